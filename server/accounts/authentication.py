@@ -0,0 +1,166 @@
+"""
+JWT authentication without a user query per request.
+
+``CachedJWTAuthentication`` (the default authentication class) resolves the
+token's user from the Django cache ``CACHE``: the account's columns but the
+password hash, plus the profile's columns (not its followers or saved
+posts) so that ``request.user.profile`` doesn't query either. A miss loads
+both in one query and caches them for ``TTL_SECONDS``. Views get regular
+model instances; the password is loaded on first access, and saving the
+account writes only the fields it was loaded with.
+
+Entries are keyed by user id and the user's version, a counter also kept in
+the cache. Saving or deleting the account or its profile (profile edits,
+deactivation, password changes) bumps the version, which makes the cached
+entry unreachable in every process sharing the cache; it is bumped once
+right away and again after commit, so a request that read the old row
+meanwhile can't bring it back. That only works if every worker process sees
+the bump: with a per-process cache (LocMemCache, the default without
+``CACHE_URL``) the user isn't cached at all, and each request loads the
+user and profile in one query. ``record_login`` updates last_login without a save, so it
+doesn't invalidate anything; the cached last_login may lag.
+
+``ClaimsOnlyJWTAuthentication`` is for read-only views that only need the
+user's id: safe requests get a ``TokenUser`` built from the token claims, with
+no cache or database access at all. Such a user isn't a model instance, so
+those views filter on ``user_id=request.user.id``. A deactivated user keeps
+access to them until the access token expires.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from config.caching import is_shared_cache
+
+from .models import Account, UserProfile
+
+DEFAULT_AUTH_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'TTL_SECONDS': 60,  # Longest a change made in another process can go unnoticed if an invalidation is lost
+    'CACHE': 'default',
+}
+
+USER_KEY = 'auth-user:{}:{}'
+VERSION_KEY = 'auth-user-version:{}'
+
+
+def get_auth_cache_settings():
+    """Return the authentication cache settings merged over the defaults"""
+    return {**DEFAULT_AUTH_CACHE_SETTINGS, **getattr(settings, 'AUTH_CACHE', {})}
+
+
+def _account_fields():
+    return [field.attname for field in Account._meta.concrete_fields if field.attname != 'password']
+
+
+def _profile_fields():
+    # Every column: a deferred one would cost a query when a view reads it
+    return [field.attname for field in UserProfile._meta.concrete_fields]
+
+
+def _value(instance, attname):
+    value = getattr(instance, attname)
+    return value.name if isinstance(value, FieldFile) else value
+
+
+def _entry(user):
+    """Cacheable projection of ``user`` and its profile"""
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        profile = None
+    return {
+        'user': [_value(user, attname) for attname in _account_fields()],
+        'profile': [_value(profile, attname) for attname in _profile_fields()] if profile is not None else None,
+    }
+
+
+def _user_from_entry(entry):
+    user = Account.from_db(DEFAULT_DB_ALIAS, _account_fields(), entry['user'])
+    profile = None
+    if entry['profile'] is not None:
+        profile = UserProfile.from_db(DEFAULT_DB_ALIAS, _profile_fields(), entry['profile'])
+        UserProfile.user.field.set_cached_value(profile, user)
+    Account.profile.related.set_cached_value(user, profile)
+    return user
+
+
+def _user_version(cache, user_id):
+    return cache.get(VERSION_KEY.format(user_id), 0)
+
+
+def invalidate_cached_user(user_id, config=None):
+    """Make every process re-read ``user_id`` on its next request"""
+    config = config or get_auth_cache_settings()
+    cache = caches[config['CACHE']]
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_cached_user_on_commit(user_id):
+    invalidate_cached_user(user_id)
+    transaction.on_commit(partial(invalidate_cached_user, user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication resolving the user from the cache (see the module docstring)"""
+
+    def get_user(self, validated_token):
+        config = get_auth_cache_settings()
+        if not config['ENABLED'] or api_settings.CHECK_REVOKE_TOKEN:
+            # The revocation check needs the password hash, which isn't cached
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if not is_shared_cache(config['CACHE']):
+            # Another worker's invalidation would never reach this process
+            user = self._load_user(user_id)
+        else:
+            cache = caches[config['CACHE']]
+            key = USER_KEY.format(user_id, _user_version(cache, user_id))
+            entry = cache.get(key)
+            if entry is not None:
+                user = _user_from_entry(entry)
+            else:
+                user = self._load_user(user_id)
+                # Filled under the version read before the query: if the user changed meanwhile, nobody reads it
+                cache.set(key, _entry(user), config['TTL_SECONDS'])
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+    def _load_user(self, user_id):
+        try:
+            return Account.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+        except Account.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+
+class ClaimsOnlyJWTAuthentication(CachedJWTAuthentication):
+    """Claims-only ``TokenUser`` for safe requests, the cached user for the others"""
+
+    def authenticate(self, request):
+        self._claims_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self._claims_only:
+            return JWTStatelessUserAuthentication.get_user(self, validated_token)
+        return super().get_user(validated_token)
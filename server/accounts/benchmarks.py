@@ -0,0 +1,79 @@
+"""
+Benchmarks for the sign-in and user search endpoints, run with
+``python manage.py benchmark`` (see config/benchmarks.py).
+
+They run as ``context.user``; the sign-in ones inside a transaction that is
+rolled back. Passwords use the MD5 hasher so that the timings show the database work of
+a login rather than PBKDF2, which costs the same before and after any
+change here.
+"""
+
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.benchmarks import benchmark
+from .views import LoginView, TokenRefreshView, UserSearchView
+
+PASSWORD = 'Benchmark123!'
+
+
+@benchmark('accounts.login')
+def login(context):
+    """POST /api/accounts/login/ with valid credentials, last_login written on every login"""
+    factory = APIRequestFactory()
+    view = LoginView.as_view()
+    with transaction.atomic(), override_settings(
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        LOGIN_TRACKING={'LAST_LOGIN_INTERVAL_MINUTES': 0},
+    ):
+        context.user.set_password(PASSWORD)
+        context.user.save()
+
+        def post():
+            request = factory.post(
+                '/api/accounts/login/', {'email': context.user.email, 'password': PASSWORD}, format='json'
+            )
+            response = view(request)
+            assert response.status_code == 200, response.data
+            return response
+
+        yield post
+        transaction.set_rollback(True)
+
+
+@benchmark('accounts.token_refresh')
+def token_refresh(context):
+    """POST /api/accounts/token/refresh/, rotating and blacklisting the refresh token"""
+    factory = APIRequestFactory()
+    view = TokenRefreshView.as_view()
+    with transaction.atomic():
+        tokens = {'refresh': str(RefreshToken.for_user(context.user))}
+
+        def post():
+            request = factory.post('/api/accounts/token/refresh/', tokens, format='json')
+            response = view(request)
+            assert response.status_code == 200, response.data
+            tokens['refresh'] = response.data['refresh']
+            return response
+
+        yield post
+        transaction.set_rollback(True)
+
+
+@benchmark('accounts.user_search')
+def user_search(context):
+    """GET /api/accounts/users/search/ for a common first name and a two-letter prefix"""
+    factory = APIRequestFactory()
+    view = UserSearchView.as_view()
+
+    def search():
+        for query in ('ahmad', 'ha'):
+            request = factory.get('/api/accounts/users/search/', {'q': query, 'limit': 20})
+            force_authenticate(request, user=context.user)
+            response = view(request)
+            assert response.status_code == 200, response.data
+        return response
+
+    yield search
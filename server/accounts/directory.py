@@ -0,0 +1,183 @@
+"""
+Versioned user directory for the chat client's local user cache.
+
+The directory is the minimal card of every account (id, name, email,
+avatar URL, admin flag). Clients do one full sync, in cursor pages or as a
+single NDJSON stream, and then only ask for the users that changed since
+the version they hold:
+
+    GET users/directory/                     -> first page + next_cursor
+    GET users/directory/?cursor=...          -> following pages
+    GET users/directory/?since=<version>     -> changed and deleted users
+
+Versions are ids in the ``DirectoryChange`` log. Log ids come from a
+sequence, so a transaction that commits late can make an older id appear
+after newer ones were already read; the version handed to clients never
+moves past changes younger than ``SETTLE_SECONDS``, which are delivered
+again on the next delta instead of being skipped.
+"""
+
+import base64
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Account, DirectoryChange
+
+DEFAULT_USER_DIRECTORY_SETTINGS = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    'CHUNK_SIZE': 2000,     # Rows fetched per query while streaming
+    'SETTLE_SECONDS': 2,    # Window in which late-committing changes may still appear
+}
+
+ENTRY_COLUMNS = ('id', 'first_name', 'last_name', 'email', 'profile_picture', 'is_admin')
+
+CURSOR_VERSION = 'd1'
+
+
+class InvalidDirectoryCursor(ValueError):
+    pass
+
+
+def get_user_directory_settings():
+    """Return the user directory settings merged over the defaults"""
+    return {**DEFAULT_USER_DIRECTORY_SETTINGS, **getattr(settings, 'USER_DIRECTORY', {})}
+
+
+class EntryBuilder:
+    """Turns ``ENTRY_COLUMNS`` value rows into directory entries without loading models"""
+
+    def __init__(self):
+        self.storage = Account._meta.get_field('profile_picture').storage
+        base_url = getattr(settings, 'BASE_URL', None)
+        self.base_url = base_url.rstrip('/') if base_url else None
+
+    def avatar_url(self, name):
+        if not name:
+            return ''
+        avatar_url = self.storage.url(name)
+        if avatar_url.startswith('http') or not self.base_url:
+            return avatar_url
+        if not avatar_url.startswith('/'):
+            avatar_url = '/' + avatar_url
+        return self.base_url + avatar_url
+
+    def __call__(self, row):
+        user_id, first_name, last_name, email, picture, is_admin = row
+        return {
+            'id': str(user_id),
+            'name': f"{first_name} {last_name}".strip(),
+            'email': email,
+            'avatarUrl': self.avatar_url(picture),
+            'is_admin': is_admin,
+        }
+
+
+def iter_entries(queryset=None, chunk_size=None):
+    """Stream directory entries in id order with a server-side cursor"""
+    queryset = Account.objects.all() if queryset is None else queryset
+    chunk_size = chunk_size or get_user_directory_settings()['CHUNK_SIZE']
+    build = EntryBuilder()
+    for row in queryset.order_by('id').values_list(*ENTRY_COLUMNS).iterator(chunk_size=chunk_size):
+        yield build(row)
+
+
+def latest_version():
+    """Id of the newest change; one cheap query, used for ETags"""
+    return DirectoryChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def settled_version():
+    """Newest version no late-committing change can still slip under"""
+    settled_before = timezone.now() - timedelta(seconds=get_user_directory_settings()['SETTLE_SECONDS'])
+    newest = DirectoryChange.objects.filter(created_at__lte=settled_before).aggregate(latest=Max('id'))['latest']
+    return newest or 0
+
+
+def directory_etag(request, version):
+    accepted = getattr(request, 'accepted_media_type', '') or request.META.get('HTTP_ACCEPT', '')
+    params = sorted((key, value) for key, values in request.GET.lists() for value in values)
+    raw = repr([request.get_host(), request.path, params, accepted, version, getattr(settings, 'BASE_URL', None)])
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def encode_cursor(after_id, version):
+    raw = f"{CURSOR_VERSION}:{after_id}:{version}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (last user id of the previous page, snapshot version)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        prefix, after_id, version = raw.split(':')
+        if prefix != CURSOR_VERSION:
+            raise ValueError(prefix)
+        return int(after_id), int(version)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidDirectoryCursor(f"Invalid cursor: {cursor}") from e
+
+
+def fetch_page(cursor=None, limit=None):
+    """
+    One page of the full directory in id order. The version is fixed when
+    the first page is read and carried in the cursor; once the last page is
+    read the client continues with deltas ``since`` that version.
+    """
+    config = get_user_directory_settings()
+    limit = max(1, min(limit or config['PAGE_SIZE'], config['MAX_PAGE_SIZE']))
+    if cursor:
+        after_id, version = decode_cursor(cursor)
+    else:
+        after_id, version = 0, settled_version()
+
+    build = EntryBuilder()
+    rows = list(
+        Account.objects.filter(id__gt=after_id).order_by('id').values_list(*ENTRY_COLUMNS)[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'version': version,
+        'users': [build(row) for row in rows],
+        'next_cursor': encode_cursor(rows[-1][0], version) if has_more else None,
+    }
+
+
+def fetch_delta(since, limit=None):
+    """
+    Users changed after version ``since``: their current entries, the ids of
+    deleted accounts, the version to ask from next and whether more changes
+    are waiting.
+    """
+    config = get_user_directory_settings()
+    limit = max(1, min(limit or config['PAGE_SIZE'], config['MAX_PAGE_SIZE']))
+    rows = list(
+        DirectoryChange.objects.filter(id__gt=since).order_by('id').values_list('id', 'user_id', 'created_at')[:limit]
+    )
+
+    # Advance only over changes that can no longer be overtaken by a late commit
+    settled_before = timezone.now() - timedelta(seconds=config['SETTLE_SECONDS'])
+    next_version = since
+    for change_id, _user_id, created_at in rows:
+        if created_at > settled_before:
+            break
+        next_version = change_id
+
+    user_ids = list(dict.fromkeys(user_id for _change_id, user_id, _created_at in rows))
+    build = EntryBuilder()
+    users = [
+        build(row)
+        for row in Account.objects.filter(id__in=user_ids).order_by('id').values_list(*ENTRY_COLUMNS)
+    ]
+    found = {int(user['id']) for user in users}
+    return {
+        'version': next_version,
+        'users': users,
+        'deleted': [str(user_id) for user_id in user_ids if user_id not in found],
+        'has_more': len(rows) == limit and next_version == rows[-1][0],
+    }
@@ -0,0 +1,311 @@
+"""
+Firestore copy of the users, for the chat client (``users`` collection).
+
+Saving an account no longer writes to Firestore. ``Account.save`` and
+``UserProfile.save`` add a ``UserSyncOutbox`` row in the same transaction
+when a synced field changed (a last_login update doesn't), deletions add one
+too, and ``set_online``/``set_offline`` add presence rows. The rows commit
+or roll back with the change, so Firestore never sees a save that didn't
+happen and never misses one that did.
+
+``process_user_sync_outbox`` drains the outbox: each run takes the users
+with due rows, coalesces each user's rows into one write of the current
+account (the last presence row wins) and sends them as one Firestore
+batched write of at most ``BATCH_SIZE`` (<= 500) operations. The rows are
+deleted only after the batch committed; on failure they stay and are
+retried on the next run. Several workers may run: they wait on each
+other's row locks, so a user is never written by two at once.
+
+Presence is debounced. A presence row becomes due ``PRESENCE_DEBOUNCE_SECONDS``
+after it was queued and a user is due only once all its rows are, so an app
+flapping between foreground and background ends in one write of its last
+state; ``PRESENCE_MAX_DELAY_SECONDS`` bounds how long a flapping user waits.
+
+``sync_users_to_firestore`` reconciles the collection with the database
+(``reconcile_users``), for the first sync and after outages. A pass only
+visits the users whose ``firestore_changed_at`` (account or profile) is
+newer than the last completed pass, or every user with ``full``, skips those
+whose document hashes to what it last wrote (``FirestoreUserState``) and
+commits the rest in batched writes, ``RECONCILE_WORKERS`` batches at a time.
+Its ``FirestoreSyncCheckpoint`` advances after every chunk, so an
+interrupted pass resumes where it stopped.
+"""
+
+import hashlib
+import json
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from .models import Account, FirestoreSyncCheckpoint, FirestoreUserState, UserProfile, UserSyncOutbox
+
+DEFAULT_FIRESTORE_SYNC_SETTINGS = {
+    'COLLECTION': 'users',
+    'BATCH_SIZE': 500,                  # Users per Firestore batched write; Firestore allows 500 writes
+    'PRESENCE_DEBOUNCE_SECONDS': 10,    # Presence must be stable this long before it's written
+    'PRESENCE_MAX_DELAY_SECONDS': 60,   # ... but a user is never held back longer than this
+    'RECONCILE_CHUNK_SIZE': 2000,       # Users read, hashed and checkpointed together by sync_users_to_firestore
+    'RECONCILE_WORKERS': 4,             # Batched writes it commits in parallel
+    'RECONCILE_OVERLAP_SECONDS': 60,    # Passes look back this far, for saves that committed during the previous one
+}
+
+MAX_BATCH_WRITES = 500
+
+OutboxRun = namedtuple('OutboxRun', ['users', 'changes', 'deleted', 'presence'])
+
+ReconcileRun = namedtuple('ReconcileRun', ['checked', 'written', 'deleted', 'seconds', 'full', 'resumed_after'])
+
+
+def get_firestore_sync_settings():
+    """Return the Firestore sync settings merged over the defaults"""
+    return {**DEFAULT_FIRESTORE_SYNC_SETTINGS, **getattr(settings, 'FIRESTORE_SYNC', {})}
+
+
+def get_firestore_client():
+    """Initialize the Firebase app once and return a Firestore client"""
+    if not firebase_admin._apps:
+        cred_path = getattr(
+            settings,
+            'FIREBASE_CRED_PATH',
+            '/Users/momen_mac/Desktop/flutter_application/server/livespot-b1eb4-firebase-adminsdk-fbsvc-f5e95b9818.json'
+        )
+        firebase_admin.initialize_app(credentials.Certificate(cred_path))
+    return firestore.client()
+
+
+def user_document(user, online=None):
+    """
+    Fields of ``user``'s Firestore document. ``isOnline`` is only included
+    when ``online`` is given: documents are merged, so a profile edit leaves
+    the presence the app last reported alone.
+    """
+    data = {
+        'id': str(user.id),
+        'name': f"{user.first_name} {user.last_name}".strip(),
+        'email': user.email,
+        'avatarUrl': user.profile_picture.url if user.profile_picture else '',
+    }
+    try:
+        profile = user.profile
+    except Account.profile.RelatedObjectDoesNotExist:
+        profile = None
+    if profile is not None:
+        data.update({
+            'username': profile.username,
+            'bio': profile.bio,
+            'honesty_score': profile.honesty_score,
+        })
+    if online is not None:
+        data['isOnline'] = online
+    return data
+
+
+def ready_user_ids(limit, now=None, config=None):
+    """Users whose outbox rows are all due (or waited PRESENCE_MAX_DELAY_SECONDS), oldest first"""
+    config = config or get_firestore_sync_settings()
+    now = now or timezone.now()
+    overdue = now - timedelta(seconds=config['PRESENCE_MAX_DELAY_SECONDS'])
+    return list(
+        UserSyncOutbox.objects.values('user_id')
+        .annotate(ready_at=Max('available_at'), queued_at=Min('created_at'))
+        .filter(Q(ready_at__lte=now) | Q(queued_at__lte=overdue))
+        .order_by('queued_at')
+        .values_list('user_id', flat=True)[:limit]
+    )
+
+
+def process_outbox(client=None, batch_size=None, now=None):
+    """
+    Write one batch of due users to Firestore and delete their outbox rows.
+    Returns an ``OutboxRun``; raises (keeping the rows) if the write fails.
+    """
+    config = get_firestore_sync_settings()
+    batch_size = min(batch_size or config['BATCH_SIZE'], MAX_BATCH_WRITES)
+
+    with transaction.atomic():
+        user_ids = ready_user_ids(batch_size, now=now, config=config)
+        if not user_ids:
+            return OutboxRun(0, 0, 0, 0)
+        # Rows queued while this batch is written stay for the next run
+        rows = list(
+            UserSyncOutbox.objects.select_for_update()
+            .filter(user_id__in=user_ids)
+            .order_by('id')
+            .values_list('id', 'user_id', 'online')
+        )
+        if not rows:
+            # Another worker synced them meanwhile
+            return OutboxRun(0, 0, 0, 0)
+
+        presence = {}
+        for _, user_id, online in rows:
+            if online is not None:
+                presence[user_id] = online
+        user_ids = list(dict.fromkeys(user_id for _, user_id, _ in rows))
+        users = Account.objects.select_related('profile').in_bulk(user_ids)
+
+        client = client or get_firestore_client()
+        collection = client.collection(config['COLLECTION'])
+        batch = client.batch()
+        deleted = 0
+        for user_id in user_ids:
+            reference = collection.document(str(user_id))
+            user = users.get(user_id)
+            if user is None:
+                batch.delete(reference)
+                deleted += 1
+            else:
+                batch.set(reference, user_document(user, online=presence.get(user_id)), merge=True)
+        batch.commit()
+
+        UserSyncOutbox.objects.filter(id__in=[row_id for row_id, _, _ in rows]).delete()
+    return OutboxRun(len(user_ids), len(rows), deleted, len(presence))
+
+
+def pending_summary(now=None):
+    """Rows, users and due users waiting in the outbox"""
+    totals = UserSyncOutbox.objects.aggregate(rows=Count('id'), users=Count('user_id', distinct=True))
+    return {**totals, 'due_users': len(ready_user_ids(None, now=now))}
+
+
+def document_hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _changed_user_ids(since, after, limit):
+    """The ``limit`` lowest user ids above ``after`` whose account or profile changed after ``since``"""
+    accounts = Account.objects.filter(firestore_changed_at__gt=since, id__gt=after)
+    profiles = UserProfile.objects.filter(firestore_changed_at__gt=since, user_id__gt=after)
+    ids = set(accounts.order_by('id').values_list('id', flat=True)[:limit])
+    ids.update(profiles.order_by('user_id').values_list('user_id', flat=True)[:limit])
+    return sorted(ids)[:limit]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _commit_writes(client, collection, writes):
+    """Commit ``(user_id, document or None)`` pairs as one batched write; None deletes the document"""
+    batch = client.batch()
+    for user_id, data in writes:
+        reference = collection.document(str(user_id))
+        if data is None:
+            batch.delete(reference)
+        else:
+            batch.set(reference, data, merge=True)
+    batch.commit()
+    return len(writes)
+
+
+def reconcile_users(client=None, full=False, force=False, restart=False, dry_run=False,
+                    chunk_size=None, batch_size=None, workers=None, progress=None):
+    """
+    Bring the Firestore users collection in line with the database (see the
+    module docstring). ``force`` writes users even when their hash matches;
+    ``restart`` drops an interrupted pass instead of resuming it.
+    ``progress(checked, written, seconds)`` is called after every chunk.
+    Returns a ``ReconcileRun``; a failed write raises and leaves the
+    checkpoint after the last complete chunk.
+    """
+    config = get_firestore_sync_settings()
+    chunk_size = chunk_size or config['RECONCILE_CHUNK_SIZE']
+    batch_size = min(batch_size or config['BATCH_SIZE'], MAX_BATCH_WRITES)
+    workers = workers or config['RECONCILE_WORKERS']
+
+    checkpoint = (
+        FirestoreSyncCheckpoint.objects.filter(name=config['COLLECTION']).first()
+        or FirestoreSyncCheckpoint(name=config['COLLECTION'])
+    )
+    resumed_after = None
+    if checkpoint.pass_started_at is not None and not (restart or full):
+        resumed_after = checkpoint.cursor
+    else:
+        checkpoint.pass_started_at = timezone.now()
+        checkpoint.pass_since = None if full else checkpoint.synced_through
+        checkpoint.cursor = 0
+        if not dry_run:
+            checkpoint.save()
+    since = checkpoint.pass_since
+    if since is not None:
+        since -= timedelta(seconds=config['RECONCILE_OVERLAP_SECONDS'])
+
+    if client is None and not dry_run:
+        client = get_firestore_client()
+    collection = client.collection(config['COLLECTION']) if client is not None else None
+    checked = written = 0
+    start = time.perf_counter()
+    after = checkpoint.cursor
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='firestore-sync') as executor:
+        while True:
+            if since is None:
+                user_ids = list(
+                    Account.objects.filter(id__gt=after).order_by('id').values_list('id', flat=True)[:chunk_size]
+                )
+            else:
+                user_ids = _changed_user_ids(since, after, chunk_size)
+            if not user_ids:
+                break
+            users = Account.objects.select_related('profile').in_bulk(user_ids)
+            documents = {user_id: user_document(user) for user_id, user in users.items()}
+            hashes = {user_id: document_hash(data) for user_id, data in documents.items()}
+            stored = dict(
+                FirestoreUserState.objects.filter(user_id__in=hashes).values_list('user_id', 'document_hash')
+            )
+            changed = [
+                user_id for user_id in user_ids
+                if user_id in hashes and (force or stored.get(user_id) != hashes[user_id])
+            ]
+
+            if not dry_run and changed:
+                writes = [(user_id, documents[user_id]) for user_id in changed]
+                # Waits for every batch: the checkpoint may only pass users that are written
+                list(executor.map(lambda chunk: _commit_writes(client, collection, chunk), _chunks(writes, batch_size)))
+                now = timezone.now()
+                FirestoreUserState.objects.bulk_create(
+                    [
+                        FirestoreUserState(user_id=user_id, document_hash=hashes[user_id], synced_at=now)
+                        for user_id in changed
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['user_id'],
+                    update_fields=['document_hash', 'synced_at'],
+                )
+            checked += len(user_ids)
+            written += len(changed)
+            after = user_ids[-1]
+            if not dry_run:
+                checkpoint.cursor = after
+                checkpoint.save(update_fields=['cursor', 'updated_at'])
+            if progress:
+                progress(checked, written, time.perf_counter() - start)
+
+        deleted = _delete_missing_users(client, collection, executor, batch_size, dry_run)
+
+    if not dry_run:
+        checkpoint.synced_through = checkpoint.pass_started_at
+        checkpoint.pass_started_at = checkpoint.pass_since = None
+        checkpoint.cursor = 0
+        checkpoint.save()
+    return ReconcileRun(checked, written, deleted, time.perf_counter() - start, since is None, resumed_after)
+
+
+def _delete_missing_users(client, collection, executor, batch_size, dry_run):
+    """Remove the documents this command wrote for users that no longer exist"""
+    missing = list(
+        FirestoreUserState.objects.exclude(user_id__in=Account.objects.values('id')).values_list('user_id', flat=True)
+    )
+    if missing and not dry_run:
+        writes = [(user_id, None) for user_id in missing]
+        list(executor.map(lambda chunk: _commit_writes(client, collection, chunk), _chunks(writes, batch_size)))
+        FirestoreUserState.objects.filter(user_id__in=missing).delete()
+    return len(missing)
@@ -0,0 +1,102 @@
+"""
+Lean login bookkeeping and token refresh.
+
+Recording a login used to save the account with
+``update_fields=['last_login']``: that runs ``Account.save`` and the
+post_save handlers, which reload and save the whole profile on every login
+and token obtain. ``record_login`` writes ``last_login`` with a single
+conditional UPDATE instead, and only when the stored value is older than
+``LAST_LOGIN_INTERVAL_MINUTES`` (no query at all otherwise). No signals run,
+so nothing is queued for Firestore either; ``last_login`` isn't synced.
+
+``LeanTokenRefreshSerializer`` (``SIMPLE_JWT['TOKEN_REFRESH_SERIALIZER']``)
+rotates refresh tokens like simplejwt's, but loads the user once: the stock
+serializer looks the user up again to blacklist the old token and to list
+the new one, and does both through ``get_or_create``.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+DEFAULT_LOGIN_SETTINGS = {
+    'LAST_LOGIN_INTERVAL_MINUTES': 5,  # last_login is written at most this often per user; 0 = every login
+}
+
+
+def get_login_settings():
+    """Return the login settings merged over the defaults"""
+    return {**DEFAULT_LOGIN_SETTINGS, **getattr(settings, 'LOGIN_TRACKING', {})}
+
+
+def record_login(user, now=None):
+    """Set ``user``'s last_login to now unless it was set recently; returns True when it was written"""
+    now = now or timezone.now()
+    stale_before = now - timedelta(minutes=get_login_settings()['LAST_LOGIN_INTERVAL_MINUTES'])
+    if user.last_login is not None and user.last_login > stale_before:
+        return False
+    # The condition is repeated in SQL so concurrent logins write once
+    written = get_user_model().objects.filter(
+        Q(last_login__isnull=True) | Q(last_login__lte=stale_before), pk=user.pk
+    ).update(last_login=now)
+    if written:
+        user.last_login = now
+    return bool(written)
+
+
+def _outstand(token, user):
+    return OutstandingToken.objects.create(
+        user=user,
+        jti=token[api_settings.JTI_CLAIM],
+        token=str(token),
+        created_at=token.current_time,
+        expires_at=datetime_from_epoch(token['exp']),
+    )
+
+
+def _blacklist(token, user):
+    token_id = (
+        OutstandingToken.objects.filter(jti=token[api_settings.JTI_CLAIM]).values_list('id', flat=True).first()
+    )
+    if token_id is None:
+        # Issued before the blacklist app was installed
+        token_id = _outstand(token, user).id
+    BlacklistedToken.objects.bulk_create([BlacklistedToken(token_id=token_id)], ignore_conflicts=True)
+
+
+class LeanTokenRefreshSerializer(TokenRefreshSerializer):
+    """TokenRefreshSerializer with one user lookup and plain inserts (see the module docstring)"""
+
+    def validate(self, attrs):
+        # Verifies the signature and expiry, and that the token isn't blacklisted
+        refresh = self.token_class(attrs['refresh'])
+
+        user = None
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        if user_id:
+            user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                _blacklist(refresh, user)
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            _outstand(refresh, user)
+
+            data['refresh'] = str(refresh)
+
+        return data
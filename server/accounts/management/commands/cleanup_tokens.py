@@ -1,31 +1,89 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+"""
+Django management command deleting expired refresh tokens and their
+blacklist entries in id chunks (see accounts/token_cleanup.py). Run it as a
+daily cron job, or keep it running in the background:
+
+    python manage.py cleanup_tokens
+    python manage.py cleanup_tokens --daemon
+    python manage.py cleanup_tokens --dry-run
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.token_cleanup import (
+    cleanup_expired_tokens,
+    expired_summary,
+    get_token_cleanup_settings,
+    rows_per_second,
+)
+
 
 class Command(BaseCommand):
-    help = 'Clean up expired tokens from the database'
+    help = 'Delete expired outstanding and blacklisted tokens in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Outstanding token ids per DELETE (default: TOKEN_CLEANUP CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=None,
+            help='Seconds to pause after each chunk that deleted rows (default: TOKEN_CLEANUP SLEEP_SECONDS)'
+        )
+        parser.add_argument('--daemon', action='store_true', help='Keep cleaning up every --interval seconds')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Seconds between cleanups in daemon mode (default: TOKEN_CLEANUP INTERVAL_SECONDS)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Count the expired tokens without deleting them')
 
     def handle(self, *args, **options):
-        # Delete expired blacklisted tokens
-        expired_tokens = OutstandingToken.objects.filter(expires_at__lt=timezone.now())
-        
-        # Count tokens before deletion
-        total_count = OutstandingToken.objects.count()
-        expired_count = expired_tokens.count()
-        
-        # Count blacklisted tokens that will be deleted
-        blacklisted_count = BlacklistedToken.objects.filter(token__expires_at__lt=timezone.now()).count()
-        
-        # Delete blacklisted tokens first as they reference outstanding tokens
-        BlacklistedToken.objects.filter(token__in=expired_tokens).delete()
-        
-        # Then delete outstanding tokens
-        deleted_count = expired_tokens.delete()[0]
-        
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        if options['sleep'] is not None and options['sleep'] < 0:
+            raise CommandError('--sleep must not be negative')
+
+        if options['dry_run']:
+            summary = expired_summary()
+            self.stdout.write(self.style.WARNING(
+                f"DRY RUN: Would delete {summary['outstanding']} expired tokens "
+                f"and {summary['blacklisted']} blacklist entries"
+            ))
+            return
+
+        if options['daemon']:
+            interval = options['interval'] or get_token_cleanup_settings()['INTERVAL_SECONDS']
+            self.stdout.write(f'Cleaning up expired tokens every {interval:g}s. Press Ctrl+C to stop.')
+            try:
+                while True:
+                    self.cleanup(options)
+                    time.sleep(interval)
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.SUCCESS('Stopped.'))
+        else:
+            self.cleanup(options)
+
+    def cleanup(self, options):
+        run = cleanup_expired_tokens(
+            chunk_size=options['chunk_size'],
+            sleep_seconds=options['sleep'],
+            progress=self.report_progress if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {run.outstanding} expired tokens and {run.blacklisted} blacklist entries '
+            f'in {run.chunks} chunks, {run.seconds:.2f}s ({rows_per_second(run):.0f} rows/s)'
+        ))
+
+    def report_progress(self, run):
         self.stdout.write(
-            self.style.SUCCESS(
-                f'Cleaned up {deleted_count} expired tokens\n'
-                f'Removed {blacklisted_count} blacklisted tokens\n'
-                f'Remaining tokens: {total_count - deleted_count}'
-            )
+            f'{run.chunks} chunks, {run.outstanding} tokens and {run.blacklisted} blacklist entries deleted, '
+            f'{rows_per_second(run):.0f} rows/s'
         )
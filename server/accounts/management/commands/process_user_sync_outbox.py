@@ -0,0 +1,84 @@
+"""
+Django management command draining the Firestore user sync outbox (see
+accounts/firestore_sync.py): coalesces the queued changes of each user and
+writes them with Firestore batched writes.
+
+    python manage.py process_user_sync_outbox              # until nothing is due
+    python manage.py process_user_sync_outbox --daemon
+    python manage.py process_user_sync_outbox --dry-run
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.firestore_sync import MAX_BATCH_WRITES, get_firestore_sync_settings, pending_summary, process_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Write the queued account changes to the Firestore users collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help=f'Users per Firestore batched write (default: BATCH_SIZE, at most {MAX_BATCH_WRITES})'
+        )
+        parser.add_argument('--daemon', action='store_true', help='Keep polling the outbox')
+        parser.add_argument(
+            '--sleep-interval',
+            type=float,
+            default=2.0,
+            help='Seconds between polls when nothing is due (daemon mode)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Show what is queued without writing')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            summary = pending_summary()
+            self.stdout.write(
+                f"{summary['rows']} queued changes for {summary['users']} users, "
+                f"{summary['due_users']} users due now"
+            )
+            return
+
+        batch_size = options['batch_size'] or get_firestore_sync_settings()['BATCH_SIZE']
+        if options['daemon']:
+            self.stdout.write('Processing the user sync outbox. Press Ctrl+C to stop.')
+            try:
+                while True:
+                    if not self.drain(batch_size):
+                        time.sleep(options['sleep_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.SUCCESS('Stopped.'))
+        else:
+            self.drain(batch_size)
+
+    def drain(self, batch_size):
+        """Write batches until nothing is due; returns the number of users written"""
+        users = changes = deleted = batches = 0
+        start = time.perf_counter()
+        while True:
+            try:
+                run = process_outbox(batch_size=batch_size)
+            except Exception as e:
+                # The rows stay queued; the next drain retries them
+                logger.error(f'Firestore user sync failed: {e}')
+                self.stderr.write(f'Firestore user sync failed, will retry: {e}')
+                break
+            if not run.users:
+                break
+            batches += 1
+            users += run.users
+            changes += run.changes
+            deleted += run.deleted
+        if users:
+            self.stdout.write(
+                f'Synced {users} users ({changes} queued changes, {deleted} deletions) '
+                f'in {batches} batches, {time.perf_counter() - start:.2f}s'
+            )
+        return users
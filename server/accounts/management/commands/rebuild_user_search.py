@@ -0,0 +1,40 @@
+"""
+Django management command recomputing the user search columns of every
+profile (see accounts/search.py). Run it after bulk edits that bypass
+UserProfile.save:
+
+    python manage.py rebuild_user_search
+    python manage.py rebuild_user_search --dry-run
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recompute the search text and follower totals the user search ranks on'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Profiles read and written together')
+        parser.add_argument('--dry-run', action='store_true', help='Count the profiles that would be updated')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        start = time.perf_counter()
+        checked, updated = rebuild_search_index(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            progress=self.report_progress if options['verbosity'] > 1 else None,
+        )
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {updated} of {checked} profiles in {time.perf_counter() - start:.2f}s'
+        ))
+
+    def report_progress(self, checked, updated):
+        self.stdout.write(f'{checked} profiles checked, {updated} updated')
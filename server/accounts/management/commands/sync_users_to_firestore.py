@@ -1,47 +1,74 @@
 """
-Django management command to sync all users from your Django Account model to Firestore users collection.
-Run with: python manage.py sync_users_to_firestore
+Django management command reconciling the Firestore users collection with
+the database (see accounts/firestore_sync.py). Day to day the outbox keeps
+Firestore current; this is for the first sync and after outages.
+
+    python manage.py sync_users_to_firestore            # users changed since the last pass
+    python manage.py sync_users_to_firestore --full     # every user, unchanged documents still skipped
+    python manage.py sync_users_to_firestore --full --force
+    python manage.py sync_users_to_firestore --dry-run
+
+An interrupted pass resumes after the last checkpointed user on the next
+run; --restart starts over instead.
 """
 
-from django.core.management.base import BaseCommand
-from accounts.models import Account
-import firebase_admin
-from firebase_admin import credentials, firestore
-from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.firestore_sync import MAX_BATCH_WRITES, reconcile_users
+
 
 class Command(BaseCommand):
-    help = 'Sync all users from Django Account model to Firestore users collection'
+    help = 'Write the users changed since the last sync to the Firestore users collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Visit every user, not only the changed ones')
+        parser.add_argument('--force', action='store_true', help='Write users even when their document is unchanged')
+        parser.add_argument('--restart', action='store_true', help='Drop an interrupted pass instead of resuming it')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Users read and checkpointed together (default: RECONCILE_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help=f'Users per Firestore batched write (default: BATCH_SIZE, at most {MAX_BATCH_WRITES})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Batched writes committed in parallel (default: RECONCILE_WORKERS)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Count the users that would be written')
 
     def handle(self, *args, **options):
-        # Use your actual service account path
-        FIREBASE_CRED_PATH = getattr(
-            settings,
-            'FIREBASE_CRED_PATH',
-            '/Users/momen_mac/Desktop/flutter_application/server/livespot-b1eb4-firebase-adminsdk-fbsvc-f5e95b9818.json'
+        for option in ('chunk_size', 'batch_size', 'workers'):
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be positive")
+
+        run = reconcile_users(
+            full=options['full'],
+            force=options['force'],
+            restart=options['restart'],
+            dry_run=options['dry_run'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            progress=self.report_progress if options['verbosity'] > 1 else None,
         )
 
-        # Initialize Firebase app if not already initialized
-        if hasattr(firebase_admin, '_apps') and isinstance(firebase_admin._apps, dict):
-            if not firebase_admin._apps:
-                cred = credentials.Certificate(FIREBASE_CRED_PATH)
-                firebase_admin.initialize_app(cred)
-        else:
-            raise RuntimeError(
-                f"firebase_admin._apps is not a dict! Type: {type(getattr(firebase_admin, '_apps', None))}. "
-                "Check your imports: do not import firebase_admin.initialize_app as firebase_admin."
-            )
-        db = firestore.client()
-
-        users_synced = 0
-        for user in Account.objects.all():
-            user_data = {
-                'id': str(user.id),
-                'name': f"{user.first_name} {user.last_name}".strip(),
-                'email': user.email,
-                'avatarUrl': user.profile_picture.url if user.profile_picture else '',
-                'isOnline': False,
-            }
-            db.collection('users').document(str(user.id)).set(user_data)
-            users_synced += 1
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully synced {users_synced} users to Firestore.'))
+        if run.resumed_after is not None:
+            self.stdout.write(f'Resumed the interrupted pass after user {run.resumed_after}')
+        rate = run.checked / run.seconds if run.seconds else 0.0
+        verb = 'Would write' if options['dry_run'] else 'Wrote'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {run.written} of {run.checked} {'' if run.full else 'changed '}users "
+            f"and {run.deleted} deletions in {run.seconds:.2f}s ({rate:.0f} users/s)"
+        ))
+
+    def report_progress(self, checked, written, seconds):
+        rate = checked / seconds if seconds else 0.0
+        self.stdout.write(f'{checked} users checked, {written} written, {rate:.0f} users/s')
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the table writable while the index builds.
+    # The table belongs to simplejwt's token_blacklist app, hence plain SQL here.
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0009_firestore_reconcile'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS outstanding_token_expires_idx '
+                'ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS outstanding_token_expires_idx',
+        ),
+    ]
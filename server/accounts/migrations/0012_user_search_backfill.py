@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:30
+
+import unicodedata
+
+from django.db import migrations, transaction
+from django.db.models import Count
+
+BACKFILL_BATCH_SIZE = 1000
+
+# accounts.search.SEARCH_FOLDING and normalize_search_text as of this migration
+SEARCH_FOLDING = str.maketrans({
+    'ـ': None,  # Tatweel
+    'ٱ': 'ا',  # Alef wasla -> alef
+    'ى': 'ي',  # Alef maksura -> yeh
+    'ة': 'ه',  # Teh marbuta -> heh
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},  # Extended Arabic-Indic digits
+})
+
+
+def normalize_search_text(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.translate(SEARCH_FOLDING).casefold().split())
+
+
+def backfill_user_search(apps, schema_editor):
+    """
+    Fill search_text and followers_total of the existing profiles, one short
+    transaction per id batch. The batch's profiles and accounts are locked
+    while it is computed, so a concurrent save or follow lands after it.
+    """
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    Followers = UserProfile.followers.through
+    db_alias = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        with transaction.atomic(using=db_alias):
+            batch = list(
+                UserProfile.objects.using(db_alias).filter(id__gt=last_id).order_by('id')
+                .select_related('user').select_for_update()
+                .only('id', 'user', 'username', 'user__first_name', 'user__last_name', 'user__email')
+                [:BACKFILL_BATCH_SIZE]
+            )
+            if not batch:
+                return
+            last_id = batch[-1].id
+
+            totals = dict(
+                Followers.objects.using(db_alias)
+                .filter(from_userprofile_id__in=[profile.id for profile in batch])
+                .values('from_userprofile_id').annotate(total=Count('*'))
+                .values_list('from_userprofile_id', 'total')
+            )
+            for profile in batch:
+                user = profile.user
+                profile.search_text = normalize_search_text(
+                    ' '.join([profile.username, user.first_name, user.last_name, user.email])
+                )
+                profile.followers_total = totals.get(profile.id, 0)
+            UserProfile.objects.using(db_alias).bulk_update(batch, ['search_text', 'followers_total'])
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own: one transaction would keep every profile
+    # row locked until the last batch.
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0011_user_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:20
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the table writable while the index builds.
+    # The index isn't declared on the model: the test database is built
+    # without migrations and doesn't need pg_trgm, LIKE works without it.
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0012_user_search_backfill'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS user_profile_search_trgm_idx '
+                'ON accounts_userprofile USING gin (search_text gin_trgm_ops)',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS user_profile_search_trgm_idx',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the table writable while the index builds.
+    # The expression is accounts.search.SearchWords; it needs no extension.
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0013_user_search_trigram_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS user_profile_search_words_idx "
+                "ON accounts_userprofile USING gin (array_to_tsvector(string_to_array(search_text, ' ')))",
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS user_profile_search_words_idx',
+        ),
+    ]
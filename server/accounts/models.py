@@ -2,13 +2,13 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 import os
 import uuid
+from datetime import timedelta
 from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
-from firebase_admin import firestore, credentials, initialize_app
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from django.db import transaction
+from django.db import router, transaction
 import logging
 
 def user_profile_path(instance, filename):
@@ -29,38 +29,17 @@ def user_cover_photo_path(instance, filename):
 
 def sync_user_to_firestore(user, update_online=None):
     """
-    Sync a Django Account instance to Firestore 'users' collection.
+    Write a Django Account instance to the Firestore 'users' collection right away.
     If update_online is not None, force isOnline to that value.
+
+    Saves don't call this; they go through the outbox (see accounts/firestore_sync.py).
     """
+    from .firestore_sync import get_firestore_client, get_firestore_sync_settings, user_document
+
     try:
-        # Only initialize once
-        if not hasattr(sync_user_to_firestore, "_firebase_initialized"):
-            cred_path = getattr(settings, 'FIREBASE_CRED_PATH', '/Users/momen_mac/Desktop/flutter_application/server/livespot-b1eb4-firebase-adminsdk-fbsvc-f5e95b9818.json')
-            if not firestore.client._apps:
-                cred = credentials.Certificate(cred_path)
-                initialize_app(cred)
-            sync_user_to_firestore._firebase_initialized = True
-
-        db = firestore.client()
-        user_data = {
-            'id': str(user.id),
-            'name': f"{user.first_name} {user.last_name}".strip(),
-            'email': user.email,
-            'avatarUrl': user.profile_picture.url if user.profile_picture else '',
-            'isOnline': update_online if update_online is not None else False,
-        }
-        # Try to get profile data
-        try:
-            if hasattr(user, 'profile'):
-                user_data.update({
-                    'username': user.profile.username,
-                    'bio': user.profile.bio,
-                    'honesty_score': user.profile.honesty_score,
-                })
-        except:
-            pass
-            
-        db.collection('users').document(str(user.id)).set(user_data)
+        db = get_firestore_client()
+        user_data = user_document(user, online=update_online if update_online is not None else False)
+        db.collection(get_firestore_sync_settings()['COLLECTION']).document(str(user.id)).set(user_data)
     except Exception as e:
         logging.getLogger(__name__).error(f"Failed to sync user to Firestore: {e}")
 
@@ -96,15 +75,33 @@ class Account(AbstractBaseUser, PermissionsMixin):
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)  # Changed from auto_now_add to default
     last_login = models.DateTimeField(default=timezone.now)
+    # Last change of a FIRESTORE_FIELDS value; sync_users_to_firestore only revisits users changed since its last pass
+    firestore_changed_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     objects = AccountManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    # Fields shown in the user directory (see accounts/directory.py)
+    DIRECTORY_FIELDS = ('email', 'first_name', 'last_name', 'profile_picture', 'is_admin')
+    # Fields copied to the Firestore users collection (see accounts/firestore_sync.py)
+    FIRESTORE_FIELDS = ('email', 'first_name', 'last_name', 'profile_picture')
+
     def __str__(self):
         return self.email
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the stored directory fields so saves that only touch last_login etc. aren't logged
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_directory = instance.directory_snapshot()
+        instance._loaded_firestore = instance.firestore_snapshot()
+        return instance
+
+    def directory_snapshot(self):
+        return tuple(str(self.__dict__.get(field)) for field in self.DIRECTORY_FIELDS)
+
     @property
     def is_staff(self):
         return self.is_admin
@@ -117,16 +114,82 @@ class Account(AbstractBaseUser, PermissionsMixin):
             'access': str(refresh.access_token),
         }
 
+    def firestore_snapshot(self):
+        return tuple(str(self.__dict__.get(field)) for field in self.FIRESTORE_FIELDS)
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Sync to Firestore on every save (create/update)
-        sync_user_to_firestore(self)
+        # The outbox row commits or rolls back with the save (see accounts/firestore_sync.py)
+        using = kwargs.get('using') or router.db_for_write(Account, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            created = self._state.adding
+            changed = created or getattr(self, '_loaded_firestore', None) != self.firestore_snapshot()
+            if changed:
+                mark_firestore_change(self, kwargs)
+            super().save(*args, **kwargs)
+            self._loaded_firestore = self.firestore_snapshot()
+            if created:
+                enqueue_user_sync(self.id, online=False, debounce=False)
+            elif changed:
+                enqueue_user_sync(self.id)
 
     def set_online(self):
-        sync_user_to_firestore(self, update_online=True)
+        enqueue_user_sync(self.id, online=True)
 
     def set_offline(self):
-        sync_user_to_firestore(self, update_online=False)
+        enqueue_user_sync(self.id, online=False)
+
+class DirectoryChange(models.Model):
+    """
+    Append-only log behind the user directory deltas.
+
+    A row is written when an account is created, deleted or one of its
+    ``Account.DIRECTORY_FIELDS`` changes; the auto-increment id is the
+    directory version clients sync against. ``user_id`` is not a foreign key
+    so that deletions stay in the log.
+    """
+    user_id = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} user {self.user_id}"
+
+class UserSyncOutbox(models.Model):
+    """
+    Transactional outbox of the Firestore users collection.
+
+    A row means "user ``user_id`` changed": written in the transaction that
+    saves (or deletes) the account or its synced profile fields, and drained
+    by ``process_user_sync_outbox`` (see accounts/firestore_sync.py), which
+    coalesces the rows of each user into one Firestore write. ``online`` is
+    set by presence changes, which become due only at ``available_at``.
+    ``user_id`` is not a foreign key so that deletions are synced too.
+    """
+    user_id = models.BigIntegerField(db_index=True)
+    online = models.BooleanField(null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} user {self.user_id}"
+
+def enqueue_user_sync(user_id, online=None, debounce=True):
+    """
+    Queue a Firestore sync of ``user_id``; ``online`` also sets its presence.
+    Presence changes are debounced: flapping within PRESENCE_DEBOUNCE_SECONDS
+    ends in a single write of the last state.
+    """
+    from .firestore_sync import get_firestore_sync_settings
+
+    available_at = timezone.now()
+    if online is not None and debounce:
+        available_at += timedelta(seconds=get_firestore_sync_settings()['PRESENCE_DEBOUNCE_SECONDS'])
+    UserSyncOutbox.objects.create(user_id=user_id, online=online, available_at=available_at)
 
 class VerificationCode(models.Model):
     user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='verification_codes')
@@ -146,6 +209,45 @@ ACTIVITY_STATUS_CHOICES = [
     ('do_not_disturb', 'Do Not Disturb'),
 ]
 
+def mark_firestore_change(instance, save_kwargs):
+    """Stamp ``firestore_changed_at`` on a model about to be saved, also when the save lists update_fields"""
+    instance.firestore_changed_at = timezone.now()
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        save_kwargs['update_fields'] = {*update_fields, 'firestore_changed_at'}
+
+class FirestoreUserState(models.Model):
+    """
+    Hash of the document ``sync_users_to_firestore`` last wrote for a user,
+    so that users whose document would come out the same are skipped.
+    ``user_id`` is not a foreign key so that deleted users can be found.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    document_hash = models.CharField(max_length=64)
+    synced_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"user {self.user_id} {self.document_hash[:12]}"
+
+class FirestoreSyncCheckpoint(models.Model):
+    """
+    Progress of ``sync_users_to_firestore`` for one collection.
+
+    ``synced_through`` is the change time up to which every user was synced.
+    While a pass runs, ``pass_started_at`` and ``pass_since`` describe it and
+    ``cursor`` is the highest user id it finished, so an interrupted pass
+    resumes after that user; ``pass_since`` is None for a full pass.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    cursor = models.BigIntegerField(default=0)
+    pass_started_at = models.DateTimeField(null=True, blank=True)
+    pass_since = models.DateTimeField(null=True, blank=True)
+    synced_through = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} through {self.synced_through}"
+
 class UserProfile(models.Model):
     user = models.OneToOneField(Account, on_delete=models.CASCADE, related_name='profile')
     username = models.CharField(max_length=30, unique=True)
@@ -159,11 +261,68 @@ class UserProfile(models.Model):
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following', blank=True)
     interests = models.JSONField(blank=True, null=True)  # Store interests as a list of strings
     last_active = models.DateTimeField(default=timezone.now)
+    firestore_changed_at = models.DateTimeField(null=True, blank=True, db_index=True)  # See Account.firestore_changed_at
     saved_posts = models.ManyToManyField('posts.Post', related_name='saved_by_profiles', blank=True)
+    # Folded username, names and email matched by the user search (see accounts/search.py)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    # followers.count(), kept by update_followers_total so search can rank on it
+    followers_total = models.PositiveIntegerField(default=0, editable=False)
+
+    # Fields copied to the Firestore users collection (see accounts/firestore_sync.py)
+    FIRESTORE_FIELDS = ('username', 'bio', 'honesty_score')
 
     def __str__(self):
         return f"{self.user.email} - @{self.username}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the stored username so signal handlers can tell whether it changed
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_username = instance.__dict__.get('username')
+        instance._loaded_firestore = instance.firestore_snapshot()
+        return instance
+
+    def firestore_snapshot(self):
+        return tuple(str(self.__dict__.get(field)) for field in self.FIRESTORE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # Edits of the synced fields queue a Firestore sync in the same transaction;
+        # a new profile belongs to a new account, which is already queued
+        using = kwargs.get('using') or router.db_for_write(UserProfile, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            created = self._state.adding
+            if not created and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+                # followers_total is written by update_followers_total alone; a stale copy (the cached
+                # user's profile, say) mustn't overwrite it. Deferred fields stay unsaved, as in Model.save
+                deferred = self.get_deferred_fields()
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'followers_total' and field.attname not in deferred
+                ]
+            changed = created or getattr(self, '_loaded_firestore', None) != self.firestore_snapshot()
+            if changed:
+                mark_firestore_change(self, kwargs)
+            self.refresh_search_text(kwargs)
+            super().save(*args, **kwargs)
+            self._loaded_username = self.__dict__.get('username')
+            if not created and changed:
+                enqueue_user_sync(self.user_id)
+            self._loaded_firestore = self.firestore_snapshot()
+    
+    def refresh_search_text(self, save_kwargs):
+        """Recompute ``search_text`` when the account is at hand or the username changed"""
+        from .search import profile_search_text
+
+        # Account saves reach here with the account cached; loading it otherwise is only worth it for a new username
+        if not UserProfile.user.is_cached(self) and self.__dict__.get('username') == getattr(self, '_loaded_username', None):
+            return
+        search_text = profile_search_text(self, self.user)
+        if search_text != self.search_text:
+            self.search_text = search_text
+            update_fields = save_kwargs.get('update_fields')
+            if update_fields is not None:
+                save_kwargs['update_fields'] = {*update_fields, 'search_text'}
+
     @property
     def followers_count(self):
         return self.followers.count()
@@ -221,6 +380,25 @@ def create_user_profile(sender, instance, created, **kwargs):
                 )
                 logging.getLogger(__name__).info(f"Created profile for user: {instance.email} with username: {username}")
 
+# Signals to version the user directory
+@receiver(post_save, sender=Account)
+def record_directory_change(sender, instance, created, **kwargs):
+    """Log new accounts and edits of the fields the user directory shows"""
+    snapshot = instance.directory_snapshot()
+    if not created and getattr(instance, '_loaded_directory', None) == snapshot:
+        return
+    instance._loaded_directory = snapshot
+    DirectoryChange.objects.create(user_id=instance.id)
+
+@receiver(post_delete, sender=Account)
+def record_directory_deletion(sender, instance, **kwargs):
+    DirectoryChange.objects.create(user_id=instance.id)
+
+# Deleted accounts leave the Firestore users collection too (saves enqueue in Account.save)
+@receiver(post_delete, sender=Account)
+def enqueue_account_deletion(sender, instance, **kwargs):
+    enqueue_user_sync(instance.id)
+
 # Signal to save UserProfile when Account is updated
 @receiver(post_save, sender=Account)
 def save_user_profile(sender, instance, created, **kwargs):
@@ -237,6 +415,44 @@ def save_user_profile(sender, instance, created, **kwargs):
         except Exception as e:
             logging.getLogger(__name__).error(f"Error saving profile for user {instance.email}: {e}")
 
+# Cached users of the JWT authentication (see accounts/authentication.py)
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def invalidate_cached_account(sender, instance, **kwargs):
+    from .authentication import invalidate_cached_user_on_commit
+
+    invalidate_cached_user_on_commit(instance.id)
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    from .authentication import invalidate_cached_user_on_commit
+
+    invalidate_cached_user_on_commit(instance.user_id)
+
+# Follower totals ranked on by the user search (see accounts/search.py)
+@receiver(m2m_changed, sender=UserProfile.followers.through)
+def update_followers_total(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount the followers of the profiles whose followers changed"""
+    from .search import followers_total_subquery
+
+    if reverse and action == 'pre_clear':
+        # profile.following.clear() doesn't say whom it unfollowed
+        instance._cleared_following = list(
+            sender.objects.filter(to_userprofile_id=instance.pk).values_list('from_userprofile_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        profile_ids = [instance.pk]
+    elif action == 'post_clear':
+        profile_ids = instance.__dict__.pop('_cleared_following', [])
+    else:
+        profile_ids = list(pk_set)
+    if not profile_ids:
+        return
+    UserProfile.objects.filter(pk__in=profile_ids).update(followers_total=followers_total_subquery())
+
 class VerificationRequest(models.Model):
     PENDING = 'pending'
     APPROVED = 'approved'
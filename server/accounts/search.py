@@ -0,0 +1,186 @@
+"""
+User search on a normalized, denormalized column.
+
+``UserSearchView`` used to run ``icontains`` on the username and on the
+account's names and email across a join, which no index can serve. Every
+profile now stores ``search_text``: its username, first and last name and
+email folded by ``normalize_search_text`` (lowercase, Latin accents and
+Arabic diacritics and tatweel removed, alef/yeh/teh marbuta variants and
+Arabic-Indic digits unified), kept current by ``UserProfile.save`` and
+filled for the existing profiles by migration 0012. Queries are folded the
+same way.
+
+Results are ranked by relevance (exact username, username prefix, word
+prefix, anywhere), then by ``followers_total``, the profile's follower count
+kept by the ``m2m_changed`` receiver in accounts/models.py so that ranking
+doesn't count followers per match. ``UserProfile.save`` never writes it, so
+a stale profile instance can't overwrite it.
+
+Word prefix matches outrank the others, so they are looked up first, in the
+GIN index on the words of ``search_text`` (migration 0014, plain Postgres).
+Only when they don't fill the page does a query of ``SUBSTRING_MIN_LENGTH``
+or more characters also look for it anywhere in the column with ``LIKE``,
+which the pg_trgm GIN index (migration 0013) serves. Shorter queries only
+match word prefixes: an infix that short yields no trigram to look up.
+
+Migration 0012 has its own copy of ``normalize_search_text``; a change to the
+folding needs ``rebuild_user_search`` to refold the stored column.
+Rows written by ``.update()`` or raw SQL bypass ``UserProfile.save``;
+``python manage.py rebuild_user_search`` recomputes both columns.
+"""
+
+import unicodedata
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQueryField, SearchVectorField
+from django.db.models import BooleanField, Case, Count, Func, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .models import UserProfile
+
+DEFAULT_USER_SEARCH_SETTINGS = {
+    'SUBSTRING_MIN_LENGTH': 3,  # Shorter queries only match the start of a word
+}
+
+# Folded after NFKD has split the hamza and madda off alef, waw and yeh
+SEARCH_FOLDING = str.maketrans({
+    'ـ': None,  # Tatweel
+    'ٱ': 'ا',  # Alef wasla -> alef
+    'ى': 'ي',  # Alef maksura -> yeh
+    'ة': 'ه',  # Teh marbuta -> heh
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},  # Extended Arabic-Indic digits
+})
+
+
+def get_user_search_settings():
+    """Return the user search settings merged over the defaults"""
+    return {**DEFAULT_USER_SEARCH_SETTINGS, **getattr(settings, 'USER_SEARCH', {})}
+
+
+def normalize_search_text(value):
+    """Fold ``value`` for matching: no case, accents, Arabic diacritics or letter variants; single spaces"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.translate(SEARCH_FOLDING).casefold().split())
+
+
+class SearchWords(Func):
+    """The words of a ``search_text`` as a tsvector; migration 0014 indexes this expression"""
+    template = "array_to_tsvector(string_to_array(%(expressions)s, ' '))"
+    output_field = SearchVectorField()
+
+
+class Matches(Func):
+    """``tsvector @@ tsquery``"""
+    arg_joiner = ' @@ '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+def words_query(term):
+    """tsquery of the texts having every word of ``term``, the last one as a prefix"""
+    words = [word.replace('\\', '\\\\').replace("'", "''") for word in term.split(' ')]
+    lexemes = [f"'{word}'" for word in words[:-1]] + [f"'{words[-1]}':*"]
+    return Cast(Value(' & '.join(lexemes)), SearchQueryField())
+
+
+def profile_search_text(profile, user):
+    """``search_text`` of ``profile``; the username comes first so username matches can be ranked"""
+    return normalize_search_text(' '.join([profile.username, user.first_name, user.last_name, user.email]))
+
+
+def followers_total_subquery():
+    """Live follower count of the outer profile"""
+    through = UserProfile.followers.through
+    counts = (
+        through.objects.filter(from_userprofile_id=OuterRef('pk'))
+        .values('from_userprofile_id').annotate(total=Count('*')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def following_total_subquery():
+    """Live count of the profiles the outer profile follows"""
+    through = UserProfile.followers.through
+    counts = (
+        through.objects.filter(to_userprofile_id=OuterRef('pk'))
+        .values('to_userprofile_id').annotate(total=Count('*')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _ranked(profiles, limit):
+    return list(
+        profiles.order_by('-relevance', '-followers_total', 'id')
+        .select_related('user')
+        .annotate(following_total=following_total_subquery())[:limit]
+    )
+
+
+def search_users(query, limit, exclude_user_id=None):
+    """
+    List of the profiles matching ``query`` ranked by relevance, then
+    followers, with their accounts and a ``following_total`` annotation.
+    """
+    term = normalize_search_text(query)
+    if not term or limit < 1:
+        return []
+
+    profiles = UserProfile.objects.all()
+    if exclude_user_id is not None:
+        profiles = profiles.exclude(user_id=exclude_user_id)
+
+    # The words index finds the candidates, the LIKE checks the words are adjacent
+    word_prefix = Q(search_text__startswith=term) | Q(search_text__contains=f' {term}')
+    relevance = Case(
+        When(search_text__startswith=f'{term} ', then=Value(4)),
+        When(search_text__startswith=term, then=Value(3)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+    results = _ranked(
+        profiles.filter(Matches(SearchWords('search_text'), words_query(term)), word_prefix)
+        .annotate(relevance=relevance),
+        limit,
+    )
+
+    if len(results) < limit and len(term) >= get_user_search_settings()['SUBSTRING_MIN_LENGTH']:
+        infixes = profiles.filter(search_text__contains=term).exclude(word_prefix).annotate(relevance=Value(1))
+        results += _ranked(infixes, limit - len(results))
+    return results
+
+
+def rebuild_search_index(batch_size=1000, dry_run=False, progress=None):
+    """
+    Recompute ``search_text`` and ``followers_total`` of every profile in id
+    batches, writing only the rows that differ. ``progress(checked, updated)``
+    is called after every batch. Returns (checked, updated).
+    """
+    checked = updated = 0
+    last_id = 0
+    while True:
+        batch = list(
+            UserProfile.objects.filter(id__gt=last_id).order_by('id')
+            .select_related('user')
+            .only('id', 'user', 'username', 'search_text', 'followers_total',
+                  'user__first_name', 'user__last_name', 'user__email')
+            .annotate(live_followers=followers_total_subquery())[:batch_size]
+        )
+        if not batch:
+            return checked, updated
+        last_id = batch[-1].id
+
+        stale = []
+        for profile in batch:
+            search_text = profile_search_text(profile, profile.user)
+            if profile.search_text != search_text or profile.followers_total != profile.live_followers:
+                profile.search_text = search_text
+                profile.followers_total = profile.live_followers
+                stale.append(profile)
+        if stale and not dry_run:
+            UserProfile.objects.bulk_update(stale, ['search_text', 'followers_total'])
+        checked += len(batch)
+        updated += len(stale)
+        if progress:
+            progress(checked, updated)
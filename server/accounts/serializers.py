@@ -34,10 +34,10 @@ class AccountAuthorSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'first_name', 'last_name', 'profile_picture', 'display_name', 'is_admin']
     
     def get_display_name(self, obj):
-        # Try to get the username from the related UserProfile
+        # Try to get the username from the related UserProfile (select_related('author__profile') avoids a query)
         try:
-            if hasattr(obj, 'userprofile') and obj.userprofile.username:
-                return obj.userprofile.username
+            if hasattr(obj, 'profile') and obj.profile.username:
+                return obj.profile.username
             else:
                 return f"{obj.first_name} {obj.last_name}".strip() or obj.email.split('@')[0]
         except:
@@ -71,7 +71,16 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
 
 class UserSearchResultSerializer(serializers.ModelSerializer):
     account = AccountSerializer(source='user', read_only=True)
+    followers_count = serializers.SerializerMethodField()
+    following_count = serializers.SerializerMethodField()
     
     class Meta:
         model = UserProfile
         fields = ['account', 'username', 'bio', 'is_verified', 'followers_count', 'following_count']
+
+    # search_users annotates following_total and ranks on followers_total; other lists count per profile
+    def get_followers_count(self, obj):
+        return obj.followers_total if hasattr(obj, 'following_total') else obj.followers_count
+
+    def get_following_count(self, obj):
+        return obj.following_total if hasattr(obj, 'following_total') else obj.following_count
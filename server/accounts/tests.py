@@ -32,11 +32,33 @@ else:
 
 django.setup()
 
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.core.cache import cache
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Account
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from unittest import mock
+
+from config.firebase_stub import FakeFirestore
+from .firestore_sync import process_outbox, reconcile_users
+from .authentication import USER_KEY, VERSION_KEY, invalidate_cached_user
+from .login import record_login
+from .search import normalize_search_text, search_users
+from .token_cleanup import cleanup_expired_tokens
+from .models import Account, DirectoryChange, FirestoreSyncCheckpoint, FirestoreUserState, UserProfile, UserSyncOutbox
 
 class AccountAPITests(TestCase):
     def setUp(self):
@@ -94,3 +116,600 @@ class AccountAPITests(TestCase):
         self.assertIn('token', response.data)
         self.assertIn('user', response.data)
         self.assertTrue(Account.objects.filter(email='googleuser@example.com').exists())
+
+
+class UserDirectoryTests(TestCase):
+    url = '/api/accounts/users/directory/'
+
+    def setUp(self):
+        self.users = [
+            Account.objects.create_user(
+                email=f'dir{index}@example.com', first_name='Dir', last_name=str(index), password='testpassword123'
+            )
+            for index in range(5)
+        ]
+        self._settle()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def _settle(self):
+        # Age the logged changes past SETTLE_SECONDS
+        DirectoryChange.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+
+    def test_cursor_pages_cover_directory(self):
+        response = self.client.get(self.url, {'limit': 2})
+        ids = [user['id'] for user in response.data['users']]
+        version = response.data['version']
+        while response.data['next_cursor']:
+            response = self.client.get(self.url, {'cursor': response.data['next_cursor'], 'limit': 2})
+            ids += [user['id'] for user in response.data['users']]
+            self.assertEqual(response.data['version'], version)
+        self.assertEqual(ids, [str(user.id) for user in self.users])
+        self.assertEqual(response.data['users'][-1]['name'], 'Dir 4')
+
+    def test_delta_since_version(self):
+        version = self.client.get(self.url).data['version']
+
+        renamed, deleted = self.users[1], self.users[2]
+        renamed.first_name = 'Renamed'
+        renamed.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        self.users[3].save()  # No directory field changed
+        self._settle()
+
+        response = self.client.get(self.url, {'since': version})
+        self.assertEqual([user['id'] for user in response.data['users']], [str(renamed.id)])
+        self.assertEqual(response.data['users'][0]['name'], 'Renamed 1')
+        self.assertEqual(response.data['deleted'], [str(deleted_id)])
+        self.assertGreater(response.data['version'], version)
+
+        response = self.client.get(self.url, {'since': response.data['version']})
+        self.assertEqual(response.data['users'], [])
+
+    def test_unsettled_changes_hold_version_back(self):
+        version = self.client.get(self.url).data['version']
+        self.users[1].last_name = 'Late'
+        self.users[1].save()
+
+        response = self.client.get(self.url, {'since': version})
+        self.assertEqual(len(response.data['users']), 1)
+        self.assertEqual(response.data['version'], version)
+
+    def test_limit_must_be_a_positive_integer(self):
+        for params in ({'limit': -5}, {'limit': 0}, {'since': 1, 'limit': -1}, {'limit': 'abc'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+        # Callers outside the view get one entry per page
+        from .directory import fetch_delta, fetch_page
+        page = fetch_page(limit=-5)
+        self.assertEqual(([user['id'] for user in page['users']], bool(page['next_cursor'])),
+                         ([str(self.users[0].id)], True))
+        delta = fetch_delta(0, limit=-1)
+        self.assertEqual((len(delta['users']), delta['has_more']), (1, True))
+
+    def test_etag_costs_one_query_when_unchanged(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries.captured_queries), 1)
+
+        self.users[1].email = 'changed@example.com'
+        self.users[1].save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_ndjson_stream(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertIn('version', lines[0])
+        self.assertEqual([line['id'] for line in lines[1:]], [str(user.id) for user in self.users])
+
+    def test_legacy_endpoint_shape(self):
+        response = self.client.get('/api/accounts/all-users/')
+        self.assertEqual(response.json()[0], {
+            'id': str(self.users[0].id),
+            'name': 'Dir 0',
+            'email': 'dir0@example.com',
+            'avatarUrl': '',
+            'is_admin': False,
+        })
+
+
+class UserSyncOutboxTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(
+            email='outbox@example.com', first_name='Out', last_name='Box', password='testpassword123'
+        )
+        self.firestore = FakeFirestore()
+
+    def _drain(self, **kwargs):
+        return process_outbox(client=self.firestore, **kwargs)
+
+    def test_saves_queue_changes_instead_of_writing_firestore(self):
+        self.assertEqual(UserSyncOutbox.objects.filter(user_id=self.user.id).count(), 1)
+        self._drain()
+        self.assertEqual(self.firestore.documents[f'users/{self.user.id}'], {
+            'id': str(self.user.id), 'name': 'Out Box', 'email': 'outbox@example.com', 'avatarUrl': '',
+            'username': 'outbox', 'bio': '', 'honesty_score': 0, 'isOnline': False,
+        })
+        self.assertFalse(UserSyncOutbox.objects.exists())
+
+        # Logins only touch last_login, which Firestore doesn't hold
+        user = Account.objects.get(pk=self.user.pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        user.save()
+        self.assertFalse(UserSyncOutbox.objects.exists())
+
+        user.first_name = 'Renamed'
+        user.save()
+        user.profile.bio = 'Hello'
+        user.profile.save()
+        self.assertEqual(UserSyncOutbox.objects.count(), 2)
+
+    def test_rolled_back_saves_queue_nothing(self):
+        self._drain()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.user.first_name = 'Ghost'
+            self.user.save()
+            raise RuntimeError
+        self.assertFalse(UserSyncOutbox.objects.exists())
+
+    def test_changes_coalesce_per_user_and_deletions_remove_the_document(self):
+        self._drain()
+        for name in ('One', 'Two', 'Three'):
+            self.user.first_name = name
+            self.user.save()
+        other = Account.objects.create_user(email='gone@example.com', first_name='Go', last_name='Ne', password='x')
+        self._drain()
+        self.assertIn(f'users/{other.id}', self.firestore.documents)
+
+        other.delete()
+        run = self._drain()
+
+        self.assertEqual(run.deleted, 1)
+        self.assertNotIn(f'users/{other.id}', self.firestore.documents)
+        self.assertEqual(self.firestore.documents[f'users/{self.user.id}']['name'], 'Three Box')
+        # One write per user however many changes were queued
+        self.assertEqual(self.firestore.commits, [1, 2, 1])
+
+    def test_batches_stay_within_the_firestore_limit(self):
+        for index in range(4):
+            Account.objects.create_user(email=f'batch{index}@example.com', first_name='B', last_name='C', password='x')
+
+        out = StringIO()
+        with mock.patch('accounts.firestore_sync.get_firestore_client', return_value=self.firestore):
+            call_command('process_user_sync_outbox', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(self.firestore.commits, [2, 2, 1])
+        self.assertIn('Synced 5 users', out.getvalue())
+        self.assertEqual(len(self.firestore.documents), 5)
+
+    def test_presence_is_debounced_to_the_last_state(self):
+        self._drain()
+        for online in (True, False, True):
+            self.user.set_online() if online else self.user.set_offline()
+
+        self.assertEqual(self._drain().users, 0)
+        later = timezone.now() + timedelta(seconds=11)
+        run = self._drain(now=later)
+
+        self.assertEqual((run.users, run.changes, run.presence), (1, 3, 1))
+        self.assertTrue(self.firestore.documents[f'users/{self.user.id}']['isOnline'])
+        self.assertEqual(self.firestore.commits, [1, 1])
+
+    def test_failed_writes_keep_the_queue(self):
+        with mock.patch.object(FakeFirestore, 'batch', side_effect=ConnectionError('firestore down')):
+            with self.assertRaises(ConnectionError):
+                self._drain()
+        self.assertEqual(UserSyncOutbox.objects.count(), 1)
+        self.assertEqual(self._drain().users, 1)
+
+
+class FirestoreReconcileTests(TestCase):
+    def setUp(self):
+        self.users = [
+            Account.objects.create_user(email=f'sync{index}@example.com', first_name='Sync', last_name=str(index), password='x')
+            for index in range(5)
+        ]
+        self.firestore = FakeFirestore()
+
+    def _reconcile(self, **kwargs):
+        return reconcile_users(client=self.firestore, **kwargs)
+
+    def _age_changes(self):
+        # Changes older than the overlap window of the next pass
+        long_ago = timezone.now() - timedelta(hours=1)
+        Account.objects.update(firestore_changed_at=long_ago)
+        UserProfile.objects.update(firestore_changed_at=long_ago)
+
+    def test_passes_only_write_changed_users(self):
+        run = self._reconcile(batch_size=2)
+        self.assertEqual((run.checked, run.written, run.full), (5, 5, True))
+        self.assertEqual(self.firestore.commits, [2, 2, 1])
+        self.assertNotIn('isOnline', self.firestore.documents[f'users/{self.users[0].id}'])
+
+        self._age_changes()
+        self.assertEqual(self._reconcile().checked, 0)
+
+        # Logins don't count as changes; names and synced profile fields do
+        user = Account.objects.get(pk=self.users[0].pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        user.first_name = 'Renamed'
+        user.save(update_fields=['first_name'])
+        profile = self.users[1].profile
+        profile.bio = 'Hello'
+        profile.save()
+        run = self._reconcile()
+
+        self.assertEqual((run.checked, run.written, run.full), (2, 2, False))
+        self.assertEqual(self.firestore.documents[f'users/{user.id}']['name'], 'Renamed 0')
+        self.assertEqual(self.firestore.documents[f'users/{self.users[1].id}']['bio'], 'Hello')
+
+    def test_unchanged_documents_are_skipped(self):
+        self._reconcile()
+        run = self._reconcile(full=True)
+        self.assertEqual((run.checked, run.written), (5, 0))
+        self.assertEqual(self._reconcile(full=True, force=True).written, 5)
+
+    def test_interrupted_pass_resumes_after_checkpoint(self):
+        commit = FakeFirestore.batch
+        calls = []
+
+        def failing_batch(client):
+            calls.append(1)
+            if len(calls) == 2:
+                raise ConnectionError('firestore down')
+            return commit(client)
+
+        with mock.patch.object(FakeFirestore, 'batch', failing_batch):
+            with self.assertRaises(ConnectionError):
+                self._reconcile(chunk_size=2, workers=1)
+
+        checkpoint = FirestoreSyncCheckpoint.objects.get(name='users')
+        self.assertEqual(checkpoint.cursor, self.users[1].id)
+        run = self._reconcile(chunk_size=2)
+
+        self.assertEqual(run.resumed_after, self.users[1].id)
+        self.assertEqual((run.checked, run.written), (3, 3))
+        self.assertEqual(len(self.firestore.documents), 5)
+        checkpoint.refresh_from_db()
+        self.assertIsNone(checkpoint.pass_started_at)
+        self.assertIsNotNone(checkpoint.synced_through)
+
+    def test_deleted_users_leave_the_collection(self):
+        self._reconcile()
+        gone = self.users.pop()
+        gone.delete()
+        run = self._reconcile()
+        self.assertEqual(run.deleted, 1)
+        self.assertNotIn(f'users/{gone.id}', self.firestore.documents)
+        self.assertFalse(FirestoreUserState.objects.filter(user_id=gone.id).exists())
+
+    def test_command_reports_users_per_second(self):
+        out = StringIO()
+        with mock.patch('accounts.firestore_sync.get_firestore_client', return_value=self.firestore):
+            call_command('sync_users_to_firestore', '--dry-run', stdout=out)
+            self.assertEqual(self.firestore.documents, {})
+            call_command('sync_users_to_firestore', '--workers', '2', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Would write 5 of 5 users', output)
+        self.assertIn('Wrote 5 of 5 users and 0 deletions', output)
+        self.assertIn('users/s', output)
+
+
+class LoginTrackingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Account.objects.create_user(
+            email='login@example.com', first_name='Log', last_name='In', password='testpassword123'
+        )
+        UserSyncOutbox.objects.all().delete()
+
+    def _age_last_login(self, minutes=10):
+        Account.objects.filter(pk=self.user.pk).update(last_login=timezone.now() - timedelta(minutes=minutes))
+        self.user.refresh_from_db()
+
+    def test_last_login_is_one_update_at_most_every_interval(self):
+        self._age_last_login()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(record_login(self.user))
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE "accounts_account" SET "last_login"'))
+
+        with self.assertNumQueries(0):
+            self.assertFalse(record_login(self.user))
+        # Saves and signals are skipped, so nothing is queued for Firestore
+        self.assertFalse(UserSyncOutbox.objects.exists())
+
+    def test_concurrent_logins_write_once(self):
+        self._age_last_login()
+        stale_copy = Account.objects.get(pk=self.user.pk)
+        self.assertTrue(record_login(self.user))
+        self.assertFalse(record_login(stale_copy))
+
+    def test_token_obtain_records_login(self):
+        self._age_last_login()
+        response = self.client.post(
+            '/api/accounts/token/', {'email': 'login@example.com', 'password': 'testpassword123'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login, timezone.now() - timedelta(minutes=1))
+
+    def test_refresh_rotates_and_blacklists(self):
+        refresh = str(self.user.get_tokens()['refresh'])
+        response = self.client.post('/api/accounts/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertNotEqual(response.data['refresh'], refresh)
+
+        reused = self.client.post('/api/accounts/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(reused.status_code, 401)
+        rotated = self.client.post('/api/accounts/token/refresh/', {'refresh': response.data['refresh']}, format='json')
+        self.assertEqual(rotated.status_code, 200)
+
+    def test_refresh_rejects_inactive_users(self):
+        refresh = str(self.user.get_tokens()['refresh'])
+        Account.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post('/api/accounts/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        # A directory cache stands in for the cache server every worker shares
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared_cache = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        })
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        self.user = Account.objects.create_user(
+            email='cached@example.com', first_name='Cach', last_name='Ed', password='testpassword123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.user.get_tokens()['access']}")
+
+    def _profile(self):
+        response = self.client.get('/api/accounts/users/profile/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_warm_requests_skip_user_and_profile_queries(self):
+        self._profile()
+        with CaptureQueriesContext(connection) as queries:
+            self._profile()
+        self.assertFalse([
+            query for query in queries
+            if 'FROM "accounts_account" WHERE' in query['sql'] or 'FROM "accounts_userprofile" WHERE' in query['sql']
+        ])
+        entry = cache.get(USER_KEY.format(self.user.id, cache.get(VERSION_KEY.format(self.user.id), 0)))
+        self.assertNotIn(self.user.password, entry['user'])
+
+    def test_profile_edits_invalidate_the_cached_user(self):
+        self._profile()
+        response = self.client.post('/api/accounts/users/profile/update/', {'bio': 'Fresh'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Fresh', self._profile().content.decode())
+
+    def test_deactivation_takes_effect_on_the_next_request(self):
+        self._profile()
+        user = Account.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get('/api/accounts/users/profile/').status_code, 401)
+
+    def test_password_change_invalidates_and_still_verifies(self):
+        self._profile()
+        version = cache.get(VERSION_KEY.format(self.user.id), 0)
+        response = self.client.post(
+            '/api/accounts/change-password/',
+            {'current_password': 'testpassword123', 'new_password': 'newpassword456'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(cache.get(VERSION_KEY.format(self.user.id)), version)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpassword456'))
+
+    def test_per_process_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self._profile()
+            with CaptureQueriesContext(connection) as queries:
+                self._profile()
+            # Every request loads the user again
+            self.assertTrue([
+                query for query in queries
+                if 'FROM "accounts_account" LEFT OUTER JOIN "accounts_userprofile"' in query['sql']
+            ])
+            self.assertIsNone(cache.get(USER_KEY.format(self.user.id, 0)))
+
+    def test_claims_only_reads_skip_the_user(self):
+        invalidate_cached_user(self.user.id)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/notifications/history/unread_count/')
+        self.assertEqual(response.data, {'unread_count': 0})
+
+
+class TokenCleanupTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(
+            email='tokens@example.com', first_name='Tok', last_name='En', password='testpassword123'
+        )
+        now = timezone.now()
+        self.expired = [self._token(f'expired-{i}', now - timedelta(days=1)) for i in range(7)]
+        self.live = [self._token(f'live-{i}', now + timedelta(days=1)) for i in range(3)]
+        for token in self.expired[::2] + self.live[:1]:
+            BlacklistedToken.objects.create(token=token)
+
+    def _token(self, jti, expires_at):
+        return OutstandingToken.objects.create(
+            user=self.user, jti=jti, token=jti, created_at=expires_at - timedelta(days=7), expires_at=expires_at
+        )
+
+    def test_deletes_expired_tokens_and_their_blacklist_entries_in_chunks(self):
+        progress = []
+        run = cleanup_expired_tokens(chunk_size=3, sleep_seconds=0, progress=progress.append)
+
+        self.assertEqual((run.outstanding, run.blacklisted, run.chunks), (7, 4, 3))
+        self.assertEqual([p.outstanding for p in progress], [3, 6, 7])
+        self.assertEqual(
+            set(OutstandingToken.objects.values_list('id', flat=True)), {token.id for token in self.live}
+        )
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token_id', flat=True)), [self.live[0].id])
+
+    def test_each_chunk_is_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            cleanup_expired_tokens(chunk_size=100, sleep_seconds=0)
+        # The expired id range, then one DELETE for both tables
+        self.assertEqual(len(queries), 2)
+
+    def test_nothing_expired(self):
+        OutstandingToken.objects.filter(id__in=[token.id for token in self.expired]).delete()
+        with self.assertNumQueries(1):
+            run = cleanup_expired_tokens()
+        self.assertEqual((run.outstanding, run.blacklisted, run.chunks), (0, 0, 0))
+
+    def test_command_reports_rate_and_dry_run_keeps_rows(self):
+        out = StringIO()
+        call_command('cleanup_tokens', '--dry-run', stdout=out)
+        self.assertIn('Would delete 7 expired tokens and 4 blacklist entries', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 10)
+
+        out = StringIO()
+        call_command('cleanup_tokens', '--chunk-size', '4', '--sleep', '0', stdout=out)
+        self.assertIn('Deleted 7 expired tokens and 4 blacklist entries in 2 chunks', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+
+
+class UserSearchTests(TestCase):
+    url = '/api/accounts/users/search/'
+
+    def setUp(self):
+        self.viewer = self._user('viewer', 'View', 'Er')
+        self.exact = self._user('samir', 'Samir', 'Haddad')
+        self.prefix = self._user('samira99', 'Lina', 'Odeh')
+        self.word = self._user('lh', 'Samir', 'Khoury')
+        self.infix = self._user('bassamir', 'Omar', 'Nasser')
+        self.arabic = self._user('arabic1', 'أَحْمَد', 'الشامى')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.viewer)
+
+    def _user(self, username, first_name, last_name):
+        user = Account.objects.create_user(
+            email=f'{username}@example.com', first_name=first_name, last_name=last_name, password='testpassword123'
+        )
+        UserProfile.objects.filter(user=user).update(username=username)
+        user.refresh_from_db()
+        user.profile.save()
+        return user
+
+    def _usernames(self, query):
+        return [profile.username for profile in search_users(query, 20, exclude_user_id=self.viewer.id)]
+
+    def test_normalization_folds_case_accents_and_arabic_variants(self):
+        self.assertEqual(normalize_search_text('  José   ÅSTRÖM '), 'jose astrom')
+        self.assertEqual(normalize_search_text('أَحْمَد'), normalize_search_text('احمد'))
+        self.assertEqual(normalize_search_text('إسلام آمنة'), 'اسلام امنه')
+        self.assertEqual(normalize_search_text('مـحـمـد مصطفى ٢٠٢٤'), 'محمد مصطفي 2024')
+
+    def test_ranked_by_relevance_then_followers(self):
+        self.assertEqual(self._usernames('Samir'), ['samir', 'samira99', 'lh', 'bassamir'])
+
+        # Followers break ties within a relevance tier
+        tied = self._user('omar2', 'Samir', 'Saleh')
+        tied.profile.followers.add(self.viewer.profile)
+        self.assertEqual(self._usernames('samir'), ['samir', 'samira99', 'omar2', 'lh', 'bassamir'])
+
+    def test_arabic_query_matches_unvocalized_variants(self):
+        self.assertEqual(self._usernames('احمد الشامي'), ['arabic1'])
+
+    def test_short_queries_only_match_word_prefixes(self):
+        self.assertEqual(self._usernames('sa'), ['samir', 'samira99', 'lh'])
+
+    def test_search_text_follows_account_and_username_edits(self):
+        self.exact.first_name = 'Yousef'
+        self.exact.save()
+        self.assertIn('samir', self._usernames('yousef'))
+
+        profile = UserProfile.objects.get(user=self.exact)
+        profile.username = 'yousef_h'
+        profile.save(update_fields=['username'])
+        self.assertEqual(self._usernames('yousef_h'), ['yousef_h'])
+
+    def test_followers_total_tracks_both_sides_of_the_relation(self):
+        target = self.exact.profile
+        target.followers.add(self.viewer.profile, self.prefix.profile)
+        self.viewer.profile.following.add(self.word.profile)
+        target.refresh_from_db()
+        self.word.profile.refresh_from_db()
+        self.assertEqual((target.followers_total, self.word.profile.followers_total), (2, 1))
+
+        target.followers.remove(self.prefix.profile)
+        self.viewer.profile.following.clear()
+        target.refresh_from_db()
+        self.word.profile.refresh_from_db()
+        self.assertEqual((target.followers_total, self.word.profile.followers_total), (0, 0))
+
+    def test_profile_saves_keep_the_followers_total(self):
+        stale = UserProfile.objects.get(user=self.exact)
+        self.exact.profile.followers.add(self.viewer.profile)
+        stale.bio = 'Edited'
+        stale.save()
+        self.assertEqual(UserProfile.objects.get(user=self.exact).followers_total, 1)
+
+    def test_rebuild_command_repairs_bulk_edits(self):
+        UserProfile.objects.filter(user=self.infix).update(search_text='', followers_total=7)
+        out = StringIO()
+        call_command('rebuild_user_search', '--batch-size', '2', stdout=out)
+        self.assertIn('Updated 1 of 6 profiles', out.getvalue())
+        self.assertIn('bassamir', self._usernames('bassamir'))
+        self.assertEqual(UserProfile.objects.get(user=self.infix).followers_total, 0)
+
+    def test_migration_backfills_existing_profiles(self):
+        self.exact.profile.followers.add(self.viewer.profile, self.prefix.profile)
+        UserProfile.objects.update(search_text='', followers_total=0)
+        migration = import_module('accounts.migrations.0012_user_search_backfill')
+        with mock.patch.object(migration, 'BACKFILL_BATCH_SIZE', 2):
+            migration.backfill_user_search(apps, mock.Mock(connection=connection))
+        self.assertEqual(self._usernames('Samir'), ['samir', 'samira99', 'lh', 'bassamir'])
+        self.assertEqual(self._usernames('احمد الشامي'), ['arabic1'])
+        self.assertEqual(UserProfile.objects.get(user=self.exact).followers_total, 2)
+
+    def test_view_returns_ranked_results_with_counts(self):
+        self.exact.profile.followers.add(self.viewer.profile)
+        response = self.client.get(self.url, {'q': 'samir'})
+        self.assertEqual(response.status_code, 200)
+        users = response.data['data']['users']
+        self.assertEqual([user['username'] for user in users], ['samir', 'samira99', 'lh', 'bassamir'])
+        self.assertEqual((users[0]['followers_count'], users[0]['following_count']), (1, 0))
+        self.assertEqual(self.client.get(self.url, {'q': 'viewer'}).data['data']['users'], [])
+
+
+class IndexedUserSearchTests(UserSearchTests):
+    """UserSearchTests on the words index of migration 0014, which the test database is built without"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Built before the rows: a transaction can't use an index it built after updating them
+        migration = import_module('accounts.migrations.0014_user_search_words_index')
+        with connection.cursor() as cursor:
+            cursor.execute(migration.Migration.operations[0].sql.replace(' CONCURRENTLY', ''))
+
+    def test_word_prefixes_are_looked_up_in_the_words_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_indexscan = off')
+        self.assertEqual(self._usernames("o'brien \\"), [])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._usernames('lina od'), ['samira99'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {queries.captured_queries[0]['sql']}")
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn('user_profile_search_words_idx', plan)
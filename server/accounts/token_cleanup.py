@@ -0,0 +1,110 @@
+"""
+Chunked cleanup of expired refresh tokens.
+
+With ``ROTATE_REFRESH_TOKENS`` and ``BLACKLIST_AFTER_ROTATION`` every token
+refresh adds an ``OutstandingToken`` and a ``BlacklistedToken`` row. Both
+are useless once the token has expired: simplejwt rejects an expired token
+before it looks at the blacklist.
+
+``cleanup_expired_tokens`` walks the outstanding token ids in ranges of
+``CHUNK_SIZE`` between the smallest and largest expired id, and deletes the
+expired tokens of each range together with their blacklist entries in one
+statement, so each chunk is its own short transaction. It sleeps
+``SLEEP_SECONDS`` after every chunk that deleted something to leave room
+for the refreshes writing to the same tables. Ids grow with ``created_at``
+and every refresh token has the same lifetime, so the expired tokens are
+mostly a prefix of the id space and few ranges come back empty.
+
+The tables belong to simplejwt's blacklist app, so they aren't partitioned:
+the blacklist's foreign key and the unique ``jti`` would both need the
+partition key. The ``expires_at`` index (migration 0010) keeps finding the
+expired range and the dry-run counts cheap instead.
+"""
+
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+DEFAULT_TOKEN_CLEANUP_SETTINGS = {
+    'CHUNK_SIZE': 5000,  # Outstanding token ids per DELETE
+    'SLEEP_SECONDS': 0.1,  # Pause after each chunk that deleted rows
+    'INTERVAL_SECONDS': 3600,  # Between cleanups in daemon mode
+}
+
+CleanupRun = namedtuple('CleanupRun', ['outstanding', 'blacklisted', 'chunks', 'seconds'])
+
+
+def get_token_cleanup_settings():
+    """Return the token cleanup settings merged over the defaults"""
+    return {**DEFAULT_TOKEN_CLEANUP_SETTINGS, **getattr(settings, 'TOKEN_CLEANUP', {})}
+
+
+def rows_per_second(run):
+    return (run.outstanding + run.blacklisted) / run.seconds if run.seconds else 0.0
+
+
+def expired_summary(cutoff=None):
+    """Count the expired outstanding tokens and their blacklist entries in one query"""
+    return OutstandingToken.objects.filter(expires_at__lt=cutoff or timezone.now()).aggregate(
+        outstanding=Count('id'), blacklisted=Count('blacklistedtoken')
+    )
+
+
+def _delete_chunk(lo, hi, cutoff):
+    """Delete the tokens with ``lo <= id < hi`` expired before ``cutoff``; returns (outstanding, blacklisted)"""
+    outstanding = connection.ops.quote_name(OutstandingToken._meta.db_table)
+    blacklisted = connection.ops.quote_name(BlacklistedToken._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH expired AS (
+                SELECT id FROM {outstanding}
+                WHERE id >= %s AND id < %s AND expires_at < %s
+            ), unlisted AS (
+                DELETE FROM {blacklisted}
+                WHERE token_id IN (SELECT id FROM expired)
+                RETURNING 1
+            ), removed AS (
+                DELETE FROM {outstanding}
+                WHERE id IN (SELECT id FROM expired)
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM removed), (SELECT COUNT(*) FROM unlisted)
+            """,
+            [lo, hi, cutoff],
+        )
+        return cursor.fetchone()
+
+
+def cleanup_expired_tokens(cutoff=None, chunk_size=None, sleep_seconds=None, progress=None):
+    """
+    Delete the tokens expired before ``cutoff`` (default: now) in id ranges.
+
+    ``progress(run)`` is called after every chunk with the running totals.
+    Returns a ``CleanupRun``.
+    """
+    config = get_token_cleanup_settings()
+    cutoff = cutoff or timezone.now()
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    sleep_seconds = config['SLEEP_SECONDS'] if sleep_seconds is None else sleep_seconds
+
+    start = time.perf_counter()
+    bounds = OutstandingToken.objects.filter(expires_at__lt=cutoff).aggregate(lo=Min('id'), hi=Max('id'))
+    outstanding = blacklisted = chunks = 0
+    if bounds['lo'] is not None:
+        for lo in range(bounds['lo'], bounds['hi'] + 1, chunk_size):
+            removed, unlisted = _delete_chunk(lo, lo + chunk_size, cutoff)
+            outstanding += removed
+            blacklisted += unlisted
+            chunks += 1
+            if progress:
+                progress(CleanupRun(outstanding, blacklisted, chunks, time.perf_counter() - start))
+            if removed and sleep_seconds and lo + chunk_size <= bounds['hi']:
+                time.sleep(sleep_seconds)
+    return CleanupRun(outstanding, blacklisted, chunks, time.perf_counter() - start)
@@ -5,7 +5,7 @@ from .views import (
     CustomTokenObtainPairView, RegisterView, LoginView, GoogleLoginView, 
     ProfileView, ProfileImageView, LogoutView, ValidateTokenView, 
     VerifyEmailView, ResendVerificationCodeView, ForgotPasswordView, 
-    VerifyResetCodeView, ResetPasswordView, all_users_minimal,
+    VerifyResetCodeView, ResetPasswordView, all_users_minimal, UserDirectoryView,
     
     # New Profile views
     UserProfileView, UserProfileUpdateView, UserProfileDetailView,
@@ -52,6 +52,7 @@ urlpatterns = [
     path('users/<int:user_id>/unfollow/', UserUnfollowView.as_view(), name='user_unfollow'),
     path('users/<int:user_id>/followers/', UserFollowersView.as_view(), name='user_followers'),
     path('users/<int:user_id>/following/', UserFollowingView.as_view(), name='user_following'),
+    path('users/directory/', UserDirectoryView.as_view(), name='user_directory'),
     path('users/search/', UserSearchView.as_view(), name='user_search'),
     path('users/random/', UserRandomView.as_view(), name='user_random'),
     
@@ -7,6 +7,9 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status, permissions, views, generics
 from django.db.models import Q
 from .models import Account, VerificationCode, UserProfile, VerificationRequest
+from .authentication import ClaimsOnlyJWTAuthentication
+from .login import record_login
+from .search import search_users
 from .serializers import (
     AccountSerializer,
     UserProfileSerializer,
@@ -27,7 +30,14 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.decorators import api_view, permission_classes
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from config.renderers import MessagePackRenderer, NDJSONRenderer, ndjson_lines
+import itertools
+import asyncio
+from asgiref.sync import sync_to_async
+from config.async_views import AsyncAPIView, run_io
 
 # Import notification models for follow/unfollow notifications
 from notifications.models import NotificationQueue, FCMToken, NotificationSettings
@@ -52,6 +62,12 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         return token
 
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # Replaces SIMPLE_JWT['UPDATE_LAST_LOGIN'], which saves the account and its profile
+        record_login(self.user)
+        return data
+
 # Implement custom token view properly
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
@@ -174,11 +190,14 @@ def send_verification_email(user, code):
         logger.error(f"Failed to send verification email: {str(e)}")
         return False
 
-# Add profile picture helper function
-def save_profile_picture_from_url(user, profile_picture_url):
-    """Save profile picture from URL for user"""
+# Add profile picture helper functions
+def download_profile_picture(profile_picture_url):
+    """
+    Download a profile picture; returns (filename, ContentFile) or None.
+    Network only (no database access), so async views can run it with run_io.
+    """
     if not profile_picture_url:
-        return False
+        return None
         
     try:
         from urllib.request import urlopen, Request
@@ -214,25 +233,35 @@ def save_profile_picture_from_url(user, profile_picture_url):
         
         if len(img_data) < 100:
             print(f"Warning: Very small image data received ({len(img_data)} bytes)")
-            return False
-            
-        # Save profile picture with proper filename
-        filename = f"{uuid.uuid4()}.{img_temp_ext}"
-        user.profile_picture.save(
-            filename, 
-            ContentFile(img_data), 
-            save=True
-        )
+            return None
+            
+        return f"{uuid.uuid4()}.{img_temp_ext}", ContentFile(img_data)
         
+    except Exception as e:
+        print(f"Failed to download profile picture: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def save_downloaded_profile_picture(user, picture):
+    """Save a picture returned by download_profile_picture as the user's profile picture"""
+    if picture is None:
+        return False
+    filename, content = picture
+    try:
+        user.profile_picture.save(filename, content, save=True)
         print(f"Successfully saved profile picture as {filename}")
         return True
-        
     except Exception as e:
         print(f"Failed to save profile picture: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
+def save_profile_picture_from_url(user, profile_picture_url):
+    """Save profile picture from URL for user"""
+    return save_downloaded_profile_picture(user, download_profile_picture(profile_picture_url))
+
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -358,9 +387,8 @@ class LoginView(APIView):
 
             user = authenticate(email=email, password=password)
             if user:
-                # Update last_login time with timezone aware datetime
-                user.last_login = timezone.now()
-                user.save(update_fields=['last_login'])
+                # One conditional UPDATE, skipped when last_login is recent (see accounts/login.py)
+                record_login(user)
                 
                 # Use only JWT tokens
                 tokens = user.get_tokens()
@@ -387,11 +415,16 @@ class LoginView(APIView):
             response = Response({"error": str(e)}, status=500)
             return add_cors_headers(response)
 
-@method_decorator(csrf_exempt, name='dispatch')
-class GoogleLoginView(APIView):
+class GoogleLoginView(AsyncAPIView):
+    """
+    Sign in with Google, creating or linking the account.
+
+    Async: the profile picture download runs in the I/O pool, overlapping
+    the password hashing of a new account (see config/async_views.py).
+    """
     permission_classes = [AllowAny]
 
-    def post(self, request):
+    async def post(self, request):
         try:
             google_id = request.data.get('google_id')
             email = request.data.get('email')
@@ -409,10 +442,7 @@ class GoogleLoginView(APIView):
 
             # Try to find an existing user with this email
             try:
-                user = Account.objects.get(email=email)
-                
-                # Don't update last_login yet - we'll do this after all modifications
-                needs_save = False
+                user = await Account.objects.aget(email=email)
                 
                 # If user exists but doesn't have google_id, this is an existing account
                 # We should link the Google account to the existing account
@@ -423,7 +453,6 @@ class GoogleLoginView(APIView):
                     print(f"Linking Google account to existing account: {email}")
                     user.google_id = google_id
                     account_linked = True
-                    needs_save = True
                     
                     # Update user profile with Google info if provided
                     if first_name and not user.first_name:
@@ -433,30 +462,20 @@ class GoogleLoginView(APIView):
                     
                     # Save profile picture if provided and user doesn't have one
                     if profile_picture and (not user.profile_picture or not user.profile_picture.name):
-                        # Save profile picture using our helper function
-                        save_profile_picture_from_url(user, profile_picture)
-                    elif needs_save:
-                        # Only save if we made changes but didn't save via profile picture
-                        user.save()
+                        picture = await run_io(download_profile_picture, profile_picture)
+                        if not await sync_to_async(save_downloaded_profile_picture)(user, picture):
+                            await user.asave()
+                    else:
+                        await user.asave()
                 
                 # Update last_login time - do this after all other modifications
-                user.last_login = timezone.now()
-                user.save(update_fields=['last_login'])
+                await sync_to_async(record_login)(user)
                 
                 # User already exists, just log them in
                 logger.info(f"Existing user logging in via Google: {email}")
                 print(f"Existing user logging in via Google: {email}")
                 
-                # Remove login(request, user) - we don't need session login
-                
-                # Generate JWT tokens
-                tokens = user.get_tokens()
-                
-                user_data = AccountSerializer(user).data
-                # Ensure profile picture URL is fully qualified
-                if user.profile_picture and user.profile_picture.url:
-                    user_data['profile_picture_url'] = request.build_absolute_uri(user.profile_picture.url)
-                
+                tokens, user_data = await sync_to_async(self._login_payload)(request, user)
                 return add_cors_headers(Response({
                     "message": "User logged in",
                     "user": user_data,
@@ -470,6 +489,9 @@ class GoogleLoginView(APIView):
                 logger.info(f"Creating new account via Google: {email}")
                 print(f"Creating new account via Google: {email}")
                 
+                # Start the download now; it overlaps the password hashing below
+                download = asyncio.ensure_future(run_io(download_profile_picture, profile_picture)) if profile_picture else None
+                
                 # Generate a secure random password - user won't use this
                 # since they'll authenticate with Google
                 import secrets
@@ -477,31 +499,27 @@ class GoogleLoginView(APIView):
                 
                 # Create new user with random password
                 # Note: last_login will be set automatically by Django when the user is created
-                user = Account.objects.create_user(
-                    email=email,
-                    password=random_password,
-                    first_name=first_name,
-                    last_name=last_name,
-                    google_id=google_id,
-                    is_verified=True  # Google accounts are pre-verified
-                )
+                try:
+                    user = await sync_to_async(Account.objects.create_user)(
+                        email=email,
+                        password=random_password,
+                        first_name=first_name,
+                        last_name=last_name,
+                        google_id=google_id,
+                        is_verified=True  # Google accounts are pre-verified
+                    )
+                except Exception:
+                    if download is not None:
+                        download.cancel()
+                    raise
                 
                 # Save profile picture if provided
-                if profile_picture:
-                    saved = save_profile_picture_from_url(user, profile_picture)
+                if download is not None:
+                    saved = await sync_to_async(save_downloaded_profile_picture)(user, await download)
                     if not saved:
                         print(f"Couldn't save profile picture during user creation")
                 
-                # Remove login(request, user) - we don't need session login
-                
-                # Generate JWT tokens
-                tokens = user.get_tokens()
-                
-                user_data = AccountSerializer(user).data
-                # Ensure profile picture URL is fully qualified
-                if user.profile_picture and user.profile_picture.url:
-                    user_data['profile_picture_url'] = request.build_absolute_uri(user.profile_picture.url)
-                
+                tokens, user_data = await sync_to_async(self._login_payload)(request, user)
                 return add_cors_headers(Response({
                     "message": "New user created and logged in",
                     "user": user_data,
@@ -518,6 +536,17 @@ class GoogleLoginView(APIView):
             response = Response({"error": str(e)}, status=500)
             return add_cors_headers(response)
 
+    def _login_payload(self, request, user):
+        """JWT tokens and serialized user (both touch the database)"""
+        # Generate JWT tokens
+        tokens = user.get_tokens()
+        
+        user_data = AccountSerializer(user).data
+        # Ensure profile picture URL is fully qualified
+        if user.profile_picture and user.profile_picture.url:
+            user_data['profile_picture_url'] = request.build_absolute_uri(user.profile_picture.url)
+        return tokens, user_data
+
 # Add a profile view
 @method_decorator(csrf_exempt, name='dispatch')
 class ProfileView(APIView):
@@ -931,29 +960,76 @@ def all_users_minimal(request):
     """
     Return all users with minimal info: id, name, email, avatarUrl.
     Ensures avatarUrl is a full URL using BASE_URL if needed.
+
+    Kept for older app versions; new clients should sync through
+    UserDirectoryView, which pages, streams and serves deltas.
     """
-    users = Account.objects.all()
-    data = []
-    from django.conf import settings
-    base_url = getattr(settings, "BASE_URL", None)
-    for user in users:
-        name = f"{user.first_name} {user.last_name}".strip()
-        avatar_url = user.profile_picture.url if user.profile_picture else ""
-        if avatar_url and not avatar_url.startswith("http"):
-            # Add BASE_URL if needed
-            if base_url:
-                # Ensure avatar_url starts with a single slash
-                if not avatar_url.startswith("/"):
-                    avatar_url = "/" + avatar_url
-                avatar_url = base_url.rstrip("/") + avatar_url
-        data.append({
-            "id": str(user.id),
-            "name": name,
-            "email": user.email,
-            "avatarUrl": avatar_url,
-            "is_admin": user.is_admin,
-        })
-    return add_cors_headers(JsonResponse(data, safe=False))
+    from .directory import iter_entries
+    return add_cors_headers(JsonResponse(list(iter_entries()), safe=False))
+
+class UserDirectoryView(views.APIView):
+    """
+    Versioned user directory for the chat client's local cache (see accounts/directory.py).
+
+    GET users/directory/                   first page; follow next_cursor until it is null
+    GET users/directory/?since=<version>   users changed/deleted since a version
+    Accept: application/x-ndjson           the whole directory (or delta) as one stream
+    """
+    # Any signed-in user may read the directory, so the token's claims are enough
+    authentication_classes = [ClaimsOnlyJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, MessagePackRenderer, NDJSONRenderer]
+
+    def get(self, request):
+        from .directory import (
+            InvalidDirectoryCursor, directory_etag, fetch_delta, fetch_page, iter_entries,
+            latest_version, settled_version,
+        )
+
+        # Unchanged directories cost one aggregate query
+        etag = directory_etag(request, latest_version())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag)
+
+        since = request.query_params.get('since')
+        limit = request.query_params.get('limit')
+        try:
+            since = int(since) if since is not None else None
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            return Response({'error': 'since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit is not None and limit < 1:
+            return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.accepted_renderer.format == 'ndjson':
+            if since is not None:
+                delta = fetch_delta(since, limit)
+                header = {key: delta[key] for key in ('version', 'deleted', 'has_more')}
+                entries = delta['users']
+            else:
+                header = {'version': settled_version()}
+                entries = iter_entries()
+            response = StreamingHttpResponse(
+                ndjson_lines(itertools.chain([header], entries)),
+                content_type=NDJSONRenderer.media_type,
+            )
+            return self._with_validators(response, etag)
+
+        try:
+            if since is not None:
+                data = fetch_delta(since, limit)
+            else:
+                data = fetch_page(request.query_params.get('cursor'), limit)
+        except InvalidDirectoryCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self._with_validators(Response(data), etag)
+
+    def _with_validators(self, response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
 
 class UserProfileView(views.APIView):
     permission_classes = [IsAuthenticated]
@@ -1313,15 +1389,8 @@ class UserSearchView(views.APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Search in multiple fields
-            search_results = UserProfile.objects.filter(
-                Q(username__icontains=query) |
-                Q(user__first_name__icontains=query) |
-                Q(user__last_name__icontains=query) |
-                Q(user__email__icontains=query)
-            ).exclude(
-                user_id=request.user.id  # Exclude current user
-            ).select_related('user')[:limit]
+            # Ranked matches on the folded search column (see accounts/search.py), excluding the current user
+            search_results = search_users(query, limit, exclude_user_id=request.user.id)
             
             # Serialize the results
             serializer = UserSearchResultSerializer(search_results, many=True)
@@ -1880,7 +1949,7 @@ class DeleteAccountView(APIView):
                 NotificationSettings.objects.filter(user=user).delete()
                 
                 # Delete user profile if exists
-                UserProfile.objects.filter(account=user).delete()
+                UserProfile.objects.filter(user=user).delete()
                 
                 # Delete verification codes
                 VerificationCode.objects.filter(user=user).delete()
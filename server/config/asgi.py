@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+
+# Load tests run the server with FIREBASE_STUB=1 (see config/firebase_stub.py)
+from config.firebase_stub import install_if_enabled  # noqa: E402
+
+install_if_enabled()
@@ -0,0 +1,135 @@
+"""
+Async views for the endpoints that mostly wait on other services: media
+uploads (Firebase Storage), Google sign-in (profile picture download) and
+FCM pushes (direct messages, friend requests).
+
+Served by an ASGI server (``config/asgi.py``), such a view awaits the
+upstream call instead of holding a worker thread for its whole round trip,
+so one worker keeps serving other requests while Google answers. Under WSGI
+Django runs them with ``async_to_sync`` and they behave like sync views.
+
+DRF 3.15 has no async views, so ``AsyncAPIView`` is an ``APIView`` with an
+async ``dispatch``, and ``async_api_view`` is its ``api_view`` counterpart
+for functions (it honours ``@permission_classes``, ``@parser_classes``,
+``@throttle_classes`` and the other DRF decorators the same way). The
+request goes through DRF's own pipeline: authentication, permissions,
+throttles and content negotiation (``APIView.initial``), the configured
+parsers for ``request.data``, the exception handler for errors and the
+negotiated renderer (JSON or MessagePack) for the ``Response`` the handler
+returns. Those steps are synchronous (they may query the database or the
+cache), so they run through ``sync_to_async``; only the handler itself runs
+on the event loop.
+
+Inside them:
+
+- the database goes through the async ORM (``aget``, ``acreate``,
+  ``asave``, ``async for``), or ``sync_to_async`` for code that mixes ORM
+  calls with other work (serializers, file storage);
+- blocking calls that never touch the database (Firebase SDK, HTTP
+  downloads) go through ``run_io``, which runs them in a dedicated thread
+  pool of ``IO_THREADS`` threads so concurrent requests overlap their waits.
+"""
+
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.views import APIView
+
+DEFAULT_ASYNC_VIEWS_SETTINGS = {
+    'IO_THREADS': 32,  # Threads running the blocking upstream calls of all async views of a process
+}
+
+
+def get_async_views_settings():
+    """Return the async view settings merged over the defaults"""
+    return {**DEFAULT_ASYNC_VIEWS_SETTINGS, **getattr(settings, 'ASYNC_VIEWS', {})}
+
+
+_io_executor = None
+_io_executor_lock = threading.Lock()
+
+
+def io_executor():
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(
+                max_workers=get_async_views_settings()['IO_THREADS'], thread_name_prefix='async-io'
+            )
+        return _io_executor
+
+
+def run_io(func, *args, **kwargs):
+    """
+    Await ``func(*args, **kwargs)`` run in the I/O thread pool.
+
+    Only for calls that don't use the database: pool threads hold no
+    request-scoped connection, so ORM calls belong in ``sync_to_async``.
+    """
+    return sync_to_async(func, thread_sensitive=False, executor=io_executor())(*args, **kwargs)
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose handler methods are ``async def`` (see the module docstring)"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial_and_parse)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def initial_and_parse(self, request, *args, **kwargs):
+        self.initial(request, *args, **kwargs)
+        # Parsing reads (and for multipart spools) the body, so it happens here rather than on the event loop
+        request.data
+
+
+def async_api_view(http_method_names):
+    """
+    ``api_view`` for ``async def view(request, ...)`` functions: the view is
+    served by an ``AsyncAPIView`` accepting ``http_method_names``
+    """
+    def decorator(func):
+        class WrappedAPIView(AsyncAPIView):
+            pass
+
+        WrappedAPIView.http_method_names = [method.lower() for method in http_method_names] + ['options']
+
+        async def handler(self, request, *args, **kwargs):
+            return await func(request, *args, **kwargs)
+
+        for method in http_method_names:
+            setattr(WrappedAPIView, method.lower(), handler)
+
+        WrappedAPIView.__name__ = func.__name__
+        WrappedAPIView.__module__ = func.__module__
+        WrappedAPIView.__doc__ = func.__doc__
+        for attribute in (
+            'renderer_classes', 'parser_classes', 'authentication_classes', 'throttle_classes',
+            'permission_classes', 'content_negotiation_class', 'metadata_class', 'versioning_class', 'schema',
+        ):
+            if hasattr(func, attribute):
+                setattr(WrappedAPIView, attribute, getattr(func, attribute))
+
+        return WrappedAPIView.as_view()
+
+    return decorator
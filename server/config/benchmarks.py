@@ -0,0 +1,164 @@
+"""
+Micro-benchmark harness for hot code paths.
+
+Benchmarks live in a ``benchmarks.py`` module of any installed app and are
+registered with ``@benchmark``. A benchmark is a generator: the code before
+``yield`` is setup, the yielded callable is what gets timed, and the code
+after ``yield`` is teardown::
+
+    @benchmark('posts.serializer', 'PostSerializer on N posts')
+    def serializer(context):
+        posts = list(Post.objects.all()[:context.size])
+        yield lambda: PostSerializer(posts, many=True).data
+
+``run_benchmark`` runs the warmup and timed rounds and summarizes them with
+``summarize`` (p50/p95/p99 in milliseconds); ``compare`` checks a run
+against a stored baseline. ``python manage.py benchmark`` drives all of it.
+"""
+
+import contextlib
+import io
+import math
+import platform
+import statistics
+import time
+from collections import namedtuple
+from fnmatch import fnmatch
+
+import django
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+Benchmark = namedtuple('Benchmark', 'name description setup')
+
+# Everything a benchmark may need to build its inputs from the current database
+BenchmarkContext = namedtuple('BenchmarkContext', 'size user latitude longitude')
+
+BENCHMARKS = {}
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')
+
+
+def benchmark(name, description=''):
+    """Register a generator function as the benchmark ``name``"""
+    def register(func):
+        summary = description or ' '.join((func.__doc__ or '').split())
+        BENCHMARKS[name] = Benchmark(name, summary, contextlib.contextmanager(func))
+        return func
+    return register
+
+
+def discover_benchmarks():
+    """Import ``benchmarks`` from every installed app and return the registry"""
+    autodiscover_modules('benchmarks')
+    return BENCHMARKS
+
+
+def select_benchmarks(patterns=None):
+    """Registered benchmarks whose name matches any of the glob ``patterns`` (all if none)"""
+    registry = discover_benchmarks()
+    if not patterns:
+        return [registry[name] for name in sorted(registry)]
+    return [
+        registry[name] for name in sorted(registry)
+        if any(fnmatch(name, pattern) or name.startswith(pattern) for pattern in patterns)
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(timings_ms):
+    """Percentiles and spread of a list of timings in milliseconds"""
+    ordered = sorted(timings_ms)
+    return {
+        'repeat': len(ordered),
+        'min_ms': round(ordered[0], 4) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50), 4),
+        'p95_ms': round(percentile(ordered, 0.95), 4),
+        'p99_ms': round(percentile(ordered, 0.99), 4),
+        'max_ms': round(ordered[-1], 4) if ordered else 0.0,
+        'mean_ms': round(statistics.fmean(ordered), 4) if ordered else 0.0,
+        'stdev_ms': round(statistics.stdev(ordered), 4) if len(ordered) > 1 else 0.0,
+    }
+
+
+def run_benchmark(bench, context, warmup=3, repeat=30):
+    """
+    Run one benchmark and return its summary plus the number of queries a
+    single call makes. Output printed by the code under test is discarded.
+    """
+    with contextlib.redirect_stdout(io.StringIO()), bench.setup(context) as func:
+        for _ in range(warmup):
+            func()
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            func()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return {**summarize(timings), 'queries': len(queries)}
+
+
+def run_report(benchmarks, context, warmup=3, repeat=30, progress=None):
+    """Run ``benchmarks`` and return the JSON-serializable report"""
+    results = {}
+    for bench in benchmarks:
+        results[bench.name] = run_benchmark(bench, context, warmup=warmup, repeat=repeat)
+        if progress:
+            progress(bench, results[bench.name])
+    return {
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+        },
+        'options': {'size': context.size, 'warmup': warmup, 'repeat': repeat},
+        'benchmarks': results,
+    }
+
+
+def compare(report, baseline, threshold=10.0, metric='p50_ms', min_delta_ms=0.05):
+    """
+    Compare ``report`` with ``baseline`` on ``metric``. Returns one row per
+    benchmark: (name, baseline value, current value, change in percent,
+    status) where status is ``regressed``, ``improved``, ``ok``, ``new`` or
+    ``missing``. Changes smaller than ``min_delta_ms`` never count, so
+    sub-microsecond noise on fast benchmarks can't fail a run.
+    """
+    current = report.get('benchmarks', {})
+    previous = baseline.get('benchmarks', {})
+    rows = []
+    for name in sorted(set(current) | set(previous)):
+        if name not in previous:
+            rows.append((name, None, current[name][metric], None, 'new'))
+            continue
+        if name not in current:
+            rows.append((name, previous[name][metric], None, None, 'missing'))
+            continue
+        before, after = previous[name][metric], current[name][metric]
+        change = (after - before) / before * 100 if before else 0.0
+        if abs(after - before) < min_delta_ms:
+            state = 'ok'
+        elif change > threshold:
+            state = 'regressed'
+        elif change < -threshold:
+            state = 'improved'
+        else:
+            state = 'ok'
+        rows.append((name, before, after, round(change, 2), state))
+    return rows
@@ -0,0 +1,23 @@
+"""
+Which Django cache aliases are shared between worker processes.
+
+The post cache, the JWT user cache and the read-your-writes pins are only
+correct when an invalidation (or pin) made by one worker is seen by every
+other: that takes a cache server (``CACHE_URL`` in settings.py). LocMemCache
+lives inside one process and DummyCache stores nothing, so the features
+built on them check ``is_shared_cache`` and fall back to behaviour that is
+safe per process.
+"""
+
+from django.conf import settings
+
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def is_shared_cache(alias='default'):
+    """True when the cache ``alias`` is visible to every worker process"""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return bool(backend) and backend not in PROCESS_LOCAL_BACKENDS
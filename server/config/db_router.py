@@ -0,0 +1,220 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Replicas are extra ``DATABASES`` aliases; by default every alias whose
+``TEST['MIRROR']`` is ``'default'`` (settings.py adds ``replica1``,
+``replica2``, ... from ``DATABASE_REPLICA_HOSTS``). Writes, migrations and
+anything outside a request always use ``default``.
+
+``DatabaseRoutingMiddleware`` decides per request. Only GET/HEAD/OPTIONS
+requests to the URL names in ``REPLICA_URL_NAMES`` read from a replica,
+which is one picked per request. Even then the request stays on the
+primary when:
+
+- its user wrote within the last ``STICKY_SECONDS``: every successful
+  POST/PUT/PATCH/DELETE (vote, post, follow, ...) pins the user, so their
+  next feed or profile read sees the change;
+- the request itself has written (the list endpoints auto-end events);
+- the read runs inside ``transaction.atomic()``.
+
+Pins live in the Django cache ``CACHE``, which must be shared between the
+worker processes (``CACHE_URL``): a pin set by the worker that handled the
+write has to reach the one serving the next read. With a per-process cache
+(LocMemCache, the default without a cache server) no request reads from a
+replica at all.
+"""
+
+import contextvars
+import random
+from fnmatch import fnmatch
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .caching import is_shared_cache
+
+DEFAULT_DATABASE_ROUTING_SETTINGS = {
+    'REPLICAS': None,  # Aliases to read from; None = every DATABASES entry mirroring 'default' in tests
+    'STICKY_SECONDS': 15,  # Reads stay on the primary this long after the user's last write
+    # URL names (glob patterns) whose safe requests may read from a replica
+    'REPLICA_URL_NAMES': [
+        'post-*',
+        'profile', 'user_profile', 'user_profile_detail', 'user_followers', 'user_following',
+        'notification-history-*',
+    ],
+    'CACHE': 'default',  # Cache alias holding the per-user primary pins
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PIN_KEY = 'db-routing:pin:{}'
+
+
+def get_database_routing_settings():
+    """Return the database routing settings merged over the defaults"""
+    return {**DEFAULT_DATABASE_ROUTING_SETTINGS, **getattr(settings, 'DATABASE_ROUTING', {})}
+
+
+def get_replicas(config=None):
+    config = config or get_database_routing_settings()
+    if config['REPLICAS'] is not None:
+        return list(config['REPLICAS'])
+    return [
+        alias for alias, database in settings.DATABASES.items()
+        if alias != DEFAULT_DB_ALIAS and database.get('TEST', {}).get('MIRROR') == DEFAULT_DB_ALIAS
+    ]
+
+
+def pick_replica(replicas):
+    return random.choice(replicas)
+
+
+class RoutingState:
+    """Routing decision for the current request; ``replica`` is None while reads must use the primary"""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+current_routing = contextvars.ContextVar('current_database_routing', default=None)
+
+
+def pin_to_primary(user_id, config=None):
+    """Send ``user_id``'s replica-eligible reads to the primary for the next STICKY_SECONDS"""
+    config = config or get_database_routing_settings()
+    if config['STICKY_SECONDS'] > 0:
+        caches[config['CACHE']].set(PIN_KEY.format(user_id), 1, config['STICKY_SECONDS'])
+
+
+def is_pinned(user_id, config=None):
+    config = config or get_database_routing_settings()
+    return bool(caches[config['CACHE']].get(PIN_KEY.format(user_id)))
+
+
+def reading_from_replica():
+    """True while the current request's reads go to a replica"""
+    state = current_routing.get()
+    return state is not None and state.replica is not None and not state.wrote
+
+
+def _in_transaction():
+    """True inside transaction.atomic(), ignoring the blocks TestCase wraps each test in"""
+    return any(
+        not getattr(block, '_from_testcase', False) for block in connections[DEFAULT_DB_ALIAS].atomic_blocks
+    )
+
+
+class ReplicaRouter:
+    """Database router; routes reads to the replica chosen by DatabaseRoutingMiddleware"""
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        if _in_transaction():
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            # Later reads in this request must see what it wrote
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        if db in get_replicas():
+            return False
+        return None
+
+
+def _token_user_id(request):
+    """User id claimed by the request's access token, without a database lookup (None if anonymous or invalid)"""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from rest_framework_simplejwt.settings import api_settings
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Set up replica routing for each request (see the module docstring) and
+    pin users to the primary after a successful write.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        self._pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # request.user may still be the lazy session user, which queries the database
+            await sync_to_async(self._pin_after_write)(request, response)
+        return response
+
+    def _pin_after_write(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF and the async API views store the authenticated user on the Django request too
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = current_routing.get()
+        if state is None or request.method not in SAFE_METHODS:
+            return None
+        config = get_database_routing_settings()
+        replicas = get_replicas(config)
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        if not replicas or not url_name or not is_shared_cache(config['CACHE']):
+            # Without shared pins a write handled by another worker would go unnoticed
+            return None
+        if not any(fnmatch(url_name, pattern) for pattern in config['REPLICA_URL_NAMES']):
+            return None
+        user_id = _token_user_id(request)
+        if user_id is not None and is_pinned(user_id, config):
+            return None
+        state.replica = pick_replica(replicas)
+        return None
@@ -0,0 +1,277 @@
+"""
+In-process stand-ins for the Firebase services the API calls: FCM sends,
+Firestore writes and Storage uploads. Used for load tests, where the
+server must not talk to Google but should still run the code around
+every call.
+
+Enable with ``FIREBASE_STUB=1`` in the environment of the server process;
+``config/wsgi.py`` and ``config/asgi.py`` install the stub once the
+application is loaded. ``FIREBASE_STUB_LATENCY_MS`` adds a fixed delay to
+every stubbed call to approximate the real round trip.
+
+``FakeFirestore`` is an in-memory Firestore that keeps what was written,
+for tests that check the documents.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIREBASE_STUB_SETTINGS = {
+    'ENABLED': False,
+    'LATENCY_MS': 0,  # Simulated round trip added to every stubbed call
+}
+
+
+def get_firebase_stub_settings():
+    """Return the Firebase stub settings merged over the defaults"""
+    return {**DEFAULT_FIREBASE_STUB_SETTINGS, **getattr(settings, 'FIREBASE_STUB', {})}
+
+
+_installed = False
+
+
+def _wait():
+    latency = get_firebase_stub_settings()['LATENCY_MS']
+    if latency:
+        time.sleep(latency / 1000)
+
+
+def _send(message, *args, **kwargs):
+    _wait()
+    return 'projects/stub/messages/0'
+
+
+def _send_many(message, *args, **kwargs):
+    _wait()
+    tokens = getattr(message, 'tokens', None) or list(message)
+    return SimpleNamespace(
+        success_count=len(tokens),
+        failure_count=0,
+        responses=[SimpleNamespace(success=True, exception=None, message_id=str(i)) for i in range(len(tokens))],
+    )
+
+
+class _Document:
+    def __init__(self, path):
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def set(self, data, merge=False):
+        _wait()
+
+    def update(self, data):
+        _wait()
+
+    def delete(self):
+        _wait()
+
+    def get(self):
+        _wait()
+        return SimpleNamespace(exists=False, id=self.id, to_dict=lambda: None)
+
+    def collection(self, name):
+        return _Collection(f'{self.path}/{name}')
+
+
+class _Collection:
+    def __init__(self, path):
+        self.path = path
+
+    def document(self, document_id=None):
+        return _Document(f'{self.path}/{document_id or "auto"}')
+
+    def add(self, data):
+        _wait()
+        return None, self.document()
+
+    def stream(self):
+        _wait()
+        return iter(())
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return self
+
+
+class _Batch:
+    def set(self, reference, data, merge=False):
+        pass
+
+    def update(self, reference, data):
+        pass
+
+    def delete(self, reference):
+        pass
+
+    def commit(self):
+        _wait()
+        return []
+
+
+class FirestoreStub:
+    def collection(self, name):
+        return _Collection(name)
+
+    def batch(self):
+        return _Batch()
+
+
+class FakeFirestore:
+    """
+    Firestore client keeping documents in memory, for tests of code that
+    writes Firestore (``FakeFirestore().documents['users/1']``). Batches
+    apply on commit and, like Firestore, refuse more than 500 writes.
+    """
+    MAX_BATCH_WRITES = 500
+
+    def __init__(self):
+        self.documents = {}
+        self.commits = []  # Writes per committed batch
+
+    def collection(self, name):
+        return _FakeCollection(self, name)
+
+    def batch(self):
+        return _FakeBatch(self)
+
+    def _set(self, path, data, merge=False):
+        self.documents[path] = {**self.documents.get(path, {}), **data} if merge else dict(data)
+
+
+class _FakeReference:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def set(self, data, merge=False):
+        self.client._set(self.path, data, merge)
+
+    def delete(self):
+        self.client.documents.pop(self.path, None)
+
+    def get(self):
+        data = self.client.documents.get(self.path)
+        return SimpleNamespace(exists=data is not None, id=self.id, to_dict=lambda: dict(data) if data else None)
+
+
+class _FakeCollection:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def document(self, document_id):
+        return _FakeReference(self.client, f'{self.name}/{document_id}')
+
+
+class _FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, reference, data, merge=False):
+        self.writes.append((reference.set, (data, merge)))
+
+    def delete(self, reference):
+        self.writes.append((reference.delete, ()))
+
+    def commit(self):
+        if len(self.writes) > FakeFirestore.MAX_BATCH_WRITES:
+            raise ValueError(f'{len(self.writes)} writes in one batch; Firestore allows {FakeFirestore.MAX_BATCH_WRITES}')
+        for write, args in self.writes:
+            write(*args)
+        self.client.commits.append(len(self.writes))
+        return []
+
+
+class _Blob:
+    def __init__(self, name):
+        self.name = name
+        self.public_url = f'https://storage.googleapis.com/stub-bucket/{name}'
+
+    def upload_from_filename(self, filename, content_type=None, **kwargs):
+        _wait()
+
+    def upload_from_file(self, file_obj, content_type=None, **kwargs):
+        _wait()
+
+    def upload_from_string(self, data, content_type=None, **kwargs):
+        _wait()
+
+    def make_public(self):
+        _wait()
+
+    def delete(self):
+        _wait()
+
+    def exists(self):
+        return True
+
+
+class BucketStub:
+    name = 'stub-bucket'
+
+    def blob(self, name):
+        return _Blob(name)
+
+
+def _firestore_client(*args, **kwargs):
+    return FirestoreStub()
+
+
+def _bucket(*args, **kwargs):
+    return BucketStub()
+
+
+# media_api.views checks ``firestore.client._apps`` before initializing an app
+_firestore_client._apps = {'[DEFAULT]': 'stub'}
+
+
+def _stubs():
+    """(module, attribute, stub) for every Firebase entry point the API calls"""
+    from firebase_admin import firestore, messaging, storage
+
+    stubs = [(messaging, 'send', _send)]
+    for name in ('send_multicast', 'send_each_for_multicast', 'send_each', 'send_all'):
+        stubs.append((messaging, name, _send_many))
+    stubs.append((firestore, 'client', _firestore_client))
+    stubs.append((storage, 'bucket', _bucket))
+    return stubs
+
+
+def install():
+    """Replace the Firebase entry points used by the API with the stubs"""
+    global _installed
+    if _installed:
+        return
+    for module, name, stub in _stubs():
+        setattr(module, name, stub)
+    _installed = True
+    logger.warning('Firebase is stubbed: no notifications, Firestore writes or uploads leave this process')
+
+
+@contextmanager
+def installed():
+    """Stub Firebase inside the block only (benchmarks and tests in a process that keeps running)"""
+    stubs = _stubs()
+    originals = [(module, name, getattr(module, name)) for module, name, _ in stubs]
+    for module, name, stub in stubs:
+        setattr(module, name, stub)
+    try:
+        yield
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+def install_if_enabled():
+    if get_firebase_stub_settings()['ENABLED']:
+        install()
@@ -0,0 +1,289 @@
+"""
+Closed-model HTTP load generator replaying the mobile app's traffic mix
+against a running server (``runserver`` or an ASGI server).
+
+Each virtual user is a thread with its own keep-alive session. It logs in,
+performs a random number of actions drawn from the weighted mix with an
+exponential think time between them, then starts a new session with a
+fresh login. Virtual users are started at ``arrival_rate`` per second
+until ``users`` are active, and everything stops after ``duration``
+seconds. Latency, status and errors are recorded per endpoint label.
+
+Start the server with ``FIREBASE_STUB=1`` (see config/firebase_stub.py) so
+logins, follows and uploads don't reach Firebase. ``python manage.py
+loadtest`` drives this module using accounts made by ``generate_dataset``.
+"""
+
+import io
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+from .benchmarks import percentile
+
+# Relative weight of each action in a session; login happens once per session
+DEFAULT_MIX = {
+    'feed': 30,
+    'nearby': 15,
+    'recommended': 10,
+    'notifications': 20,
+    'vote': 8,
+    'follow': 3,
+    'token_refresh': 5,
+    'upload': 2,
+}
+
+
+def parse_mix(value):
+    """``"feed=30,nearby=10"`` -> ``{'feed': 30, 'nearby': 10}``; unknown actions raise ValueError"""
+    mix = {}
+    for part in filter(None, (part.strip() for part in value.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action '{name}'; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('The mix needs at least one action with a positive weight')
+    return mix
+
+
+class LoadStats:
+    """Thread-safe latency and status counters per endpoint label"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._statuses = defaultdict(Counter)
+        self._errors = Counter()
+
+    def record(self, label, seconds, status, ok):
+        with self._lock:
+            self._latencies[label].append(seconds * 1000)
+            self._statuses[label][status] += 1
+            if not ok:
+                self._errors[label] += 1
+
+    def summary(self, elapsed):
+        """Per-label throughput, error rate and latency percentiles, plus a total row"""
+        with self._lock:
+            latencies = {label: sorted(values) for label, values in self._latencies.items()}
+            statuses = {label: dict(counter) for label, counter in self._statuses.items()}
+            errors = dict(self._errors)
+
+        endpoints = {}
+        for label, values in sorted(latencies.items()):
+            endpoints[label] = self._row(values, errors.get(label, 0), elapsed)
+            endpoints[label]['statuses'] = {
+                str(code): count for code, count in sorted(statuses[label].items(), key=str)
+            }
+        everything = sorted(value for values in latencies.values() for value in values)
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'endpoints': endpoints,
+            'total': self._row(everything, sum(errors.values()), elapsed),
+        }
+
+    @staticmethod
+    def _row(values, errors, elapsed):
+        count = len(values)
+        return {
+            'requests': count,
+            'errors': errors,
+            'error_rate': round(errors / count, 4) if count else 0.0,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(values, 0.50), 2),
+            'p95_ms': round(percentile(values, 0.95), 2),
+            'p99_ms': round(percentile(values, 0.99), 2),
+            'max_ms': round(values[-1], 2) if values else 0.0,
+        }
+
+
+class VirtualUser:
+    """One simulated app user; ``run`` loops sessions until ``stop`` is set"""
+
+    def __init__(self, runner, credentials, rng):
+        self.runner = runner
+        self.email, self.password = credentials
+        self.rng = rng
+        self.session = requests.Session()
+        self.access = None
+        self.refresh = None
+        self.location = None
+        self.following = set()
+
+    # Plumbing
+
+    def request(self, label, method, path, ok_statuses=(200, 201), authenticated=True, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if authenticated and self.access:
+            headers['Authorization'] = f'Bearer {self.access}'
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.runner.base_url + path, headers=headers, timeout=self.runner.timeout, **kwargs
+            )
+        except requests.RequestException as exc:
+            self.runner.stats.record(label, time.perf_counter() - start, type(exc).__name__, False)
+            return None
+        self.runner.stats.record(
+            label, time.perf_counter() - start, response.status_code, response.status_code in ok_statuses
+        )
+        return response
+
+    def think(self):
+        if self.runner.think_time > 0:
+            self.runner.stop.wait(self.rng.expovariate(1 / self.runner.think_time))
+
+    def run(self):
+        while not self.runner.stop.is_set():
+            if not self.login():
+                # Back off instead of hammering a failing login
+                self.runner.stop.wait(1.0)
+                continue
+            for _ in range(1 + int(self.rng.expovariate(1 / self.runner.session_actions))):
+                if self.runner.stop.is_set():
+                    break
+                self.think()
+                action = self.rng.choices(self.runner.actions, self.runner.weights)[0]
+                getattr(self, f'do_{action}')()
+        self.session.close()
+
+    # Actions
+
+    def login(self):
+        self.access = self.refresh = None
+        response = self.request(
+            'login', 'post', '/api/accounts/login/', authenticated=False,
+            json={'email': self.email, 'password': self.password}
+        )
+        if response is None or response.status_code != 200:
+            return False
+        tokens = response.json().get('tokens') or {}
+        self.access, self.refresh = tokens.get('access'), tokens.get('refresh')
+        self.location = self.rng.choice(self.runner.locations)
+        return bool(self.access)
+
+    def _coordinates(self):
+        latitude, longitude = self.location
+        # Users move a little between requests
+        return latitude + self.rng.gauss(0, 0.005), longitude + self.rng.gauss(0, 0.005)
+
+    def do_feed(self):
+        self.request('feed', 'get', '/api/posts/', params={'page_size': 20})
+
+    def do_nearby(self):
+        latitude, longitude = self._coordinates()
+        self.request('nearby', 'get', '/api/posts/nearby/', params={
+            'lat': latitude, 'lng': longitude, 'radius': 5000, 'page_size': 20,
+        })
+
+    def do_recommended(self):
+        latitude, longitude = self._coordinates()
+        self.request('recommended', 'get', '/api/posts/recommended/', params={
+            'latitude': latitude, 'longitude': longitude, 'limit': 20,
+        })
+
+    def do_notifications(self):
+        # The app polls the unread badge and occasionally opens the list
+        self.request('notifications.unread', 'get', '/api/notifications/history/unread_count/')
+        if self.rng.random() < 0.3:
+            self.request('notifications.list', 'get', '/api/notifications/history/', params={'page_size': 20})
+
+    def do_vote(self):
+        if self.runner.post_ids:
+            post_id = self.rng.choice(self.runner.post_ids)
+            self.request('vote', 'post', f'/api/posts/{post_id}/vote/', json={'is_upvote': self.rng.random() < 0.8})
+
+    def do_follow(self):
+        if not self.runner.user_ids:
+            return
+        user_id = self.rng.choice(self.runner.user_ids)
+        if user_id in self.following:
+            self.following.discard(user_id)
+            self.request('unfollow', 'post', f'/api/accounts/users/{user_id}/unfollow/', ok_statuses=(200, 400))
+        else:
+            self.following.add(user_id)
+            # 400 means the generated follow graph already has this edge (or it's the user itself)
+            self.request('follow', 'post', f'/api/accounts/users/{user_id}/follow/', ok_statuses=(200, 201, 400))
+
+    def do_token_refresh(self):
+        response = self.request(
+            'token_refresh', 'post', '/api/accounts/token/refresh/', authenticated=False,
+            json={'refresh': self.refresh}
+        )
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            self.access = data.get('access', self.access)
+            self.refresh = data.get('refresh', self.refresh)
+
+    def do_upload(self):
+        self.request('upload', 'post', '/media-api/upload/', data={'content_type': 'image'}, files={
+            'file': ('photo.png', io.BytesIO(self.runner.upload_body), 'image/png'),
+        })
+
+
+class LoadTest:
+    """
+    Configure and run one load test. ``accounts`` is a list of (email,
+    password); ``locations`` (lat, lng) pairs users are placed around;
+    ``post_ids`` and ``user_ids`` the targets of votes and follows.
+    """
+
+    def __init__(self, base_url, accounts, locations, post_ids=(), user_ids=(), mix=None, users=10,
+                 arrival_rate=2.0, duration=60, think_time=1.0, session_actions=20, timeout=30, seed=1,
+                 upload_body=b''):
+        self.base_url = base_url.rstrip('/')
+        self.accounts = list(accounts)
+        self.locations = list(locations)
+        self.post_ids = list(post_ids)
+        self.user_ids = list(user_ids)
+        mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+        self.users = users
+        self.arrival_rate = arrival_rate
+        self.duration = duration
+        self.think_time = think_time
+        self.session_actions = max(session_actions, 1)
+        self.timeout = timeout
+        self.seed = seed
+        self.upload_body = upload_body
+        self.stats = LoadStats()
+        self.stop = threading.Event()
+
+    def run(self, progress=None, progress_interval=10):
+        """Run the test and return ``LoadStats.summary`` with the peak number of virtual users"""
+        rng = random.Random(self.seed)
+        threads = []
+        start = time.perf_counter()
+        deadline = start + self.duration
+        next_report = start + progress_interval
+        try:
+            while time.perf_counter() < deadline:
+                now = time.perf_counter()
+                # Ramp up: start virtual users at the arrival rate until all are running
+                if self.arrival_rate > 0:
+                    due = min(self.users, 1 + int((now - start) * self.arrival_rate))
+                else:
+                    due = self.users
+                while len(threads) < due:
+                    credentials = self.accounts[len(threads) % len(self.accounts)]
+                    user = VirtualUser(self, credentials, random.Random(rng.random()))
+                    thread = threading.Thread(target=user.run, name=f'vu-{len(threads)}', daemon=True)
+                    thread.start()
+                    threads.append(thread)
+                if progress and now >= next_report:
+                    progress(self.stats.summary(now - start), len(threads))
+                    next_report = now + progress_interval
+                time.sleep(0.05)
+        finally:
+            self.stop.set()
+            elapsed = time.perf_counter() - start
+            for thread in threads:
+                thread.join(timeout=self.timeout)
+        summary = self.stats.summary(elapsed)
+        summary['virtual_users'] = len(threads)
+        return summary
@@ -0,0 +1,295 @@
+"""
+Per-request instrumentation: query count, DB time, serializer time, total
+time and response size per endpoint, exported in Prometheus text format.
+
+``RequestMetricsMiddleware`` (config/middleware.py) measures every request
+and feeds ``request_metrics``; ``metrics_view`` serves ``/metrics``.
+
+Histograms are cumulative, as Prometheus expects; rolling windows come from
+the scraper (``rate(livespot_request_duration_seconds_bucket[5m])``).
+Endpoints are labelled with the URL name (``post-nearby``), never the raw
+path, so label cardinality stays bounded.
+
+Each worker process keeps its own registry; scrape every worker or sum in
+the query. Requests over their query or latency budget are logged with the
+endpoint and counted in ``livespot_request_budget_exceeded_total``.
+
+The current request's counters live in a context variable, and the query
+wrapper is installed on every connection as it is created, so queries run
+through ``sync_to_async`` (which copies the context into its thread) count
+towards the request that awaited them. Threads started directly with
+``threading.Thread`` don't inherit the context and aren't counted.
+
+``/metrics`` answers the bearer ``TOKEN`` when one is set, and otherwise
+only direct requests from ``INTERNAL_NETWORKS``; requests relayed by a
+proxy (``X-Forwarded-For``) never count as internal. Staff users (API
+access token) are always let in.
+"""
+
+import bisect
+import contextvars
+import ipaddress
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_METRICS_SETTINGS = {
+    'ENABLED': True,
+    'SECONDS_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'QUERY_BUCKETS': (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    'BYTES_BUCKETS': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    # Per-endpoint budgets keyed by URL name, e.g. {'post-list': {'queries': 12, 'latency_ms': 250}}
+    'BUDGETS': {},
+    'DEFAULT_BUDGET': {'queries': 50, 'latency_ms': 1000},
+    'SERVER_TIMING_HEADER': False,  # Add a Server-Timing header with db/serializer/total durations
+    'TOKEN': None,  # If set, /metrics requires "Authorization: Bearer <TOKEN>" (or a staff user)
+    # Without a token, /metrics only answers staff users and direct requests from these networks
+    'INTERNAL_NETWORKS': ('127.0.0.0/8', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '::1/128', 'fc00::/7'),
+}
+
+
+def get_request_metrics_settings():
+    """Return the request metrics settings merged over the defaults"""
+    return {**DEFAULT_REQUEST_METRICS_SETTINGS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class RequestSample:
+    """Counters for one request; the DB wrapper and serializer hook add to the current one"""
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+current_sample = contextvars.ContextVar('current_request_sample', default=None)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Execute wrapper counting and timing queries of the current request"""
+    sample = current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db_seconds += time.perf_counter() - start
+        sample.queries += 1
+
+
+_query_hook_installed = False
+
+
+def _add_query_timer(sender=None, connection=None, **kwargs):
+    # First in line, so an enclosing ``execute_wrapper`` block pops its own wrapper, not this one
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_timer)
+
+
+def install_query_timer():
+    """Time the queries of every connection, including those opened later in other threads"""
+    global _query_hook_installed
+    if _query_hook_installed:
+        return
+    connection_created.connect(_add_query_timer)
+    for connection in connections.all():
+        _add_query_timer(connection=connection)
+    _query_hook_installed = True
+
+
+_serializer_hook_installed = False
+
+
+def install_serializer_timer():
+    """
+    Time ``serializer.data`` for the current request. Only the outermost
+    call is timed so serializers rendering other serializers aren't counted twice.
+    """
+    global _serializer_hook_installed
+    if _serializer_hook_installed:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+
+    def timed_data(self):
+        sample = current_sample.get()
+        if sample is None or sample.serializer_depth:
+            return original.fget(self)
+        sample.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            sample.serializer_seconds += time.perf_counter() - start
+            sample.serializer_depth -= 1
+
+    BaseSerializer.data = property(timed_data)
+    _serializer_hook_installed = True
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count for one label set"""
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+HISTOGRAMS = (
+    # (metric name, help, settings key for the buckets, field of the observation)
+    ('livespot_request_duration_seconds', 'Total time spent handling the request', 'SECONDS_BUCKETS', 'seconds'),
+    ('livespot_request_db_seconds', 'Time spent in database queries', 'SECONDS_BUCKETS', 'db_seconds'),
+    ('livespot_request_serializer_seconds', 'Time spent in serializer.data', 'SECONDS_BUCKETS', 'serializer_seconds'),
+    ('livespot_request_queries', 'Database queries per request', 'QUERY_BUCKETS', 'queries'),
+    ('livespot_response_bytes', 'Response body size', 'BYTES_BUCKETS', 'bytes'),
+)
+
+
+class RequestMetrics:
+    """Process-wide registry of per-endpoint histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}   # (metric, endpoint, method) -> Histogram
+            self._responses = {}    # (endpoint, method, status) -> count
+            self._exceeded = {}     # (endpoint, budget) -> count
+
+    def observe(self, endpoint, method, status, observation, config=None):
+        """Record one request; ``observation`` holds seconds, db_seconds, serializer_seconds, queries, bytes"""
+        config = config or get_request_metrics_settings()
+        exceeded = self.check_budget(endpoint, observation, config)
+        with self._lock:
+            for metric, _help, buckets_key, field in HISTOGRAMS:
+                value = observation.get(field)
+                if value is None:
+                    continue
+                key = (metric, endpoint, method)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(tuple(config[buckets_key]))
+                histogram.observe(value)
+            response_key = (endpoint, method, status)
+            self._responses[response_key] = self._responses.get(response_key, 0) + 1
+            for budget in exceeded:
+                self._exceeded[(endpoint, budget)] = self._exceeded.get((endpoint, budget), 0) + 1
+        return exceeded
+
+    def check_budget(self, endpoint, observation, config):
+        """Names of the budgets (``queries``, ``latency_ms``) this request went over"""
+        budget = {**config['DEFAULT_BUDGET'], **config['BUDGETS'].get(endpoint, {})}
+        exceeded = []
+        if budget.get('queries') is not None and observation['queries'] > budget['queries']:
+            exceeded.append('queries')
+        if budget.get('latency_ms') is not None and observation['seconds'] * 1000 > budget['latency_ms']:
+            exceeded.append('latency_ms')
+        return exceeded
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {
+                key: (histogram.bounds, list(histogram.counts), histogram.total, histogram.count)
+                for key, histogram in self._histograms.items()
+            }
+            return histograms, dict(self._responses), dict(self._exceeded)
+
+    def render_prometheus(self):
+        """The registry in Prometheus text exposition format (version 0.0.4)"""
+        histograms, responses, exceeded = self.snapshot()
+        lines = []
+        for metric, help_text, _buckets_key, _field in HISTOGRAMS:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (name, endpoint, method), (bounds, counts, total, count) in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                cumulative = 0
+                for bound, bucket_count in zip((*bounds, '+Inf'), counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{labels}}} {total}')
+                lines.append(f'{metric}_count{{{labels}}} {count}')
+
+        lines.append('# HELP livespot_responses_total Responses by endpoint, method and status code')
+        lines.append('# TYPE livespot_responses_total counter')
+        for (endpoint, method, status), count in sorted(responses.items()):
+            lines.append(
+                f'livespot_responses_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}'
+            )
+
+        lines.append('# HELP livespot_request_budget_exceeded_total Requests over their query or latency budget')
+        lines.append('# TYPE livespot_request_budget_exceeded_total counter')
+        for (endpoint, budget), count in sorted(exceeded.items()):
+            lines.append(
+                f'livespot_request_budget_exceeded_total{{endpoint="{_escape(endpoint)}",budget="{budget}"}} {count}'
+            )
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide registry fed by RequestMetricsMiddleware
+request_metrics = RequestMetrics()
+
+
+def is_internal_request(request, networks):
+    """True for a request made directly (not through a proxy) from one of ``networks``"""
+    if 'HTTP_X_FORWARDED_FOR' in request.META:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in networks)
+
+
+def is_staff_request(request):
+    """True when the API authenticators (JWT) resolve the request to a staff user"""
+    from rest_framework.exceptions import APIException
+    from rest_framework.settings import api_settings
+
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator_class().authenticate(request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    config = get_request_metrics_settings()
+    if config['TOKEN']:
+        allowed = request.META.get('HTTP_AUTHORIZATION') == f"Bearer {config['TOKEN']}"
+    else:
+        allowed = is_internal_request(request, config['INTERNAL_NETWORKS'])
+    if not (allowed or is_staff_request(request)):
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(request_metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,85 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import (
+    RequestSample, current_sample, get_request_metrics_settings, install_query_timer, install_serializer_timer,
+    request_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request (see config/metrics.py): queries and DB time via
+    an execute wrapper on every connection, serializer time via a hook on ``serializer.data``,
+    total time and response size. Place it first so it times the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            # Under ASGI, don't force async views through a sync thread
+            markcoroutinefunction(self)
+        install_query_timer()
+        install_serializer_timer()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_request_metrics_settings()
+        if not config['ENABLED'] or request.path == '/metrics':
+            return self.get_response(request)
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self._finish(request, response, sample, time.perf_counter() - start, config)
+
+    async def __acall__(self, request):
+        config = get_request_metrics_settings()
+        if not config['ENABLED'] or request.path == '/metrics':
+            return await self.get_response(request)
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self._finish(request, response, sample, time.perf_counter() - start, config)
+
+    def _finish(self, request, response, sample, seconds, config):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.view_name or match.route) if match else 'unresolved'
+        observation = {
+            'seconds': seconds,
+            'db_seconds': sample.db_seconds,
+            'serializer_seconds': sample.serializer_seconds,
+            'queries': sample.queries,
+            'bytes': None if response.streaming else len(response.content),
+        }
+        exceeded = request_metrics.observe(endpoint, request.method, response.status_code, observation, config)
+        if exceeded:
+            logger.warning(
+                f"Request over budget ({', '.join(exceeded)}): {request.method} {endpoint} "
+                f"{sample.queries} queries, {seconds * 1000:.1f}ms total, {sample.db_seconds * 1000:.1f}ms db"
+            )
+
+        if config['SERVER_TIMING_HEADER']:
+            response['Server-Timing'] = (
+                f"db;dur={sample.db_seconds * 1000:.1f};desc=\"{sample.queries} queries\", "
+                f"serializer;dur={sample.serializer_seconds * 1000:.1f}, "
+                f"total;dur={seconds * 1000:.1f}"
+            )
+        return response
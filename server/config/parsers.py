@@ -0,0 +1,21 @@
+"""
+MessagePack request parsing, the counterpart of ``config.renderers``.
+
+Request bodies sent with ``Content-Type: application/msgpack`` are unpacked
+into the same structures a JSON body would produce, so serializers and
+views don't need to know which format the client used.
+"""
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (msgpack.UnpackException, ValueError, TypeError) as e:
+            raise ParseError(f'MessagePack parse error - {e}')
@@ -0,0 +1,354 @@
+"""
+EXPLAIN-based index advisor and plan regression checker.
+
+Each app lists the canonical queries its endpoints and jobs issue in a
+``query_plans.py`` module, registered with ``@canonical_query``. A canonical
+query is a function returning the queryset exactly as the endpoint builds
+it::
+
+    @canonical_query('notifications.queue_pending', 'process_notification_queue batch')
+    def queue_pending(context):
+        return NotificationQueue.objects.filter(status='pending').order_by('priority')[:100]
+
+``explain`` runs ``EXPLAIN (FORMAT JSON)`` on it (``ANALYZE`` optional),
+``find_problems`` flags sequential scans and sorts over large tables,
+``propose_index`` turns a finding into a composite index and
+``compare_plans`` checks a run against a stored baseline.
+``python manage.py explain_queries`` drives all of it. PostgreSQL only.
+"""
+
+import json
+import re
+from collections import namedtuple
+from fnmatch import fnmatch
+
+from django.apps import apps
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+CanonicalQuery = namedtuple('CanonicalQuery', 'name description build')
+
+# What a canonical query may need to build its filters from the current database
+QueryContext = namedtuple('QueryContext', 'user latitude longitude')
+
+# kind is 'seq_scan' or 'sort'; columns are the table columns the node filters or sorts on
+Finding = namedtuple('Finding', 'query kind table rows columns detail')
+
+# fields are model field names and condition Q() lookups, ready for ``models.Index(fields=..., condition=...)``
+IndexProposal = namedtuple('IndexProposal', 'table model fields condition sql existing')
+
+QUERIES = {}
+
+SCAN_NODES = ('Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan')
+
+# ``(status)::text = 'pending'::text``, ``posts_post.created_at < '...'``, ``related_post_id IS NULL``
+_CONDITION = re.compile(
+    r'\(*(?:(?P<table>\w+)\.)?(?P<column>\w+)\)*(?:::[\w ]+\)*)?\s*'
+    r'(?P<operator>=|<>|<=|>=|<|>|~~|IS NOT NULL|IS NULL)'
+)
+_SORT_KEY = re.compile(r'^\(*(?:(?P<table>\w+)\.)?(?P<column>\w+)')
+
+
+def canonical_query(name, description=''):
+    """Register a function returning a queryset as the canonical query ``name``"""
+    def register(func):
+        summary = description or ' '.join((func.__doc__ or '').split())
+        QUERIES[name] = CanonicalQuery(name, summary, func)
+        return func
+    return register
+
+
+def discover_queries():
+    """Import ``query_plans`` from every installed app and return the registry"""
+    autodiscover_modules('query_plans')
+    return QUERIES
+
+
+def select_queries(patterns=None):
+    """Registered queries whose name matches any of the glob ``patterns`` (all if none)"""
+    registry = discover_queries()
+    if not patterns:
+        return [registry[name] for name in sorted(registry)]
+    return [
+        registry[name] for name in sorted(registry)
+        if any(fnmatch(name, pattern) or name.startswith(pattern) for pattern in patterns)
+    ]
+
+
+def explain(queryset, analyze=False):
+    """The root plan node of ``queryset`` as a dict (EXPLAIN FORMAT JSON)"""
+    options = {'analyze': True, 'buffers': True} if analyze else {}
+    return json.loads(queryset.explain(format='json', **options))[0]['Plan']
+
+
+def walk(plan):
+    """Every node of a plan, depth first"""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk(child)
+
+
+def table_rows():
+    """Estimated row count per table from pg_class (kept current by ANALYZE/autovacuum)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, c.reltuples::bigint FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relkind IN ('r', 'p') AND n.nspname = current_schema()"
+        )
+        return dict(cursor.fetchall())
+
+
+def _node_rows(node):
+    """Rows a node produced: the actual count when ANALYZEd, the planner's estimate otherwise"""
+    if 'Actual Rows' in node:
+        return node['Actual Rows'] * node.get('Actual Loops', 1)
+    return node.get('Plan Rows', 0)
+
+
+def _condition_columns(expression, table, alias):
+    """(column, operator) pairs of ``table`` referenced by a Filter/Cond expression"""
+    columns = []
+    for match in _CONDITION.finditer(expression or ''):
+        owner = match.group('table')
+        if owner and owner not in (table, alias):
+            continue
+        pair = (match.group('column'), match.group('operator'))
+        if pair not in columns:
+            columns.append(pair)
+    return columns
+
+
+def _sort_columns(sort_keys, tables):
+    """(table, column, descending) of each sort key; keys without a table prefix get table None"""
+    columns = []
+    for key in sort_keys or ():
+        match = _SORT_KEY.match(key)
+        if not match:
+            continue
+        owner = match.group('table')
+        table = tables.get(owner, owner)
+        columns.append((table, match.group('column'), key.rstrip().endswith('DESC')))
+    return columns
+
+
+def _walk_with_sorts(plan, sorts=()):
+    """Every node of a plan with the Sort nodes above it, nearest last"""
+    yield plan, sorts
+    if plan['Node Type'] in ('Sort', 'Incremental Sort'):
+        sorts = sorts + (plan,)
+    for child in plan.get('Plans', ()):
+        yield from _walk_with_sorts(child, sorts)
+
+
+def _leading_sort_columns(sort_node, aliases):
+    """
+    (table, [(column, direction), ...]) for the leading keys of a sort that
+    come from one table; an index can only replace a sort from its first key.
+    """
+    sort_columns = _sort_columns(sort_node.get('Sort Key'), aliases)
+    if not sort_columns:
+        return None, []
+    tables = set(aliases.values())
+    table = sort_columns[0][0] or (tables.pop() if len(tables) == 1 else None)
+    columns = []
+    for owner, column, descending in sort_columns:
+        if owner not in (table, None):
+            break
+        columns.append((column, 'DESC' if descending else 'ASC'))
+    return table, columns
+
+
+def find_problems(name, plan, rows_by_table, min_rows=10000):
+    """
+    Sequential scans of tables with at least ``min_rows`` rows, and sorts of
+    at least ``min_rows`` input rows, in ``plan``. Both usually mean a
+    missing index: the scan reads the whole table to find a few rows, the
+    sort orders rows an index could return already ordered. A seq scan
+    under a sort on the same table also carries the sort columns, so the
+    proposal covers both.
+    """
+    findings = []
+    aliases = {}
+    for node in walk(plan):
+        if 'Relation Name' in node:
+            aliases[node.get('Alias', node['Relation Name'])] = node['Relation Name']
+
+    for node, sorts in _walk_with_sorts(plan):
+        if node['Node Type'] == 'Seq Scan':
+            table = node['Relation Name']
+            rows = rows_by_table.get(table, 0)
+            if rows < min_rows:
+                continue
+            columns = _condition_columns(node.get('Filter'), table, node.get('Alias'))
+            if sorts:
+                sort_table, sort_columns = _leading_sort_columns(sorts[-1], aliases)
+                if sort_table == table:
+                    columns += [pair for pair in sort_columns if pair[0] not in dict(columns)]
+            findings.append(Finding(name, 'seq_scan', table, rows, columns, node.get('Filter', '')))
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            children = node.get('Plans', ())
+            rows = max((_node_rows(child) for child in children), default=_node_rows(node))
+            table, columns = _leading_sort_columns(node, aliases)
+            if rows < min_rows or table is None:
+                continue
+            findings.append(Finding(name, 'sort', table, rows, columns, ', '.join(node.get('Sort Key', ()))))
+    return findings
+
+
+def _model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def _existing_indexes(table):
+    """(columns, predicate) of each index on ``table``; predicate is None unless the index is partial"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+        cursor.execute(
+            "SELECT i.relname, pg_get_expr(x.indpred, x.indrelid) FROM pg_index x "
+            "JOIN pg_class i ON i.oid = x.indexrelid JOIN pg_class t ON t.oid = x.indrelid "
+            "WHERE t.relname = %s",
+            [table]
+        )
+        predicates = dict(cursor.fetchall())
+    return {
+        name: (info['columns'], predicates.get(name))
+        for name, info in constraints.items() if info['index'] or info['unique']
+    }
+
+
+def propose_index(finding):
+    """
+    The composite index that serves ``finding``: columns compared for
+    equality first, then the range or sort column, so one index both
+    narrows the rows and returns them in order. A column tested with IS
+    NULL becomes a partial index condition instead, because the planner
+    can't use an index column matched by IS NULL to return the next column
+    in order. ``existing`` names an index that already covers the proposal,
+    in which case there is nothing to add and the planner is choosing the
+    scan for another reason (stale statistics, a filter that matches most of
+    the table).
+    """
+    model = _model_for_table(finding.table)
+    columns_by_name = {}
+    if model is not None:
+        columns_by_name = {field.column: field.name for field in model._meta.concrete_fields}
+
+    null = [column for column, operator in finding.columns if operator == 'IS NULL']
+    equality = [column for column, operator in finding.columns if operator == '=']
+    ordered = [
+        column for column, operator in finding.columns
+        if operator not in ('=', 'IS NULL', 'IS NOT NULL', '<>', '~~')
+    ]
+    columns = []
+    for column in equality + ordered[:1]:
+        if column not in columns and column not in null and (not columns_by_name or column in columns_by_name):
+            columns.append(column)
+    if not columns:
+        return None
+    condition = ' AND '.join(f'{column} IS NULL' for column in null) or None
+
+    existing = None
+    for index_name, (index_columns, predicate) in _existing_indexes(finding.table).items():
+        same_condition = (predicate or None) == (f'({condition})' if condition else None)
+        if index_columns[:len(columns)] == columns and same_condition:
+            existing = index_name
+            break
+
+    fields = [columns_by_name.get(column, column) for column in columns]
+    index_name = f"{finding.table}_{'_'.join(columns)}{'_partial' if null else ''}_idx"[:63]
+    sql = f"CREATE INDEX CONCURRENTLY {index_name} ON {finding.table} ({', '.join(columns)})"
+    if condition:
+        sql += f' WHERE {condition}'
+        condition = ', '.join(f'{columns_by_name.get(column, column)}__isnull=True' for column in null)
+    return IndexProposal(finding.table, model._meta.label if model else None, fields, condition, sql + ';', existing)
+
+
+def plan_signature(plan):
+    """
+    What a plan does, independent of cost estimates: each scan with its
+    table and index, plus the sorts. Two runs with the same signature read
+    the data the same way.
+    """
+    signature = []
+    for node in walk(plan):
+        if node['Node Type'] in SCAN_NODES:
+            target = node.get('Relation Name') or ''
+            if node.get('Index Name'):
+                target = f"{target} using {node['Index Name']}".strip()
+            signature.append(f"{node['Node Type']} on {target}")
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            signature.append(f"{node['Node Type']} by {', '.join(node.get('Sort Key', ()))}")
+    return signature
+
+
+def run_report(queries, context, analyze=False, min_rows=10000, progress=None):
+    """EXPLAIN every query and return the JSON-serializable report with findings and proposals"""
+    rows_by_table = table_rows()
+    results = {}
+    for query in queries:
+        plan = explain(query.build(context), analyze=analyze)
+        findings = find_problems(query.name, plan, rows_by_table, min_rows=min_rows)
+        result = {
+            'total_cost': plan['Total Cost'],
+            'signature': plan_signature(plan),
+            'findings': [finding._asdict() for finding in findings],
+            'proposals': [],
+        }
+        if analyze:
+            result['execution_ms'] = plan.get('Actual Total Time')
+        for finding in findings:
+            proposal = propose_index(finding)
+            if proposal is not None and proposal._asdict() not in result['proposals']:
+                result['proposals'].append(proposal._asdict())
+        result['plan'] = plan
+        results[query.name] = result
+        if progress:
+            progress(query, result)
+    return {
+        'created_at': timezone.now().isoformat(),
+        'options': {'analyze': analyze, 'min_rows': min_rows},
+        'tables': {table: rows for table, rows in sorted(rows_by_table.items()) if rows >= min_rows},
+        'queries': results,
+    }
+
+
+def compare_plans(report, baseline, cost_threshold=50.0):
+    """
+    Compare ``report`` with ``baseline``. Returns one row per query: (name,
+    status, detail) where status is ``regressed`` (a new seq scan or sort on
+    a large table, or estimated cost up more than ``cost_threshold``
+    percent), ``changed`` (different plan, no new problem), ``ok``, ``new``
+    or ``missing``.
+    """
+    current = report.get('queries', {})
+    previous = baseline.get('queries', {})
+    rows = []
+    for name in sorted(set(current) | set(previous)):
+        if name not in previous:
+            rows.append((name, 'new', ''))
+            continue
+        if name not in current:
+            rows.append((name, 'missing', ''))
+            continue
+        before, after = previous[name], current[name]
+        known = {(finding['kind'], finding['table']) for finding in before['findings']}
+        added = [
+            f"{finding['kind']} on {finding['table']}" for finding in after['findings']
+            if (finding['kind'], finding['table']) not in known
+        ]
+        cost_before, cost_after = before['total_cost'], after['total_cost']
+        change = (cost_after - cost_before) / cost_before * 100 if cost_before else 0.0
+        if added:
+            rows.append((name, 'regressed', 'new ' + ', '.join(added)))
+        elif change > cost_threshold:
+            rows.append((name, 'regressed', f'estimated cost {cost_before:.0f} -> {cost_after:.0f} ({change:+.0f}%)'))
+        elif after['signature'] != before['signature']:
+            rows.append((name, 'changed', '; '.join(after['signature'])))
+        else:
+            rows.append((name, 'ok', ''))
+    return rows
@@ -0,0 +1,60 @@
+"""
+MessagePack rendering for the REST API.
+
+Clients that send ``Accept: application/msgpack`` (or ``?format=msgpack``)
+get the same payload as the JSON renderer, packed as MessagePack. Values
+MessagePack has no native type for go through DRF's ``JSONEncoder.default``
+so datetimes, dates, Decimals, UUIDs and lazy strings come out exactly as
+they do in JSON (ISO 8601 strings with ``Z`` for UTC, Decimals as floats).
+
+Map keys keep their Python type: id-keyed maps such as the side-loaded
+``authors`` use integer keys, where JSON has to stringify them.
+"""
+
+import json
+
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_json_encoder = JSONEncoder()
+
+
+def packb(data):
+    """Pack ``data`` with the JSON encoder's conversions for non-native types"""
+    return msgpack.packb(data, default=_json_encoder.default, use_bin_type=True)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return packb(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON (``Accept: application/x-ndjson``), one value per
+    line. Views that stream large collections return a
+    ``StreamingHttpResponse`` of ``ndjson_lines`` instead of using ``render``.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(ndjson_lines(items))
+
+
+def ndjson_lines(items):
+    """Encode each item as one line of JSON with the JSON renderer's conversions"""
+    for item in items:
+        yield json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
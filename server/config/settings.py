@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from datetime import timedelta
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.RequestMetricsMiddleware",  # First, so it times the whole stack
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",  # Restored for admin interface
     "corsheaders.middleware.CorsMiddleware",
@@ -65,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.db_router.DatabaseRoutingMiddleware",  # Needs the resolved URL name, so it runs last
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -110,6 +113,22 @@ DATABASES = {
     }
 }
 
+# Read replicas as host[:port],... with the primary's name and credentials, added as replica1,
+# replica2, ... Routing is in config/db_router.py. Not under the test runner: each TestCase runs in
+# a transaction that a replica connection can't see.
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+_replica_hosts = "" if TESTING else os.getenv("DATABASE_REPLICA_HOSTS", "")
+for _number, _address in enumerate(filter(None, _replica_hosts.split(",")), start=1):
+    _host, _, _port = _address.strip().partition(":")
+    DATABASES[f"replica{_number}"] = {
+        **DATABASES["default"],
+        "HOST": _host,
+        "PORT": _port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -131,7 +150,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',  # JWT, user resolved from AUTH_CACHE
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -140,6 +159,18 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
+        'config.renderers.MessagePackRenderer',  # Accept: application/msgpack
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'config.parsers.MessagePackParser',  # Content-Type: application/msgpack
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'TEST_REQUEST_RENDERER_CLASSES': [
+        'rest_framework.renderers.MultiPartRenderer',
+        'rest_framework.renderers.JSONRenderer',
+        'config.renderers.MessagePackRenderer',
     ],
     'DEFAULT_CHARSET': 'utf-8',
 }
@@ -153,7 +184,8 @@ SIMPLE_JWT = {
     # Token rotation and security
     'ROTATE_REFRESH_TOKENS': True,                      # Get new refresh token on refresh
     'BLACKLIST_AFTER_ROTATION': True,                   # Blacklist old refresh tokens
-    'UPDATE_LAST_LOGIN': True,                          # Update last login on token use
+    'UPDATE_LAST_LOGIN': False,                         # Token obtain records logins itself (accounts/login.py)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.login.LeanTokenRefreshSerializer',
     
     # Token validation
     'ALGORITHM': 'HS256',
@@ -273,6 +305,12 @@ if not firebase_admin._apps:
     else:
         print("⚠️ Firebase service account file not found. Push notifications will not work.")
 
+# Stand-ins for FCM, Firestore and Storage for load tests (see config/firebase_stub.py)
+FIREBASE_STUB = {
+    'ENABLED': os.getenv('FIREBASE_STUB', '') == '1',
+    'LATENCY_MS': int(os.getenv('FIREBASE_STUB_LATENCY_MS', 0)),
+}
+
 # Notification System Settings
 NOTIFICATION_SETTINGS = {
     'BATCH_SIZE': 100,  # Number of notifications to process at once
@@ -280,3 +318,102 @@ NOTIFICATION_SETTINGS = {
     'RETRY_DELAY': 300,  # Delay in seconds between retries
     'CLEANUP_DAYS': 30,  # Days to keep notification history
 }
+
+# Category interaction ingest settings (see posts/interactions.py)
+INTERACTION_INGEST = {
+    'FLUSH_INTERVAL': int(os.getenv('INTERACTION_FLUSH_INTERVAL', 5)),  # Seconds between flushes (0 = synchronous)
+    'MAX_PENDING': 5000,  # Flush early once this many user/category keys are buffered
+}
+
+# Materialized category preference vectors (see posts/preferences.py)
+PREFERENCE_VECTOR = {
+    'HALF_LIFE_HOURS': 72,  # Interaction weight halves every 3 days
+    'RETENTION_DAYS': 30,  # compact_category_interactions rolls up older interactions
+}
+
+# Cache shared by every worker: the post cache, the JWT user cache and the
+# read-your-writes pins keep their invalidations here. Set CACHE_URL
+# (redis://host:6379/0) whenever more than one worker process runs; without
+# it each process has its own LocMemCache and those features fall back to
+# per-process behaviour (see config/caching.py)
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Two-tier post response cache (see posts/cache.py)
+POST_CACHE = {
+    'ENABLED': os.getenv('POST_CACHE_ENABLED', 'True') == 'True',
+    # Shared through CACHES when a cache server is configured, per process otherwise
+    'BACKEND': 'posts.cache.DjangoCacheBackend' if CACHE_URL else 'posts.cache.LocalMemoryBackend',
+    'OPTIONS': {'ALIAS': 'default'} if CACHE_URL else {'MAX_ENTRIES': 20000},
+    'POST_TTL': 300,  # Seconds a rendered post body is kept
+    'LIST_TTL': 15,  # Seconds the id list for a filter set is kept
+    'LOCAL_TTL': 5,  # Cap on both TTLs when the backend isn't shared between workers
+    'EXPIRY_CHECK_SECONDS': 10,  # Cached list hits sweep expired events at most this often
+}
+
+# Post change log behind the delta-sync endpoint (see posts/changes.py)
+POST_CHANGES = {
+    'RETENTION_DAYS': 7,  # Older cursors get 410 and must reload the feed
+    'SETTLE_SECONDS': 2,  # Cursor never moves past changes younger than this
+}
+
+# Versioned user directory for the chat client (see accounts/directory.py)
+USER_DIRECTORY = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    'SETTLE_SECONDS': 2,  # Versions never move past changes younger than this
+}
+
+# Users of JWT-authenticated requests are cached when CACHES is shared (see accounts/authentication.py)
+AUTH_CACHE = {
+    'TTL_SECONDS': int(os.getenv('AUTH_CACHE_TTL_SECONDS', 60)),
+}
+
+# last_login is written at most once per interval per user (see accounts/login.py)
+LOGIN_TRACKING = {
+    'LAST_LOGIN_INTERVAL_MINUTES': int(os.getenv('LAST_LOGIN_INTERVAL_MINUTES', 5)),
+}
+
+# Ranked user search on a folded, trigram-indexed column (see accounts/search.py)
+USER_SEARCH = {
+    'SUBSTRING_MIN_LENGTH': int(os.getenv('USER_SEARCH_SUBSTRING_MIN_LENGTH', 3)),
+}
+
+# Expired refresh tokens are deleted in id chunks (see accounts/token_cleanup.py)
+TOKEN_CLEANUP = {
+    'CHUNK_SIZE': int(os.getenv('TOKEN_CLEANUP_CHUNK_SIZE', 5000)),
+    'SLEEP_SECONDS': float(os.getenv('TOKEN_CLEANUP_SLEEP_SECONDS', 0.1)),
+}
+
+# Outbox-driven Firestore copy of the users (see accounts/firestore_sync.py)
+FIRESTORE_SYNC = {
+    'PRESENCE_DEBOUNCE_SECONDS': int(os.getenv('FIRESTORE_PRESENCE_DEBOUNCE_SECONDS', 10)),
+}
+
+# Thread pool for the blocking upstream calls of the async views (see config/async_views.py)
+ASYNC_VIEWS = {
+    'IO_THREADS': int(os.getenv('ASYNC_IO_THREADS', 32)),
+}
+
+# Read-replica routing with read-your-writes stickiness (see config/db_router.py);
+# replicas are only read when CACHES is shared (CACHE_URL), where the pins live
+DATABASE_ROUTING = {
+    'STICKY_SECONDS': int(os.getenv('DATABASE_STICKY_SECONDS', 15)),
+}
+
+# Per-request query/latency instrumentation exported at /metrics (see config/metrics.py)
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS_ENABLED', 'True') == 'True',
+    'TOKEN': os.getenv('METRICS_TOKEN'),  # Bearer token required by /metrics; unset, only staff and internal networks
+    'SERVER_TIMING_HEADER': DEBUG,
+    'DEFAULT_BUDGET': {'queries': 50, 'latency_ms': 1000},
+    # Tighter budgets for the hot mobile feeds, keyed by URL name
+    'BUDGETS': {
+        'post-list': {'queries': 15, 'latency_ms': 300},
+        'post-nearby': {'queries': 15, 'latency_ms': 300},
+        'post-recommended': {'queries': 30, 'latency_ms': 800},
+    },
+}
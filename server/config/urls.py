@@ -20,12 +20,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),  # Accounts API endpoints
     path('media-api/', include('media_api.urls')),  # Media API endpoints
     path('api/', include('posts.urls')),  # Posts API endpoints
     path('api/notifications/', include('notifications.urls')),  # Notifications API endpoints
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint (see config/metrics.py)
 ]
 
 # Serve media files in development
@@ -0,0 +1,11 @@
+"""
+Settings shared by every test in the project, the app test modules
+included: uploads go to a temporary MEDIA_ROOT instead of server/media.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def temporary_media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
@@ -12,6 +12,9 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from firebase_admin import credentials, initialize_app, storage, firestore
 from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
+
+from config.async_views import async_api_view, run_io
 
 from .models import MediaFile
 from .serializers import MediaFileSerializer, MediaFileUploadSerializer, MediaFileResponseSerializer
@@ -163,51 +166,10 @@ class MediaFileViewSet(viewsets.ModelViewSet):
         media_file = serializer.save(user=self.request.user)
         
         try:
-            # Upload to Firebase Storage
-            bucket = get_firebase_storage()
-            if bucket:
-                # Get file path
-                file_path = media_file.file.path
-                
-                # Determine content type for blob and get proper file extension
-                detected_content_type, detected_mime_type = detect_content_type_from_file(file_path, media_file.content_type)
-                
-                # Use detected MIME type or fallback
-                content_type = detected_mime_type or mimetypes.guess_type(file_path)[0]
-                if not content_type:
-                    if detected_content_type == 'image':
-                        content_type = 'image/jpeg'
-                    elif detected_content_type == 'video':
-                        content_type = 'video/mp4'
-                    elif detected_content_type == 'audio':
-                        content_type = 'audio/mpeg'
-                    else:
-                        content_type = 'application/octet-stream'
-                
-                # Get proper file extension based on MIME type and content type
-                proper_extension = get_proper_file_extension(content_type, detected_content_type, media_file.original_filename)
-                
-                # Create a unique Firebase path with proper extension
-                firebase_path = f"attachments/{detected_content_type}/{media_file.id}.{proper_extension}"
-                
-                # Upload file to Firebase
-                blob = bucket.blob(firebase_path)
-                blob.upload_from_filename(
-                    file_path,
-                    content_type=content_type
-                )
-                
-                # Make the blob publicly accessible
-                blob.make_public()
-                
-                # Update MediaFile with Firebase URL
-                firebase_url = blob.public_url
+            firebase_url = upload_to_firebase(media_file)
+            if firebase_url:
                 media_file.firebase_url = firebase_url
                 media_file.save()
-                
-                logger.info(f"File uploaded to Firebase: {firebase_url}")
-            else:
-                logger.warning("Firebase bucket not initialized, using local storage only")
         except Exception as e:
             logger.error(f"Firebase upload error: {e}")
             # Even if Firebase upload fails, we still have the file in Django storage
@@ -215,12 +177,113 @@ class MediaFileViewSet(viewsets.ModelViewSet):
         return media_file
 
 
-@csrf_exempt
-@api_view(['POST'])
+def upload_to_firebase(media_file):
+    """
+    Upload a saved media file to Firebase Storage and make it public.
+    Returns the public URL, or None when Firebase isn't configured.
+
+    Only does file and network I/O (no database access), so async views
+    can run it with ``run_io``.
+    """
+    bucket = get_firebase_storage()
+    if not bucket:
+        logger.warning("Firebase bucket not initialized, using local storage only")
+        return None
+
+    # Get file path
+    file_path = media_file.file.path
+    
+    # Determine content type for blob and get proper file extension
+    detected_content_type, detected_mime_type = detect_content_type_from_file(file_path, media_file.content_type)
+    
+    # Use detected MIME type or fallback
+    mime_type = detected_mime_type or mimetypes.guess_type(file_path)[0]
+    if not mime_type:
+        if detected_content_type == 'image':
+            mime_type = 'image/jpeg'
+        elif detected_content_type == 'video':
+            mime_type = 'video/mp4'
+        elif detected_content_type == 'audio':
+            mime_type = 'audio/mpeg'
+        else:
+            mime_type = 'application/octet-stream'
+    
+    # Get proper file extension based on MIME type and content type
+    proper_extension = get_proper_file_extension(mime_type, detected_content_type, media_file.original_filename)
+    
+    # Create a unique Firebase path with proper extension
+    firebase_path = f"attachments/{detected_content_type}/{media_file.id}.{proper_extension}"
+    
+    # Upload file to Firebase
+    blob = bucket.blob(firebase_path)
+    blob.upload_from_filename(
+        file_path,
+        content_type=mime_type
+    )
+    
+    # Make the blob publicly accessible
+    blob.make_public()
+    
+    logger.info(f"File uploaded to Firebase: {blob.public_url}")
+    return blob.public_url
+
+
+def _post_process_upload(media_file, content_type):
+    """
+    Fix the extension and path of a just uploaded file if needed and
+    generate video thumbnails. Returns True when ``media_file`` changed.
+    """
+    # Check if file has wrong extension or is a .temp file
+    if not (media_file.file and media_file.file.path):
+        return False
+    file_path = media_file.file.path
+    file_name = os.path.basename(file_path)
+    
+    # Detect actual file type and fix if needed
+    detected_content_type, detected_mime_type = detect_content_type_from_file(file_path, content_type)
+    
+    # If detected type is different from stored type, or file has .temp extension
+    should_fix = (
+        file_name.endswith('.temp') or
+        detected_content_type != media_file.content_type or
+        (detected_content_type == 'video' and media_file.content_type == 'image')
+    )
+    
+    if not should_fix:
+        # Generate thumbnail for regular video uploads that don't need fixing
+        if detected_content_type == 'video' or content_type == 'video':
+            FileProcessor.process_video_with_thumbnail(media_file)
+        return False
+
+    logger.info(f"Post-processing file {file_name}: detected as {detected_content_type}/{detected_mime_type}")
+    if file_name.endswith('.temp'):
+        # Process .temp files
+        fixed = FileProcessor.process_temp_file(media_file)
+    else:
+        # Fix extension for files with wrong extensions
+        fixed = FileProcessor.fix_file_extension_and_path(media_file, detected_mime_type)
+    if not fixed:
+        return False
+
+    media_file.refresh_from_db()
+    logger.info(f"Successfully post-processed file: {media_file.firebase_url or media_file.file.name}")
+    
+    # Generate thumbnail for videos
+    if media_file.content_type == 'video':
+        FileProcessor.process_video_with_thumbnail(media_file)
+    return True
+
+
+@async_api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
-def upload_media(request):
-    """Upload a media file and return the URL"""
+async def upload_media(request):
+    """
+    Upload a media file and return the URL.
+
+    Async: the Firebase upload runs in the I/O pool while the worker serves
+    other requests (see config/async_views.py).
+    """
     try:
         if 'file' not in request.FILES:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
@@ -228,7 +291,7 @@ def upload_media(request):
         file_obj = request.FILES['file']
         content_type = request.data.get('content_type', 'image')
         
-        # Create a new MediaFile instance
+        # Create a new MediaFile instance; saving writes the file to storage too
         media_file = MediaFile(
             user=request.user,
             file=file_obj,
@@ -236,119 +299,34 @@ def upload_media(request):
             original_filename=file_obj.name,
             file_size=file_obj.size
         )
-        media_file.save()
+        await media_file.asave()
         
         # Upload to Firebase Storage
         firebase_url = None
         try:
-            bucket = get_firebase_storage()
-            if bucket:
-                # Get file path
-                file_path = media_file.file.path
-                
-                # Determine content type for blob and get proper file extension
-                detected_content_type, detected_mime_type = detect_content_type_from_file(file_path, content_type)
-                
-                # Use detected MIME type or fallback
-                mime_type = detected_mime_type or mimetypes.guess_type(file_path)[0]
-                if not mime_type:
-                    if detected_content_type == 'image':
-                        mime_type = 'image/jpeg'
-                    elif detected_content_type == 'video':
-                        mime_type = 'video/mp4'
-                    elif detected_content_type == 'audio':
-                        mime_type = 'audio/mpeg'
-                    else:
-                        mime_type = 'application/octet-stream'
-                
-                # Get proper file extension based on MIME type and content type
-                proper_extension = get_proper_file_extension(mime_type, detected_content_type, file_obj.name)
-                
-                # Create a unique Firebase path with proper extension
-                firebase_path = f"attachments/{detected_content_type}/{media_file.id}.{proper_extension}"
-                
-                # Upload file to Firebase
-                blob = bucket.blob(firebase_path)
-                blob.upload_from_filename(
-                    file_path, 
-                    content_type=mime_type
-                )
-                
-                # Make the blob publicly accessible
-                blob.make_public()
-                
-                # Update MediaFile with Firebase URL
-                firebase_url = blob.public_url
+            firebase_url = await run_io(upload_to_firebase, media_file)
+            if firebase_url:
                 media_file.firebase_url = firebase_url
-                media_file.save()
-                
-                logger.info(f"File uploaded to Firebase: {firebase_url}")
+                await media_file.asave(update_fields=['firebase_url'])
         except Exception as e:
             logger.error(f"Firebase upload error: {e}")
             # Continue even if Firebase upload fails
         
-        # Return the media file data with Firebase URL if available
-        serializer = MediaFileResponseSerializer(media_file)
-        response_data = serializer.data
-        
-        # IMPORTANT: Always use Firebase URL in response if available
-        # This prevents "localhost" URLs from being sent to clients
-        if firebase_url:
-            response_data['url'] = firebase_url
-            response_data['firebase_url'] = firebase_url
-        
         # Post-process the file to fix extensions and paths if needed
         try:
-            # Check if file has wrong extension or is a .temp file
-            if media_file.file and media_file.file.path:
-                file_path = media_file.file.path
-                file_name = os.path.basename(file_path)
-                
-                # Detect actual file type and fix if needed
-                detected_content_type, detected_mime_type = detect_content_type_from_file(file_path, content_type)
-                
-                # If detected type is different from stored type, or file has .temp extension
-                should_fix = (
-                    file_name.endswith('.temp') or
-                    detected_content_type != media_file.content_type or
-                    (detected_content_type == 'video' and media_file.content_type == 'image')
-                )
-                
-                if should_fix:
-                    logger.info(f"Post-processing file {file_name}: detected as {detected_content_type}/{detected_mime_type}")
-                    
-                    if file_name.endswith('.temp'):
-                        # Process .temp files
-                        if FileProcessor.process_temp_file(media_file):
-                            # Refresh the response data with updated URLs
-                            media_file.refresh_from_db()
-                            serializer = MediaFileResponseSerializer(media_file)
-                            response_data = serializer.data
-                            logger.info(f"Successfully processed .temp file: {response_data.get('firebase_url', response_data.get('url'))}")
-                            
-                            # Generate thumbnail for videos
-                            if media_file.content_type == 'video':
-                                FileProcessor.process_video_with_thumbnail(media_file)
-                    else:
-                        # Fix extension for files with wrong extensions
-                        if FileProcessor.fix_file_extension_and_path(media_file, detected_mime_type):
-                            # Refresh the response data with updated URLs
-                            media_file.refresh_from_db()
-                            serializer = MediaFileResponseSerializer(media_file)
-                            response_data = serializer.data
-                            logger.info(f"Successfully fixed file extension: {response_data.get('firebase_url', response_data.get('url'))}")
-                            
-                            # Generate thumbnail for videos
-                            if media_file.content_type == 'video':
-                                FileProcessor.process_video_with_thumbnail(media_file)
-                else:
-                    # Generate thumbnail for regular video uploads that don't need fixing
-                    if detected_content_type == 'video' or content_type == 'video':
-                        FileProcessor.process_video_with_thumbnail(media_file)
-                            
+            await sync_to_async(_post_process_upload)(media_file, content_type)
         except Exception as e:
             logger.warning(f"File post-processing failed (continuing anyway): {e}")
         
+        # Return the media file data with Firebase URL if available
+        response_data = await sync_to_async(lambda: MediaFileResponseSerializer(media_file).data)()
+        
+        # IMPORTANT: Always use Firebase URL in response if available
+        # This prevents "localhost" URLs from being sent to clients
+        if media_file.firebase_url:
+            response_data['url'] = media_file.firebase_url
+            response_data['firebase_url'] = media_file.firebase_url
+        
         return Response(response_data, status=status.HTTP_201_CREATED)
         
     except Exception as e:
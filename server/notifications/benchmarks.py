@@ -0,0 +1,65 @@
+"""
+Benchmarks for notification delivery, run with ``python manage.py benchmark``
+(see config/benchmarks.py).
+"""
+
+import io
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Account
+from config.benchmarks import benchmark
+from .management.commands.process_notification_queue import Command as ProcessQueueCommand
+from .models import FCMToken, NotificationQueue
+
+
+def _fake_multicast(message, *args, **kwargs):
+    """Stand-in for messaging.send_multicast: every token succeeds, nothing leaves the process"""
+    return SimpleNamespace(
+        success_count=len(message.tokens),
+        failure_count=0,
+        responses=[SimpleNamespace(success=True, exception=None) for _ in message.tokens],
+    )
+
+
+@benchmark('notifications.queue_batch')
+def queue_batch(context):
+    """
+    process_notification_queue building and sending a batch of N pending
+    notifications (token lookups, multicast messages, history rows), with
+    Firebase stubbed. The queued rows and tokens are created for the run and
+    everything, including each round's writes, is rolled back.
+    """
+    command = ProcessQueueCommand(stdout=io.StringIO(), stderr=io.StringIO())
+    with transaction.atomic(), mock.patch(
+        'notifications.management.commands.process_notification_queue.messaging.send_multicast',
+        side_effect=_fake_multicast,
+    ):
+        users = list(Account.objects.filter(is_active=True).order_by('id')[:context.size])
+        if not users:
+            raise ValueError('No users to benchmark; run generate_dataset first')
+        FCMToken.objects.bulk_create([
+            FCMToken(user=user, token=f'benchmark-token-{user.id}', device_platform='android') for user in users
+        ])
+        NotificationQueue.objects.bulk_create([
+            NotificationQueue(
+                user=users[index % len(users)],
+                notification_type='new_event',
+                title='Benchmark event',
+                body='Something is happening nearby',
+                data={'post_id': str(index)},
+                scheduled_for=timezone.now() - timezone.timedelta(minutes=1),
+            )
+            for index in range(context.size)
+        ])
+
+        def process():
+            with transaction.atomic():
+                command.process_batch(context.size, max_retries=3)
+                transaction.set_rollback(True)
+
+        yield process
+        transaction.set_rollback(True)
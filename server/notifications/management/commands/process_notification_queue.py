@@ -101,7 +101,7 @@ class Command(BaseCommand):
                         notification.processed_at = timezone.now()
                         processed_count += 1
                         self.stdout.write(
-                            f"✅ Sent notification {notification.id} to {notification.user.username}"
+                            f"✅ Sent notification {notification.id} to {notification.user.email}"
                         )
                     else:
                         self.handle_failed_notification(notification, max_retries)
@@ -130,7 +130,7 @@ class Command(BaseCommand):
             ).values_list('token', flat=True)
 
             if not fcm_tokens:
-                logger.warning(f"No active FCM tokens for user {notification.user.username}")
+                logger.warning(f"No active FCM tokens for user {notification.user.email}")
                 return False
 
             # Create Firebase message
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:50
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the tables writable while the indexes build
+    atomic = False
+
+    dependencies = [
+        ('notifications', '0004_alter_fcmtoken_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='fcmtoken',
+            index=models.Index(fields=['user', 'is_active'], name='fcm_token_user_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notificationqueue',
+            index=models.Index(fields=['status', 'scheduled_for'], name='notif_queue_status_sched_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notificationqueue',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['priority', 'scheduled_for'], name='notif_queue_pending_idx'),
+        ),
+    ]
@@ -40,6 +40,10 @@ class FCMToken(models.Model):
         db_table = 'fcm_tokens'
         # Only one active token per user per device platform
         unique_together = ['user', 'token']
+        indexes = [
+            # Every send looks up the recipient's active tokens
+            models.Index(fields=['user', 'is_active'], name='fcm_token_user_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.device_platform}"
@@ -188,6 +192,15 @@ class NotificationQueue(models.Model):
     class Meta:
         db_table = 'notification_queue'
         ordering = ['priority', 'scheduled_for']
+        indexes = [
+            models.Index(fields=['status', 'scheduled_for'], name='notif_queue_status_sched_idx'),
+            # The worker's batch query, in its own order; only pending rows, so it stays small
+            models.Index(
+                fields=['priority', 'scheduled_for'],
+                condition=models.Q(status='pending'),
+                name='notif_queue_pending_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.notification_type} for {self.user.username} - {self.status}"
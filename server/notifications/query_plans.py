@@ -0,0 +1,45 @@
+"""
+Canonical queries of the notification endpoints and the queue worker,
+checked with ``python manage.py explain_queries`` (see config/query_plans.py).
+"""
+
+from django.utils import timezone
+
+from config.query_plans import canonical_query
+from .models import FCMToken, NotificationHistory, NotificationQueue
+
+
+@canonical_query('notifications.queue_pending')
+def queue_pending(context):
+    """process_notification_queue: the next batch of due notifications"""
+    return NotificationQueue.objects.filter(
+        status='pending',
+        scheduled_for__lte=timezone.now()
+    ).order_by('priority', 'scheduled_for')[:100]
+
+
+@canonical_query('notifications.queue_cleanup')
+def queue_cleanup(context):
+    """process_notification_queue --cleanup: processed notifications past retention"""
+    return NotificationQueue.objects.filter(
+        status__in=['sent', 'failed'],
+        processed_at__lt=timezone.now() - timezone.timedelta(days=30)
+    )
+
+
+@canonical_query('notifications.active_tokens')
+def active_tokens(context):
+    """Every send: a user's active FCM tokens"""
+    return FCMToken.objects.filter(user=context.user, is_active=True).values_list('token', flat=True)
+
+
+@canonical_query('notifications.unread_count')
+def unread_count(context):
+    """GET /api/notifications/history/unread_count/ (polled by the app)"""
+    return NotificationHistory.objects.filter(user=context.user, read=False).values('id')
+
+
+@canonical_query('notifications.history')
+def history(context):
+    """GET /api/notifications/history/: first page"""
+    return NotificationHistory.objects.filter(user=context.user).select_related('user')[:20]
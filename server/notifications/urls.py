@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     NotificationSettingsViewSet, FCMTokenViewSet, NotificationHistoryViewSet,
-    FriendRequestViewSet, EventConfirmationViewSet, NotificationQueueViewSet, NotificationAPIView
+    FriendRequestViewSet, EventConfirmationViewSet, NotificationQueueViewSet, NotificationAPIView,
+    send_direct, send_friend_request, respond_to_friend_request
 )
 
 # Create router for ViewSets
@@ -23,15 +24,14 @@ test_notification_view = NotificationAPIView.as_view({
     'post': 'test_notification',
 })
 
-send_direct_view = NotificationAPIView.as_view({
-    'post': 'send_direct',
-})
-
 app_name = 'notifications'
 
 urlpatterns = [
+    # Async views (see config/async_views.py), under the router's friend-requests/ prefix and URL names
+    path('friend-requests/send_request/', send_friend_request, name='friend-requests-send-request'),
+    path('friend-requests/<uuid:pk>/respond/', respond_to_friend_request, name='friend-requests-respond'),
     path('', include(router.urls)),
     path('actions/send-still-there-confirmation/', api_view, name='send-still-there-confirmation'),
     path('actions/test-notification/', test_notification_view, name='test-notification'),
-    path('actions/send-direct/', send_direct_view, name='send-direct'),
+    path('actions/send-direct/', send_direct, name='send-direct'),
 ]
@@ -10,6 +10,12 @@ from firebase_admin import messaging
 import json
 import logging
 
+from asgiref.sync import sync_to_async
+
+from accounts.authentication import ClaimsOnlyJWTAuthentication
+from accounts.models import UserProfile
+from config.async_views import async_api_view, run_io
+
 # Get the custom Account model
 Account = get_user_model()
 
@@ -62,7 +68,7 @@ class FCMTokenViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return FCMToken.objects.filter(user=self.request.user)
+        return FCMToken.objects.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -173,9 +179,10 @@ class NotificationHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return NotificationHistory.objects.filter(user=self.request.user)
+        # user_id: unread_count authenticates with the token claims only (see accounts/authentication.py)
+        return NotificationHistory.objects.filter(user_id=self.request.user.id).select_related('user')
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], authentication_classes=[ClaimsOnlyJWTAuthentication])
     def unread_count(self, request):
         """Get count of unread notifications"""
         count = self.get_queryset().filter(read=False).count()
@@ -229,191 +236,7 @@ class FriendRequestViewSet(viewsets.ModelViewSet):
         return FriendRequest.objects.filter(
             models.Q(from_user=self.request.user) | 
             models.Q(to_user=self.request.user)
-        )
-
-    @action(detail=False, methods=['post'])
-    def send_request(self, request):
-        """Send a friend request with notification"""
-        to_user_id = request.data.get('to_user_id')
-        message = request.data.get('message', '')
-
-        try:
-            to_user = Account.objects.get(id=to_user_id)
-        except Account.DoesNotExist:
-            return Response(
-                {'error': 'User not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        if to_user == request.user:
-            return Response(
-                {'error': 'Cannot send friend request to yourself'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Check if request already exists
-        existing_request = FriendRequest.objects.filter(
-            from_user=request.user,
-            to_user=to_user,
-            status__in=['pending', 'accepted']
-        ).first()
-
-        if existing_request:
-            return Response(
-                {'error': 'Friend request already exists'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Create friend request
-        friend_request = FriendRequest.objects.create(
-            from_user=request.user,
-            to_user=to_user,
-            message=message
-        )
-
-        # Send notification
-        try:
-            notification_sent = self._send_friend_request_notification(
-                friend_request
-            )
-            friend_request.notification_sent = notification_sent
-            friend_request.save()
-        except Exception as e:
-            logger.error(f"Failed to send friend request notification: {e}")
-
-        serializer = self.get_serializer(friend_request)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-    @action(detail=True, methods=['post'])
-    def respond(self, request, pk=None):
-        """Respond to a friend request (accept/reject)"""
-        friend_request = self.get_object()
-        response = request.data.get('response')  # 'accepted' or 'rejected'
-
-        if friend_request.to_user != request.user:
-            return Response(
-                {'error': 'You can only respond to requests sent to you'}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        if friend_request.status != 'pending':
-            return Response(
-                {'error': 'This request has already been responded to'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if response not in ['accepted', 'rejected']:
-            return Response(
-                {'error': 'Response must be "accepted" or "rejected"'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Update request status
-        friend_request.status = response
-        friend_request.responded_at = timezone.now()
-        friend_request.save()
-
-        # Send notification to requester if accepted
-        if response == 'accepted':
-            try:
-                self._send_friend_request_accepted_notification(friend_request)
-            except Exception as e:
-                logger.error(f"Failed to send acceptance notification: {e}")
-
-        serializer = self.get_serializer(friend_request)
-        return Response(serializer.data)
-
-    def _send_friend_request_notification(self, friend_request):
-        """Send friend request notification"""
-        # Get FCM tokens for the target user
-        tokens = FCMToken.objects.filter(
-            user=friend_request.to_user,
-            is_active=True
-        ).values_list('token', flat=True)
-
-        if not tokens:
-            return False
-
-        # Create notification data
-        notification_data = {
-            'type': 'friend_request',
-            'fromUserId': str(friend_request.from_user.id),
-            'fromUserName': friend_request.from_user.username,
-            'fromUserAvatar': '',  # Add avatar URL if available
-            'requestId': str(friend_request.id),
-            'message': friend_request.message,
-        }
-
-        # Create Firebase message
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(
-                title='Friend Request',
-                body=f'{friend_request.from_user.username} wants to be your friend'
-            ),
-            data=notification_data,
-            tokens=list(tokens)
-        )
-
-        # Send notification
-        response = messaging.send_multicast(message)
-        
-        # Log notification
-        NotificationHistory.objects.create(
-            user=friend_request.to_user,
-            notification_type='friend_request',
-            title='Friend Request',
-            body=f'{friend_request.from_user.username} wants to be your friend',
-            data=notification_data,
-            sent=response.success_count > 0,
-            sent_at=timezone.now() if response.success_count > 0 else None
-        )
-
-        return response.success_count > 0
-
-    def _send_friend_request_accepted_notification(self, friend_request):
-        """Send friend request accepted notification"""
-        # Get FCM tokens for the requester
-        tokens = FCMToken.objects.filter(
-            user=friend_request.from_user,
-            is_active=True
-        ).values_list('token', flat=True)
-
-        if not tokens:
-            return False
-
-        # Create notification data
-        notification_data = {
-            'type': 'friend_request_accepted',
-            'fromUserId': str(friend_request.to_user.id),
-            'fromUserName': friend_request.to_user.username,
-            'requestId': str(friend_request.id),
-        }
-
-        # Create Firebase message
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(
-                title='Friend Request Accepted',
-                body=f'{friend_request.to_user.username} accepted your friend request!'
-            ),
-            data=notification_data,
-            tokens=list(tokens)
-        )
-
-        # Send notification
-        response = messaging.send_multicast(message)
-        
-        # Log notification
-        NotificationHistory.objects.create(
-            user=friend_request.from_user,
-            notification_type='friend_request_accepted',
-            title='Friend Request Accepted',
-            body=f'{friend_request.to_user.username} accepted your friend request!',
-            data=notification_data,
-            sent=response.success_count > 0,
-            sent_at=timezone.now() if response.success_count > 0 else None
-        )
-
-        return response.success_count > 0
+        ).select_related('from_user', 'to_user')
 
 
 class EventConfirmationViewSet(viewsets.ModelViewSet):
@@ -422,7 +245,7 @@ class EventConfirmationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return EventConfirmation.objects.filter(user=self.request.user)
+        return EventConfirmation.objects.filter(user=self.request.user).select_related('user')
 
     @action(detail=False, methods=['post'])
     def respond_to_confirmation(self, request):
@@ -481,7 +304,7 @@ class NotificationQueueViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         # Only allow users to see their own queued notifications
-        return NotificationQueue.objects.filter(user=self.request.user)
+        return NotificationQueue.objects.filter(user=self.request.user).select_related('user')
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -663,139 +486,345 @@ class NotificationAPIView(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
-    def send_direct(self, request):
-        """
-        Send a direct FCM notification without storing in notification queue
-        Used for message notifications that should not be persisted
-        """
+
+# Async views (see config/async_views.py): each waits on FCM, so under ASGI
+# the send runs in the I/O pool and the worker serves other requests meanwhile.
+
+@async_api_view(['POST'])
+async def send_friend_request(request):
+    """Send a friend request with notification"""
+    to_user_id = request.data.get('to_user_id')
+    message = request.data.get('message', '')
+
+    try:
+        to_user = await Account.objects.aget(id=to_user_id)
+    except Account.DoesNotExist:
+        return Response(
+            {'error': 'User not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    if to_user == request.user:
+        return Response(
+            {'error': 'Cannot send friend request to yourself'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Check if request already exists
+    existing_request = await FriendRequest.objects.filter(
+        from_user=request.user,
+        to_user=to_user,
+        status__in=['pending', 'accepted']
+    ).afirst()
+
+    if existing_request:
+        return Response(
+            {'error': 'Friend request already exists'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Create friend request
+    friend_request = await FriendRequest.objects.acreate(
+        from_user=request.user,
+        to_user=to_user,
+        message=message
+    )
+
+    # Send notification
+    try:
+        notification_sent = await _send_friend_request_notification(friend_request)
+        friend_request.notification_sent = notification_sent
+        await friend_request.asave(update_fields=['notification_sent'])
+    except Exception as e:
+        logger.error(f"Failed to send friend request notification: {e}")
+
+    data = await sync_to_async(lambda: FriendRequestSerializer(friend_request, context={'request': request}).data)()
+    return Response(data, status=status.HTTP_201_CREATED)
+
+
+@async_api_view(['POST'])
+async def respond_to_friend_request(request, pk):
+    """Respond to a friend request (accept/reject)"""
+    try:
+        friend_request = await FriendRequest.objects.filter(
+            models.Q(from_user=request.user) | 
+            models.Q(to_user=request.user)
+        ).select_related('from_user', 'to_user').aget(pk=pk)
+    except FriendRequest.DoesNotExist:
+        return Response(
+            {'detail': 'No FriendRequest matches the given query.'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    response = request.data.get('response')  # 'accepted' or 'rejected'
+
+    if friend_request.to_user != request.user:
+        return Response(
+            {'error': 'You can only respond to requests sent to you'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    if friend_request.status != 'pending':
+        return Response(
+            {'error': 'This request has already been responded to'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if response not in ['accepted', 'rejected']:
+        return Response(
+            {'error': 'Response must be "accepted" or "rejected"'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Update request status
+    friend_request.status = response
+    friend_request.responded_at = timezone.now()
+    await friend_request.asave(update_fields=['status', 'responded_at'])
+
+    # Send notification to requester if accepted
+    if response == 'accepted':
         try:
-            recipient_user_id = request.data.get('recipient_user_id')
-            notification_type = request.data.get('notification_type', 'message')
-            title = request.data.get('title', 'Notification')
-            body = request.data.get('body', '')
-            data = request.data.get('data', {})
-            priority = request.data.get('priority', 'normal')
-            android_config = request.data.get('android', {})
-            apns_config = request.data.get('apns', {})
-
-            if not recipient_user_id:
-                return Response(
-                    {'error': 'recipient_user_id is required'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            await _send_friend_request_accepted_notification(friend_request)
+        except Exception as e:
+            logger.error(f"Failed to send acceptance notification: {e}")
 
-            # Get recipient user
-            try:
-                recipient_user = Account.objects.get(id=recipient_user_id)
-            except Account.DoesNotExist:
-                return Response(
-                    {'error': 'Recipient user not found'}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
+    data = await sync_to_async(lambda: FriendRequestSerializer(friend_request, context={'request': request}).data)()
+    return Response(data)
 
-            # Get active FCM tokens for recipient
-            active_tokens = FCMToken.objects.filter(
-                user=recipient_user,
-                is_active=True
-            ).values_list('token', flat=True)
 
-            if not active_tokens:
-                return Response(
-                    {'error': 'No active FCM tokens found for recipient'}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
+async def _active_tokens(user):
+    return [
+        token async for token in FCMToken.objects.filter(user=user, is_active=True).values_list('token', flat=True)
+    ]
 
-            # Convert data to strings (FCM requirement)
-            fcm_data = {str(k): str(v) for k, v in data.items()}
-            
-            # Add notification metadata
-            fcm_data.update({
-                'notification_type': notification_type,
-                'sender_id': str(request.user.id),
-                'sent_at': timezone.now().isoformat(),
-            })
 
-            # Set priority
-            android_priority = 'high' if priority == 'high' else 'normal'
-            
-            # Build Android config
-            android_notification_config = android_config.get('notification', {})
-            android_notification = messaging.AndroidNotification(
-                click_action='FLUTTER_NOTIFICATION_CLICK',
-                priority=android_priority,
-                channel_id=android_notification_config.get('channel_id', 'default'),
+async def _username(user):
+    """The user's @username, which lives on the profile (Account has none)"""
+    username = await UserProfile.objects.filter(user=user).values_list('username', flat=True).afirst()
+    return username or user.email.split('@')[0]
+
+
+async def _send_friend_request_notification(friend_request):
+    """Send friend request notification"""
+    # Get FCM tokens for the target user
+    tokens = await _active_tokens(friend_request.to_user)
+
+    if not tokens:
+        return False
+
+    from_username = await _username(friend_request.from_user)
+
+    # Create notification data
+    notification_data = {
+        'type': 'friend_request',
+        'fromUserId': str(friend_request.from_user.id),
+        'fromUserName': from_username,
+        'fromUserAvatar': '',  # Add avatar URL if available
+        'requestId': str(friend_request.id),
+        'message': friend_request.message,
+    }
+
+    # Create Firebase message
+    message = messaging.MulticastMessage(
+        notification=messaging.Notification(
+            title='Friend Request',
+            body=f'{from_username} wants to be your friend'
+        ),
+        data=notification_data,
+        tokens=tokens
+    )
+
+    # Send notification
+    response = await run_io(messaging.send_multicast, message)
+    
+    # Log notification
+    await NotificationHistory.objects.acreate(
+        user=friend_request.to_user,
+        notification_type='friend_request',
+        title='Friend Request',
+        body=f'{from_username} wants to be your friend',
+        data=notification_data,
+        sent=response.success_count > 0,
+        sent_at=timezone.now() if response.success_count > 0 else None
+    )
+
+    return response.success_count > 0
+
+
+async def _send_friend_request_accepted_notification(friend_request):
+    """Send friend request accepted notification"""
+    # Get FCM tokens for the requester
+    tokens = await _active_tokens(friend_request.from_user)
+
+    if not tokens:
+        return False
+
+    to_username = await _username(friend_request.to_user)
+
+    # Create notification data
+    notification_data = {
+        'type': 'friend_request_accepted',
+        'fromUserId': str(friend_request.to_user.id),
+        'fromUserName': to_username,
+        'requestId': str(friend_request.id),
+    }
+
+    # Create Firebase message
+    message = messaging.MulticastMessage(
+        notification=messaging.Notification(
+            title='Friend Request Accepted',
+            body=f'{to_username} accepted your friend request!'
+        ),
+        data=notification_data,
+        tokens=tokens
+    )
+
+    # Send notification
+    response = await run_io(messaging.send_multicast, message)
+    
+    # Log notification
+    await NotificationHistory.objects.acreate(
+        user=friend_request.from_user,
+        notification_type='friend_request_accepted',
+        title='Friend Request Accepted',
+        body=f'{to_username} accepted your friend request!',
+        data=notification_data,
+        sent=response.success_count > 0,
+        sent_at=timezone.now() if response.success_count > 0 else None
+    )
+
+    return response.success_count > 0
+
+
+@async_api_view(['POST'])
+async def send_direct(request):
+    """
+    Send a direct FCM notification without storing in notification queue
+    Used for message notifications that should not be persisted
+    """
+    try:
+        recipient_user_id = request.data.get('recipient_user_id')
+        notification_type = request.data.get('notification_type', 'message')
+        title = request.data.get('title', 'Notification')
+        body = request.data.get('body', '')
+        data = request.data.get('data', {})
+        priority = request.data.get('priority', 'normal')
+        android_config = request.data.get('android', {})
+        apns_config = request.data.get('apns', {})
+
+        if not recipient_user_id:
+            return Response(
+                {'error': 'recipient_user_id is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            # Add grouping if specified
-            if 'group_key' in android_notification_config:
-                android_notification.tag = android_notification_config.get('group_key')
-            
-            android_cfg = messaging.AndroidConfig(
-                priority=android_priority,
-                notification=android_notification
+
+        # Get recipient user
+        try:
+            recipient_user = await Account.objects.aget(id=recipient_user_id)
+        except Account.DoesNotExist:
+            return Response(
+                {'error': 'Recipient user not found'}, 
+                status=status.HTTP_404_NOT_FOUND
             )
-            
-            # Build APNS config  
-            apns_payload = apns_config.get('payload', {})
-            apns_aps = apns_payload.get('aps', {})
-            apns_cfg = messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        content_available=True,
-                        category=apns_aps.get('category', 'MESSAGE'),
-                        thread_id=apns_aps.get('thread-id', None),
-                    )
+
+        # Get active FCM tokens for recipient
+        active_tokens = await _active_tokens(recipient_user)
+
+        if not active_tokens:
+            return Response(
+                {'error': 'No active FCM tokens found for recipient'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Convert data to strings (FCM requirement)
+        fcm_data = {str(k): str(v) for k, v in data.items()}
+        
+        # Add notification metadata
+        fcm_data.update({
+            'notification_type': notification_type,
+            'sender_id': str(request.user.id),
+            'sent_at': timezone.now().isoformat(),
+        })
+
+        # Set priority
+        android_priority = 'high' if priority == 'high' else 'normal'
+        
+        # Build Android config
+        android_notification_config = android_config.get('notification', {})
+        android_notification = messaging.AndroidNotification(
+            click_action='FLUTTER_NOTIFICATION_CLICK',
+            priority=android_priority,
+            channel_id=android_notification_config.get('channel_id', 'default'),
+        )
+        
+        # Add grouping if specified
+        if 'group_key' in android_notification_config:
+            android_notification.tag = android_notification_config.get('group_key')
+        
+        android_cfg = messaging.AndroidConfig(
+            priority=android_priority,
+            notification=android_notification
+        )
+        
+        # Build APNS config  
+        apns_payload = apns_config.get('payload', {})
+        apns_aps = apns_payload.get('aps', {})
+        apns_cfg = messaging.APNSConfig(
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(
+                    content_available=True,
+                    category=apns_aps.get('category', 'MESSAGE'),
+                    thread_id=apns_aps.get('thread-id', None),
                 )
             )
+        )
+        
+        # Create Firebase message
+        if len(active_tokens) == 1:
+            # Single token
+            message = messaging.Message(
+                notification=messaging.Notification(
+                    title=title,
+                    body=body
+                ),
+                data=fcm_data,
+                token=active_tokens[0],
+                android=android_cfg,
+                apns=apns_cfg
+            )
             
-            # Create Firebase message
-            if len(active_tokens) == 1:
-                # Single token
-                message = messaging.Message(
-                    notification=messaging.Notification(
-                        title=title,
-                        body=body
-                    ),
-                    data=fcm_data,
-                    token=list(active_tokens)[0],
-                    android=android_cfg,
-                    apns=apns_cfg
-                )
-                
-                response = messaging.send(message)
-                success_count = 1
-                failure_count = 0
-                
-            else:
-                # Multiple tokens
-                message = messaging.MulticastMessage(
-                    notification=messaging.Notification(
-                        title=title,
-                        body=body
-                    ),
-                    data=fcm_data,
-                    tokens=list(active_tokens),
-                    android=android_cfg,
-                    apns=apns_cfg
-                )
-                
-                response = messaging.send_multicast(message)
-                success_count = response.success_count
-                failure_count = response.failure_count
+            response = await run_io(messaging.send, message)
+            success_count = 1
+            failure_count = 0
+            
+        else:
+            # Multiple tokens
+            message = messaging.MulticastMessage(
+                notification=messaging.Notification(
+                    title=title,
+                    body=body
+                ),
+                data=fcm_data,
+                tokens=active_tokens,
+                android=android_cfg,
+                apns=apns_cfg
+            )
+            
+            response = await run_io(messaging.send_multicast, message)
+            success_count = response.success_count
+            failure_count = response.failure_count
 
-            logger.info(f"Direct notification sent - Success: {success_count}, Failed: {failure_count}")
+        logger.info(f"Direct notification sent - Success: {success_count}, Failed: {failure_count}")
 
-            return Response({
-                'success': True,
-                'sent_count': success_count,
-                'failure_count': failure_count,
-                'message': f'Notification sent to {success_count} devices'
-            })
+        return Response({
+            'success': True,
+            'sent_count': success_count,
+            'failure_count': failure_count,
+            'message': f'Notification sent to {success_count} devices'
+        })
 
-        except Exception as e:
-            logger.error(f"Failed to send direct notification: {e}")
-            return Response(
-                {'error': f'Failed to send notification: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    except Exception as e:
+        logger.error(f"Failed to send direct notification: {e}")
+        return Response(
+            {'error': f'Failed to send notification: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
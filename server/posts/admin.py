@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Post, PostCoordinates, PostVote, CategoryInteraction
+from .models import (
+    Post, PostCoordinates, PostVote, CategoryInteraction, CategoryInteractionDaily, UserPreferenceVector, PostChange,
+)
 
 @admin.register(PostCoordinates)
 class PostCoordinatesAdmin(admin.ModelAdmin):
@@ -38,3 +40,21 @@ class CategoryInteractionAdmin(admin.ModelAdmin):
         """Optimize queryset with select_related"""
         queryset = super().get_queryset(request)
         return queryset.select_related('user')
+
+@admin.register(CategoryInteractionDaily)
+class CategoryInteractionDailyAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'category', 'interaction_type', 'day', 'count')
+    list_filter = ('category', 'interaction_type', 'day')
+    raw_id_fields = ('user',)
+
+@admin.register(UserPreferenceVector)
+class UserPreferenceVectorAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'updated_at')
+    raw_id_fields = ('user',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(PostChange)
+class PostChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'post_id', 'kind', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('post_id',)
@@ -0,0 +1,112 @@
+"""
+Benchmarks for the post hot paths, run with ``python manage.py benchmark``
+(see config/benchmarks.py). Inputs come from the current database; load a
+realistic one first with ``python manage.py generate_dataset``.
+"""
+
+from django.db.models import Count, Q
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from config.benchmarks import benchmark
+from .cache import get_post_cache_settings, post_cache
+from .models import Post
+from .serializers import PostSerializer, prime_user_post_state
+from .views import PostViewSet
+
+
+def _latest_posts(context):
+    """The ``context.size`` newest main posts with the joins the list endpoints use"""
+    posts = list(
+        Post.objects.select_related('author__profile', 'location', 'related_post')
+        .filter(related_post__isnull=True)
+        .annotate(_related_posts_count=Count('related_posts'))
+        .order_by('-created_at')[:context.size]
+    )
+    if not posts:
+        raise ValueError('No posts to benchmark; run generate_dataset first')
+    return posts
+
+
+def _request(context):
+    request = Request(APIRequestFactory().get('/api/posts/', HTTP_HOST='localhost'))
+    request.user = context.user
+    return request
+
+
+def _viewset(context):
+    view = PostViewSet()
+    view.request = _request(context)
+    view.format_kwarg = None
+    return view
+
+
+def _render_posts(context, posts):
+    post_ids = [post.id for post in posts]
+
+    def render():
+        request = _request(context)
+        prime_user_post_state(request, post_ids)
+        return PostSerializer(posts, many=True, context={'request': request}).data
+
+    return render
+
+
+@benchmark('posts.serializer')
+def serializer(context):
+    """PostSerializer(many=True).data on N posts for a signed-in user, post cache disabled"""
+    posts = _latest_posts(context)
+    with override_settings(POST_CACHE={**get_post_cache_settings(), 'ENABLED': False}):
+        yield _render_posts(context, posts)
+
+
+@benchmark('posts.serializer_cached')
+def serializer_cached(context):
+    """PostSerializer(many=True).data on N posts served from a warm post cache (per-user fields overlaid)"""
+    posts = _latest_posts(context)
+    post_cache.clear()
+    yield _render_posts(context, posts)
+
+
+@benchmark('posts.recommendation_scoring')
+def recommendation_scoring(context):
+    """_calculate_smart_recommendation_scores over N candidate posts"""
+    view = _viewset(context)
+    posts = list(
+        Post.objects.select_related('location', 'author__profile').prefetch_related('votes')
+        .order_by('-created_at')[:context.size]
+    )
+    for post in posts:
+        # Set by _get_nearby_posts on the real path
+        post.distance_km = view._calculate_distance(
+            context.latitude, context.longitude, post.location.latitude, post.location.longitude
+        )
+    preferences, _has_preferences, recent_filters = view._get_smart_user_preferences(context.user)
+    yield lambda: view._calculate_smart_recommendation_scores(
+        posts, preferences, context.user, context.latitude, context.longitude, recent_filters
+    )
+
+
+@benchmark('posts.find_similar_post')
+def find_similar_post(context):
+    """PostSerializer.find_similar_post for the newest post (the check run on every create)"""
+    post = Post.objects.select_related('location').order_by('-created_at').first()
+    if post is None:
+        raise ValueError('No posts to benchmark; run generate_dataset first')
+    serializer = PostSerializer()
+    yield lambda: serializer.find_similar_post(post)
+
+
+@benchmark('posts.distribute_by_categories')
+def distribute_by_categories(context):
+    """_distribute_posts_by_categories round-robin over N posts (the new-user recommendations path)"""
+    view = _viewset(context)
+    posts = _latest_posts(context)
+    popular = list(
+        Post.objects.values_list('category', flat=True)
+        .annotate(total=Count('id', filter=Q(related_post__isnull=True)))
+        .order_by('-total')[:5]
+    )
+    yield lambda: view._distribute_posts_by_categories(posts, popular, equal_distribution=True)
+
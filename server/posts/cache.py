@@ -0,0 +1,381 @@
+"""
+Two-tier response cache for post lists.
+
+Tier 1 stores the *shared* part of a rendered post (everything except the
+per-user ``user_vote``, ``is_saved`` and ``user_status_vote`` fields) keyed by
+(post id, post version). Tier 2 stores the id lists produced by a given filter
+set with a short TTL. The per-user fields are overlaid at response time from
+the page-scoped vote/saved lookups, so one cached body serves every user.
+
+Post versions are opaque tokens kept in the cache itself. Saving a post,
+voting on it or changing its status votes replaces the token (see
+``posts/signals.py``), which orphans every cached body for that post. The
+token is replaced when the change is made and again once its transaction
+commits: a reader that fetched the uncommitted (old) row in between can
+only have stored it under a token nobody reads any more.
+
+The storage backend is pluggable through ``POST_CACHE['BACKEND']``:
+``DjangoCacheBackend`` shares entries between workers through a Django
+cache (the default when settings.py has a ``CACHE_URL``), and
+``LocalMemoryBackend`` keeps them per process. Invalidations only reach the
+worker that made them when the backend isn't shared, so both TTLs are then
+capped at ``LOCAL_TTL`` seconds. So are entries rendered from a read
+replica (config/db_router.py), which may lag behind the invalidation that
+preceded them.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from config.caching import is_shared_cache
+from config.db_router import reading_from_replica
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POST_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'BACKEND': 'posts.cache.LocalMemoryBackend',
+    'OPTIONS': {},
+    'POST_TTL': 300,  # Seconds a rendered post body is kept
+    'LIST_TTL': 15,   # Seconds a filter set's id list is kept
+    'LOCAL_TTL': 5,   # Cap on both TTLs when the backend isn't shared between workers
+    'EXPIRY_CHECK_SECONDS': 10,  # Cached list hits sweep expired events at most this often
+    'KEY_PREFIX': 'posts',
+}
+
+
+def get_post_cache_settings():
+    """Return the post cache settings merged over the defaults"""
+    return {**DEFAULT_POST_CACHE_SETTINGS, **getattr(settings, 'POST_CACHE', {})}
+
+
+class BaseCacheBackend:
+    """
+    Storage interface used by ``PostCache``. Values must be picklable;
+    ``ttl`` is in seconds and ``None`` means "no expiry". ``shared`` tells
+    whether every worker process sees the same entries.
+    """
+
+    shared = False
+
+    def get_many(self, keys):
+        raise NotImplementedError
+
+    def set_many(self, mapping, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Set ``key`` only if it is missing and return the stored value"""
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalMemoryBackend(BaseCacheBackend):
+    """Thread-safe, per-process LRU cache with per-key expiry"""
+
+    def __init__(self, MAX_ENTRIES=20000):
+        self.max_entries = MAX_ENTRIES
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key, value, ttl, now):
+        self._data[key] = (now + ttl if ttl is not None else None, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._get(key, now)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def set_many(self, mapping, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in mapping.items():
+                self._set(key, value, ttl, now)
+
+    def add(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            existing = self._get(key, now)
+            if existing is not None:
+                return existing
+            self._set(key, value, ttl, now)
+            return value
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend(BaseCacheBackend):
+    """Shared backend delegating to a Django cache alias (e.g. Redis or Memcached)"""
+
+    def __init__(self, ALIAS='default'):
+        from django.core.cache import caches
+        self.cache = caches[ALIAS]
+        self.shared = is_shared_cache(ALIAS)
+
+    def get_many(self, keys):
+        return self.cache.get_many(list(keys))
+
+    def set_many(self, mapping, ttl=None):
+        self.cache.set_many(mapping, timeout=ttl)
+
+    def add(self, key, value, ttl=None):
+        if self.cache.add(key, value, timeout=ttl):
+            return value
+        return self.cache.get(key, value)
+
+    def delete_many(self, keys):
+        self.cache.delete_many(list(keys))
+
+    def clear(self):
+        self.cache.clear()
+
+
+class PostCache:
+    """Shared post bodies, filter-set id lists, versioning and hit-rate metrics"""
+
+    def __init__(self):
+        self._backend = None
+        self._backend_path = None
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def config(self):
+        return get_post_cache_settings()
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    def ttl(self, name):
+        """``POST_TTL`` or ``LIST_TTL``, capped at ``LOCAL_TTL`` for a per-process backend or replica reads"""
+        config = self.config
+        if self.backend.shared and not reading_from_replica():
+            return config[name]
+        return min(config[name], config['LOCAL_TTL'])
+
+    @property
+    def backend(self):
+        config = self.config
+        if self._backend is None or self._backend_path != config['BACKEND']:
+            backend_class = import_string(config['BACKEND'])
+            self._backend = backend_class(**config['OPTIONS'])
+            self._backend_path = config['BACKEND']
+        return self._backend
+
+    # Metrics
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {
+                'post_hits': 0, 'post_misses': 0,
+                'list_hits': 0, 'list_misses': 0,
+                'invalidations': 0,
+            }
+
+    def _count(self, name, amount=1):
+        if amount:
+            with self._stats_lock:
+                self._stats[name] += amount
+
+    def stats(self):
+        """Counters plus hit rates for both tiers"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        for tier in ('post', 'list'):
+            lookups = stats[f'{tier}_hits'] + stats[f'{tier}_misses']
+            stats[f'{tier}_hit_rate'] = round(stats[f'{tier}_hits'] / lookups, 4) if lookups else None
+        stats['backend'] = self.config['BACKEND']
+        return stats
+
+    # Keys
+
+    def _key(self, *parts):
+        return ':'.join([self.config['KEY_PREFIX'], *[str(part) for part in parts]])
+
+    def variant_for(self, request):
+        """
+        Rendered bodies contain absolute media URLs, so bodies are kept per
+        scheme and host the client used.
+        """
+        if request is None:
+            return 'default'
+        return f"{request.scheme}://{request.get_host()}"
+
+    def _new_token(self):
+        return uuid.uuid4().hex[:12]
+
+    def get_versions(self, post_ids):
+        """Current version token per post id, creating tokens for unseen posts"""
+        version_keys = {post_id: self._key('ver', post_id) for post_id in post_ids}
+        found = self.backend.get_many(version_keys.values())
+        versions = {}
+        for post_id, key in version_keys.items():
+            version = found.get(key)
+            if version is None:
+                version = self.backend.add(key, self._new_token())
+            versions[post_id] = version
+        return versions
+
+    def _body_key(self, post_id, version, variant):
+        return self._key('body', post_id, version, hashlib.md5(variant.encode()).hexdigest()[:8])
+
+    # Tier 1: shared post bodies
+
+    def get_bodies(self, post_ids, variant):
+        """
+        Return ({post_id: shared body}, {post_id: version}) for the cached posts.
+        Pass the versions back to ``set_bodies`` when storing the misses.
+        """
+        if not self.enabled or not post_ids:
+            return {}, {}
+
+        try:
+            versions = self.get_versions(post_ids)
+            body_keys = {post_id: self._body_key(post_id, versions[post_id], variant) for post_id in post_ids}
+            found = self.backend.get_many(body_keys.values())
+        except Exception as e:
+            logger.warning(f"Post cache read failed: {e}")
+            return {}, {}
+
+        bodies = {post_id: found[key] for post_id, key in body_keys.items() if key in found}
+        self._count('post_hits', len(bodies))
+        self._count('post_misses', len(post_ids) - len(bodies))
+        return bodies, versions
+
+    def set_bodies(self, bodies, versions, variant):
+        if not self.enabled or not bodies:
+            return
+        try:
+            self.backend.set_many(
+                {
+                    self._body_key(post_id, versions[post_id], variant): body
+                    for post_id, body in bodies.items()
+                    if post_id in versions
+                },
+                ttl=self.ttl('POST_TTL'),
+            )
+        except Exception as e:
+            logger.warning(f"Post cache write failed: {e}")
+
+    def invalidate_posts(self, post_ids):
+        """Replace the version token of each post so its cached bodies are never read again"""
+        post_ids = [post_id for post_id in set(post_ids) if post_id is not None]
+        if not post_ids:
+            return
+        try:
+            self.backend.set_many({self._key('ver', post_id): self._new_token() for post_id in post_ids})
+        except Exception as e:
+            logger.warning(f"Post cache invalidation failed: {e}")
+        self._count('invalidations', len(post_ids))
+
+    # Tier 2: id lists per filter set
+
+    def _list_generation(self):
+        key = self._key('listgen')
+        generation = self.backend.get_many([key]).get(key)
+        if generation is None:
+            generation = self.backend.add(key, self._new_token())
+        return generation
+
+    def list_key(self, request, scope=''):
+        """Key for the id list of this request's filter set (path, sorted query params and host)"""
+        params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+        raw = f"{scope}|{self.variant_for(request)}{request.path}|{params}"
+        return self._key('list', self._list_generation(), hashlib.md5(raw.encode()).hexdigest())
+
+    def get_list(self, key):
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get_many([key]).get(key)
+        except Exception as e:
+            logger.warning(f"Post list cache read failed: {e}")
+            return None
+        self._count('list_hits' if value is not None else 'list_misses')
+        return value
+
+    def set_list(self, key, value):
+        if not self.enabled:
+            return
+        try:
+            self.backend.set_many({key: value}, ttl=self.ttl('LIST_TTL'))
+        except Exception as e:
+            logger.warning(f"Post list cache write failed: {e}")
+
+    def invalidate_posts_on_commit(self, post_ids):
+        """``invalidate_posts`` now and again when the current transaction commits (see the module docstring)"""
+        post_ids = list(post_ids)
+        self.invalidate_posts(post_ids)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self.invalidate_posts(post_ids))
+
+    def invalidate_lists_on_commit(self):
+        """``invalidate_lists`` now and again when the current transaction commits"""
+        self.invalidate_lists()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(self.invalidate_lists)
+
+    def claim(self, name, seconds):
+        """True for the first caller within ``seconds`` (per backend): throttles periodic work done in requests"""
+        token = self._new_token()
+        try:
+            return self.backend.add(self._key('claim', name), token, ttl=seconds) == token
+        except Exception as e:
+            logger.warning(f"Post cache claim failed: {e}")
+            return True
+
+    def invalidate_lists(self):
+        """Start a new list generation so cached id lists are dropped (posts created or deleted)"""
+        try:
+            self.backend.set_many({self._key('listgen'): self._new_token()})
+        except Exception as e:
+            logger.warning(f"Post list cache invalidation failed: {e}")
+        self._count('invalidations')
+
+    def clear(self):
+        self.backend.clear()
+        self.reset_stats()
+
+
+# Process-wide cache used by the serializers, views and signals
+post_cache = PostCache()
@@ -0,0 +1,126 @@
+"""
+Delta sync over the ``PostChange`` log.
+
+Clients keep an opaque cursor and ask ``posts/changes/?cursor=...`` for the
+posts created, edited, voted on, ended or deleted since then, instead of
+re-polling whole feeds. The response size is bounded by the number of
+changes (``limit`` log rows), not by the size of the feed.
+
+Log ids come from a sequence, so a transaction that commits late can make
+an older id appear after newer ones were already read. Changes younger than
+``SETTLE_SECONDS`` are returned but the cursor does not move past them, so
+they are delivered again on the next poll instead of being skipped.
+"""
+
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PostChange, PostChangeKind
+
+DEFAULT_POST_CHANGES_SETTINGS = {
+    'RETENTION_DAYS': 7,    # Change rows older than this are pruned; older cursors must resync
+    'SETTLE_SECONDS': 2,    # Window in which late-committing changes may still appear
+    'DEFAULT_LIMIT': 200,
+    'MAX_LIMIT': 500,
+}
+
+CURSOR_VERSION = 'c1'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    """The cursor points at changes that were already pruned; the client must do a full resync"""
+
+
+def get_post_changes_settings():
+    """Return the post change log settings merged over the defaults"""
+    return {**DEFAULT_POST_CHANGES_SETTINGS, **getattr(settings, 'POST_CHANGES', {})}
+
+
+def encode_cursor(change_id, issued_at=None):
+    issued_at = issued_at or timezone.now()
+    raw = f"{CURSOR_VERSION}:{change_id}:{int(issued_at.timestamp())}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (change id, issue timestamp) for a cursor produced by ``encode_cursor``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        version, change_id, issued_at = raw.split(':')
+        if version != CURSOR_VERSION:
+            raise ValueError(version)
+        return int(change_id), int(issued_at)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def current_cursor():
+    """Cursor pointing at the newest change, for clients starting from a fresh feed"""
+    latest = PostChange.objects.order_by('-id').values_list('id', flat=True).first()
+    return encode_cursor(latest or 0)
+
+
+def fetch_changes(cursor, limit=None, posts=None):
+    """
+    Read the change log after ``cursor``.
+
+    ``posts`` optionally restricts the changes to a Post queryset (bbox,
+    followed users); deletions are always reported because the deleted rows
+    can no longer be matched against a filter.
+
+    Returns a dict with the changed post ids (oldest change first), the
+    deleted post ids, the next cursor and whether more changes are waiting.
+    """
+    config = get_post_changes_settings()
+    limit = max(1, min(limit or config['DEFAULT_LIMIT'], config['MAX_LIMIT']))
+    after_id, issued_at = decode_cursor(cursor)
+
+    now = timezone.now()
+    if issued_at < (now - timedelta(days=config['RETENTION_DAYS'])).timestamp():
+        raise CursorExpired()
+
+    changes = PostChange.objects.filter(id__gt=after_id)
+    if posts is not None:
+        changes = changes.filter(Q(kind=PostChangeKind.DELETED) | Q(post_id__in=posts.values('id')))
+    rows = list(changes.order_by('id').values_list('id', 'post_id', 'kind', 'created_at')[:limit])
+
+    # Advance the cursor only over changes that can no longer be overtaken by a late commit
+    settled_before = now - timedelta(seconds=config['SETTLE_SECONDS'])
+    next_id = after_id
+    for change_id, _post_id, _kind, created_at in rows:
+        if created_at > settled_before:
+            break
+        next_id = change_id
+
+    latest_kind = {}
+    for _change_id, post_id, kind, _created_at in rows:
+        latest_kind.pop(post_id, None)  # Order posts by their most recent change
+        latest_kind[post_id] = kind
+
+    return {
+        'post_ids': [post_id for post_id, kind in latest_kind.items() if kind != PostChangeKind.DELETED],
+        'deleted': [post_id for post_id, kind in latest_kind.items() if kind == PostChangeKind.DELETED],
+        'cursor': encode_cursor(next_id, issued_at=now),
+        # Unsettled changes hold the cursor back; report them once instead of asking clients to spin
+        'has_more': len(rows) == limit and next_id == rows[-1][0],
+    }
+
+
+def prune_changes(days=None, batch_size=10000):
+    """Delete change rows older than the retention window in id batches; returns rows deleted"""
+    days = days or get_post_changes_settings()['RETENTION_DAYS']
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    while True:
+        batch = list(PostChange.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += PostChange.objects.filter(id__in=batch).delete()[0]
@@ -0,0 +1,112 @@
+"""
+ETag / Last-Modified validators for post feeds and post detail.
+
+Validators are built from a cheap aggregate over the posts a response
+renders (``Post.version`` and ``Post.changed_at``, which are bumped on
+edits, votes, status votes and related-post changes) plus everything else
+that changes the payload: the path and filter parameters, the requesting
+user's saved posts, the negotiated media type and the host used for
+absolute media URLs. They are computed before serialization so a matching
+``If-None-Match`` returns 304 without rendering anything.
+
+ETags are weak: two responses with the same validators are semantically
+equivalent, not necessarily byte-identical. Last-Modified (the newest
+``changed_at``) is sent for clients that display it, but 304s are decided
+by the ETag alone: deleting a post or saving one does not move it forward.
+"""
+
+import hashlib
+from collections import namedtuple
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Post
+
+PostValidators = namedtuple('PostValidators', ['etag', 'last_modified'])
+
+
+def _user_fingerprint(request):
+    """Identify the per-user parts of the payload (user_vote changes already bump Post.version)"""
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated):
+        return 'anonymous'
+
+    from accounts.models import UserProfile
+    saved = UserProfile.saved_posts.through.objects.filter(userprofile__user_id=user.id).aggregate(
+        count=Count('id'), last_id=Max('id')
+    )
+    return f"{user.id}:{saved['count']}:{saved['last_id']}"
+
+
+def _build_validators(request, aggregate, extra=()):
+    accepted = getattr(request, 'accepted_media_type', '') or request.META.get('HTTP_ACCEPT', '')
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        sorted((key, value) for key, values in request.GET.lists() for value in values),
+        accepted,
+        _user_fingerprint(request),
+        aggregate['count'],
+        aggregate['last_id'],
+        aggregate['version_sum'] or 0,
+        aggregate['last_changed'] and aggregate['last_changed'].isoformat(),
+        *extra,
+    ]
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    last_changed = aggregate['last_changed']
+    return PostValidators(
+        etag=f'W/"{digest}"',
+        last_modified=last_changed.timestamp() if last_changed else None,
+    )
+
+
+def validators_for_queryset(request, queryset, extra=()):
+    """One aggregate query over ``queryset`` (count, max id, version sum, last change)"""
+    aggregate = queryset.order_by().aggregate(
+        count=Count('id'),
+        last_id=Max('id'),
+        version_sum=Sum('version'),
+        last_changed=Max('changed_at'),
+    )
+    return _build_validators(request, aggregate, extra)
+
+
+def validators_for_ids(request, post_ids, extra=()):
+    """Validators for an explicit (e.g. cached) list of post ids; order is part of the ETag"""
+    return validators_for_queryset(
+        request, Post.objects.filter(id__in=post_ids), extra=(*extra, tuple(post_ids))
+    )
+
+
+def validators_for_posts(request, posts, extra=()):
+    """Validators for already loaded posts; no post query is needed"""
+    posts = list(posts)
+    changed = [post.changed_at for post in posts if post.changed_at]
+    aggregate = {
+        'count': len(posts),
+        'last_id': max((post.id for post in posts), default=None),
+        'version_sum': sum(post.version for post in posts),
+        'last_changed': max(changed, default=None),
+    }
+    return _build_validators(request, aggregate, extra=(*extra, tuple(post.id for post in posts)))
+
+
+def not_modified_response(request, validators):
+    """A 304 response if the client's cached copy is still current, otherwise None"""
+    response = get_conditional_response(request, etag=validators.etag)
+    if response is not None:
+        set_validators(response, validators)
+    return response
+
+
+def set_validators(response, validators):
+    """Attach ETag/Last-Modified and make clients revalidate instead of reusing stale feeds"""
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(validators.last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept', 'Authorization'])
+    return response
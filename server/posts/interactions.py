@@ -0,0 +1,202 @@
+"""
+Buffered ingestion of category interactions.
+
+Filtered feed requests used to write ``CategoryInteraction`` rows inline
+(``get_or_create`` + ``save``) on every category tap. Requests now only
+append an event to an in-process buffer, and a background flusher
+aggregates the buffer into ``CategoryInteraction`` with one bulk upsert:
+
+    INSERT ... ON CONFLICT (user_id, category, interaction_type)
+    DO UPDATE SET count = count + EXCLUDED.count
+
+The same flush folds the events into the users' materialized preference
+vectors (see ``posts/preferences.py``).
+
+The buffer is flushed every ``INTERACTION_INGEST['FLUSH_INTERVAL']`` seconds
+(and on interpreter exit), so a crash loses at most one flush window.
+A flush interval of 0 writes synchronously, which is what the tests use.
+"""
+
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INGEST_SETTINGS = {
+    'FLUSH_INTERVAL': 5,     # Seconds between background flushes (0 = synchronous)
+    'MAX_PENDING': 5000,     # Wake the flusher early once this many keys are buffered
+    'UPSERT_CHUNK_SIZE': 1000,  # Rows per INSERT ... ON CONFLICT statement
+}
+
+
+def get_ingest_settings():
+    """Return the interaction ingest settings merged over the defaults"""
+    return {**DEFAULT_INGEST_SETTINGS, **getattr(settings, 'INTERACTION_INGEST', {})}
+
+
+class InteractionBuffer:
+    """
+    Thread-safe, in-memory aggregation buffer for category interactions.
+
+    Events are keyed by (user_id, category, interaction_type) so a burst of
+    taps on the same category collapses into a single upsert row.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (user_id, category, interaction_type) -> [count, last_seen]
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, user_id, category, interaction_type='filter', count=1):
+        """Buffer one interaction event; never touches the database on the hot path"""
+        config = get_ingest_settings()
+        key = (user_id, category, interaction_type)
+        now = timezone.now()
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [count, now]
+            else:
+                entry[0] += count
+                entry[1] = now
+            pending_keys = len(self._pending)
+
+        if config['FLUSH_INTERVAL'] <= 0:
+            # Synchronous mode (tests, scripts)
+            self.flush()
+            return
+
+        self._ensure_flusher(config['FLUSH_INTERVAL'])
+        if pending_keys >= config['MAX_PENDING']:
+            self._wakeup.set()
+
+    def pending_count(self):
+        """Number of distinct buffered keys waiting for the next flush"""
+        with self._lock:
+            return len(self._pending)
+
+    def _drain(self):
+        """Swap out the pending events so requests can keep appending during a flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _requeue(self, pending):
+        """Merge events from a failed flush back into the buffer"""
+        with self._lock:
+            for key, (count, last_seen) in pending.items():
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = [count, last_seen]
+                else:
+                    entry[0] += count
+                    entry[1] = max(entry[1], last_seen)
+
+    def flush(self):
+        """
+        Write all buffered events to ``CategoryInteraction`` with bulk upserts
+        and update the affected preference vectors.
+        Returns the number of aggregated rows written.
+        """
+        from .preferences import apply_interaction_events
+
+        pending = self._drain()
+        if not pending:
+            return 0
+
+        events = [
+            (user_id, category, interaction_type, count, last_seen)
+            for (user_id, category, interaction_type), (count, last_seen) in pending.items()
+        ]
+
+        try:
+            with transaction.atomic():
+                upsert_category_interactions(events)
+                apply_interaction_events(events)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(events)} category interactions: {e}")
+            self._requeue(pending)
+            return 0
+
+        logger.debug(f"Flushed {len(events)} category interaction rows")
+        return len(events)
+
+    def _ensure_flusher(self, interval):
+        """Start the background flusher lazily (and again after a fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(interval,),
+                name='category-interaction-flusher',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+def upsert_category_interactions(events):
+    """
+    Aggregate events into ``CategoryInteraction`` with
+    ``INSERT ... ON CONFLICT DO UPDATE SET count = count + EXCLUDED.count``.
+
+    The VALUES list is joined against the user table so that events for
+    users deleted since they were buffered are dropped instead of failing
+    the whole batch on the foreign key.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import CategoryInteraction
+
+    if not events:
+        return
+
+    table = connection.ops.quote_name(CategoryInteraction._meta.db_table)
+    user_table = connection.ops.quote_name(get_user_model()._meta.db_table)
+    chunk_size = get_ingest_settings()['UPSERT_CHUNK_SIZE']
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(events), chunk_size):
+            chunk = events[start:start + chunk_size]
+            values_sql = ', '.join(['(%s::bigint, %s, %s, %s::integer, %s::timestamptz)'] * len(chunk))
+            params = [value for event in chunk for value in event]
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (user_id, category, interaction_type, count, created_at, last_updated)
+                SELECT v.user_id, v.category, v.interaction_type, v.count, v.last_seen, v.last_seen
+                FROM (VALUES {values_sql}) AS v (user_id, category, interaction_type, count, last_seen)
+                JOIN {user_table} u ON u.id = v.user_id
+                ON CONFLICT (user_id, category, interaction_type) DO UPDATE
+                SET count = {table}.count + EXCLUDED.count,
+                    last_updated = GREATEST({table}.last_updated, EXCLUDED.last_updated)
+                """,
+                params,
+            )
+
+
+# Process-wide buffer used by the views
+interaction_buffer = InteractionBuffer()
+
+# Flush whatever is left when the worker shuts down cleanly
+atexit.register(interaction_buffer.flush)
@@ -0,0 +1,152 @@
+"""
+Django management command running the micro-benchmarks registered in the
+apps' benchmarks.py modules (see config/benchmarks.py). Replaces the old
+test_performance.py script.
+
+    python manage.py benchmark --list
+    python manage.py benchmark posts.serializer --size 50 --repeat 50
+    python manage.py benchmark --output baseline.json
+    python manage.py benchmark --compare baseline.json --threshold 15
+
+With --compare the command exits with an error when any benchmark's
+--metric is more than --threshold percent slower than in the baseline.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Account
+from config.benchmarks import BenchmarkContext, METRICS, compare, run_report, select_benchmarks
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks of hot code paths and report p50/p95/p99 timings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Benchmark names, prefixes or glob patterns (default: all)'
+        )
+        parser.add_argument('--list', action='store_true', help='List the registered benchmarks and exit')
+        parser.add_argument('--size', type=int, default=50, help='Number of posts/notifications per call (N)')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed calls before measuring')
+        parser.add_argument('--repeat', type=int, default=30, help='Timed calls per benchmark')
+        parser.add_argument('--user-id', type=int, default=None, help='User the benchmarks run as (default: first user)')
+        parser.add_argument('--output', default=None, help='Write the results as JSON to this file')
+        parser.add_argument('--compare', default=None, help='Baseline JSON file to compare the results against')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=10.0,
+            help='Percent slowdown against the baseline that counts as a regression'
+        )
+        parser.add_argument(
+            '--metric',
+            choices=[metric[:-3] for metric in METRICS],
+            default='p50',
+            help='Statistic compared against the baseline'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=0.05,
+            help='Ignore differences smaller than this many milliseconds'
+        )
+
+    def handle(self, *args, **options):
+        benchmarks = select_benchmarks(options['names'])
+        if options['list']:
+            for bench in benchmarks:
+                self.stdout.write(f'{bench.name:<36}{bench.description}')
+            return
+        if not benchmarks:
+            raise CommandError(f"No benchmark matches {', '.join(options['names'])}; see --list")
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {exc}")
+
+        context = self._context(options)
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG is on: timings include Django\'s per-query logging'))
+        self.stdout.write(
+            f"Running {len(benchmarks)} benchmarks, N={context.size}, "
+            f"{options['warmup']} warmup + {options['repeat']} timed calls each\n"
+        )
+        self.stdout.write(
+            f'{"benchmark":<36}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"mean ms":>10}{"queries":>9}'
+        )
+        try:
+            report = run_report(
+                benchmarks, context, warmup=options['warmup'], repeat=options['repeat'], progress=self._progress
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True)
+            self.stdout.write(f"\nResults written to {options['output']}")
+
+        if baseline is not None:
+            self._compare(report, baseline, options)
+
+    def _context(self, options):
+        if options['user_id']:
+            user = Account.objects.filter(id=options['user_id']).first()
+        else:
+            user = Account.objects.filter(is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to run the benchmarks as; run generate_dataset first')
+        post = Post.objects.select_related('location').order_by('-created_at').first()
+        latitude, longitude = (post.location.latitude, post.location.longitude) if post else (31.9, 35.2)
+        return BenchmarkContext(size=options['size'], user=user, latitude=latitude, longitude=longitude)
+
+    def _progress(self, bench, result):
+        self.stdout.write(
+            f"{bench.name:<36}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"{result['mean_ms']:>10.3f}{result['queries']:>9}"
+        )
+
+    def _compare(self, report, baseline, options):
+        metric = f"{options['metric']}_ms"
+        baseline_size = baseline.get('options', {}).get('size')
+        if baseline_size is not None and baseline_size != report['options']['size']:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with N={baseline_size}, this run used N={report['options']['size']}"
+            ))
+
+        rows = compare(
+            report, baseline, threshold=options['threshold'], metric=metric, min_delta_ms=options['min_delta_ms']
+        )
+        self.stdout.write(f'\n{"benchmark":<36}{"baseline":>10}{"current":>10}{"change":>10}  status ({metric})')
+        regressions = []
+        for name, before, after, change, state in rows:
+            before_text = '-' if before is None else f'{before:.3f}'
+            after_text = '-' if after is None else f'{after:.3f}'
+            change_text = '-' if change is None else f'{change:+.1f}%'
+            line = f'{name:<36}{before_text:>10}{after_text:>10}{change_text:>10}  {state}'
+            if state == 'regressed':
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            elif state == 'improved':
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) regressed more than {options['threshold']}% on {metric}: "
+                + ', '.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions over {options['threshold']}%"))
@@ -0,0 +1,182 @@
+"""
+Django management command showing what the async views (see
+config/async_views.py) buy when an upstream is slow.
+
+    python manage.py benchmark_async_views --latency-ms 200 --requests 50 --concurrency 25
+
+FCM is replaced by the in-process stub (config/firebase_stub.py), which
+answers every send after --latency-ms. The same burst of POST
+/api/notifications/actions/send-direct/ requests is then served twice, in
+process and without a network:
+
+- wsgi: one sync worker, as under gunicorn's sync workers; it handles one
+  request at a time and is blocked while each send waits on FCM.
+- asgi: one event loop, as under uvicorn; up to --concurrency requests are
+  in flight and their sends wait in the I/O pool together.
+
+Per mode it reports throughput, latency and how busy the worker was: for
+the sync worker, the share of the run it spent inside a request (it can't
+take another one meanwhile); for the event loop, the share it spent
+running code rather than waiting (estimated from its scheduling lag).
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Account
+from config import firebase_stub
+from notifications.models import FCMToken
+
+PATH = '/api/notifications/actions/send-direct/'
+
+
+async def _loop_busy_seconds(stop, interval=0.001):
+    """Time the event loop spent running other code, measured as the lag of a short sleep"""
+    busy = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        busy += max(0.0, time.perf_counter() - start - interval)
+    return busy
+
+
+class Command(BaseCommand):
+    help = 'Compare one sync worker with one event loop serving send-direct while FCM is slow (stubbed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency-ms', type=int, default=200, help='Simulated FCM round trip')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=25, help='Requests in flight at once in asgi mode')
+        parser.add_argument(
+            '--modes',
+            default='wsgi,asgi',
+            help='Comma-separated modes to run: wsgi, asgi'
+        )
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - {'wsgi', 'asgi'}
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+
+        users = list(Account.objects.filter(is_active=True).order_by('id')[:2])
+        if len(users) < 2:
+            raise CommandError('Need two active users; run generate_dataset first')
+        sender, recipient = users
+        # The recipient needs a device; this one is removed again below
+        device = FCMToken.objects.create(
+            user=recipient, token=f'benchmark-{uuid.uuid4().hex}', device_platform='android', is_active=True
+        )
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(sender)}'}
+        self.payload = {'recipient_user_id': recipient.id, 'title': 'Benchmark', 'body': 'Async views'}
+
+        self.stdout.write(
+            f"{options['requests']} x POST {PATH}, FCM stubbed at {options['latency_ms']} ms per send\n"
+        )
+        results = []
+        try:
+            with override_settings(
+                FIREBASE_STUB={'ENABLED': True, 'LATENCY_MS': options['latency_ms']},
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                REQUEST_METRICS={**getattr(settings, 'REQUEST_METRICS', {}), 'ENABLED': False},
+            ), firebase_stub.installed():
+                for mode in modes:
+                    if mode == 'wsgi':
+                        results.append(self._run_wsgi(options))
+                    else:
+                        results.append(async_to_sync(self._run_asgi)(options))
+        finally:
+            device.delete()
+
+        self._report(results)
+
+    def _run_wsgi(self, options):
+        client = Client()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(options['requests']):
+            request_start = time.perf_counter()
+            response = client.post(PATH, self.payload, content_type='application/json', headers=self.headers)
+            latencies.append(time.perf_counter() - request_start)
+            self._check(response)
+        seconds = time.perf_counter() - start
+        # A sync worker is unavailable from the start to the end of each request
+        return self._result('wsgi (1 sync worker)', latencies, seconds, sum(latencies), 1)
+
+    async def _run_asgi(self, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+        in_flight = peak = 0
+
+        async def one_request():
+            nonlocal in_flight, peak
+            async with semaphore:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                request_start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        PATH, self.payload, content_type='application/json', headers=self.headers
+                    )
+                finally:
+                    in_flight -= 1
+                latencies.append(time.perf_counter() - request_start)
+                self._check(response)
+
+        stop = asyncio.Event()
+        monitor = asyncio.ensure_future(_loop_busy_seconds(stop))
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(one_request() for _ in range(options['requests'])))
+        finally:
+            seconds = time.perf_counter() - start
+            stop.set()
+            busy = await monitor
+        return self._result('asgi (1 event loop)', latencies, seconds, busy, peak)
+
+    def _check(self, response):
+        if response.status_code != 200:
+            raise CommandError(f'send-direct returned {response.status_code}: {response.content[:200]!r}')
+
+    def _result(self, mode, latencies, seconds, busy_seconds, peak):
+        ordered = sorted(latencies)
+        return {
+            'mode': mode,
+            'requests': len(latencies),
+            'seconds': seconds,
+            'throughput': len(latencies) / seconds if seconds else 0.0,
+            'p50_ms': statistics.median(ordered) * 1000,
+            'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            'busy': min(1.0, busy_seconds / seconds) if seconds else 0.0,
+            'peak_in_flight': peak,
+        }
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'mode':<24}{'requests':>9}{'wall s':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'in flight':>11}{'worker busy':>13}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<24}{result['requests']:>9}{result['seconds']:>9.2f}{result['throughput']:>9.1f}"
+                f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['peak_in_flight']:>11}"
+                f"{result['busy']:>12.0%}"
+            )
+        by_mode = {result['mode'].split()[0]: result for result in results}
+        if 'wsgi' in by_mode and 'asgi' in by_mode and by_mode['wsgi']['throughput']:
+            self.stdout.write(self.style.SUCCESS(
+                f"\nOne event loop served {by_mode['asgi']['throughput'] / by_mode['wsgi']['throughput']:.1f}x "
+                f"the requests per second of one sync worker"
+            ))
@@ -0,0 +1,91 @@
+"""
+Django management command comparing the JSON and MessagePack renderers on
+real feed payloads: the nearby feed, recommendations and notification
+history of one user. For each payload it reports the wire size (raw and
+gzipped) and the time to encode on the server and decode on the client.
+
+    python manage.py benchmark_renderers --user-id 12 --lat 31.95 --lng 35.93
+"""
+
+import gzip
+import json
+import statistics
+import time
+
+import msgpack
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import Account
+from config.renderers import MessagePackRenderer
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON and MessagePack encode/decode time and wire size on feed payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=None, help='User whose feeds are rendered (default: first user)')
+        parser.add_argument('--lat', type=float, default=None, help='Latitude for nearby/recommended (default: newest post)')
+        parser.add_argument('--lng', type=float, default=None, help='Longitude for nearby/recommended (default: newest post)')
+        parser.add_argument('--page-size', type=int, default=50, help='Page size requested from paginated feeds')
+        parser.add_argument('--iterations', type=int, default=200, help='Encode/decode rounds per payload')
+
+    def handle(self, *args, **options):
+        user = Account.objects.filter(id=options['user_id']).first() if options['user_id'] else Account.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('No user found to render feeds for')
+
+        lat, lng = options['lat'], options['lng']
+        if lat is None or lng is None:
+            post = Post.objects.select_related('location').order_by('-created_at').first()
+            if post is None:
+                raise CommandError('No posts found; pass --lat and --lng')
+            lat, lng = post.location.latitude, post.location.longitude
+
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user=user)
+        page_size = options['page_size']
+        endpoints = {
+            'nearby': ('/api/posts/nearby/', {'lat': lat, 'lng': lng, 'radius': 50000, 'page_size': page_size}),
+            'recommended': ('/api/posts/recommended/', {'latitude': lat, 'longitude': lng, 'limit': page_size}),
+            'notification history': ('/api/notifications/history/', {'page_size': page_size}),
+        }
+
+        self.stdout.write(f'Rendering feeds for user {user.id} around ({lat}, {lng}), {options["iterations"]} rounds\n')
+        self.stdout.write(
+            f'{"payload":<22}{"format":<9}{"bytes":>9}{"gzip":>9}{"encode ms":>11}{"decode ms":>11}'
+        )
+        for name, (path, params) in endpoints.items():
+            response = client.get(path, params)
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f'{name}: {path} returned {response.status_code}, skipped'))
+                continue
+            self._compare(name, response.data, options['iterations'])
+
+    def _compare(self, name, data, iterations):
+        formats = {
+            'json': (JSONRenderer(), json.loads),
+            'msgpack': (MessagePackRenderer(), lambda body: msgpack.unpackb(body, raw=False, strict_map_key=False)),
+        }
+        results = {}
+        for label, (renderer, decode) in formats.items():
+            body = renderer.render(data)
+            encode_time = self._median_ms(lambda: renderer.render(data), iterations)
+            decode_time = self._median_ms(lambda: decode(body), iterations)
+            results[label] = len(body)
+            self.stdout.write(
+                f'{name:<22}{label:<9}{len(body):>9}{len(gzip.compress(body)):>9}'
+                f'{encode_time:>11.3f}{decode_time:>11.3f}'
+            )
+        saved = 1 - results['msgpack'] / results['json'] if results['json'] else 0
+        self.stdout.write(self.style.SUCCESS(f'{name:<22}msgpack is {saved:.1%} smaller uncompressed'))
+
+    def _median_ms(self, func, iterations):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,122 @@
+"""
+Django management command to compact old category interactions into daily rollups.
+Replaces the old cleanup_category_interactions.py script. Run it as a daily cron job:
+
+    python manage.py compact_category_interactions
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts.models import CategoryInteraction, CategoryInteractionDaily
+from posts.preferences import get_preference_settings, rebuild_preference_vector
+
+
+class Command(BaseCommand):
+    help = 'Compact old category interactions into daily rollups and prune expired rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Compact interactions not updated for this many days (default: PREFERENCE_VECTOR RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--rollup-days',
+            type=int,
+            default=365,
+            help='Delete daily rollups older than this many days (default: 365)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of interaction rows compacted per transaction'
+        )
+        parser.add_argument(
+            '--rebuild-vectors',
+            action='store_true',
+            help='Recompute every preference vector from interactions and rollups afterwards'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be compacted without making changes'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] or get_preference_settings()['RETENTION_DAYS']
+        cutoff = timezone.now() - timedelta(days=days)
+        rollup_cutoff = (timezone.now() - timedelta(days=options['rollup_days'])).date()
+
+        stale = CategoryInteraction.objects.filter(last_updated__lt=cutoff)
+        expired_rollups = CategoryInteractionDaily.objects.filter(day__lt=rollup_cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'DRY RUN: Would compact {stale.count()} interactions older than {days} days '
+                    f'and delete {expired_rollups.count()} rollups before {rollup_cutoff}'
+                )
+            )
+            return
+
+        compacted = 0
+        while True:
+            with transaction.atomic():
+                moved = self.compact_batch(cutoff, options['batch_size'])
+            if moved == 0:
+                break
+            compacted += moved
+
+        deleted_rollups = expired_rollups.delete()[0]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Compacted {compacted} interactions older than {days} days into daily rollups\n'
+                f'Deleted {deleted_rollups} rollups before {rollup_cutoff}'
+            )
+        )
+
+        if options['rebuild_vectors']:
+            user_ids = set(CategoryInteraction.objects.values_list('user_id', flat=True).distinct())
+            user_ids |= set(CategoryInteractionDaily.objects.values_list('user_id', flat=True).distinct())
+            for user_id in user_ids:
+                rebuild_preference_vector(user_id)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(user_ids)} preference vectors'))
+
+    def compact_batch(self, cutoff, batch_size):
+        """Move one batch of stale interaction rows into the daily rollup table"""
+        interactions = connection.ops.quote_name(CategoryInteraction._meta.db_table)
+        rollups = connection.ops.quote_name(CategoryInteractionDaily._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {interactions}
+                    WHERE id IN (
+                        SELECT id FROM {interactions}
+                        WHERE last_updated < %s
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING user_id, category, interaction_type, count, last_updated
+                ), inserted AS (
+                    INSERT INTO {rollups} (user_id, category, interaction_type, day, count)
+                    SELECT user_id, category, interaction_type, (last_updated AT TIME ZONE 'UTC')::date, SUM(count)
+                    FROM moved
+                    GROUP BY 1, 2, 3, 4
+                    ON CONFLICT (user_id, category, interaction_type, day) DO UPDATE
+                    SET count = {rollups}.count + EXCLUDED.count
+                )
+                SELECT COUNT(*) FROM moved
+                """,
+                [cutoff, batch_size],
+            )
+            return cursor.fetchone()[0]
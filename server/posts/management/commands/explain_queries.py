@@ -0,0 +1,173 @@
+"""
+Django management command running EXPLAIN on the canonical queries
+registered in the apps' query_plans.py modules (see config/query_plans.py),
+flagging sequential scans and sorts on large tables and proposing the
+indexes that would avoid them.
+
+    python manage.py explain_queries --list
+    python manage.py explain_queries posts.feed --analyze --verbose
+    python manage.py explain_queries --output plans.json
+    python manage.py explain_queries --compare plans.json --fail-on-findings
+
+In CI, run it against the synthetic dataset (``generate_dataset``): with
+--fail-on-findings it exits with an error when any query scans or sorts a
+large table, and with --compare when a plan got worse than the baseline.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import Account
+from config.query_plans import QueryContext, compare_plans, run_report, select_queries
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the canonical endpoint queries, flag seq scans and large sorts, and propose indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Query names, prefixes or glob patterns (default: all)'
+        )
+        parser.add_argument('--list', action='store_true', help='List the registered queries and exit')
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE: executes each query and reports actual rows and time'
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Only flag scans of tables and sorts of inputs with at least this many rows'
+        )
+        parser.add_argument('--user-id', type=int, default=None, help='User the queries run as (default: first user)')
+        parser.add_argument('--verbose', action='store_true', help='Print every plan node, not just the findings')
+        parser.add_argument('--output', default=None, help='Write the plans, findings and proposals as JSON')
+        parser.add_argument('--compare', default=None, help='Baseline JSON file to compare the plans against')
+        parser.add_argument(
+            '--cost-threshold',
+            type=float,
+            default=50.0,
+            help='Percent rise in estimated cost against the baseline that counts as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-findings',
+            action='store_true',
+            help='Exit with an error when any query has a seq scan or sort on a large table'
+        )
+
+    def handle(self, *args, **options):
+        queries = select_queries(options['names'])
+        if options['list']:
+            for query in queries:
+                self.stdout.write(f'{query.name:<40}{query.description}')
+            return
+        if not queries:
+            raise CommandError(f"No query matches {', '.join(options['names'])}; see --list")
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'explain_queries needs PostgreSQL, not {connection.vendor}')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {exc}")
+
+        self.verbose = options['verbose']
+        context = self._context(options)
+        self.stdout.write(
+            f"Explaining {len(queries)} queries{' with ANALYZE' if options['analyze'] else ''}, "
+            f"flagging tables and sorts of {options['min_rows']}+ rows\n"
+        )
+        report = run_report(
+            queries, context, analyze=options['analyze'], min_rows=options['min_rows'], progress=self._progress
+        )
+
+        proposals = {}
+        for result in report['queries'].values():
+            for proposal in result['proposals']:
+                key = (proposal['table'], tuple(proposal['fields']), proposal['condition'])
+                proposals.setdefault(key, proposal)
+        findings = sum(len(result['findings']) for result in report['queries'].values())
+        self._proposals(proposals.values())
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True, default=str)
+            self.stdout.write(f"\nPlans written to {options['output']}")
+
+        if baseline is not None:
+            self._compare(report, baseline, options)
+
+        if options['fail_on_findings'] and findings:
+            raise CommandError(f'{findings} seq scan(s) or sort(s) on large tables; see the proposals above')
+        if not findings:
+            self.stdout.write(self.style.SUCCESS('\nNo seq scans or sorts on large tables'))
+
+    def _context(self, options):
+        if options['user_id']:
+            user = Account.objects.filter(id=options['user_id']).first()
+        else:
+            user = Account.objects.filter(is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to run the queries as; run generate_dataset first')
+        post = Post.objects.select_related('location').order_by('-created_at').first()
+        latitude, longitude = (post.location.latitude, post.location.longitude) if post else (31.9, 35.2)
+        return QueryContext(user=user, latitude=latitude, longitude=longitude)
+
+    def _progress(self, query, result):
+        timing = f"{result['execution_ms']:.2f} ms" if result.get('execution_ms') is not None else 'not run'
+        line = f"{query.name:<40}cost {result['total_cost']:>12.2f}  {timing}"
+        if result['findings']:
+            self.stdout.write(self.style.WARNING(line))
+        else:
+            self.stdout.write(line)
+        for finding in result['findings']:
+            kind = 'Seq scan' if finding['kind'] == 'seq_scan' else 'Sort'
+            detail = f" ({finding['detail']})" if finding['detail'] else ''
+            self.stdout.write(f"    {kind} on {finding['table']}, {finding['rows']} rows{detail}")
+        if self.verbose:
+            for step in result['signature']:
+                self.stdout.write(f'    - {step}')
+
+    def _proposals(self, proposals):
+        new = [proposal for proposal in proposals if not proposal['existing']]
+        covered = [proposal for proposal in proposals if proposal['existing']]
+        if not new and not covered:
+            return
+        self.stdout.write('\nProposed indexes:')
+        for proposal in new:
+            condition = f", condition=Q({proposal['condition']})" if proposal['condition'] else ''
+            self.stdout.write(
+                f"  {proposal['model'] or proposal['table']}: models.Index(fields={proposal['fields']!r}{condition})"
+            )
+            self.stdout.write(f"    {proposal['sql']}")
+        for proposal in covered:
+            self.stdout.write(
+                f"  {proposal['table']} ({', '.join(proposal['fields'])}) is already covered by "
+                f"{proposal['existing']}; check the filter's selectivity and ANALYZE the table"
+            )
+
+    def _compare(self, report, baseline, options):
+        rows = compare_plans(report, baseline, cost_threshold=options['cost_threshold'])
+        self.stdout.write(f'\n{"query":<40}status')
+        regressions = []
+        for name, state, detail in rows:
+            line = f'{name:<40}{state}' + (f'  {detail}' if detail else '')
+            if state == 'regressed':
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            elif state == 'changed':
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} query plan(s) regressed: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS('No plan regressions against the baseline'))
@@ -0,0 +1,94 @@
+"""
+Django management command to generate a large, deterministic synthetic dataset
+for benchmarks and load tests. Replaces generate_palestinian_data.py and
+scripts/add_palestine_data.py:
+
+    python manage.py generate_dataset --users 100000 --posts 1000000 --seed 7
+
+Rows are written with COPY (bulk_create on other backends), so no model
+signals run. Run it against a benchmark database, never production.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Account
+from posts.synthetic import EMAIL_DOMAIN, SYNTHETIC_PASSWORD, SyntheticDataset
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic users, follows, posts, votes, interactions and notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--posts', type=int, default=10000, help='Number of posts to create')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed; the same seed and volumes produce the same dataset'
+        )
+        parser.add_argument('--follows-per-user', type=int, default=20, help='Average accounts followed per user')
+        parser.add_argument('--votes-per-post', type=int, default=4, help='Average up/down votes per post')
+        parser.add_argument('--status-votes-per-post', type=int, default=1, help='Average status votes per post')
+        parser.add_argument('--saves-per-user', type=int, default=5, help='Average saved posts per user')
+        parser.add_argument(
+            '--notifications-per-user',
+            type=int,
+            default=5,
+            help='Average notification history rows per user'
+        )
+        parser.add_argument(
+            '--related-ratio',
+            type=float,
+            default=0.2,
+            help='Share of posts written as follow-ups of a recent post at the same spot'
+        )
+        parser.add_argument('--days', type=int, default=30, help='Spread posts over this many days before now')
+        parser.add_argument('--batch-size', type=int, default=20000, help='Rows per COPY / bulk_create batch')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the planned volumes without writing anything'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if options['posts'] < 0:
+            raise CommandError('--posts cannot be negative')
+
+        seed = options['seed']
+        existing = Account.objects.filter(email__endswith=f'.s{seed}@{EMAIL_DOMAIN}').count()
+        if existing:
+            raise CommandError(
+                f'{existing} users from seed {seed} already exist; use another --seed or a fresh database'
+            )
+
+        self.stdout.write(
+            f"Generating {options['users']} users, ~{options['users'] * options['follows_per_user']} follows, "
+            f"{options['posts']} posts, ~{options['posts'] * options['votes_per_post']} votes, "
+            f"~{options['users'] * options['notifications_per_user']} notifications (seed {seed})"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN - no data written'))
+            return
+
+        dataset = SyntheticDataset(
+            users=options['users'],
+            posts=options['posts'],
+            seed=seed,
+            follows_per_user=options['follows_per_user'],
+            votes_per_post=options['votes_per_post'],
+            status_votes_per_post=options['status_votes_per_post'],
+            saves_per_user=options['saves_per_user'],
+            related_ratio=options['related_ratio'],
+            notifications_per_user=options['notifications_per_user'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        counts = dataset.generate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['users']} users and {counts['posts']} posts in {counts['seconds']}s. "
+            f"Log in as user0.s{seed}@{EMAIL_DOMAIN} / {SYNTHETIC_PASSWORD}"
+        ))
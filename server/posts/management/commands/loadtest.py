@@ -0,0 +1,136 @@
+"""
+Django management command running an end-to-end load test against a
+running server with the mobile app's traffic mix (see config/loadtest.py).
+
+    python manage.py generate_dataset --users 2000 --posts 100000 --seed 1
+    FIREBASE_STUB=1 python manage.py runserver --noreload      # or an ASGI server
+    python manage.py loadtest --users 50 --arrival-rate 5 --duration 120 --seed 1
+
+Virtual users log in as the generated accounts of --seed. The report lists
+throughput, p50/p95/p99 latency and error rate per endpoint; --output also
+writes it as JSON.
+"""
+
+import io
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Account
+from config.loadtest import DEFAULT_MIX, LoadTest, parse_mix
+from posts.models import Post
+from posts.synthetic import CITIES, EMAIL_DOMAIN, SYNTHETIC_PASSWORD
+
+
+class Command(BaseCommand):
+    help = 'Replay the mobile traffic mix against a running server and report per-endpoint latency and errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server under test')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument(
+            '--arrival-rate',
+            type=float,
+            default=2.0,
+            help='Virtual users started per second until --users are running (0 = all at once)'
+        )
+        parser.add_argument('--duration', type=int, default=60, help='Test length in seconds')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between actions in seconds')
+        parser.add_argument('--session-actions', type=int, default=20, help='Mean actions per session before logging in again')
+        parser.add_argument(
+            '--mix',
+            default=None,
+            help='Action weights, e.g. "feed=30,nearby=15,vote=5" (default: '
+                 + ','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()) + ')'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='generate_dataset seed whose accounts log in')
+        parser.add_argument('--password', default=SYNTHETIC_PASSWORD, help='Password of those accounts')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--output', default=None, help='Write the report as JSON to this file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the plan and the accounts that would be used without sending requests'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix']) if options['mix'] else DEFAULT_MIX
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        emails = list(
+            Account.objects.filter(email__endswith=f".s{options['seed']}@{EMAIL_DOMAIN}", is_active=True)
+            .order_by('id').values_list('email', flat=True)[:max(options['users'], 1) * 4]
+        )
+        if not emails:
+            raise CommandError(f"No accounts from seed {options['seed']}; run generate_dataset --seed {options['seed']}")
+        post_ids = list(Post.objects.order_by('-created_at').values_list('id', flat=True)[:2000])
+        user_ids = list(Account.objects.order_by('?').values_list('id', flat=True)[:2000])
+
+        self.stdout.write(
+            f"{options['users']} virtual users against {options['base_url']} for {options['duration']}s "
+            f"(arrival {options['arrival_rate']}/s, think time {options['think_time']}s, "
+            f"{len(emails)} accounts, mix {', '.join(f'{name}={weight:g}' for name, weight in mix.items())})"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN - no requests sent'))
+            return
+
+        load_test = LoadTest(
+            base_url=options['base_url'],
+            accounts=[(email, options['password']) for email in emails],
+            locations=[(city['latitude'], city['longitude']) for city in CITIES],
+            post_ids=post_ids,
+            user_ids=user_ids,
+            mix=mix,
+            users=options['users'],
+            arrival_rate=options['arrival_rate'],
+            duration=options['duration'],
+            think_time=options['think_time'],
+            session_actions=options['session_actions'],
+            timeout=options['timeout'],
+            seed=options['seed'],
+            upload_body=self._png(),
+        )
+        report = load_test.run(progress=self._progress)
+        self._print(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def _png(self):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'orange').save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def _progress(self, summary, virtual_users):
+        total = summary['total']
+        self.stdout.write(
+            f"[{summary['elapsed_seconds']:>6.0f}s] {virtual_users} users, {total['requests']} requests, "
+            f"{total['throughput_rps']} req/s, p95 {total['p95_ms']}ms, errors {total['error_rate']:.1%}"
+        )
+
+    def _print(self, report):
+        self.stdout.write(
+            f"\n{'endpoint':<24}{'requests':>9}{'req/s':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        rows = [*report['endpoints'].items(), ('TOTAL', report['total'])]
+        for label, row in rows:
+            line = (
+                f"{label:<24}{row['requests']:>9}{row['throughput_rps']:>9.1f}{row['error_rate']:>8.1%}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['error_rate'] > 0.01 else line)
+        for label, row in report['endpoints'].items():
+            failures = {code: count for code, count in row['statuses'].items() if not code.startswith('2')}
+            if failures:
+                self.stdout.write(f'  {label}: ' + ', '.join(f'{code} x{count}' for code, count in failures.items()))
+        self.stdout.write(
+            f"\n{report['virtual_users']} virtual users, {report['elapsed_seconds']}s, "
+            f"{report['total']['throughput_rps']} req/s overall"
+        )
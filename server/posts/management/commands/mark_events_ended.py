@@ -6,7 +6,8 @@ This can be run as a daily cron job.
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-from posts.models import Post, PostStatus
+from posts.cache import post_cache
+from posts.models import Post, PostChangeKind, PostStatus
 
 class Command(BaseCommand):
     help = 'Mark events as ended if they are older than 24 hours'
@@ -69,7 +70,10 @@ class Command(BaseCommand):
                 self.stdout.write(f'  ... and {vote_count - 10} more')
         else:
             # Update time-based events
+            old_event_ids = list(old_events.values_list('id', flat=True))
             updated = old_events.update(status=PostStatus.ENDED, event_status=PostStatus.ENDED)
+            Post.bump_versions(old_event_ids, kind=PostChangeKind.ENDED)
+            post_cache.invalidate_posts_on_commit(old_event_ids)
             
             self.stdout.write(
                 self.style.SUCCESS(
@@ -0,0 +1,54 @@
+"""
+Django management command to prune the bookkeeping kept for offline/mobile
+sync: the post change log used by delta sync and the bulk vote idempotency
+receipts. Run it as a daily cron job:
+
+    python manage.py prune_post_changes
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.changes import get_post_changes_settings, prune_changes
+from posts.models import PostChange
+from posts.votes import prune_vote_receipts
+
+
+class Command(BaseCommand):
+    help = 'Delete post change log rows and bulk vote receipts older than their retention windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Delete changes older than this many days (default: POST_CHANGES RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of rows deleted per query'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be deleted without making changes'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] or get_post_changes_settings()['RETENTION_DAYS']
+
+        if options['dry_run']:
+            cutoff = timezone.now() - timedelta(days=days)
+            count = PostChange.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would delete {count} changes older than {days} days'))
+            return
+
+        deleted = prune_changes(days=days, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} changes older than {days} days'))
+        
+        receipts = prune_vote_receipts()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {receipts} expired bulk vote receipts'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_alter_post_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPreferenceVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weights', models.JSONField(default=dict, help_text='Decayed interaction weight per category')),
+                ('recent_filters', models.JSONField(default=dict, help_text='Last filter timestamp (ISO) per category')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='preference_vector', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryInteractionDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('news', 'News'), ('event', 'Event'), ('alert', 'Alert'), ('military', 'Military'), ('casualties', 'Casualties'), ('explosion', 'Explosion'), ('politics', 'Politics'), ('sports', 'Sports'), ('health', 'Health'), ('traffic', 'Traffic'), ('weather', 'Weather'), ('crime', 'Crime'), ('community', 'Community'), ('disaster', 'Disaster'), ('environment', 'Environment'), ('education', 'Education'), ('fire', 'Fire'), ('other', 'Other')], max_length=20)),
+                ('interaction_type', models.CharField(default='filter', max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_interaction_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('user', 'category', 'interaction_type', 'day')},
+            },
+        ),
+    ]
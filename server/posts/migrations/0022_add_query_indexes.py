@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:50
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the tables writable while the indexes build
+    atomic = False
+
+    dependencies = [
+        ('posts', '0021_vote_receipts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='categoryinteraction',
+            index=models.Index(fields=['last_updated'], name='category_interaction_upd_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['status', 'created_at'], name='post_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['related_post', 'created_at'], name='post_related_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(
+                condition=models.Q(('related_post__isnull', True)),
+                fields=['created_at'],
+                name='post_main_created_idx'
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='postcoordinates',
+            index=models.Index(fields=['latitude', 'longitude'], name='post_coords_lat_lng_idx'),
+        ),
+    ]
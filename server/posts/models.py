@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 User = get_user_model()
@@ -29,11 +30,24 @@ class PostStatus(models.TextChoices):
     HAPPENING = 'happening', _('Happening')
     ENDED = 'ended', _('Ended')
 
+class PostChangeKind(models.TextChoices):
+    CREATED = 'created', _('Created')
+    UPDATED = 'updated', _('Updated')
+    VOTED = 'voted', _('Voted')
+    ENDED = 'ended', _('Ended')
+    DELETED = 'deleted', _('Deleted')
+
 class PostCoordinates(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
     address = models.CharField(max_length=255, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter of nearby and recommended (_get_nearby_posts)
+            models.Index(fields=['latitude', 'longitude'], name='post_coords_lat_lng_idx'),
+        ]
+
     def __str__(self):
         return f"{self.latitude}, {self.longitude}"
 
@@ -77,11 +91,35 @@ class Post(models.Model):
         blank=True,
         related_name='related_posts'
     )
+    # Bumped on every change to the rendered post (edits, votes, status votes, related posts)
+    # and used to build ETag/Last-Modified validators (see posts/conditional.py)
+    version = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Auto-end check on every list request: happening posts older than 24 hours
+            models.Index(fields=['status', 'created_at'], name='post_status_created_idx'),
+            # ?related_to=: a main post's related posts, newest first
+            models.Index(fields=['related_post', 'created_at'], name='post_related_created_idx'),
+            # Main-post feed, newest first. Partial because the planner can't walk the index
+            # above in created_at order when its leading column is matched with IS NULL
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(related_post__isnull=True),
+                name='post_main_created_idx'
+            ),
+        ]
 
     def save(self, *args, **kwargs):
+        if self.pk:
+            self.version += 1
+            self.changed_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version', 'changed_at'}
+        
         # If this is a new post (no id yet), set updated_at = created_at
         if not self.pk and not self.updated_at:
             # Make sure created_at is timezone-aware
@@ -93,6 +131,18 @@ class Post(models.Model):
             self.updated_at = self.created_at or timezone.now()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bump_versions(cls, post_ids, kind=None):
+        """Mark posts as changed without a full save (votes, bulk status updates)"""
+        post_ids = {post_id for post_id in post_ids if post_id is not None}
+        if not post_ids:
+            return 0
+        PostChange.record(post_ids, kind or PostChangeKind.UPDATED)
+        return cls.objects.filter(id__in=post_ids).update(
+            version=models.F('version') + 1,
+            changed_at=timezone.now()
+        )
+
     def __str__(self):
         # Ensure proper Unicode handling for Arabic text
         try:
@@ -196,6 +246,29 @@ class Post(models.Model):
             
         return False
     
+
+
+def annotate_related_posts_count(queryset):
+    """
+    Annotate ``_related_posts_count`` (read by ``Post.related_posts_count``):
+    the number of related posts for main posts, 0 for related ones. A
+    correlated subquery rather than ``Count('related_posts')`` so the query
+    has no GROUP BY and a paginated feed can walk post_main_created_idx
+    instead of aggregating and sorting every main post.
+    """
+    related = (
+        Post.objects.filter(related_post=models.OuterRef('pk')).order_by()
+        .values('related_post').annotate(total=models.Count('id')).values('total')
+    )
+    return queryset.annotate(
+        _related_posts_count=models.Case(
+            models.When(related_post__isnull=True, then=Coalesce(models.Subquery(related), 0)),
+            default=0,
+            output_field=models.IntegerField()
+        )
+    )
+
+
 class PostVote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='votes')
@@ -251,6 +324,10 @@ class CategoryInteraction(models.Model):
     class Meta:
         ordering = ['-last_updated']
         unique_together = ('user', 'category', 'interaction_type')
+        indexes = [
+            # compact_category_interactions: rows not updated within the retention window
+            models.Index(fields=['last_updated'], name='category_interaction_upd_idx'),
+        ]
         
     def __str__(self):
         username = getattr(self.user, 'username', self.user.email)
@@ -261,6 +338,9 @@ class CategoryInteraction(models.Model):
         """
         Increment the count for a specific user-category-interaction_type combination.
         Creates a new record if it doesn't exist.
+
+        This writes synchronously; request paths should buffer events through
+        ``posts.interactions.interaction_buffer`` instead.
         """
         try:
             interaction, created = cls.objects.get_or_create(
@@ -281,3 +361,116 @@ class CategoryInteraction(models.Model):
             return None
 
 
+
+class CategoryInteractionDaily(models.Model):
+    """Daily rollup of category interactions compacted out of CategoryInteraction by the retention job"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_interaction_rollups')
+    category = models.CharField(max_length=20, choices=PostCategory.choices)
+    interaction_type = models.CharField(max_length=20, default='filter')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        unique_together = ('user', 'category', 'interaction_type', 'day')
+
+    def __str__(self):
+        return f"{self.user_id} {self.interaction_type} {self.category} on {self.day} ({self.count}x)"
+
+class UserPreferenceVector(models.Model):
+    """
+    Materialized category preference vector for a user.
+
+    ``weights`` holds one float per PostCategory as of ``updated_at``. The
+    interaction flusher decays the stored weights exponentially and adds the
+    newly flushed counts, so recommendation requests only read this row.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='preference_vector')
+    weights = models.JSONField(default=dict, help_text="Decayed interaction weight per category")
+    recent_filters = models.JSONField(default=dict, help_text="Last filter timestamp (ISO) per category")
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Preference vector for user {self.user_id}"
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the user's vector, seeding it from stored interactions the first time"""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            from .preferences import rebuild_preference_vector
+            return rebuild_preference_vector(user.id)
+
+    def get_preferences(self, now=None):
+        """
+        Return (normalized category preferences, user_has_preferences) with the
+        stored weights decayed to ``now``.
+        """
+        from .preferences import decay_factor
+
+        now = now or timezone.now()
+        factor = decay_factor(now - self.updated_at)
+        decayed = {
+            category: self.weights.get(category, 0.0) * factor
+            for category in PostCategory.values
+        }
+        total_weight = sum(decayed.values())
+
+        if total_weight <= 0:
+            # No preferences yet, use balanced default weights for all categories
+            equal_weight = 1.0 / len(PostCategory.values)
+            return {category: equal_weight for category in PostCategory.values}, False
+
+        return {
+            category: weight / total_weight
+            for category, weight in decayed.items()
+            if weight > 0
+        }, True
+
+
+class PostChange(models.Model):
+    """
+    Append-only change log behind the ``changes`` delta-sync endpoint.
+
+    One row is written for every mutation of a post (create, edit, vote,
+    status vote, auto-end, delete). The auto-increment id is the change
+    sequence that client cursors point into. ``post_id`` is not a foreign
+    key so that deletions stay in the log.
+    """
+    post_id = models.BigIntegerField(db_index=True)
+    kind = models.CharField(max_length=10, choices=PostChangeKind.choices)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} post {self.post_id}"
+
+    @classmethod
+    def record(cls, post_ids, kind):
+        """Append one change row per post id"""
+        now = timezone.now()
+        cls.objects.bulk_create([
+            cls(post_id=post_id, kind=kind, created_at=now)
+            for post_id in post_ids
+            if post_id is not None
+        ])
+
+
+class VoteReceipt(models.Model):
+    """
+    Idempotency key of an applied bulk vote operation (see posts/votes.py).
+    Offline clients may replay the same queue several times; operations whose
+    key already has a receipt are skipped.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vote_receipts')
+    key = models.CharField(max_length=64)
+    applied_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"Vote receipt {self.key} for user {self.user_id}"
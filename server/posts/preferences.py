@@ -0,0 +1,149 @@
+"""
+Materialized user preference vectors.
+
+Each user has one ``UserPreferenceVector`` row holding a decayed weight per
+``PostCategory``. Weights decay exponentially with a configurable half-life
+and are updated incrementally every time the interaction buffer flushes, so
+``recommended`` no longer rescans 30 days of ``CategoryInteraction`` rows.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    CategoryInteraction, CategoryInteractionDaily, PostCategory, UserPreferenceVector,
+)
+
+DEFAULT_PREFERENCE_SETTINGS = {
+    'HALF_LIFE_HOURS': 72,   # Weight halves every 3 days without new interactions
+    'RETENTION_DAYS': 30,    # Raw interactions older than this are compacted into daily rollups
+}
+
+# Base multiplier per interaction type (category filter taps are the strongest signal)
+INTERACTION_WEIGHTS = {
+    'filter': 2.0,
+    'view': 1.0,
+    'click': 1.5,
+}
+
+
+def get_preference_settings():
+    """Return the preference vector settings merged over the defaults"""
+    return {**DEFAULT_PREFERENCE_SETTINGS, **getattr(settings, 'PREFERENCE_VECTOR', {})}
+
+
+def decay_factor(elapsed):
+    """Exponential decay multiplier for a timedelta, based on the configured half-life"""
+    hours = max(0.0, elapsed.total_seconds() / 3600)
+    return 0.5 ** (hours / get_preference_settings()['HALF_LIFE_HOURS'])
+
+
+def empty_weights():
+    return {category: 0.0 for category in PostCategory.values}
+
+
+def _add_event(vector, category, interaction_type, count, occurred_at):
+    """Add one aggregated event to a vector whose weights are already decayed to ``vector.updated_at``"""
+    weight = count * INTERACTION_WEIGHTS.get(interaction_type, 1.0)
+    weight *= decay_factor(vector.updated_at - occurred_at)
+    vector.weights[category] = vector.weights.get(category, 0.0) + weight
+
+    if interaction_type == 'filter':
+        previous = vector.recent_filters.get(category)
+        if previous is None or parse_datetime(previous) < occurred_at:
+            vector.recent_filters[category] = occurred_at.isoformat()
+
+
+def apply_interaction_events(events, now=None):
+    """
+    Fold flushed interaction events into the users' preference vectors.
+
+    ``events`` is the flusher's list of
+    ``(user_id, category, interaction_type, count, last_seen)`` tuples.
+    Called inside the flush transaction; issues one locking read, one user
+    existence check and one bulk upsert regardless of the batch size.
+    """
+    if not events:
+        return 0
+
+    now = now or timezone.now()
+    events_by_user = defaultdict(list)
+    for user_id, category, interaction_type, count, last_seen in events:
+        events_by_user[user_id].append((category, interaction_type, count, last_seen))
+
+    # Skip users deleted since their events were buffered
+    existing_user_ids = set(
+        get_user_model().objects.filter(id__in=events_by_user).values_list('id', flat=True)
+    )
+    vectors = {
+        vector.user_id: vector
+        for vector in UserPreferenceVector.objects.select_for_update().filter(user_id__in=existing_user_ids)
+    }
+
+    updated = []
+    for user_id in existing_user_ids:
+        vector = vectors.get(user_id)
+        if vector is None:
+            vector = UserPreferenceVector(user_id=user_id, weights=empty_weights(), recent_filters={}, updated_at=now)
+        else:
+            factor = decay_factor(now - vector.updated_at)
+            vector.weights = {category: weight * factor for category, weight in vector.weights.items()}
+            vector.updated_at = now
+
+        for category, interaction_type, count, last_seen in events_by_user[user_id]:
+            _add_event(vector, category, interaction_type, count, last_seen)
+        updated.append(vector)
+
+    UserPreferenceVector.objects.bulk_create(
+        updated,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['weights', 'recent_filters', 'updated_at'],
+    )
+    return len(updated)
+
+
+def rebuild_preference_vector(user_id, now=None):
+    """
+    Recompute a user's vector from ``CategoryInteraction`` and the daily rollups.
+    Used to seed vectors for users who interacted before vectors existed and by
+    ``compact_category_interactions --rebuild-vectors``.
+    """
+    now = now or timezone.now()
+    vector = UserPreferenceVector(user_id=user_id, weights=empty_weights(), recent_filters={}, updated_at=now)
+
+    interactions = CategoryInteraction.objects.filter(user_id=user_id).values_list(
+        'category', 'interaction_type', 'count', 'last_updated'
+    )
+    for category, interaction_type, count, last_updated in interactions:
+        _add_event(vector, category, interaction_type, count, last_updated)
+
+    rollups = CategoryInteractionDaily.objects.filter(user_id=user_id).values_list(
+        'category', 'interaction_type', 'count', 'day'
+    )
+    for category, interaction_type, count, day in rollups:
+        # Rollups only keep the day; treat them as happening at the end of that day
+        occurred_at = datetime.combine(day, time.max, tzinfo=dt_timezone.utc)
+        _add_event(vector, category, interaction_type, count, min(occurred_at, now))
+
+    try:
+        with transaction.atomic():
+            vector, _ = UserPreferenceVector.objects.update_or_create(
+                user_id=user_id,
+                defaults={
+                    'weights': vector.weights,
+                    'recent_filters': vector.recent_filters,
+                    'updated_at': vector.updated_at,
+                },
+            )
+    except IntegrityError:
+        # Concurrently created by the flusher, which is at least as fresh
+        return UserPreferenceVector.objects.get(user_id=user_id)
+
+    return vector
@@ -0,0 +1,74 @@
+"""
+Canonical queries of the post endpoints and jobs, checked with ``python
+manage.py explain_queries`` (see config/query_plans.py). Each one is built
+the way the endpoint builds it, so the plan is the one production runs.
+"""
+
+import math
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from config.query_plans import canonical_query
+from .models import CategoryInteraction, Post, PostStatus, annotate_related_posts_count
+from .views import PostViewSet
+
+PAGE_SIZE = 20
+
+
+@canonical_query('posts.feed')
+def feed(context):
+    """GET /api/posts/: newest main posts, first page"""
+    request = Request(APIRequestFactory().get('/api/posts/', HTTP_HOST='localhost'))
+    request.user = context.user
+    # The auto-end check is its own canonical query (posts.auto_end) and must not write here
+    request._event_status_checked = True
+    view = PostViewSet(request=request, format_kwarg=None, action='list')
+    return view.get_queryset()[:PAGE_SIZE]
+
+
+@canonical_query('posts.auto_end')
+def auto_end(context):
+    """_check_and_update_event_status: happening posts older than 24 hours (every list request)"""
+    return Post.objects.filter(
+        status=PostStatus.HAPPENING,
+        created_at__lt=timezone.now() - timedelta(hours=24)
+    ).values_list('id', flat=True)
+
+
+@canonical_query('posts.related_to')
+def related_to(context):
+    """GET /api/posts/?related_to=: a main post's related posts, newest first"""
+    main_post = Post.objects.filter(related_post__isnull=True).order_by('-created_at').values('id')[:1]
+    return Post.objects.filter(related_post__in=main_post).order_by('-created_at')[:PAGE_SIZE]
+
+
+@canonical_query('posts.user_posts')
+def user_posts(context):
+    """GET /api/posts/user_posts/: one author's posts, first page"""
+    return annotate_related_posts_count(
+        Post.objects.filter(author_id=context.user.id, is_anonymous=False)
+        .select_related('author__profile', 'location')
+        .order_by('-created_at')
+    )[:PAGE_SIZE]
+
+
+@canonical_query('posts.nearby_candidates')
+def nearby_candidates(context):
+    """_get_nearby_posts: last week's posts inside a 5 km bounding box (nearby and recommended)"""
+    radius_km = 5.0
+    lat_range = radius_km / 111.0
+    lng_range = radius_km / (111.0 * math.cos(math.radians(context.latitude)))
+    return Post.objects.select_related('location', 'author__profile').filter(
+        location__latitude__range=(context.latitude - lat_range, context.latitude + lat_range),
+        location__longitude__range=(context.longitude - lng_range, context.longitude + lng_range),
+        created_at__gte=timezone.now() - timedelta(days=7)
+    ).order_by('-created_at')[:100]
+
+
+@canonical_query('posts.stale_category_interactions')
+def stale_category_interactions(context):
+    """compact_category_interactions: interactions not updated within the retention window"""
+    return CategoryInteraction.objects.filter(last_updated__lt=timezone.now() - timedelta(days=90))
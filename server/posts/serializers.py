@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 from accounts.serializers import AccountAuthorSerializer
 from .models import PostCoordinates, Post, PostVote
 from django.db.models import Q, Count
@@ -11,6 +13,180 @@ class PostCoordinatesSerializer(serializers.ModelSerializer):
         model = PostCoordinates
         fields = ['id', 'latitude', 'longitude', 'address']
 
+# Fields that differ per requesting user; everything else is shared and cacheable
+PER_USER_FIELDS = ('user_vote', 'is_saved', 'user_status_vote')
+
+
+# Named field sets the app can request with ?fields=<preset> (combinable with field names)
+FIELD_PRESETS = {
+    # Feed/list cards
+    'card': (
+        'id', 'title', 'content', 'media_urls', 'category', 'location', 'author', 'created_at',
+        'upvotes', 'downvotes', 'honesty_score', 'status', 'is_anonymous', 'user_vote', 'is_saved',
+        'related_posts_count',
+    ),
+    # Map pins
+    'pin': ('id', 'title', 'category', 'location', 'status', 'created_at', 'honesty_score', 'is_anonymous'),
+    # Full post screen
+    'detail': None,
+}
+
+
+def get_requested_fields(request, available):
+    """
+    Field names selected by ``?fields=`` (field names and/or preset names) and
+    ``?exclude=`` on a read request, or None when all ``available`` fields
+    are wanted. Unknown names are ignored; ``id`` is always kept.
+    """
+    if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return None
+    
+    fields_param = request.query_params.get('fields', '')
+    exclude_param = request.query_params.get('exclude', '')
+    if not fields_param and not exclude_param:
+        return None
+    
+    available = list(available)
+    if fields_param:
+        selected = set()
+        for name in (name.strip() for name in fields_param.split(',')):
+            if name in FIELD_PRESETS:
+                selected.update(FIELD_PRESETS[name] or available)
+            elif name in available:
+                selected.add(name)
+    else:
+        selected = set(available)
+    
+    selected.difference_update(name.strip() for name in exclude_param.split(','))
+    selected.add('id')
+    return None if selected.issuperset(available) else selected
+
+
+def wants_normalized_authors(request):
+    """``?shape=normalized``: posts carry ``author_id`` and authors are side-loaded once per page"""
+    return bool(
+        request is not None
+        and request.method in ('GET', 'HEAD', 'OPTIONS')
+        and request.query_params.get('shape') == 'normalized'
+    )
+
+
+def side_load_authors(posts_data, context=None):
+    """
+    Render the ``authors`` map for normalized responses: every author referenced by
+    ``posts_data`` (via ``author_id``) once, with profile usernames loaded in one query.
+    """
+    from accounts.models import Account
+    
+    author_ids = {post['author_id'] for post in posts_data if post.get('author_id') is not None}
+    if not author_ids:
+        return {}
+    authors = Account.objects.filter(id__in=author_ids).select_related('profile')
+    return {
+        author['id']: author
+        for author in AccountAuthorSerializer(authors, many=True, context=context or {}).data
+    }
+
+
+def load_saved_post_ids(user):
+    """Fetch all saved post IDs at once and return them as a set for O(1) lookup"""
+    from accounts.models import UserProfile
+    try:
+        profile = UserProfile.objects.get(user=user)
+        if hasattr(profile, 'saved_posts'):
+            return set(profile.saved_posts.values_list('id', flat=True))
+    except UserProfile.DoesNotExist:
+        pass
+    return set()
+
+
+def prime_user_post_state(request, post_ids, fields=PER_USER_FIELDS):
+    """
+    Page-scoped lookups for the per-user post fields: the user's votes, saved
+    posts and status votes for ``post_ids`` are loaded with at most three queries
+    and stored on the request where the serializer looks for them. Only the
+    lookups backing ``fields`` are run.
+    """
+    if not (request and request.user and request.user.is_authenticated):
+        return
+    
+    from .models import EventStatusVote
+    user = request.user
+    
+    if 'user_vote' in fields:
+        if not hasattr(request, '_cached_user_votes'):
+            request._cached_user_votes = {}
+        missing_ids = [post_id for post_id in post_ids if post_id not in request._cached_user_votes]
+        if missing_ids:
+            user_votes = dict(
+                PostVote.objects.filter(user=user, post_id__in=missing_ids).values_list('post_id', 'is_upvote')
+            )
+            for post_id in missing_ids:
+                is_upvote = user_votes.get(post_id)
+                request._cached_user_votes[post_id] = 0 if is_upvote is None else (1 if is_upvote else -1)
+    
+    if 'is_saved' in fields and not hasattr(request, '_cached_saved_post_ids'):
+        request._cached_saved_post_ids = load_saved_post_ids(user)
+    
+    if 'user_status_vote' not in fields:
+        return
+    if not hasattr(request, '_cached_status_votes'):
+        request._cached_status_votes = {}
+    missing_ids = [post_id for post_id in post_ids if post_id not in request._cached_status_votes]
+    if missing_ids:
+        status_votes = dict(
+            EventStatusVote.objects.filter(user=user, post_id__in=missing_ids).values_list('post_id', 'voted_ended')
+        )
+        for post_id in missing_ids:
+            voted_ended = status_votes.get(post_id)
+            request._cached_status_votes[post_id] = None if voted_ended is None else ('ended' if voted_ended else 'happening')
+
+
+class CachedPostListSerializer(serializers.ListSerializer):
+    """
+    List serializer for posts backed by the two-tier post cache.
+
+    Accepts Post instances or bare post ids (from a cached id list). Shared
+    bodies are read from the cache, only the misses are rendered (ids are
+    loaded in one query), and the per-user fields are overlaid from the
+    page-scoped lookups.
+    """
+    
+    def to_representation(self, data):
+        from django.db.models.manager import BaseManager
+        from .cache import post_cache
+        
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        post_ids = [item if isinstance(item, int) else item.pk for item in items]
+        request = self.context.get('request')
+        variant = post_cache.variant_for(request)
+        if self.child.sparse:
+            # Partial bodies are cached separately per field set
+            variant = f"{variant}|{','.join(sorted(self.child.fields))}"
+        
+        bodies, versions = post_cache.get_bodies(post_ids, variant)
+        
+        missing = [item for item in items if (item if isinstance(item, int) else item.pk) not in bodies]
+        missing_ids = [item for item in missing if isinstance(item, int)]
+        instances = [item for item in missing if not isinstance(item, int)]
+        if missing_ids:
+            instances += list(self.child.load_instances(missing_ids, fields=self.child.fields))
+        self.child.prefetch_counts(instances, fields=self.child.fields)
+        
+        rendered = {instance.pk: self.child.to_shared_representation(instance) for instance in instances}
+        post_cache.set_bodies(rendered, versions, variant)
+        bodies.update(rendered)
+        
+        prime_user_post_state(request, post_ids, fields=self.child.fields)
+        
+        # Copy each body so the overlay never mutates a cached entry
+        return [
+            self.child.overlay_user_fields(dict(bodies[post_id]), post_id)
+            for post_id in post_ids
+            if post_id in bodies
+        ]
+
+
 class PostSerializer(serializers.ModelSerializer):
     location = PostCoordinatesSerializer()
     author = AccountAuthorSerializer(read_only=True)
@@ -42,6 +218,72 @@ class PostSerializer(serializers.ModelSerializer):
                            'is_saved', 'related_posts_count', 'is_happening',
                            'is_ended', 'ended_votes_count', 'happening_votes_count',
                            'user_status_vote']
+        list_serializer_class = CachedPostListSerializer
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # Sparse fieldsets: ?fields=card / ?fields=id,title / ?exclude=author
+        request = self.context.get('request')
+        requested = get_requested_fields(request, self.fields)
+        if requested is not None:
+            for field_name in list(self.fields):
+                if field_name not in requested:
+                    self.fields.pop(field_name)
+        
+        # Normalized shape: reference the author by id, authors are side-loaded by the view
+        normalized = wants_normalized_authors(request) and 'author' in self.fields
+        if normalized:
+            self.fields.pop('author')
+            self.fields['author_id'] = serializers.IntegerField(read_only=True)
+        
+        # Non-default field sets are cached as their own body variant
+        self.sparse = requested is not None or normalized
+    
+    @classmethod
+    def load_instances(cls, post_ids, fields=None):
+        """Load posts by id with the relations the requested fields need"""
+        related = [
+            relation for name, relation in (('author', 'author__profile'), ('location', 'location'))
+            if fields is None or name in fields
+        ]
+        return Post.objects.filter(id__in=post_ids).select_related(*related)
+    
+    @classmethod
+    def prefetch_counts(cls, instances, fields=None):
+        """
+        Attach the related-post and status-vote counts to the posts about to be
+        rendered with two grouped queries, instead of three count queries per post.
+        Counts for fields that were not requested are skipped.
+        """
+        from .models import EventStatusVote
+        
+        wants_votes = fields is None or 'ended_votes_count' in fields or 'happening_votes_count' in fields
+        needs_votes = {post.id: post for post in instances if not hasattr(post, '_ended_votes_count')}
+        if wants_votes and needs_votes:
+            vote_counts = {
+                row['post_id']: row
+                for row in EventStatusVote.objects.filter(post_id__in=needs_votes).values('post_id').annotate(
+                    ended=Count('id', filter=Q(voted_ended=True)),
+                    happening=Count('id', filter=Q(voted_ended=False)),
+                )
+            }
+            for post_id, post in needs_votes.items():
+                counts = vote_counts.get(post_id, {})
+                post._ended_votes_count = counts.get('ended', 0)
+                post._happening_votes_count = counts.get('happening', 0)
+        
+        needs_related = {
+            post.id: post for post in instances
+            if post.related_post_id is None and not hasattr(post, '_related_posts_count')
+        }
+        if (fields is None or 'related_posts_count' in fields) and needs_related:
+            related_counts = dict(
+                Post.objects.filter(related_post_id__in=needs_related).values('related_post_id')
+                .annotate(count=Count('id')).values_list('related_post_id', 'count')
+            )
+            for post_id, post in needs_related.items():
+                post._related_posts_count = related_counts.get(post_id, 0)
         
     def create(self, validated_data):
         print(f"🔍 PostSerializer.create received validated_data: {validated_data}")
@@ -118,6 +360,10 @@ class PostSerializer(serializers.ModelSerializer):
             print(f"🔍 PostSerializer.create: Linking post {post.id} to similar post {similar_post.id}")
             post.related_post = similar_post
             post.save()
+            
+            # The post left the main-post lists it was just added to
+            from .cache import post_cache
+            post_cache.invalidate_lists_on_commit()
         else:
             print(f"🔍 PostSerializer.create: No similar posts found - post {post.id} will be a main post")
             
@@ -125,7 +371,10 @@ class PostSerializer(serializers.ModelSerializer):
     
     def get_related_posts_count(self, obj):
         """Get the count of posts related to this post"""
-        if obj.related_post is None:  # This is a main post
+        if obj.related_post_id is None:  # This is a main post
+            # Use the annotated/prefetched count when available to avoid a query per post
+            if hasattr(obj, '_related_posts_count'):
+                return obj._related_posts_count
             return Post.objects.filter(related_post=obj).count()
         return 0
     
@@ -196,57 +445,80 @@ class PostSerializer(serializers.ModelSerializer):
         return c * r
     
     def to_representation(self, instance):
-        # Call the parent class's to_representation to get the default representation
-        representation = super().to_representation(instance)
+        representation = self.to_shared_representation(instance)
+        self.overlay_user_fields(representation, instance.id)
         
-        # If there's a request context, set the user_vote field
-        request = self.context.get('request')
-        if request and request.user and request.user.is_authenticated:
-            user = request.user
-            
-            # Use cached votes if available (added in get_queryset)
-            if hasattr(request, '_cached_user_votes'):
-                user_vote = request._cached_user_votes.get(instance.id, 0)
-                representation['user_vote'] = user_vote
-                setattr(instance, '_user_vote', user_vote)
-            else:
-                try:
-                    vote = PostVote.objects.get(user=user, post=instance)
-                    representation['user_vote'] = 1 if vote.is_upvote else -1
-                    # Also set on the instance for internal use
-                    setattr(instance, '_user_vote', 1 if vote.is_upvote else -1)
-                except PostVote.DoesNotExist:
-                    representation['user_vote'] = 0
-                    setattr(instance, '_user_vote', 0)
-        else:
-            representation['user_vote'] = 0
-            setattr(instance, '_user_vote', 0)
+        # Also set on the instance for internal use
+        if 'user_vote' in representation:
+            setattr(instance, '_user_vote', representation['user_vote'])
+        
+        return representation
+    
+    def to_shared_representation(self, instance):
+        """
+        Render every field except the per-user ones. The result is identical for
+        all users, which is what the post cache stores.
+        """
+        ret = {}
+        for field in self._readable_fields:
+            if field.field_name in PER_USER_FIELDS:
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
             
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+        return ret
+    
+    def overlay_user_fields(self, representation, post_id):
+        """Fill in user_vote, is_saved and user_status_vote for the requesting user"""
+        if 'user_vote' in self.fields:
+            representation['user_vote'] = self._get_user_vote(post_id)
+        if 'is_saved' in self.fields:
+            representation['is_saved'] = self._get_is_saved(post_id)
+        if 'user_status_vote' in self.fields:
+            representation['user_status_vote'] = self._get_user_status_vote(post_id)
         return representation
     
-    def get_is_saved(self, obj):
+    def _get_authenticated_request(self):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            user = request.user
-            
-            # Get the cached saved post IDs from the context if they exist
-            if not hasattr(request, '_cached_saved_post_ids'):
-                from accounts.models import UserProfile
-                try:
-                    profile = UserProfile.objects.get(user=user)
-                    if hasattr(profile, 'saved_posts'):
-                        # Fetch all saved post IDs at once and store them in a set for O(1) lookup
-                        request._cached_saved_post_ids = set(profile.saved_posts.values_list('id', flat=True))
-                    else:
-                        request._cached_saved_post_ids = set()
-                except UserProfile.DoesNotExist:
-                    request._cached_saved_post_ids = set()
-            
-            # Use the cached set for fast lookup
-            is_saved = obj.id in request._cached_saved_post_ids
-            return is_saved
-            
-        return False
+        if request and request.user and request.user.is_authenticated:
+            return request
+        return None
+    
+    def _get_user_vote(self, post_id):
+        """Get the user's vote: 1 = upvoted, -1 = downvoted, 0 = no vote"""
+        request = self._get_authenticated_request()
+        if request is None:
+            return 0
+        
+        # Use the votes primed for the page (see prime_user_post_state)
+        cached_votes = getattr(request, '_cached_user_votes', {})
+        if post_id in cached_votes:
+            return cached_votes[post_id]
+        
+        try:
+            vote = PostVote.objects.get(user=request.user, post_id=post_id)
+            return 1 if vote.is_upvote else -1
+        except PostVote.DoesNotExist:
+            return 0
+    
+    def get_is_saved(self, obj):
+        return self._get_is_saved(obj.id)
+    
+    def _get_is_saved(self, post_id):
+        request = self._get_authenticated_request()
+        if request is None:
+            return False
+        
+        # Get the cached saved post IDs from the context if they exist
+        if not hasattr(request, '_cached_saved_post_ids'):
+            request._cached_saved_post_ids = load_saved_post_ids(request.user)
+        
+        # Use the cached set for fast lookup
+        return post_id in request._cached_saved_post_ids
     
     def get_is_happening(self, obj):
         """Check if the event is currently happening"""
@@ -271,31 +543,34 @@ class PostSerializer(serializers.ModelSerializer):
         return obj.get_happening_votes_count()
     
     def get_user_status_vote(self, obj):
+        return self._get_user_status_vote(obj.id)
+    
+    def _get_user_status_vote(self, post_id):
         """Get the current user's vote on whether this event has ended"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            # Check if we have cached status votes
-            if hasattr(request, '_cached_status_votes'):
-                # Return cached status vote if available
-                if obj.id in request._cached_status_votes:
-                    return request._cached_status_votes[obj.id]
-            else:
-                # Create the cache if it doesn't exist
-                request._cached_status_votes = {}
-                
-            # If not in cache, query the database
-            from .models import EventStatusVote
-            try:
-                vote = EventStatusVote.objects.get(user=request.user, post=obj)
-                status_vote = 'ended' if vote.voted_ended else 'happening'
-                # Cache the result for future use
-                request._cached_status_votes[obj.id] = status_vote
-                return status_vote
-            except EventStatusVote.DoesNotExist:
-                # Cache the null result as well
-                request._cached_status_votes[obj.id] = None
-                return None  # User hasn't voted on status
-        return None
+        request = self._get_authenticated_request()
+        if request is None:
+            return None
+        
+        # Check if we have cached status votes
+        if hasattr(request, '_cached_status_votes'):
+            # Return cached status vote if available
+            if post_id in request._cached_status_votes:
+                return request._cached_status_votes[post_id]
+        else:
+            # Create the cache if it doesn't exist
+            request._cached_status_votes = {}
+            
+        # If not in cache, query the database
+        from .models import EventStatusVote
+        try:
+            vote = EventStatusVote.objects.get(user=request.user, post_id=post_id)
+            status_vote = 'ended' if vote.voted_ended else 'happening'
+        except EventStatusVote.DoesNotExist:
+            status_vote = None  # User hasn't voted on status
+        
+        # Cache the result (including the null result) for future use
+        request._cached_status_votes[post_id] = status_vote
+        return status_vote
 
 class PostVoteSerializer(serializers.ModelSerializer):
     class Meta:
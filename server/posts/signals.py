@@ -2,9 +2,18 @@
 Signal handlers for post-related models.
 """
 
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import EventStatusVote, Post, PostStatus
+from accounts.models import Account, UserProfile
+from .cache import post_cache
+from .models import EventStatusVote, Post, PostChange, PostChangeKind, PostStatus, PostVote
+
+# Account fields rendered inside cached post bodies (AccountAuthorSerializer);
+# Account.from_db snapshots them as the directory fields
+AUTHOR_RENDERED_FIELDS = {'email', 'first_name', 'last_name', 'profile_picture', 'is_admin'}
+assert AUTHOR_RENDERED_FIELDS <= set(Account.DIRECTORY_FIELDS)
+
 
 @receiver(post_save, sender=EventStatusVote)
 def check_event_status_after_vote(sender, instance, created, **kwargs):
@@ -22,3 +31,71 @@ def check_event_status_after_vote(sender, instance, created, **kwargs):
                 post.event_status = PostStatus.ENDED  # Update both status fields
                 post.save(update_fields=['status', 'event_status'])
                 print(f"Post '{post.title}' (ID: {post.id}) marked as ENDED based on votes.")
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def track_post_change(sender, instance, created=False, **kwargs):
+    """
+    Drop cached bodies for a saved/deleted post (vote counters and status live on
+    the post row) and for its main post, whose related_posts_count may change.
+    The post itself bumps its version in Post.save; the main post is bumped here.
+    Every save and delete is appended to the PostChange log.
+    """
+    if kwargs.get('signal') is post_delete:
+        kind = PostChangeKind.DELETED
+    elif created:
+        kind = PostChangeKind.CREATED
+    elif instance.status == PostStatus.ENDED and 'status' in (kwargs.get('update_fields') or ()):
+        kind = PostChangeKind.ENDED
+    else:
+        kind = PostChangeKind.UPDATED
+    PostChange.record([instance.id], kind)
+    
+    Post.bump_versions([instance.related_post_id])
+    post_cache.invalidate_posts_on_commit([instance.id, instance.related_post_id])
+    if created or kwargs.get('signal') is post_delete:
+        post_cache.invalidate_lists_on_commit()
+
+
+@receiver(post_save, sender=PostVote)
+@receiver(post_delete, sender=PostVote)
+@receiver(post_save, sender=EventStatusVote)
+@receiver(post_delete, sender=EventStatusVote)
+def invalidate_cached_post_after_vote(sender, instance, **kwargs):
+    """Votes and status votes change the rendered counters of their post"""
+    Post.bump_versions([instance.post_id], kind=PostChangeKind.VOTED)
+    post_cache.invalidate_posts_on_commit([instance.post_id])
+
+
+@receiver(pre_save, sender=get_user_model())
+def note_author_changes(sender, instance, **kwargs):
+    """
+    Compare the rendered author fields with the values loaded from the
+    database; runs before record_directory_change moves the snapshot on.
+    """
+    loaded = getattr(instance, '_loaded_directory', None)
+    instance._author_changed = loaded is None or loaded != instance.directory_snapshot()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_author_posts(sender, instance, created, update_fields=None, **kwargs):
+    """Cached post bodies embed the author, so re-render them when author fields change"""
+    if created or not getattr(instance, '_author_changed', True):
+        return
+    if update_fields is not None and not AUTHOR_RENDERED_FIELDS.intersection(update_fields):
+        return
+    post_ids = list(Post.objects.filter(author_id=instance.id).values_list('id', flat=True))
+    Post.bump_versions(post_ids)
+    post_cache.invalidate_posts_on_commit(post_ids)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_cached_posts_after_username_change(sender, instance, created, **kwargs):
+    """The author display name comes from the profile username"""
+    if created or getattr(instance, '_loaded_username', None) == instance.username:
+        return
+    instance._loaded_username = instance.username
+    post_ids = list(Post.objects.filter(author_id=instance.user_id).values_list('id', flat=True))
+    Post.bump_versions(post_ids)
+    post_cache.invalidate_posts_on_commit(post_ids)
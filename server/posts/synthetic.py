@@ -0,0 +1,558 @@
+"""
+Deterministic synthetic dataset for load tests and benchmarks.
+
+``SyntheticDataset`` writes users, profiles, a follow graph, posts clustered
+around the cities below, votes, status votes, saves, category interactions,
+preference vectors and notification history. Everything drawn from the
+random generator depends only on the seed and the requested volumes, so two
+runs with the same arguments produce the same rows (timestamps are offsets
+from the time of the run).
+
+Rows bypass the ORM: on PostgreSQL each table is loaded with ``COPY FROM
+STDIN`` in batches, elsewhere with ``bulk_create``. Neither calls ``save()``
+or sends signals, so no Firestore sync, PostChange or DirectoryChange rows
+are produced. Primary keys of users, profiles, locations and posts are
+reserved up front from the table sequences so foreign keys can be written
+without reading rows back.
+
+Used by ``python manage.py generate_dataset``.
+"""
+
+import bisect
+import csv
+import io
+import json
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import Account, UserProfile
+from accounts.search import followers_total_subquery, normalize_search_text
+from notifications.models import NotificationHistory
+from .models import (
+    CategoryInteraction, EventStatusVote, Post, PostCoordinates, PostStatus, PostVote,
+    UserPreferenceVector,
+)
+from .preferences import INTERACTION_WEIGHTS, decay_factor, empty_weights
+
+# Cities from the old generate_palestinian_data.py / scripts/add_palestine_data.py,
+# with a relative weight for how much activity each one gets
+CITIES = [
+    {'name': 'Gaza City', 'latitude': 31.5017, 'longitude': 34.4668, 'weight': 10,
+     'addresses': ['Omar Al-Mukhtar St', 'Al-Wehda St', 'Al-Remal', 'Al-Shati Refugee Camp', 'Al-Nasser']},
+    {'name': 'Khan Younis', 'latitude': 31.3546, 'longitude': 34.3088, 'weight': 6,
+     'addresses': ['Al-Balad', 'Al-Mawasi', 'Bani Suheila', 'Abasan Al-Kabira', 'Qarara']},
+    {'name': 'Rafah', 'latitude': 31.2935, 'longitude': 34.2506, 'weight': 5,
+     'addresses': ['Al-Salam', 'Yibna Camp', 'Brazil', 'Al-Shaboura', 'Tel Al-Sultan']},
+    {'name': 'Jabalia', 'latitude': 31.5272, 'longitude': 34.4853, 'weight': 4,
+     'addresses': ['Jabalia Camp', 'Beit Lahia', 'Beit Hanoun', 'Al-Nazla', 'Al-Fakhoura']},
+    {'name': 'Deir Al-Balah', 'latitude': 31.4202, 'longitude': 34.3511, 'weight': 4,
+     'addresses': ['Al-Nuseirat', 'Al-Bureij', 'Al-Maghazi', 'Al-Zawaida', 'Al-Musaddar']},
+    {'name': 'Nablus', 'latitude': 32.2211, 'longitude': 35.2544, 'weight': 5,
+     'addresses': ['Old City', 'Rafidia', 'Al-Makhfiya', 'New Askar', 'Balata Camp']},
+    {'name': 'Hebron', 'latitude': 31.5326, 'longitude': 35.0998, 'weight': 5,
+     'addresses': ['Old City', 'Wadi Al-Hariya', 'Ein Sara', 'Halhul', 'Al-Hawooz']},
+    {'name': 'Ramallah', 'latitude': 31.9039, 'longitude': 35.2042, 'weight': 6,
+     'addresses': ['Al-Manara Square', 'Al-Tireh', 'Al-Masyoun', 'Birzeit', 'Al-Amari Camp']},
+    {'name': 'Bethlehem', 'latitude': 31.7054, 'longitude': 35.2038, 'weight': 3,
+     'addresses': ['Manger Square', 'Al-Karkafa', 'Beit Sahour', 'Beit Jala', 'Aida Camp']},
+    {'name': 'Jenin', 'latitude': 32.4650, 'longitude': 35.2956, 'weight': 4,
+     'addresses': ['Jenin Camp', 'Al-Marah', 'Wadi Burqin', 'Al-Basatin', 'Al-Zahrawy']},
+    {'name': 'Tulkarm', 'latitude': 32.3053, 'longitude': 35.0283, 'weight': 3,
+     'addresses': ['Tulkarm Camp', 'Nur Shams', 'Iktaba', 'Dannaba', 'Zeita']},
+    {'name': 'Qalqilya', 'latitude': 32.1896, 'longitude': 34.9683, 'weight': 2,
+     'addresses': ['City Center', 'Eastern Quarter', 'Kafr Saba', 'Habla', 'Azzun']},
+    {'name': 'Jericho', 'latitude': 31.8566, 'longitude': 35.4542, 'weight': 2,
+     'addresses': ['Ein al-Sultan', 'Aqabat Jaber', 'Al-Duyuk', 'Al-Nuweima', 'Al-Auja']},
+    {'name': 'East Jerusalem', 'latitude': 31.7834, 'longitude': 35.2695, 'weight': 5,
+     'addresses': ['Old City', 'Sheikh Jarrah', 'Silwan', 'Wadi al-Joz', 'Mount of Olives']},
+]
+
+FIRST_NAMES = [
+    'Ahmad', 'Mohammed', 'Omar', 'Yousef', 'Khaled', 'Ibrahim', 'Mahmoud', 'Hassan', 'Ali', 'Sami',
+    'Fatima', 'Aisha', 'Mariam', 'Layla', 'Noor', 'Huda', 'Rania', 'Salma', 'Dina', 'Yasmin',
+]
+LAST_NAMES = [
+    'Khalil', 'Haddad', 'Nasser', 'Saleh', 'Odeh', 'Barghouti', 'Masri', 'Qasem', 'Hamdan', 'Awad',
+    'Shaheen', 'Zaid', 'Darwish', 'Abbas', 'Jaber', 'Salem', 'Hijazi', 'Tamimi', 'Khoury', 'Najjar',
+]
+
+# Categories weighted roughly like real traffic: lots of news and alerts, few education posts
+CATEGORY_WEIGHTS = {
+    'news': 14, 'event': 10, 'alert': 9, 'military': 7, 'casualties': 5, 'explosion': 4, 'politics': 6,
+    'sports': 4, 'health': 4, 'traffic': 8, 'weather': 5, 'crime': 3, 'community': 7, 'disaster': 2,
+    'environment': 2, 'education': 2, 'fire': 3, 'other': 5,
+}
+
+TITLE_TEMPLATES = [
+    '{category} report near {address}',
+    'Update from {address}, {city}',
+    '{category}: situation in {city}',
+    'Residents of {address} report {category}',
+    'Breaking: {category} in {city}',
+]
+
+NOTIFICATION_TEMPLATES = [
+    ('new_follower', 'New follower', '{name} started following you'),
+    ('nearby_event', 'Nearby event', 'Something is happening in {city}'),
+    ('new_event', 'New event', '{name} posted in {city}'),
+    ('event_update', 'Event update', 'An event you follow in {city} was updated'),
+    ('system', 'LiveSpot', 'Welcome to LiveSpot'),
+]
+
+EMAIL_DOMAIN = 'synthetic.livespot.test'
+SYNTHETIC_PASSWORD = 'synthetic-password'
+
+HOTSPOTS_PER_CITY = 6
+CITY_SPREAD = 0.02      # Degrees (~2km) between a city centre and its hotspots
+HOTSPOT_SPREAD = 0.003  # Degrees (~300m) between a hotspot and its posts
+
+
+def synthetic_email(seed, index):
+    return f'user{index}.s{seed}@{EMAIL_DOMAIN}'
+
+
+class TableWriter:
+    """
+    Buffer rows for one table and flush them in batches, with COPY on
+    PostgreSQL and ``bulk_create`` elsewhere. ``fields`` are attribute names
+    (``author_id``, not ``author``) in the order of the row tuples.
+
+    Writers that depend on each other are flushed together by the caller
+    (parents first) once the leading one is ``full``, so no row is written
+    before the row its foreign key points at.
+    """
+
+    def __init__(self, model, fields, batch_size):
+        self.model = model
+        self.fields = fields
+        self.batch_size = batch_size
+        self.rows = []
+        self.written = 0
+        self.use_copy = connection.vendor == 'postgresql'
+        if self.use_copy:
+            self.converters = [_copy_converter(model._meta.get_field(name)) for name in fields]
+            columns = ', '.join(
+                connection.ops.quote_name(model._meta.get_field(name).column) for name in fields
+            )
+            self.copy_sql = (
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+                f"FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+            )
+
+    def add(self, row):
+        self.rows.append(row)
+
+    @property
+    def full(self):
+        return len(self.rows) >= self.batch_size
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            converters = self.converters
+            for row in self.rows:
+                writer.writerow([convert(value) if convert else value for convert, value in zip(converters, row)])
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(self.copy_sql, buffer)
+        else:
+            self.model.objects.bulk_create(
+                [self.model(**dict(zip(self.fields, row))) for row in self.rows],
+                batch_size=self.batch_size
+            )
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def _copy_converter(field):
+    """Function turning a Python value into COPY csv text for ``field``, or None if csv can write it as is"""
+    internal_type = field.get_internal_type()
+    if internal_type == 'BooleanField':
+        return lambda value: 't' if value else 'f'
+    if internal_type == 'JSONField':
+        return lambda value: '\\N' if value is None else json.dumps(value)
+    if internal_type in ('DateTimeField', 'DateField'):
+        return lambda value: '\\N' if value is None else value.isoformat()
+    if field.null:
+        return lambda value: '\\N' if value is None else value
+    return None
+
+
+def reserve_ids(model, count):
+    """
+    Reserve ``count`` consecutive primary keys and return them as a range.
+    Assumes nothing else inserts into the table while the dataset is generated.
+    """
+    if count <= 0:
+        return range(0)
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                "GREATEST(nextval(pg_get_serial_sequence(%s, 'id')) - 1, "
+                f"(SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})) + %s)",
+                [table, table, count]
+            )
+            end = cursor.fetchone()[0]
+        return range(end - count + 1, end + 1)
+    start = (model.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+    return range(start, start + count)
+
+
+class SyntheticDataset:
+    """
+    Generate a dataset of the requested size. Volumes are averages per
+    user/post; the exact counts follow from the seed. ``log`` receives one
+    progress line per stage.
+    """
+
+    def __init__(self, users, posts, seed=1, follows_per_user=20, votes_per_post=4, status_votes_per_post=1,
+                 saves_per_user=5, related_ratio=0.2, notifications_per_user=5, days=30, batch_size=20000,
+                 log=None):
+        self.users = users
+        self.posts = posts
+        self.seed = seed
+        self.follows_per_user = min(follows_per_user, max(users - 1, 0))
+        self.votes_per_post = votes_per_post
+        self.status_votes_per_post = status_votes_per_post
+        self.saves_per_user = saves_per_user
+        self.related_ratio = related_ratio
+        self.notifications_per_user = notifications_per_user
+        self.days = days
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.rng = random.Random(seed)
+        self.counts = {}
+
+    def generate(self):
+        start = time.perf_counter()
+        self._build_hotspots()
+        self._stage('users', self._write_users)
+        self._stage('follows', self._write_follows)
+        self._stage('posts', self._write_posts)
+        self._stage('saves', self._write_saves)
+        self._stage('interactions', self._write_interactions)
+        self._stage('notifications', self._write_notifications)
+        self._finish()
+        self.counts['seconds'] = round(time.perf_counter() - start, 2)
+        return self.counts
+
+    def _stage(self, name, write):
+        start = time.perf_counter()
+        counts = write()
+        seconds = time.perf_counter() - start
+        self.counts.update(counts)
+        rows = sum(counts.values())
+        self.log(
+            f'{name}: ' + ', '.join(f'{count} {table}' for table, count in counts.items())
+            + f' in {seconds:.1f}s ({rows / seconds if seconds else 0:,.0f} rows/s)'
+        )
+
+    def _build_hotspots(self):
+        # Each city gets a few activity centres; posts scatter around one of them
+        self.hotspots = []
+        for city in CITIES:
+            for _ in range(HOTSPOTS_PER_CITY):
+                self.hotspots.append({
+                    'city': city,
+                    'latitude': self.rng.gauss(city['latitude'], CITY_SPREAD),
+                    'longitude': self.rng.gauss(city['longitude'], CITY_SPREAD),
+                    'weight': city['weight'] * self.rng.uniform(0.2, 1.0),
+                })
+        self.hotspot_weights = list(_cumulative(hotspot['weight'] for hotspot in self.hotspots))
+        self.categories = list(CATEGORY_WEIGHTS)
+        self.category_weights = list(_cumulative(CATEGORY_WEIGHTS.values()))
+
+    def _popular_user(self):
+        """Index of a user, skewed so a few accounts are much more popular than the rest"""
+        return min(int(self.users * self.rng.random() ** 3), self.users - 1)
+
+    def _write_users(self):
+        self.account_ids = reserve_ids(Account, self.users)
+        self.profile_ids = reserve_ids(UserProfile, self.users)
+        password = make_password(SYNTHETIC_PASSWORD)
+        accounts = TableWriter(Account, [
+            'id', 'password', 'is_superuser', 'email', 'first_name', 'last_name', 'google_id', 'is_active',
+            'is_admin', 'is_verified', 'created_at', 'last_login',
+        ], self.batch_size)
+        profiles = TableWriter(UserProfile, [
+            'id', 'user_id', 'username', 'bio', 'location', 'website', 'honesty_score', 'activity_status',
+            'is_verified', 'interests', 'last_active', 'search_text', 'followers_total',
+        ], self.batch_size)
+        self.user_cities = []
+        for index, (account_id, profile_id) in enumerate(zip(self.account_ids, self.profile_ids)):
+            first_name = self.rng.choice(FIRST_NAMES)
+            last_name = self.rng.choice(LAST_NAMES)
+            city = self.hotspots[_pick(self.rng, self.hotspot_weights)]['city']
+            self.user_cities.append(city)
+            created_at = self.now - timedelta(days=self.days + self.rng.uniform(0, 365))
+            last_login = self.now - timedelta(hours=self.rng.expovariate(1 / 48))
+            accounts.add((
+                account_id, password, False, synthetic_email(self.seed, index), first_name, last_name, None, True,
+                False, self.rng.random() < 0.8, created_at, last_login,
+            ))
+            username = f's{self.seed}_{first_name.lower()}{index}'[:30]
+            profiles.add((
+                profile_id, account_id, username, '', city['name'], '',
+                self.rng.randint(40, 100), 'online' if self.rng.random() < 0.1 else 'offline',
+                self.rng.random() < 0.02, [], last_login,
+                normalize_search_text(f'{username} {first_name} {last_name} {synthetic_email(self.seed, index)}'), 0,
+            ))
+            if accounts.full:
+                _flush(accounts, profiles)
+        _flush(accounts, profiles)
+        return {'users': accounts.written, 'profiles': profiles.written}
+
+    def _write_follows(self):
+        # A row (from=A, to=B) in the followers table means B follows A
+        follows = TableWriter(
+            UserProfile.followers.through, ['from_userprofile_id', 'to_userprofile_id'], self.batch_size
+        )
+        for follower in range(self.users):
+            wanted = min(int(self.rng.expovariate(1 / self.follows_per_user)) if self.follows_per_user else 0,
+                         self.users - 1)
+            followed = set()
+            for _ in range(wanted * 3):
+                if len(followed) >= wanted:
+                    break
+                target = self._popular_user()
+                if target != follower:
+                    followed.add(target)
+            for target in sorted(followed):
+                follows.add((self.profile_ids[target], self.profile_ids[follower]))
+            if follows.full:
+                follows.flush()
+        follows.flush()
+        # The user search ranks on the stored totals (see accounts/search.py)
+        UserProfile.objects.filter(
+            id__gte=self.profile_ids.start, id__lt=self.profile_ids.stop
+        ).update(followers_total=followers_total_subquery())
+        return {'follows': follows.written}
+
+    def _write_posts(self):
+        self.location_ids = reserve_ids(PostCoordinates, self.posts)
+        self.post_ids = reserve_ids(Post, self.posts)
+        self.post_hotspots = []
+        locations = TableWriter(PostCoordinates, ['id', 'latitude', 'longitude', 'address'], self.batch_size)
+        posts = TableWriter(Post, [
+            'id', 'title', 'content', 'media_urls', 'category', 'location_id', 'author_id', 'is_anonymous',
+            'created_at', 'updated_at', 'upvotes', 'downvotes', 'honesty_score', 'status', 'is_verified_location',
+            'taken_within_app', 'tags', 'related_post_id', 'version', 'changed_at',
+        ], self.batch_size)
+        votes = TableWriter(PostVote, ['user_id', 'post_id', 'is_upvote', 'created_at'], self.batch_size)
+        status_votes = TableWriter(
+            EventStatusVote, ['user_id', 'post_id', 'voted_ended', 'created_at'], self.batch_size
+        )
+        recent_main_posts = {}  # hotspot index -> (post id, created_at) of its latest main post
+        span = self.days * 86400
+
+        # Posts are generated oldest first so follow-ups always point at an older post
+        offsets = sorted((span * (1 - self.rng.random() ** 2) for _ in range(self.posts)), reverse=True)
+        for post_id, location_id, offset in zip(self.post_ids, self.location_ids, offsets):
+            created_at = self.now - timedelta(seconds=offset)
+            hotspot_index = _pick(self.rng, self.hotspot_weights)
+            hotspot = self.hotspots[hotspot_index]
+            city = hotspot['city']
+            category = self.categories[_pick(self.rng, self.category_weights)]
+            address = f"{self.rng.choice(city['addresses'])}, {city['name']}"
+            author = self._popular_user()
+
+            related_post_id = None
+            main = recent_main_posts.get(hotspot_index)
+            if main and self.rng.random() < self.related_ratio and created_at - main[1] < timedelta(hours=12):
+                related_post_id = main[0]
+            else:
+                recent_main_posts[hotspot_index] = (post_id, created_at)
+
+            voters = _sample(self.rng, self.users, int(self.rng.expovariate(1 / self.votes_per_post))
+                             if self.votes_per_post else 0)
+            upvotes = downvotes = 0
+            truthful = self.rng.random() < 0.85
+            for voter in voters:
+                is_upvote = self.rng.random() < (0.9 if truthful else 0.3)
+                upvotes += is_upvote
+                downvotes += not is_upvote
+                votes.add((self.account_ids[voter], post_id, is_upvote,
+                           created_at + timedelta(minutes=self.rng.uniform(1, 600))))
+            total = upvotes + downvotes
+            honesty_score = int(upvotes / total * 100) if total else 50
+
+            is_old = offset > 86400
+            ended_votes = 0
+            status_voters = _sample(self.rng, self.users, int(self.rng.expovariate(1 / self.status_votes_per_post))
+                                    if self.status_votes_per_post else 0)
+            for voter in status_voters:
+                voted_ended = self.rng.random() < (0.8 if is_old else 0.2)
+                ended_votes += voted_ended
+                status_votes.add((self.account_ids[voter], post_id, voted_ended,
+                                  created_at + timedelta(minutes=self.rng.uniform(5, 900))))
+            ended = is_old or (len(status_voters) >= 3 and ended_votes > len(status_voters) / 2)
+
+            locations.add((
+                location_id,
+                self.rng.gauss(hotspot['latitude'], HOTSPOT_SPREAD),
+                self.rng.gauss(hotspot['longitude'], HOTSPOT_SPREAD),
+                address,
+            ))
+            posts.add((
+                post_id,
+                TITLE_TEMPLATES[post_id % len(TITLE_TEMPLATES)].format(
+                    category=category.capitalize(), address=address.split(',')[0], city=city['name']
+                )[:100],
+                f'Synthetic {category} post #{post_id} from {address}.',
+                [],
+                category,
+                location_id,
+                self.account_ids[author],
+                self.rng.random() < 0.05,
+                created_at,
+                created_at,
+                upvotes,
+                downvotes,
+                honesty_score,
+                PostStatus.ENDED if ended else PostStatus.HAPPENING,
+                True,
+                self.rng.random() < 0.9,
+                [category, city['name'].lower().replace(' ', '-')],
+                related_post_id,
+                0,
+                created_at,
+            ))
+            self.post_hotspots.append(hotspot_index)
+            if posts.full:
+                _flush(locations, posts, votes, status_votes)
+        _flush(locations, posts, votes, status_votes)
+        return {
+            'locations': locations.written, 'posts': posts.written,
+            'votes': votes.written, 'status votes': status_votes.written,
+        }
+
+    def _write_saves(self):
+        saves = TableWriter(UserProfile.saved_posts.through, ['userprofile_id', 'post_id'], self.batch_size)
+        if self.posts:
+            for profile_id in self.profile_ids:
+                wanted = int(self.rng.expovariate(1 / self.saves_per_user)) if self.saves_per_user else 0
+                for index in sorted(_sample(self.rng, self.posts, wanted)):
+                    saves.add((profile_id, self.post_ids[index]))
+                if saves.full:
+                    saves.flush()
+        saves.flush()
+        return {'saves': saves.written}
+
+    def _write_interactions(self):
+        interactions = TableWriter(CategoryInteraction, [
+            'user_id', 'category', 'interaction_type', 'count', 'created_at', 'last_updated',
+        ], self.batch_size)
+        vectors = TableWriter(UserPreferenceVector, ['user_id', 'weights', 'recent_filters', 'updated_at'],
+                              self.batch_size)
+        for account_id in self.account_ids:
+            weights = empty_weights()
+            recent_filters = {}
+            # Each user cares about a handful of categories
+            favourites = {self.categories[_pick(self.rng, self.category_weights)] for _ in range(3)}
+            for category in sorted(favourites):
+                for interaction_type in INTERACTION_WEIGHTS:
+                    if self.rng.random() < 0.5:
+                        continue
+                    count = 1 + int(self.rng.expovariate(1 / 8))
+                    last_updated = self.now - timedelta(hours=self.rng.uniform(0, self.days * 24))
+                    interactions.add((
+                        account_id, category, interaction_type, count,
+                        last_updated - timedelta(days=self.rng.uniform(0, self.days)), last_updated,
+                    ))
+                    weights[category] += (
+                        count * INTERACTION_WEIGHTS[interaction_type] * decay_factor(self.now - last_updated)
+                    )
+                    if interaction_type == 'filter':
+                        recent_filters[category] = last_updated.isoformat()
+            vectors.add((account_id, weights, recent_filters, self.now))
+            if vectors.full:
+                _flush(interactions, vectors)
+        _flush(interactions, vectors)
+        return {'interactions': interactions.written, 'preference vectors': vectors.written}
+
+    def _write_notifications(self):
+        notifications = TableWriter(NotificationHistory, [
+            'id', 'user_id', 'notification_type', 'title', 'body', 'data', 'sent', 'delivered', 'read',
+            'processed', 'sent_at', 'delivered_at', 'read_at', 'processed_at', 'created_at',
+        ], self.batch_size)
+        for account_id in self.account_ids:
+            wanted = int(self.rng.expovariate(1 / self.notifications_per_user)) if self.notifications_per_user else 0
+            for _ in range(wanted):
+                notification_type, title, body = self.rng.choice(NOTIFICATION_TEMPLATES)
+                created_at = self.now - timedelta(hours=self.rng.uniform(0, self.days * 24))
+                read = self.rng.random() < 0.6
+                data = {}
+                if self.posts and notification_type in ('nearby_event', 'new_event', 'event_update'):
+                    data['post_id'] = str(self.post_ids[self.rng.randrange(self.posts)])
+                notifications.add((
+                    uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                    account_id,
+                    notification_type,
+                    title,
+                    body.format(name=self.rng.choice(FIRST_NAMES), city=self.rng.choice(CITIES)['name']),
+                    data,
+                    True,
+                    True,
+                    read,
+                    read,
+                    created_at,
+                    created_at,
+                    created_at + timedelta(minutes=5) if read else None,
+                    created_at + timedelta(minutes=5) if read else None,
+                    created_at,
+                ))
+            if notifications.full:
+                notifications.flush()
+        notifications.flush()
+        return {'notifications': notifications.written}
+
+    def _finish(self):
+        if connection.vendor == 'postgresql':
+            # Sequences were advanced by reserve_ids; refresh planner statistics for the new volumes
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            return
+        # Rows written with explicit ids don't advance the sequences on other backends
+        from django.core.management.color import no_style
+        statements = connection.ops.sequence_reset_sql(no_style(), [Account, UserProfile, PostCoordinates, Post])
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def _flush(*writers):
+    """Flush dependent writers, parents first"""
+    for writer in writers:
+        writer.flush()
+
+
+def _cumulative(weights):
+    total = 0
+    for weight in weights:
+        total += weight
+        yield total
+
+
+def _pick(rng, cumulative_weights):
+    """Index drawn from precomputed cumulative weights (``random.choices`` without rebuilding them)"""
+    return bisect.bisect_right(cumulative_weights, rng.random() * cumulative_weights[-1])
+
+
+def _sample(rng, population, count):
+    """``count`` distinct indexes below ``population``"""
+    count = min(count, population)
+    if count <= 0:
+        return []
+    return rng.sample(range(population), count)
@@ -1,3 +1,1330 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import msgpack
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.throttling import BaseThrottle
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import Account
+from accounts.search import rebuild_search_index
+from config.benchmarks import compare, summarize
+from config.db_router import ReplicaRouter, RoutingState, current_routing, is_pinned, pin_to_primary
+from config.loadtest import LoadStats, parse_mix
+from config.metrics import RequestSample, current_sample, install_query_timer, request_metrics
+from config.query_plans import compare_plans, find_problems, propose_index
+from config.renderers import MessagePackRenderer
+from notifications.models import FCMToken, NotificationHistory, NotificationQueue
+from .cache import DjangoCacheBackend, post_cache
+from .interactions import InteractionBuffer, interaction_buffer
+from .models import (
+    CategoryInteraction, CategoryInteractionDaily, EventStatusVote, Post, PostCoordinates, PostStatus, PostVote,
+    UserPreferenceVector, annotate_related_posts_count,
+)
+from .preferences import apply_interaction_events
+from .synthetic import SyntheticDataset
+from .votes import apply_vote_operations
+
+
+class InteractionBufferTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(
+            email='buffer@example.com',
+            first_name='Buffer',
+            last_name='User',
+            password='testpassword123'
+        )
+        self.buffer = InteractionBuffer()
+
+    @override_settings(INTERACTION_INGEST={'FLUSH_INTERVAL': 60})
+    def test_flush_aggregates_events_into_one_row(self):
+        with mock.patch.object(self.buffer, '_ensure_flusher'):
+            for _ in range(3):
+                self.buffer.record(self.user.id, 'news', 'filter')
+            self.buffer.record(self.user.id, 'sports', 'filter')
+
+        self.assertFalse(CategoryInteraction.objects.exists())
+        self.assertEqual(self.buffer.flush(), 2)
+
+        news = CategoryInteraction.objects.get(user=self.user, category='news', interaction_type='filter')
+        self.assertEqual(news.count, 3)
+        self.assertEqual(self.buffer.pending_count(), 0)
+
+    @override_settings(INTERACTION_INGEST={'FLUSH_INTERVAL': 0})
+    def test_upsert_adds_to_existing_count(self):
+        CategoryInteraction.objects.create(user=self.user, category='news', interaction_type='filter', count=5)
+
+        self.buffer.record(self.user.id, 'news', 'filter', count=2)
+
+        interaction = CategoryInteraction.objects.get(user=self.user, category='news', interaction_type='filter')
+        self.assertEqual(interaction.count, 7)
+
+    @override_settings(INTERACTION_INGEST={'FLUSH_INTERVAL': 0})
+    def test_events_for_deleted_users_are_dropped(self):
+        self.buffer.record(self.user.id + 1000, 'news', 'filter')
+
+        self.assertFalse(CategoryInteraction.objects.exists())
+        self.assertEqual(self.buffer.pending_count(), 0)
+
+    @override_settings(INTERACTION_INGEST={'FLUSH_INTERVAL': 60})
+    def test_category_filter_does_not_write_on_read_path(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with mock.patch.object(interaction_buffer, '_ensure_flusher'):
+            response = client.get('/api/posts/', {'category': 'news'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CategoryInteraction.objects.exists())
+
+        interaction_buffer.flush()
+        self.assertEqual(
+            CategoryInteraction.objects.get(user=self.user, category='news').count, 1
+        )
+
+
+@override_settings(PREFERENCE_VECTOR={'HALF_LIFE_HOURS': 24, 'RETENTION_DAYS': 30})
+class PreferenceVectorTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(
+            email='prefs@example.com',
+            first_name='Prefs',
+            last_name='User',
+            password='testpassword123'
+        )
+
+    def test_flush_updates_vector_with_decay(self):
+        start = timezone.now() - timedelta(hours=24)
+        apply_interaction_events([(self.user.id, 'news', 'filter', 2, start)], now=start)
+
+        vector = UserPreferenceVector.objects.get(user=self.user)
+        self.assertAlmostEqual(vector.weights['news'], 4.0)
+        self.assertEqual(vector.weights['sports'], 0.0)
+
+        now = timezone.now()
+        apply_interaction_events([(self.user.id, 'sports', 'view', 1, now)], now=now)
+
+        vector.refresh_from_db()
+        # One half-life later the news weight has halved
+        self.assertAlmostEqual(vector.weights['news'], 2.0, places=3)
+        self.assertAlmostEqual(vector.weights['sports'], 1.0, places=3)
+
+        preferences, has_preferences = vector.get_preferences(now=now)
+        self.assertTrue(has_preferences)
+        self.assertAlmostEqual(preferences['news'], 2.0 / 3.0, places=3)
+        self.assertNotIn('fire', preferences)
+        self.assertIn('news', vector.recent_filters)
+
+    def test_vector_is_seeded_from_existing_interactions(self):
+        CategoryInteraction.objects.create(user=self.user, category='health', interaction_type='filter', count=3)
+
+        vector = UserPreferenceVector.for_user(self.user)
+
+        self.assertGreater(vector.weights['health'], 0)
+        self.assertTrue(UserPreferenceVector.objects.filter(user=self.user).exists())
+        preferences, has_preferences = vector.get_preferences()
+        self.assertTrue(has_preferences)
+        self.assertAlmostEqual(preferences['health'], 1.0)
+
+    def test_user_without_interactions_gets_balanced_defaults(self):
+        preferences, has_preferences = UserPreferenceVector.for_user(self.user).get_preferences()
+
+        self.assertFalse(has_preferences)
+        self.assertEqual(len(set(preferences.values())), 1)
+
+    def test_compaction_moves_stale_interactions_into_daily_rollups(self):
+        old = CategoryInteraction.objects.create(user=self.user, category='news', interaction_type='filter', count=4)
+        CategoryInteraction.objects.filter(id=old.id).update(last_updated=timezone.now() - timedelta(days=40))
+        CategoryInteraction.objects.create(user=self.user, category='sports', interaction_type='filter', count=1)
+
+        call_command('compact_category_interactions', stdout=mock.MagicMock())
+
+        self.assertEqual(list(CategoryInteraction.objects.values_list('category', flat=True)), ['sports'])
+        rollup = CategoryInteractionDaily.objects.get(user=self.user)
+        self.assertEqual((rollup.category, rollup.count), ('news', 4))
+
+
+@override_settings(POST_CACHE={'ENABLED': True, 'BACKEND': 'posts.cache.LocalMemoryBackend', 'OPTIONS': {}})
+class PostCacheTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.author = Account.objects.create_user(
+            email='author@example.com',
+            first_name='Post',
+            last_name='Author',
+            password='testpassword123'
+        )
+        self.voter = Account.objects.create_user(
+            email='voter@example.com',
+            first_name='Post',
+            last_name='Voter',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.post = Post.objects.create(
+            title='Cached post', content='Body', location=location, author=self.author
+        )
+        self.client = APIClient()
+
+    def get_post_data(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        return next(post for post in response.data['results'] if post['id'] == self.post.id)
+
+    def test_shared_body_is_reused_with_per_user_overlay(self):
+        PostVote.objects.create(post=self.post, user=self.voter, is_upvote=True)
+        post_cache.reset_stats()
+
+        author_data = self.get_post_data(self.author)
+        voter_data = self.get_post_data(self.voter)
+
+        self.assertEqual(post_cache.stats()['post_hits'], 1)
+        self.assertEqual(author_data['user_vote'], 0)
+        self.assertEqual(voter_data['user_vote'], 1)
+        self.assertEqual(author_data['title'], voter_data['title'])
+
+    def test_vote_invalidates_cached_body(self):
+        self.assertEqual(self.get_post_data(self.voter)['upvotes'], 0)
+
+        self.client.post(f'/api/posts/{self.post.id}/vote/', {'is_upvote': True}, format='json')
+
+        data = self.get_post_data(self.voter)
+        self.assertEqual(data['upvotes'], 1)
+        self.assertEqual(data['user_vote'], 1)
+
+    def test_list_ids_are_cached_per_filter_set(self):
+        self.get_post_data(self.author)
+        post_cache.reset_stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/posts/')
+        self.assertEqual(post_cache.stats()['list_hits'], 1)
+        # Neither the feed filter nor the post rows are queried again
+        self.assertFalse(any('"posts_post"."title"' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(any('"related_post_id" IS NULL' in query['sql'] for query in queries.captured_queries))
+
+        # Creating a post starts a new list generation
+        Post.objects.create(
+            title='Newer post', content='Body', location=self.post.location, author=self.author
+        )
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_vote_lookup_is_scoped_to_the_page(self):
+        other = Post.objects.create(title='Other post', content='Body', location=self.post.location, author=self.author)
+        PostVote.objects.create(post=other, user=self.voter, is_upvote=False)
+        PostVote.objects.create(post=self.post, user=self.voter, is_upvote=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_post_data(self.voter)['user_vote'], 1)
+        vote_queries = [query['sql'] for query in queries.captured_queries if 'FROM "posts_postvote"' in query['sql']]
+        self.assertEqual(len(vote_queries), 1)
+        self.assertIn('"post_id" IN', vote_queries[0])
+
+    def test_per_process_backend_caps_ttls(self):
+        self.assertFalse(post_cache.backend.shared)
+        self.assertEqual(post_cache.ttl('POST_TTL'), 5)
+        self.assertEqual(post_cache.ttl('LIST_TTL'), 5)
+
+    def test_django_backend_is_shared_only_on_a_cache_server(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }):
+            self.assertFalse(DjangoCacheBackend(ALIAS='default').shared)
+            self.assertTrue(DjangoCacheBackend(ALIAS='shared').shared)
+
+    def test_account_save_without_author_changes_keeps_cached_posts(self):
+        self.get_post_data(self.voter)
+        author = Account.objects.get(pk=self.author.pk)
+        version = Post.objects.get(pk=self.post.pk).version
+
+        author.last_login = timezone.now()
+        author.save()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).version, version)
+
+        author.first_name = 'Renamed'
+        author.save()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).version, version + 1)
+        self.assertEqual(self.get_post_data(self.voter)['author']['first_name'], 'Renamed')
+
+    def test_cached_list_hit_ends_overdue_events(self):
+        self.assertEqual(self.get_post_data(self.voter)['status'], PostStatus.HAPPENING)
+        Post.objects.filter(pk=self.post.pk).update(created_at=timezone.now() - timedelta(hours=25))
+
+        self.assertEqual(self.get_post_data(self.voter)['status'], PostStatus.ENDED)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).status, PostStatus.ENDED)
+
+
+@override_settings(POST_CACHE={'ENABLED': True, 'BACKEND': 'posts.cache.LocalMemoryBackend', 'OPTIONS': {}})
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='etag@example.com',
+            first_name='Etag',
+            last_name='User',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.post = Post.objects.create(
+            title='Main post', content='Body', location=location, author=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assert_not_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unchanged_feed_returns_304_without_serializing(self):
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with mock.patch('posts.serializers.PostSerializer.to_representation') as to_representation:
+            self.assert_not_modified('/api/posts/', etag)
+        to_representation.assert_not_called()
+
+        # Different filter parameters produce different validators
+        other = self.client.get('/api/posts/', {'show_related': 'true'})
+        self.assertNotEqual(other['ETag'], etag)
+
+    def test_votes_and_status_votes_change_validators(self):
+        url = f'/api/posts/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assert_not_modified(url, etag)
+
+        self.client.post(f'/api/posts/{self.post.id}/vote/', {'is_upvote': True}, format='json')
+        voted = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(voted.status_code, 200)
+        self.assertEqual(voted.data['upvotes'], 1)
+
+        self.client.post(f'/api/posts/{self.post.id}/vote_status/', {'event_ended': True}, format='json')
+        status_voted = self.client.get(url, HTTP_IF_NONE_MATCH=voted['ETag'])
+        self.assertEqual(status_voted.status_code, 200)
+
+        feed_etag = self.client.get('/api/posts/')['ETag']
+        EventStatusVote.objects.filter(post=self.post).delete()
+        self.assertEqual(self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=feed_etag).status_code, 200)
+
+    def test_related_posts_change_main_post_validators(self):
+        related_url = f'/api/posts/{self.post.id}/related/'
+        detail_etag = self.client.get(f'/api/posts/{self.post.id}/')['ETag']
+        related_etag = self.client.get(related_url)['ETag']
+        self.assert_not_modified(related_url, related_etag)
+
+        Post.objects.create(
+            title='Related post', content='Body', location=self.post.location,
+            author=self.user, related_post=self.post
+        )
+
+        self.assertEqual(self.client.get(related_url, HTTP_IF_NONE_MATCH=related_etag).status_code, 200)
+        response = self.client.get(f'/api/posts/{self.post.id}/', HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(POST_CHANGES={'SETTLE_SECONDS': 0})
+class PostChangesTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='changes@example.com',
+            first_name='Changes',
+            last_name='User',
+            password='testpassword123'
+        )
+        self.location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.post = Post.objects.create(
+            title='Existing post', content='Body', location=self.location, author=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.cursor = self.client.get('/api/posts/changes/').data['cursor']
+
+    def get_changes(self, **params):
+        response = self.client.get('/api/posts/changes/', {'cursor': self.cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_cursor(self):
+        self.assertEqual(self.get_changes()['posts'], [])
+
+        self.client.post(f'/api/posts/{self.post.id}/vote/', {'is_upvote': True}, format='json')
+        created = Post.objects.create(title='New post', content='Body', location=self.location, author=self.user)
+        deleted = Post.objects.create(title='Gone', content='Body', location=self.location, author=self.user)
+        deleted_id = deleted.id
+        deleted.delete()
+
+        data = self.get_changes()
+        self.assertEqual([post['id'] for post in data['posts']], [self.post.id, created.id])
+        self.assertEqual(data['posts'][0]['upvotes'], 1)
+        self.assertEqual(data['deleted'], [deleted_id])
+
+        # The next cursor only returns what changed afterwards
+        self.cursor = data['cursor']
+        EventStatusVote.objects.create(post=created, user=self.user, voted_ended=True)
+        self.assertEqual([post['id'] for post in self.get_changes()['posts']], [created.id])
+
+    def test_bbox_filter_and_limit(self):
+        far_away = PostCoordinates.objects.create(latitude=48.85, longitude=2.35)
+        Post.objects.create(title='Far post', content='Body', location=far_away, author=self.user)
+        self.post.title = 'Edited'
+        self.post.save()
+
+        data = self.get_changes(bbox='35.8,31.9,36.0,32.0')
+        self.assertEqual([post['id'] for post in data['posts']], [self.post.id])
+
+        first_page = self.get_changes(limit=1)
+        self.assertTrue(first_page['has_more'])
+        self.assertEqual(len(first_page['posts']), 1)
+
+    def test_limit_must_be_a_positive_integer(self):
+        for limit in ('-5', '0', 'abc'):
+            response = self.client.get('/api/posts/changes/', {'cursor': self.cursor, 'limit': limit})
+            self.assertEqual(response.status_code, 400, limit)
+
+        # Callers outside the view get a one-change page
+        from .changes import fetch_changes
+        self.post.save()
+        Post.objects.create(title='New post', content='Body', location=self.location, author=self.user)
+        changes = fetch_changes(self.cursor, limit=-5)
+        self.assertEqual((changes['post_ids'], changes['has_more']), ([self.post.id], True))
+
+    def test_invalid_and_expired_cursors(self):
+        response = self.client.get('/api/posts/changes/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+        from .changes import encode_cursor
+        expired = encode_cursor(0, issued_at=timezone.now() - timedelta(days=30))
+        response = self.client.get('/api/posts/changes/', {'cursor': expired})
+        self.assertEqual(response.status_code, 410)
+
+
+class PostBatchTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='batch@example.com',
+            first_name='Batch',
+            last_name='User',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.posts = [
+            Post.objects.create(title=f'Post {index}', content='Body', location=location, author=self.user)
+            for index in range(3)
+        ]
+        PostVote.objects.create(post=self.posts[1], user=self.user, is_upvote=False)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_batch_preserves_order_and_reports_missing(self):
+        ids = [self.posts[2].id, 999999, self.posts[0].id, self.posts[1].id]
+        response = self.client.get('/api/posts/batch/', {'ids': ','.join(str(post_id) for post_id in ids)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post['id'] for post in response.data['posts']], [ids[0], ids[2], ids[3]])
+        self.assertEqual(response.data['missing'], [999999])
+        self.assertEqual(response.data['posts'][2]['user_vote'], -1)
+
+    def test_batch_query_count_does_not_grow_with_ids(self):
+        ids = [post.id for post in self.posts]
+        with CaptureQueriesContext(connection) as one:
+            self.client.post('/api/posts/batch/', {'ids': ids[:1]}, format='json')
+        post_cache.clear()
+        with CaptureQueriesContext(connection) as three:
+            response = self.client.post('/api/posts/batch/', {'ids': ids}, format='json')
+
+        self.assertEqual(len(response.data['posts']), 3)
+        self.assertEqual(len(one.captured_queries), len(three.captured_queries))
+
+    def test_batch_rejects_too_many_ids(self):
+        response = self.client.post('/api/posts/batch/', {'ids': list(range(1, 102))}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkVoteTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='bulkvote@example.com',
+            first_name='Bulk',
+            last_name='Voter',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.posts = [
+            Post.objects.create(title=f'Post {index}', content='Body', location=location, author=self.user)
+            for index in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def submit(self, operations):
+        return self.client.post('/api/posts/bulk_vote/', {'operations': operations}, format='json')
+
+    def test_operations_are_applied_with_final_state(self):
+        first, second, third = self.posts
+        PostVote.objects.create(post=second, user=self.user, is_upvote=True)
+        Post.objects.filter(id=second.id).update(upvotes=1)
+
+        response = self.submit([
+            {'key': 'a', 'type': 'vote', 'post_id': first.id, 'vote': -1, 'client_timestamp': '2026-01-01T10:00:00Z'},
+            {'key': 'b', 'type': 'vote', 'post_id': first.id, 'vote': 1, 'client_timestamp': '2026-01-01T10:05:00Z'},
+            {'key': 'c', 'type': 'vote', 'post_id': second.id, 'vote': 0},
+            {'key': 'd', 'type': 'status', 'post_id': third.id, 'event_ended': True},
+            {'key': 'e', 'type': 'vote', 'post_id': 999999, 'vote': 1},
+            {'key': 'f', 'type': 'vote', 'post_id': first.id, 'vote': 5},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['result'] for result in response.data['results']],
+            ['superseded', 'applied', 'applied', 'applied', 'missing', 'invalid']
+        )
+        states = response.data['posts']
+        self.assertEqual((states[first.id]['upvotes'], states[first.id]['user_vote']), (1, 1))
+        self.assertEqual((states[second.id]['upvotes'], states[second.id]['user_vote']), (0, 0))
+        self.assertEqual(states[third.id]['user_status_vote'], 'ended')
+        self.assertFalse(PostVote.objects.filter(post=second).exists())
+        self.assertEqual(Post.objects.get(id=first.id).honesty_score, 100)
+
+    def test_replayed_keys_are_not_applied_twice(self):
+        operations = [{'key': 'same', 'type': 'vote', 'post_id': self.posts[0].id, 'vote': 1}]
+        self.submit(operations)
+        version = Post.objects.get(id=self.posts[0].id).version
+
+        response = self.submit(operations)
+
+        self.assertEqual(response.data['results'][0]['result'], 'duplicate')
+        post = Post.objects.get(id=self.posts[0].id)
+        self.assertEqual((post.upvotes, post.version), (1, version))
+
+    def test_too_many_operations_are_rejected(self):
+        operations = [{'key': str(index), 'type': 'vote', 'post_id': 1, 'vote': 1} for index in range(501)]
+        self.assertEqual(self.submit(operations).status_code, 400)
+
+    def test_naive_client_timestamps_are_utc(self):
+        post = self.posts[0]
+        response = self.submit([
+            {'key': 'a', 'type': 'vote', 'post_id': post.id, 'vote': 1, 'client_timestamp': '2026-01-01T10:05:00'},
+            {'key': 'b', 'type': 'vote', 'post_id': post.id, 'vote': -1, 'client_timestamp': '2026-01-01T12:00:00+03:00'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['result'] for result in response.data['results']], ['applied', 'superseded'])
+        self.assertEqual(response.data['posts'][post.id]['user_vote'], 1)
+
+
+class ConcurrentBulkVoteTests(TransactionTestCase):
+    def test_concurrent_replays_apply_a_key_once(self):
+        user = Account.objects.create_user(
+            email='replay@example.com', first_name='Replay', last_name='Voter', password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        post = Post.objects.create(title='Replayed', content='Body', location=location, author=user)
+        operations = [{'key': 'same', 'type': 'vote', 'post_id': post.id, 'vote': 1}]
+        barrier = threading.Barrier(2)
+        results = []
+
+        def replay():
+            try:
+                barrier.wait()
+                results.append(apply_vote_operations(user, operations)['results'][0]['result'])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=replay) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), ['applied', 'duplicate'])
+        self.assertEqual(Post.objects.get(id=post.id).upvotes, 1)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='sparse@example.com',
+            first_name='Sparse',
+            last_name='User',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.post = Post.objects.create(title='Sparse post', content='Body', location=location, author=self.user)
+        EventStatusVote.objects.create(post=self.post, user=self.user, voted_ended=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields_and_exclude(self):
+        response = self.client.get('/api/posts/', {'fields': 'title,ended_votes_count'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'ended_votes_count'})
+        self.assertEqual(response.data['results'][0]['ended_votes_count'], 1)
+
+        response = self.client.get(f'/api/posts/{self.post.id}/', {'exclude': 'author,content'})
+        self.assertNotIn('author', response.data)
+        self.assertIn('title', response.data)
+
+    def test_presets_prune_queries(self):
+        with CaptureQueriesContext(connection) as full:
+            full_response = self.client.get('/api/posts/batch/', {'ids': self.post.id})
+        post_cache.clear()
+        with CaptureQueriesContext(connection) as pin:
+            pin_response = self.client.get('/api/posts/batch/', {'ids': self.post.id, 'fields': 'pin'})
+
+        self.assertEqual(
+            set(pin_response.data['posts'][0]),
+            {'id', 'title', 'category', 'location', 'status', 'created_at', 'honesty_score', 'is_anonymous'}
+        )
+        self.assertIn('user_status_vote', full_response.data['posts'][0])
+        self.assertFalse(any('posts_eventstatusvote' in query['sql'] for query in pin.captured_queries))
+        self.assertLess(len(pin.captured_queries), len(full.captured_queries))
+
+    def test_sparse_bodies_do_not_leak_into_full_responses(self):
+        self.client.get('/api/posts/', {'fields': 'pin'})
+        response = self.client.get('/api/posts/')
+        self.assertIn('content', response.data['results'][0])
+
+
+class NormalizedAuthorsTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='normalized@example.com',
+            first_name='Normal',
+            last_name='Ized',
+            password='testpassword123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_posts(self, authors, per_author=2, prefix='author'):
+        for index in range(authors):
+            author = Account.objects.create_user(
+                email=f'{prefix}{index}@example.com',
+                first_name='Author',
+                last_name=str(index),
+                password='testpassword123'
+            )
+            for _ in range(per_author):
+                location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+                Post.objects.create(title=f'By {index}', content='Body', location=location, author=author)
+
+    def test_normalized_shape_side_loads_authors_once(self):
+        self._create_posts(authors=2)
+        response = self.client.get('/api/posts/', {'shape': 'normalized'})
+
+        post = response.data['results'][0]
+        self.assertNotIn('author', post)
+        self.assertIn(post['author_id'], response.data['authors'])
+        self.assertEqual(len(response.data['authors']), 2)
+        author = response.data['authors'][post['author_id']]
+        self.assertEqual(author['display_name'], Account.objects.get(id=post['author_id']).profile.username)
+
+    def test_default_shape_embeds_author_with_profile_username(self):
+        self._create_posts(authors=1, per_author=1)
+        response = self.client.get('/api/posts/')
+
+        author = response.data['results'][0]['author']
+        self.assertEqual(author['display_name'], Account.objects.get(id=author['id']).profile.username)
+        self.assertNotIn('authors', response.data)
+
+    def test_side_loading_queries_do_not_grow_with_authors(self):
+        self._create_posts(authors=1)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/posts/', {'shape': 'normalized'})
+        Post.objects.all().delete()
+        post_cache.clear()
+        self._create_posts(authors=5, prefix='other')
+        with CaptureQueriesContext(connection) as many:
+            self.client.get('/api/posts/', {'shape': 'normalized'})
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_username_change_refreshes_cached_author(self):
+        self._create_posts(authors=1, per_author=1)
+        self.client.get('/api/posts/')
+        profile = Post.objects.get().author.profile
+        profile.username = 'renamed_author'
+        profile.save()
+
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.data['results'][0]['author']['display_name'], 'renamed_author')
+
+
+class MessagePackTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(
+            email='msgpack@example.com',
+            first_name='Msg',
+            last_name='Pack',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.post = Post.objects.create(title='Packed', content='Body', location=location, author=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_msgpack_payload_matches_json(self):
+        json_response = self.client.get('/api/posts/')
+        post_cache.clear()
+        packed_response = self.client.get('/api/posts/', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(packed_response['Content-Type'], 'application/msgpack')
+        decoded = msgpack.unpackb(packed_response.content, raw=False, strict_map_key=False)
+        self.assertEqual(decoded, json.loads(json_response.content))
+        self.assertNotEqual(json_response['ETag'], packed_response['ETag'])
+
+    def test_renderer_matches_json_encoding_of_datetimes_and_decimals(self):
+        data = {'at': timezone.now(), 'score': Decimal('4.50'), 'ids': (1, 2)}
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data), raw=False),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+    def test_msgpack_request_body(self):
+        body = msgpack.packb({'operations': [{'key': 'k1', 'type': 'vote', 'post_id': self.post.id, 'vote': 1}]})
+        response = self.client.post('/api/posts/bulk_vote/', body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['result'], 'applied')
+
+        response = self.client.post('/api/posts/bulk_vote/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+    def test_benchmark_command_reports_all_payloads(self):
+        out = StringIO()
+        call_command('benchmark_renderers', iterations=1, stdout=out)
+        for payload in ('nearby', 'recommended', 'notification history'):
+            self.assertIn(f'{payload:<22}msgpack is', out.getvalue())
+
+
+@override_settings(REQUEST_METRICS={'SERVER_TIMING_HEADER': True, 'BUDGETS': {'post-list': {'queries': 1}}})
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        request_metrics.reset()
+        self.user = Account.objects.create_user(
+            email='metrics@example.com',
+            first_name='Metrics',
+            last_name='User',
+            password='testpassword123'
+        )
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        Post.objects.create(title='Measured', content='Body', location=location, author=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_request_is_measured_and_exported(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/')
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+        histograms, responses, exceeded = request_metrics.snapshot()
+        _bounds, _counts, query_total, count = histograms[('livespot_request_queries', 'post-list', 'GET')]
+        self.assertEqual(count, 1)
+        self.assertEqual(query_total, len(queries.captured_queries))
+        self.assertGreater(histograms[('livespot_request_serializer_seconds', 'post-list', 'GET')][2], 0)
+        self.assertEqual(histograms[('livespot_response_bytes', 'post-list', 'GET')][2], len(response.content))
+        self.assertEqual(responses[('post-list', 'GET', 200)], 1)
+        self.assertEqual(exceeded[('post-list', 'queries')], 1)
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('livespot_request_queries_bucket{endpoint="post-list",method="GET",le="+Inf"} 1', body)
+        self.assertIn('livespot_request_budget_exceeded_total{endpoint="post-list",budget="queries"} 1', body)
+        self.assertNotIn('endpoint="metrics"', body)
+
+    @override_settings(REQUEST_METRICS={'TOKEN': 'secret'})
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_metrics_without_token_are_internal_or_staff_only(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code, 403)
+        # A proxy on the same host relays public requests
+        self.assertEqual(self.client.get('/metrics', HTTP_X_FORWARDED_FOR='203.0.113.5').status_code, 403)
+
+        staff = Account.objects.create_user(
+            email='staff@example.com', first_name='Staff', last_name='User', password='testpassword123'
+        )
+        staff.is_admin = True
+        staff.save()
+        access = str(RefreshToken.for_user(staff).access_token)
+        self.assertEqual(
+            self.client.get('/metrics', REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION=f'Bearer {access}').status_code,
+            200
+        )
+
+    def test_queries_in_sync_to_async_threads_are_counted(self):
+        install_query_timer()
+
+        def count_accounts():
+            try:
+                return Account.objects.count()
+            finally:
+                connection.close()
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        try:
+            async_to_sync(sync_to_async(count_accounts, thread_sensitive=False))()
+        finally:
+            current_sample.reset(token)
+        self.assertEqual(sample.queries, 1)
+
+
+@override_settings(DATABASE_ROUTING={'REPLICAS': ['replica1'], 'STICKY_SECONDS': 60})
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        self.user = Account.objects.create_user(email='replica@example.com', password='testpassword123')
+        location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+        self.post = Post.objects.create(title='Replicated', content='Body', location=location, author=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        # Pins need a cache every worker sees; two aliases on one directory stand in for two workers
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        cache_settings = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'worker1': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+            'worker2': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        })
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        routing_settings = override_settings(
+            DATABASE_ROUTING={**settings.DATABASE_ROUTING, 'CACHE': 'worker1'}
+        )
+        routing_settings.enable()
+        self.addCleanup(routing_settings.disable)
+        # There is no replica connection in tests; record the routing decision and read from default
+        patcher = mock.patch('config.db_router.pick_replica', return_value='default')
+        self.pick_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_router_reads_from_the_request_replica_until_it_writes(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Post))
+
+        state = RoutingState(replica='replica1')
+        token = current_routing.set(state)
+        try:
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Post))
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertIsNone(router.db_for_read(Post))
+        finally:
+            current_routing.reset(token)
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
+
+    def test_safe_reads_of_listed_endpoints_use_a_replica(self):
+        self.assertEqual(self.client.get('/api/posts/').status_code, 200)
+        self.assertEqual(self.client.get('/api/notifications/history/').status_code, 200)
+        self.assertEqual(self.pick_replica.call_count, 2)
+
+        self.client.get('/api/accounts/users/directory/')
+        self.assertEqual(self.pick_replica.call_count, 2)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        response = self.client.post(f'/api/posts/{self.post.id}/vote/', {'is_upvote': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.get('/api/posts/')
+        self.assertFalse(self.pick_replica.called)
+        self.assertTrue(is_pinned(self.user.id))
+
+        # Other users aren't affected
+        other = Account.objects.create_user(email='other-replica@example.com', password='testpassword123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other).access_token}')
+        self.client.get('/api/posts/')
+        self.assertEqual(self.pick_replica.call_count, 1)
+
+    def test_failed_writes_do_not_pin(self):
+        response = self.client.post('/api/posts/999999/vote/', {'is_upvote': True}, format='json')
+        self.assertGreaterEqual(response.status_code, 400)
+
+        self.client.get('/api/posts/')
+        self.assertTrue(self.pick_replica.called)
+
+    def test_pins_reach_other_workers_through_a_shared_cache(self):
+        self.client.post(f'/api/posts/{self.post.id}/vote/', {'is_upvote': True}, format='json')
+
+        # The next read is served by another worker
+        with override_settings(DATABASE_ROUTING={**settings.DATABASE_ROUTING, 'CACHE': 'worker2'}):
+            self.assertTrue(is_pinned(self.user.id))
+            self.client.get('/api/posts/')
+        self.assertFalse(self.pick_replica.called)
+
+    def test_per_process_pin_caches_keep_reads_on_the_primary(self):
+        with override_settings(
+            CACHES={
+                'worker1': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker1'},
+                'worker2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker2'},
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            },
+        ):
+            pin_to_primary(self.user.id)
+            with override_settings(DATABASE_ROUTING={**settings.DATABASE_ROUTING, 'CACHE': 'worker2'}):
+                # The pin is invisible to the other worker, so it must not read from a replica either
+                self.assertFalse(is_pinned(self.user.id))
+                self.client.get('/api/posts/')
+        self.assertFalse(self.pick_replica.called)
+
+    @override_settings(POST_CACHE={'ENABLED': True, 'BACKEND': 'posts.cache.DjangoCacheBackend', 'OPTIONS': {'ALIAS': 'worker1'}})
+    def test_bodies_read_from_a_replica_get_the_local_ttl(self):
+        self.assertEqual(post_cache.ttl('POST_TTL'), 300)
+        token = current_routing.set(RoutingState(replica='replica1'))
+        try:
+            self.assertEqual(post_cache.ttl('POST_TTL'), 5)
+        finally:
+            current_routing.reset(token)
+
+
+class DenyingThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        return False
+
+    def wait(self):
+        return 30
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.sender = Account.objects.create_user(email='async-sender@example.com', password='testpassword123')
+        self.recipient = Account.objects.create_user(email='async-recipient@example.com', password='testpassword123')
+        FCMToken.objects.create(user=self.sender, token='sender-device', device_platform='android')
+        FCMToken.objects.create(user=self.recipient, token='recipient-device', device_platform='ios')
+        self.client = self._client(self.sender)
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_authentication_and_methods_match_drf(self):
+        response = APIClient().post('/api/notifications/actions/send-direct/', {}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'Authentication credentials were not provided.')
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        anonymous = APIClient()
+        anonymous.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(anonymous.post('/api/notifications/actions/send-direct/').json()['code'], 'token_not_valid')
+
+        self.assertEqual(self.client.get('/api/notifications/actions/send-direct/').status_code, 405)
+        response = self.client.post('/media-api/upload/', {}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'No file provided'})
+
+    def test_errors_match_a_drf_view(self):
+        # send-direct is async, test-notification a DRF view: same statuses, headers and bodies
+        async_path, drf_path = '/api/notifications/actions/send-direct/', '/api/notifications/actions/test-notification/'
+        bad_token = APIClient()
+        bad_token.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        requests = [
+            (APIClient(), 'post', {}),
+            (bad_token, 'post', {}),
+            (self.client, 'get', {}),
+            (self.client, 'post', {'data': '{"broken', 'content_type': 'application/json'}),
+        ]
+        for client, method, kwargs in requests:
+            async_response = getattr(client, method)(async_path, **kwargs)
+            drf_response = getattr(client, method)(drf_path, **kwargs)
+            self.assertEqual(async_response.status_code, drf_response.status_code)
+            self.assertEqual(async_response.json(), drf_response.json())
+            self.assertEqual(async_response.get('WWW-Authenticate'), drf_response.get('WWW-Authenticate'))
+            self.assertEqual(async_response.get('Allow'), drf_response.get('Allow'))
+
+        with mock.patch.object(APIView, 'get_throttles', return_value=[DenyingThrottle()]):
+            async_response = self.client.post(async_path, {}, format='json')
+            drf_response = self.client.post(drf_path, {}, format='json')
+        self.assertEqual(async_response.status_code, 429)
+        self.assertEqual(async_response.json(), drf_response.json())
+        self.assertEqual(async_response['Retry-After'], drf_response['Retry-After'])
+
+    @mock.patch('notifications.views.messaging.send')
+    def test_msgpack_requests_and_responses(self, send):
+        body = msgpack.packb({'recipient_user_id': self.recipient.id, 'title': 'Hi', 'body': 'There'})
+        response = self.client.post(
+            '/api/notifications/actions/send-direct/', body,
+            content_type='application/msgpack', HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content, raw=False)['sent_count'], 1)
+
+    @mock.patch('notifications.views.messaging.send')
+    def test_send_direct_pushes_to_the_recipient_device(self, send):
+        response = self.client.post('/api/notifications/actions/send-direct/', {
+            'recipient_user_id': self.recipient.id, 'title': 'Hi', 'body': 'There', 'data': {'chat': 7},
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sent_count'], 1)
+        message = send.call_args.args[0]
+        self.assertEqual(message.token, 'recipient-device')
+        self.assertEqual(message.data['chat'], '7')
+        self.assertEqual(message.data['sender_id'], str(self.sender.id))
+
+    @mock.patch('notifications.views.messaging.send_multicast')
+    def test_friend_request_round_trip(self, send_multicast):
+        send_multicast.return_value = mock.Mock(success_count=1, failure_count=0)
+
+        response = self.client.post(
+            '/api/notifications/friend-requests/send_request/',
+            {'to_user_id': self.recipient.id, 'message': 'Hi'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['notification_sent'])
+        self.assertEqual(response.json()['to_user']['id'], self.recipient.id)
+        self.assertEqual(send_multicast.call_args.args[0].tokens, ['recipient-device'])
+        request_id = response.json()['id']
+
+        again = self.client.post(
+            '/api/notifications/friend-requests/send_request/', {'to_user_id': self.recipient.id}, format='json'
+        )
+        self.assertEqual(again.status_code, 400)
+        # Only the recipient may answer
+        self.assertEqual(
+            self.client.post(f'/api/notifications/friend-requests/{request_id}/respond/',
+                             {'response': 'accepted'}, format='json').status_code,
+            403
+        )
+
+        response = self._client(self.recipient).post(
+            f'/api/notifications/friend-requests/{request_id}/respond/', {'response': 'accepted'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'accepted')
+        self.assertEqual(send_multicast.call_args.args[0].tokens, ['sender-device'])
+        self.assertEqual(
+            set(NotificationHistory.objects.values_list('notification_type', flat=True)),
+            {'friend_request', 'friend_request_accepted'}
+        )
+
+    @mock.patch('accounts.views.download_profile_picture', return_value=None)
+    def test_google_login_creates_then_logs_in(self, download):
+        data = {'google_id': 'g-async', 'email': 'async-google@example.com', 'first_name': 'Goo',
+                'last_name': 'Gler', 'profile_picture': 'https://example.com/picture.jpg'}
+        response = APIClient().post('/api/accounts/google-login/', data, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_new_account'])
+        self.assertIn('access', response.json()['tokens'])
+        download.assert_called_once_with('https://example.com/picture.jpg')
+        self.assertTrue(Account.objects.get(email='async-google@example.com').is_verified)
+
+        response = APIClient().post('/api/accounts/google-login/', data, format='json')
+        self.assertFalse(response.json()['is_new_account'])
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+    def test_one_event_loop_overlaps_slow_sends(self):
+        out = StringIO()
+        call_command(
+            'benchmark_async_views', '--latency-ms', '100', '--requests', '6', '--concurrency', '6', stdout=out
+        )
+        output = out.getvalue()
+
+        self.assertIn('wsgi (1 sync worker)', output)
+        self.assertIn('asgi (1 event loop)', output)
+        # Six sends of 100 ms: serial on the sync worker, overlapped on the event loop
+        speedup = float(output.split('One event loop served ')[1].split('x')[0])
+        self.assertGreater(speedup, 2)
+        self.assertFalse(FCMToken.objects.filter(token__startswith='benchmark-').exists())
+
+
+class SyntheticDatasetTests(TestCase):
+    def _generate(self, seed=5):
+        return SyntheticDataset(users=30, posts=200, seed=seed, batch_size=50).generate()
+
+    def _signature(self):
+        return [
+            (post.title, post.category, round(post.location.latitude, 6), post.upvotes, post.downvotes,
+             post.author.email, post.related_post.title if post.related_post else None)
+            for post in Post.objects.select_related('location', 'author', 'related_post').order_by('id')
+        ]
+
+    def test_generates_consistent_rows(self):
+        counts = self._generate()
+
+        self.assertEqual(Account.objects.count(), 30)
+        self.assertEqual(Account.objects.filter(profile__isnull=False).count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(PostVote.objects.count(), counts['votes'])
+        self.assertEqual(EventStatusVote.objects.count(), counts['status votes'])
+        self.assertEqual(UserPreferenceVector.objects.count(), 30)
+        # Denormalized counters match the vote rows
+        for post in Post.objects.all()[:50]:
+            self.assertEqual(post.upvotes, post.votes.filter(is_upvote=True).count())
+            self.assertEqual(post.downvotes, post.votes.filter(is_upvote=False).count())
+        # The user search columns are filled in as UserProfile.save would
+        self.assertEqual(rebuild_search_index(dry_run=True), (30, 0))
+        # Follow-ups point at an older post
+        for post in Post.objects.filter(related_post__isnull=False).select_related('related_post'):
+            self.assertLess(post.related_post.created_at, post.created_at)
+        # Reserved ids leave the sequence ahead of the generated rows
+        user = Account.objects.create_user(
+            email='after@example.com', first_name='After', last_name='User', password='testpassword123'
+        )
+        self.assertGreater(user.id, max(Account.objects.exclude(id=user.id).values_list('id', flat=True)))
+
+    def test_same_seed_produces_the_same_dataset(self):
+        self._generate()
+        first = self._signature()
+        Account.objects.all().delete()
+
+        self._generate()
+        self.assertEqual(self._signature(), first)
+
+    def test_command_refuses_an_existing_seed(self):
+        out = StringIO()
+        call_command('generate_dataset', users=5, posts=10, seed=3, dry_run=True, stdout=out)
+        self.assertFalse(Post.objects.exists())
+
+        call_command('generate_dataset', users=5, posts=10, seed=3, stdout=out)
+        self.assertEqual(Post.objects.count(), 10)
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', users=5, posts=10, seed=3, stdout=out)
+
+
+class BenchmarkHarnessTests(TestCase):
+    def setUp(self):
+        post_cache.clear()
+        SyntheticDataset(users=5, posts=20, seed=11).generate()
+
+    def test_summarize_reports_percentiles(self):
+        summary = summarize([float(value) for value in range(1, 101)])
+
+        self.assertEqual(summary['repeat'], 100)
+        self.assertAlmostEqual(summary['p50_ms'], 50.5)
+        self.assertAlmostEqual(summary['p95_ms'], 95.05)
+        self.assertAlmostEqual(summary['p99_ms'], 99.01)
+        self.assertEqual(summary['max_ms'], 100.0)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baseline = {'benchmarks': {
+            'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}, 'c': {'p50_ms': 0.01}, 'gone': {'p50_ms': 1.0},
+        }}
+        report = {'benchmarks': {
+            'a': {'p50_ms': 12.0}, 'b': {'p50_ms': 8.0}, 'c': {'p50_ms': 0.03}, 'new': {'p50_ms': 1.0},
+        }}
+
+        states = {row[0]: row[4] for row in compare(report, baseline, threshold=10)}
+
+        self.assertEqual(states, {'a': 'regressed', 'b': 'improved', 'c': 'ok', 'gone': 'missing', 'new': 'new'})
+
+    def test_command_writes_json_and_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'baseline.json')
+            call_command(
+                'benchmark', 'posts.', size=5, warmup=0, repeat=2, output=output, stdout=StringIO()
+            )
+            with open(output) as results:
+                report = json.load(results)
+            self.assertEqual(
+                set(report['benchmarks']),
+                {'posts.distribute_by_categories', 'posts.find_similar_post', 'posts.recommendation_scoring',
+                 'posts.serializer', 'posts.serializer_cached'}
+            )
+            self.assertIn('p99_ms', report['benchmarks']['posts.serializer'])
+
+            # A baseline far faster than anything measurable makes every benchmark a regression
+            for result in report['benchmarks'].values():
+                result['p50_ms'] = 0.0001
+            with open(output, 'w') as baseline:
+                json.dump(report, baseline)
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark', 'posts.serializer', size=5, warmup=0, repeat=2, compare=output,
+                    min_delta_ms=0, stdout=StringIO()
+                )
+
+    def test_notification_batch_benchmark_rolls_back(self):
+        call_command('benchmark', 'notifications.queue_batch', size=3, warmup=0, repeat=2, stdout=StringIO())
+
+        self.assertFalse(NotificationQueue.objects.exists())
+        self.assertFalse(FCMToken.objects.filter(token__startswith='benchmark-token-').exists())
+        self.assertEqual(NotificationHistory.objects.filter(title='Benchmark event').count(), 0)
+
+
+class QueryPlanTests(TestCase):
+    ROWS = {'posts_post': 1000000, 'posts_postcoordinates': 1000000, 'fcm_tokens': 10}
+
+    def test_seq_scan_under_sort_proposes_partial_index(self):
+        plan = {
+            'Node Type': 'Limit', 'Plans': [{
+                'Node Type': 'Sort', 'Sort Key': ['posts_post.created_at DESC'], 'Plan Rows': 800000, 'Plans': [{
+                    'Node Type': 'Seq Scan', 'Relation Name': 'posts_post', 'Alias': 'posts_post',
+                    'Plan Rows': 800000, 'Filter': '(related_post_id IS NULL)',
+                }],
+            }],
+        }
+
+        findings = find_problems('feed', plan, self.ROWS)
+
+        self.assertEqual([(finding.kind, finding.table) for finding in findings],
+                         [('sort', 'posts_post'), ('seq_scan', 'posts_post')])
+        self.assertEqual(findings[1].columns, [('related_post_id', 'IS NULL'), ('created_at', 'DESC')])
+        proposal = propose_index(findings[1])
+        self.assertEqual(proposal.fields, ['created_at'])
+        self.assertEqual(proposal.condition, 'related_post__isnull=True')
+        self.assertEqual(proposal.existing, 'post_main_created_idx')
+
+    def test_equality_columns_lead_the_proposed_index(self):
+        plan = {
+            'Node Type': 'Seq Scan', 'Relation Name': 'posts_post', 'Alias': 'posts_post', 'Plan Rows': 10,
+            'Filter': "((created_at < '2026-01-01'::timestamp with time zone) AND ((status)::text = 'happening'::text))",
+        }
+
+        finding, = find_problems('auto_end', plan, self.ROWS)
+
+        proposal = propose_index(finding)
+        self.assertEqual(proposal.fields, ['status', 'created_at'])
+        self.assertEqual(proposal.existing, 'post_status_created_idx')
+
+    def test_unindexed_filter_gets_a_new_index_and_small_tables_are_ignored(self):
+        scan = {
+            'Node Type': 'Seq Scan', 'Relation Name': 'posts_post', 'Alias': 'posts_post', 'Plan Rows': 1,
+            'Filter': "((title)::text = 'Fire'::text)",
+        }
+        small = {'Node Type': 'Seq Scan', 'Relation Name': 'fcm_tokens', 'Alias': 'fcm_tokens', 'Plan Rows': 1}
+
+        finding, = find_problems('by_title', scan, self.ROWS)
+        proposal = propose_index(finding)
+
+        self.assertEqual(proposal.fields, ['title'])
+        self.assertIsNone(proposal.existing)
+        self.assertIn('CREATE INDEX CONCURRENTLY', proposal.sql)
+        self.assertEqual(find_problems('tokens', small, self.ROWS), [])
+
+    def test_compare_plans_flags_new_problems_and_cost_jumps(self):
+        def result(cost, signature, findings=()):
+            return {'total_cost': cost, 'signature': signature,
+                    'findings': [{'kind': kind, 'table': table} for kind, table in findings]}
+
+        baseline = {'queries': {
+            'scan': result(10, ['Index Scan on posts_post']),
+            'cost': result(10, ['Index Scan on posts_post']),
+            'plan': result(10, ['Index Scan on posts_post']),
+            'same': result(10, ['Index Scan on posts_post']),
+            'gone': result(10, []),
+        }}
+        report = {'queries': {
+            'scan': result(9, ['Seq Scan on posts_post'], [('seq_scan', 'posts_post')]),
+            'cost': result(100, ['Index Scan on posts_post']),
+            'plan': result(11, ['Bitmap Heap Scan on posts_post']),
+            'same': result(10, ['Index Scan on posts_post']),
+            'new': result(1, []),
+        }}
+
+        states = {row[0]: row[1] for row in compare_plans(report, baseline, cost_threshold=50)}
+
+        self.assertEqual(states, {
+            'scan': 'regressed', 'cost': 'regressed', 'plan': 'changed', 'same': 'ok', 'gone': 'missing', 'new': 'new',
+        })
+
+    def test_command_explains_every_canonical_query(self):
+        SyntheticDataset(users=5, posts=20, seed=12).generate()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'plans.json')
+            call_command('explain_queries', analyze=True, output=output, fail_on_findings=True, stdout=StringIO())
+            with open(output) as plans:
+                report = json.load(plans)
+            self.assertIn('posts.feed', report['queries'])
+            self.assertIn('notifications.queue_pending', report['queries'])
+            self.assertIn('execution_ms', report['queries']['posts.feed'])
+
+            # A baseline that was far cheaper makes every plan a regression
+            for result in report['queries'].values():
+                result['total_cost'] = 0.0001
+            with open(output, 'w') as baseline:
+                json.dump(report, baseline)
+            with self.assertRaises(CommandError):
+                call_command('explain_queries', 'posts.', compare=output, stdout=StringIO())
+
+    def test_related_posts_count_annotation(self):
+        author = Account.objects.create_user(email='plans@example.com', password='pass12345')
+        location = PostCoordinates.objects.create(latitude=31.9, longitude=35.2)
+        main = Post.objects.create(title='Main', content='c', location=location, author=author)
+        lonely = Post.objects.create(title='Lonely', content='c', location=location, author=author)
+        related = [
+            Post.objects.create(title='Son', content='c', location=location, author=author,
+                                related_post=main)
+            for _ in range(2)
+        ]
+
+        counts = dict(annotate_related_posts_count(Post.objects.all()).values_list('id', '_related_posts_count'))
+
+        self.assertEqual(counts, {main.id: 2, lonely.id: 0, related[0].id: 0, related[1].id: 0})
+
+
+class LoadStatsTests(TestCase):
+    def test_parse_mix_rejects_unknown_actions(self):
+        self.assertEqual(parse_mix('feed=3, vote=1'), {'feed': 3.0, 'vote': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('feed=3,teleport=1')
+        with self.assertRaises(ValueError):
+            parse_mix('feed=0')
+
+    def test_stats_report_percentiles_and_error_rate(self):
+        stats = LoadStats()
+        for millis in range(1, 101):
+            stats.record('feed', millis / 1000, 200, True)
+        stats.record('feed', 0.5, 'ReadTimeout', False)
+
+        summary = stats.summary(elapsed=10)
+
+        feed = summary['endpoints']['feed']
+        self.assertEqual(feed['requests'], 101)
+        self.assertEqual(feed['errors'], 1)
+        self.assertAlmostEqual(feed['throughput_rps'], 10.1)
+        self.assertAlmostEqual(feed['p50_ms'], 51.0)
+        self.assertEqual(feed['statuses'], {'200': 100, 'ReadTimeout': 1})
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_virtual_users_replay_the_mix_against_a_live_server(self):
+        SyntheticDataset(users=3, posts=10, seed=21).generate()
+        out = StringIO()
+        output = os.path.join(tempfile.mkdtemp(), 'load.json')
+
+        with mock.patch('accounts.models.sync_user_to_firestore'):
+            call_command(
+                'loadtest', base_url=self.live_server_url, users=2, arrival_rate=0, duration=2, think_time=0,
+                session_actions=5, seed=21, mix='feed=1,nearby=1,notifications=1,vote=1,token_refresh=1',
+                output=output, stdout=out
+            )
+
+        with open(output) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report['virtual_users'], 2)
+        self.assertGreater(report['endpoints']['login']['requests'], 0)
+        self.assertGreater(len(report['endpoints']), 2)
+        for label, row in report['endpoints'].items():
+            self.assertEqual(row['errors'], 0, f"{label}: {row['statuses']}")
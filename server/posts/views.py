@@ -8,10 +8,23 @@ from rest_framework.response import Response
 from django.utils import timezone
 from datetime import datetime, timedelta
 import math  # Adding missing math import
-from .models import Post, PostVote, EventStatusVote, CategoryInteraction
+from .models import (
+    Post, PostVote, EventStatusVote, CategoryInteraction, PostCategory, PostChange, PostChangeKind,
+    annotate_related_posts_count,
+)
+from .interactions import interaction_buffer
+from .cache import post_cache
+from .changes import CursorExpired, InvalidCursor, current_cursor, fetch_changes
+from .votes import BulkVoteError, apply_vote_operations
+from .conditional import (
+    not_modified_response, set_validators, validators_for_ids, validators_for_posts, validators_for_queryset
+)
 from .serializers import (
     PostSerializer, 
-    PostVoteSerializer
+    PostVoteSerializer,
+    get_requested_fields,
+    side_load_authors,
+    wants_normalized_authors,
 )
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
@@ -32,6 +45,7 @@ class PostViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsAuthorOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ['title', 'content', 'tags']
+    BATCH_MAX_IDS = 100
     
     def get_serializer_context(self):
         """
@@ -65,7 +79,7 @@ class PostViewSet(viewsets.ModelViewSet):
             queryset = self.request._cached_base_queryset
         else:
             # Start with a base queryset that includes select_related to reduce DB queries
-            queryset = Post.objects.select_related('author', 'location', 'related_post').order_by('-created_at')
+            queryset = Post.objects.select_related('author__profile', 'location', 'related_post').order_by('-created_at')
             
             # Store at request level for reuse in the same request
             self.request._cached_base_queryset = queryset
@@ -73,14 +87,11 @@ class PostViewSet(viewsets.ModelViewSet):
         # Check and update event status for time-based auto-ending (with optimization)
         self._check_and_update_event_status(queryset)
         
-        # Annotate with related posts count (sons count for fathers)
-        queryset = queryset.annotate(
-            _related_posts_count=Case(
-                When(related_post__isnull=True, then=Count('related_posts')),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+        # Annotate with related posts count (sons count for fathers), unless a sparse
+        # fieldset (?fields=/?exclude=) leaves related_posts_count out
+        requested_fields = get_requested_fields(self.request, PostSerializer.Meta.fields)
+        if requested_fields is None or 'related_posts_count' in requested_fields:
+            queryset = annotate_related_posts_count(queryset)
         
         # Date filtering - proper implementation
         date_str = self.request.query_params.get('date')
@@ -123,12 +134,12 @@ class PostViewSet(viewsets.ModelViewSet):
                     # This is a main post, get it and all its related posts
                     queryset = Post.objects.filter(
                         Q(id=related_to_id) | Q(related_post_id=related_to_id)
-                    ).select_related('author', 'location')
+                    ).select_related('author__profile', 'location')
                 else:
                     # This is a related post, get the main post and all related posts
                     queryset = Post.objects.filter(
                         Q(id=main_post.related_post.id) | Q(related_post_id=main_post.related_post.id)
-                    ).select_related('author', 'location')
+                    ).select_related('author__profile', 'location')
                 
                 # Prefetch votes for better performance
                 queryset = queryset.prefetch_related('votes')
@@ -145,39 +156,130 @@ class PostViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(category=category.lower())
                 
                 # Track category interaction for analytics
-                if hasattr(self, 'request') and self.request.user.is_authenticated:
-                    try:
-                        CategoryInteraction.increment_interaction(
-                            user=self.request.user,
-                            category=category.lower(),
-                            interaction_type='filter'
-                        )
-                        print(f"📊 ANALYTICS - User {self.request.user.id} filtered by category: {category}")
-                    except Exception as e:
-                        print(f"⚠️ ANALYTICS - Failed to track category interaction: {e}")
+                self._track_category_filter(category.lower())
                 
         # Cache the user's saved posts if the user is authenticated
         if hasattr(self, 'request') and self.request.user.is_authenticated:
             if not hasattr(self.request, '_cached_saved_post_ids'):
                 from accounts.models import UserProfile
                 try:
-                    profile = UserProfile.objects.get(user=self.request.user)
-                    if hasattr(profile, 'saved_posts'):
-                        # Fetch all saved post IDs at once and store them in a set for O(1) lookup
-                        self.request._cached_saved_post_ids = set(profile.saved_posts.values_list('id', flat=True))
-                    else:
-                        self.request._cached_saved_post_ids = set()
+                    # Usually cached with the user by the authentication (see accounts/authentication.py)
+                    profile_id = self.request.user.profile.pk
                 except UserProfile.DoesNotExist:
                     self.request._cached_saved_post_ids = set()
+                else:
+                    # Fetch all saved post IDs at once and store them in a set for O(1) lookup
+                    self.request._cached_saved_post_ids = set(
+                        UserProfile.saved_posts.through.objects.filter(userprofile_id=profile_id)
+                        .values_list('post_id', flat=True)
+                    )
         
-        # Cache user votes for better performance in serializer
-        if hasattr(self, 'request') and self.request.user.is_authenticated and not hasattr(self.request, '_cached_user_votes'):
-            from .models import PostVote
-            user_votes = PostVote.objects.filter(user=self.request.user)
-            self.request._cached_user_votes = {v.post_id: (1 if v.is_upvote else -1) for v in user_votes}
-                    
+        # The user's votes are looked up per page by prime_user_post_state
         return queryset
     
+    def _track_category_filter(self, category):
+        """Record a category filter tap (buffered, flushed in the background)"""
+        if hasattr(self, 'request') and self.request.user.is_authenticated:
+            try:
+                interaction_buffer.record(
+                    user_id=self.request.user.id,
+                    category=category,
+                    interaction_type='filter'
+                )
+                print(f"📊 ANALYTICS - User {self.request.user.id} filtered by category: {category}")
+            except Exception as e:
+                print(f"⚠️ ANALYTICS - Failed to track category interaction: {e}")
+    
+    def _track_cached_category_filter(self, request):
+        """Category taps are still tracked when a cached id list skips get_queryset"""
+        category = request.query_params.get('category', '').lower()
+        if category in PostCategory.values:
+            self._track_category_filter(category)
+    
+    def _side_load_authors(self, request, data, posts_data):
+        """Add the ``authors`` map to ``data`` when the normalized shape was requested"""
+        if wants_normalized_authors(request):
+            data['authors'] = side_load_authors(posts_data, self.get_serializer_context())
+    
+    def _paginate_with_cached_ids(self, request, build_queryset, scope='', on_cache_hit=None, wrap=None):
+        """
+        Paginate a post list whose id list is cached per filter set (short TTL).
+        On a hit no post query runs: the ids go straight to the cached serializer,
+        which only loads the posts whose rendered bodies are not cached.
+        A hit skips get_queryset, so it sweeps expired events itself (at most
+        every EXPIRY_CHECK_SECONDS) and rebuilds the list when one ended.
+        ETag validators are computed from the page before serialization, so an
+        unchanged page is answered with 304. ``wrap`` builds the response body
+        from the paginated data.
+        """
+        cache_key = post_cache.list_key(request, scope=scope)
+        cached_page = post_cache.get_list(cache_key)
+        
+        if cached_page is not None and self._expire_events_on_cache_hit():
+            cache_key = post_cache.list_key(request, scope=scope)
+            cached_page = None
+        
+        if cached_page is not None:
+            if on_cache_hit:
+                on_cache_hit()
+            page = None
+            page_ids = cached_page['ids']
+            envelope = cached_page['envelope']
+            validators = validators_for_ids(request, page_ids, extra=(envelope.get('count'),))
+        else:
+            queryset = build_queryset()
+            page = self.paginate_queryset(queryset)
+            page_ids = [post.id for post in page]
+            envelope = {
+                key: value for key, value in self.get_paginated_response([]).data.items() if key != 'results'
+            }
+            validators = validators_for_posts(request, page, extra=(envelope.get('count'),))
+            post_cache.set_list(cache_key, {'ids': page_ids, 'envelope': envelope})
+        
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        serializer = self.get_serializer(page if page is not None else page_ids, many=True)
+        data = {**envelope, 'results': serializer.data}
+        self._side_load_authors(request, data, data['results'])
+        return set_validators(Response(wrap(data) if wrap else data), validators)
+    
+    def _expire_events_on_cache_hit(self):
+        """End overdue events before a cached id list is served; True when any ended"""
+        if not post_cache.claim('event-expiry', post_cache.config['EXPIRY_CHECK_SECONDS']):
+            return False
+        if not self._check_and_update_event_status(Post.objects.all()):
+            return False
+        post_cache.invalidate_lists_on_commit()
+        return True
+    
+    def list(self, request, *args, **kwargs):
+        """List main posts; the id list for each filter set is served from the post cache"""
+        return self._paginate_with_cached_ids(
+            request,
+            lambda: self.filter_queryset(self.get_queryset()),
+            on_cache_hit=lambda: self._track_cached_category_filter(request),
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Post detail with ETag validators; answers 304 before serializing an unchanged post"""
+        instance = self.get_object()
+        validators = validators_for_posts(request, [instance])
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), validators)
+    
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Hit-rate metrics for the post response cache (admins only)"""
+        self.permission_classes = [permissions.IsAdminUser]
+        self.check_permissions(request)
+        return Response(post_cache.stats())
+    
     @action(detail=False, methods=['get'])
     def user_posts(self, request):
         """Get posts created by specified user ID"""
@@ -194,7 +296,7 @@ class PostViewSet(viewsets.ModelViewSet):
         # Get ALL posts by user (including both main posts and related posts) with optimized queries
         # Use select_related to reduce DB queries
         posts = Post.objects.filter(author_id=user_id, is_anonymous=False)\
-            .select_related('author', 'location')\
+            .select_related('author__profile', 'location')\
             .order_by('-created_at')
         
         # Date filtering - same implementation as main posts endpoint
@@ -227,14 +329,7 @@ class PostViewSet(viewsets.ModelViewSet):
                 )
         
         # Annotate with related posts count (sons count for fathers)
-        from django.db.models import Case, When, IntegerField
-        posts = posts.annotate(
-            _related_posts_count=Case(
-                When(related_post__isnull=True, then=Count('related_posts')),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+        posts = annotate_related_posts_count(posts)
         
         # Use optimized serializer for user posts that excludes is_saved field
         from .serializers import UserPostSerializer
@@ -242,7 +337,9 @@ class PostViewSet(viewsets.ModelViewSet):
         page = self.paginate_queryset(posts)
         if page is not None:
             serializer = UserPostSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            self._side_load_authors(request, response.data, response.data['results'])
+            return response
             
         serializer = UserPostSerializer(posts, many=True, context={'request': request})
         return Response(serializer.data)
@@ -250,17 +347,19 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def following(self, request):
         """Get posts from users the current user is following"""
-        user = request.user
+        from accounts.models import UserProfile
         
-        # Get list of users that the current user follows
-        following_users = user.following.values_list('followee_id', flat=True)
+        # Get list of users that the current user follows (profiles whose followers include ours)
+        following_users = UserProfile.objects.filter(followers__user=request.user).values('user_id')
         
         # Filter out anonymous posts
         posts = self.get_queryset().filter(author_id__in=following_users, is_anonymous=False)
         page = self.paginate_queryset(posts)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            self._side_load_authors(request, response.data, response.data['results'])
+            return response
             
         serializer = self.get_serializer(posts, many=True)
         return Response(serializer.data)
@@ -285,39 +384,109 @@ class PostViewSet(viewsets.ModelViewSet):
         lng_range = radius / (111320.0 * abs(math.cos(math.radians(lat))))
         
         # Filter posts within the bounding box and exclude anonymous posts
-        # Use select_related and prefetch_related for better performance
-        queryset = self.get_queryset().filter(
-            location__latitude__range=(lat - lat_range, lat + lat_range),
-            location__longitude__range=(lng - lng_range, lng + lng_range),
-            is_anonymous=False
-        ).select_related('author', 'location', 'related_post')\
-         .prefetch_related('votes')
+        def build_queryset():
+            return self.get_queryset().filter(
+                location__latitude__range=(lat - lat_range, lat + lat_range),
+                location__longitude__range=(lng - lng_range, lng + lng_range),
+                is_anonymous=False
+            ).select_related('author__profile', 'location', 'related_post')
+        
+        return self._paginate_with_cached_ids(
+            request,
+            build_queryset,
+            on_cache_hit=lambda: self._track_cached_category_filter(request),
+            wrap=lambda data: {'success': True, 'data': data},
+        )
+    
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """
+        Hydrate up to BATCH_MAX_IDS posts by id in one pass: ``?ids=1,2,3`` or
+        ``{"ids": [1, 2, 3]}``. Posts come back in the requested order and
+        ids that don't exist are listed under ``missing``.
+        """
+        raw_ids = request.data.get('ids') if request.method == 'POST' else request.query_params.get('ids', '')
+        if isinstance(raw_ids, str):
+            raw_ids = [value for value in raw_ids.split(',') if value.strip()]
         
-        # Ensure the user's saved post IDs are cached for the serializer
-        if request.user.is_authenticated and not hasattr(request, '_cached_saved_post_ids'):
-            from accounts.models import UserProfile
+        try:
+            post_ids = list(dict.fromkeys(int(value) for value in raw_ids or []))
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(post_ids) > self.BATCH_MAX_IDS:
+            return Response(
+                {"error": f"At most {self.BATCH_MAX_IDS} ids can be requested at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Bare ids go through the cached list serializer: cached bodies are reused, the rest
+        # is loaded in one query, and the user's votes/saved posts are looked up once
+        serializer = self.get_serializer(post_ids, many=True)
+        posts = serializer.data
+        found_ids = {post['id'] for post in posts}
+        data = {
+            'posts': posts,
+            'missing': [post_id for post_id in post_ids if post_id not in found_ids],
+        }
+        self._side_load_authors(request, data, posts)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync: posts created, updated, voted on, ended or deleted since ``cursor``.
+        Without a cursor only the current cursor is returned. Optional filters:
+        ``bbox=min_lng,min_lat,max_lng,max_lat`` and ``following=true``.
+        """
+        cursor = request.query_params.get('cursor')
+        if not cursor:
+            return Response({'posts': [], 'deleted': [], 'cursor': current_cursor(), 'has_more': False})
+        
+        limit = request.query_params.get('limit')
+        try:
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit is not None and limit < 1:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        posts = None
+        bbox = request.query_params.get('bbox')
+        if bbox:
             try:
-                profile = UserProfile.objects.get(user=request.user)
-                if hasattr(profile, 'saved_posts'):
-                    request._cached_saved_post_ids = set(profile.saved_posts.values_list('id', flat=True))
-                else:
-                    request._cached_saved_post_ids = set()
-            except UserProfile.DoesNotExist:
-                request._cached_saved_post_ids = set()
+                min_lng, min_lat, max_lng, max_lat = [float(value) for value in bbox.split(',')]
+            except ValueError:
+                return Response(
+                    {"error": "bbox must be min_lng,min_lat,max_lng,max_lat"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            posts = Post.objects.filter(
+                location__latitude__range=(min_lat, max_lat),
+                location__longitude__range=(min_lng, max_lng),
+            )
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            paginated_response = self.get_paginated_response(serializer.data)
-            return Response({
-                'success': True,
-                'data': paginated_response.data
-            })
-            
-        serializer = self.get_serializer(queryset, many=True)
+        if request.query_params.get('following', 'false').lower() == 'true':
+            from accounts.models import UserProfile
+            followed_users = UserProfile.objects.filter(followers__user=request.user).values('user_id')
+            posts = (posts if posts is not None else Post.objects.all()).filter(author_id__in=followed_users)
+        
+        try:
+            result = fetch_changes(cursor, limit=limit, posts=posts)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response(
+                {"error": "Cursor expired, reload the feed", "cursor": current_cursor()},
+                status=status.HTTP_410_GONE
+            )
+        
+        serializer = self.get_serializer(result['post_ids'], many=True)
         return Response({
-            'success': True,
-            'data': serializer.data
+            'posts': serializer.data,
+            'deleted': result['deleted'],
+            'cursor': result['cursor'],
+            'has_more': result['has_more'],
         })
     
     @action(detail=False, methods=['get'])
@@ -337,7 +506,7 @@ class PostViewSet(viewsets.ModelViewSet):
             search=query, 
             is_anonymous=False
         ).select_related(
-            'author', 'location', 'related_post'
+            'author__profile', 'location', 'related_post'
         ).prefetch_related(
             'votes'
         )
@@ -437,11 +606,7 @@ class PostViewSet(viewsets.ModelViewSet):
                 
                 # Update the vote cache if it exists
                 if hasattr(request, '_cached_user_votes'):
-                    if user_vote == 0:
-                        if post.id in request._cached_user_votes:
-                            del request._cached_user_votes[post.id]
-                    else:
-                        request._cached_user_votes[post.id] = user_vote
+                    request._cached_user_votes[post.id] = user_vote
                 
                 response_data = {
                     'upvotes': post.upvotes,
@@ -465,6 +630,27 @@ class PostViewSet(viewsets.ModelViewSet):
         print(f"❌ VOTE DEBUG - Serializer validation failed: {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def bulk_vote(self, request):
+        """
+        Apply queued vote/status-vote operations from offline clients in one transaction.
+        Body: {"operations": [...]}; see posts/votes.py for the operation format.
+        """
+        self.permission_classes = [permissions.IsAuthenticated]
+        self.check_permissions(request)
+        
+        try:
+            result = apply_vote_operations(request.user, request.data.get('operations'))
+        except BulkVoteError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Keep the request-level vote cache in line with what was just written
+        if hasattr(request, '_cached_user_votes'):
+            for post_id, state in result['posts'].items():
+                request._cached_user_votes[post_id] = state['user_vote']
+        
+        return Response(result)
+    
     @action(detail=False, methods=['get'])
     def saved(self, request):
         """Get saved posts for the specified user"""
@@ -489,7 +675,7 @@ class PostViewSet(viewsets.ModelViewSet):
                 
             # Filter out anonymous posts from saved posts and use prefetch_related for related fields
             posts = self.get_queryset().filter(id__in=saved_post_ids, is_anonymous=False)\
-                .select_related('author', 'location')\
+                .select_related('author__profile', 'location')\
                 .prefetch_related('votes')
             
             # Cache the saved post IDs for the serializer
@@ -528,7 +714,7 @@ class PostViewSet(viewsets.ModelViewSet):
             
         # Use select_related and prefetch_related to optimize the query
         posts = self.get_queryset().filter(id__in=upvoted_post_ids, is_anonymous=False)\
-            .select_related('author', 'location')\
+            .select_related('author__profile', 'location')\
             .prefetch_related('votes')
         
         # Cache user's saved posts for serializer if the user is viewing their own upvoted posts
@@ -613,7 +799,7 @@ class PostViewSet(viewsets.ModelViewSet):
             ).exclude(
                 media_urls=[]
             ).select_related(
-                'author', 'location', 'related_post'
+                'author__profile', 'location', 'related_post'
             ).prefetch_related(
                 'votes', 'status_votes'
             ).order_by('-created_at')
@@ -710,7 +896,7 @@ class PostViewSet(viewsets.ModelViewSet):
             if post.related_post is None:
                 # Optimize query with select_related and prefetch_related
                 related_posts = Post.objects.filter(related_post=post)\
-                    .select_related('author', 'location')\
+                    .select_related('author__profile', 'location')\
                     .prefetch_related('votes')
                 
                 print(f"DEBUG: This is a main post, found {related_posts.count()} related posts")
@@ -722,11 +908,17 @@ class PostViewSet(viewsets.ModelViewSet):
                 related_posts = Post.objects.filter(
                     Q(related_post=main_post) | Q(id=main_post.id)
                 ).exclude(id=post.id)\
-                    .select_related('author', 'location')\
+                    .select_related('author__profile', 'location')\
                     .prefetch_related('votes')
                 
                 print(f"DEBUG: This is a related post, found {related_posts.count()} related posts")
             
+            # Answer unchanged related lists with 304 before loading or serializing them
+            validators = validators_for_queryset(request, related_posts)
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+            
             # Cache the user's saved posts for better performance
             if request.user.is_authenticated and not hasattr(request, '_cached_saved_post_ids'):
                 from accounts.models import UserProfile
@@ -747,11 +939,11 @@ class PostViewSet(viewsets.ModelViewSet):
             
             # Return JsonResponse with ensure_ascii=False to properly handle Arabic
             from django.http import JsonResponse
-            return JsonResponse(
+            return set_validators(JsonResponse(
                 response_data, 
                 safe=False, 
                 json_dumps_params={'ensure_ascii': False}
-            )
+            ), validators)
             
         except Post.DoesNotExist:
             print(f"DEBUG: Post {pk} does not exist")
@@ -925,7 +1117,7 @@ class PostViewSet(viewsets.ModelViewSet):
         print(f"🎯 RECOMMENDATIONS - User location: ({user_lat}, {user_lng}), radius: {radius_km}km")
         
         # Get user's category preferences from analytics with time decay
-        user_preferences, user_has_preferences = self._get_smart_user_preferences(request.user)
+        user_preferences, user_has_preferences, recent_filters = self._get_smart_user_preferences(request.user)
         print(f"🎯 RECOMMENDATIONS - User preferences: {user_preferences} (has_prefs: {user_has_preferences})")
         
         # Get candidate posts (nearby + some global trending if needed)
@@ -953,7 +1145,7 @@ class PostViewSet(viewsets.ModelViewSet):
         
         # Apply sophisticated scoring algorithm
         recommended_posts = self._calculate_smart_recommendation_scores(
-            unique_posts, user_preferences, request.user, user_lat, user_lng
+            unique_posts, user_preferences, request.user, user_lat, user_lng, recent_filters
         )
         
         # Ensure content diversity and category mixing
@@ -995,82 +1187,15 @@ class PostViewSet(viewsets.ModelViewSet):
         })
     
     def _get_smart_user_preferences(self, user):
-        """Get user's category preferences with time decay and emphasis on recently filtered categories"""
-        now = timezone.now()
-        start_date = now - timedelta(days=30)
-        
-        # Get category interactions with emphasis on 'filter' type interactions (category clicks)
-        interactions = CategoryInteraction.objects.filter(
-            user=user,
-            created_at__gte=start_date
-        ).values('category', 'count', 'last_updated', 'interaction_type')
-        
-        prefs_dict = {}
-        total_weight = 0
-        
-        for interaction in interactions:
-            # Calculate time-based weight with stronger decay for filter interactions
-            hours_old = (now - interaction['last_updated']).total_seconds() / 3600
-            
-            # Different time decay based on interaction type
-            if interaction['interaction_type'] == 'filter':
-                # Category filter clicks get much stronger recent boost
-                if hours_old < 1:  # Last hour
-                    time_weight = 5.0  # 5x boost for very recent filter clicks
-                elif hours_old < 6:  # Last 6 hours
-                    time_weight = 3.0  # 3x boost for recent filter clicks
-                elif hours_old < 24:  # Last day
-                    time_weight = 2.0  # 2x boost for same-day filter clicks
-                elif hours_old < 168:  # Last week
-                    time_weight = 1.5  # 1.5x boost for recent week
-                else:
-                    time_weight = max(0.1, 1.0 - (hours_old / (30 * 24)))  # Normal decay
-                
-                # Filter interactions get base multiplier
-                base_multiplier = 2.0
-                
-            elif interaction['interaction_type'] == 'view':
-                # Views get moderate time-based boost
-                if hours_old < 24:
-                    time_weight = 1.2
-                else:
-                    time_weight = max(0.1, 1.0 - (hours_old / (30 * 24)))
-                base_multiplier = 1.0
-                
-            else:  # Other interactions (vote, save, etc.)
-                # Regular interactions get normal weight
-                time_weight = max(0.1, 1.0 - (hours_old / (30 * 24)))
-                base_multiplier = 1.5
-            
-            # Calculate final weighted count
-            weighted_count = interaction['count'] * time_weight * base_multiplier
-            
-            if interaction['category'] in prefs_dict:
-                prefs_dict[interaction['category']] += weighted_count
-            else:
-                prefs_dict[interaction['category']] = weighted_count
-            
-            total_weight += weighted_count
-            
-            # Debug recent filter interactions
-            if interaction['interaction_type'] == 'filter' and hours_old < 24:
-                print(f"🎯 FILTER BOOST - Category '{interaction['category']}' filtered {hours_old:.1f}h ago, weight: {time_weight}x")
-        
-        # Normalize preferences
-        if total_weight > 0:
-            for category in prefs_dict:
-                prefs_dict[category] = prefs_dict[category] / total_weight
-        
-        user_has_preferences = len(prefs_dict) > 0
-        
-        # If user has no preferences, create balanced default weights for all categories
-        if not user_has_preferences:
-            from .models import PostCategory
-            all_categories = [choice[0] for choice in PostCategory.choices]
-            equal_weight = 1.0 / len(all_categories)
-            prefs_dict = {cat: equal_weight for cat in all_categories}
+        """
+        Get user's category preferences from the materialized preference vector.
+        Returns (preferences, user_has_preferences, recent_filters) from a single row read.
+        """
+        from .models import UserPreferenceVector
         
-        return prefs_dict, user_has_preferences
+        vector = UserPreferenceVector.for_user(user)
+        prefs_dict, user_has_preferences = vector.get_preferences()
+        return prefs_dict, user_has_preferences, vector.recent_filters
     
     def _get_nearby_posts(self, user_lat, user_lng, radius_km, date_filter=None):
         """Get posts within specified radius with optional date filtering"""
@@ -1080,7 +1205,7 @@ class PostViewSet(viewsets.ModelViewSet):
         
         # Base query with location filtering
         queryset = Post.objects.select_related(
-            'location', 'author'
+            'location', 'author__profile'
         ).prefetch_related(
             'votes'
         ).filter(
@@ -1130,7 +1255,7 @@ class PostViewSet(viewsets.ModelViewSet):
         
         # Strategy 2: Get trending/popular posts regardless of location
         trending_query = Post.objects.select_related(
-            'location', 'author'
+            'location', 'author__profile'
         ).prefetch_related('votes')
         
         # Apply date filter if provided
@@ -1181,9 +1306,10 @@ class PostViewSet(viewsets.ModelViewSet):
         
         return c * r
     
-    def _calculate_smart_recommendation_scores(self, posts, user_preferences, user, user_lat, user_lng):
+    def _calculate_smart_recommendation_scores(self, posts, user_preferences, user, user_lat, user_lng, recent_filters=None):
         """Calculate sophisticated recommendation scores based on multiple factors with enhanced weighting"""
         scored_posts = []
+        recent_filters = recent_filters or {}
         
         # Get max preference weight for normalization
         max_pref_weight = max(user_preferences.values()) if user_preferences else 1
@@ -1295,7 +1421,7 @@ class PostViewSet(viewsets.ModelViewSet):
             category_score = category_weight / max_pref_weight if max_pref_weight > 0 else 0.3
             
             # Check for recent category filter interactions for extra boost
-            recent_filter_boost = self._get_recent_filter_boost(user, post.category)
+            recent_filter_boost = self._get_recent_filter_boost(recent_filters.get(post.category))
             if recent_filter_boost > 0:
                 category_score *= (1 + recent_filter_boost)
                 if recent_filter_boost >= 2.0:
@@ -1380,23 +1506,15 @@ class PostViewSet(viewsets.ModelViewSet):
         # Sort by score descending
         return sorted(scored_posts, key=lambda p: p.recommendation_score, reverse=True)
     
-    def _get_recent_filter_boost(self, user, category):
-        """Get boost multiplier based on recent category filter interactions"""
-        now = timezone.now()
-        
-        # Look for recent filter interactions for this specific category
-        recent_filters = CategoryInteraction.objects.filter(
-            user=user,
-            category=category,
-            interaction_type='filter',
-            last_updated__gte=now - timedelta(hours=24)  # Last 24 hours
-        ).order_by('-last_updated').first()
-        
-        if not recent_filters:
+    def _get_recent_filter_boost(self, last_filtered_at):
+        """Get boost multiplier based on when the user last filtered by this category"""
+        from django.utils.dateparse import parse_datetime
+        
+        if not last_filtered_at:
             return 0
         
         # Calculate boost based on how recent the filter interaction was
-        hours_since_filter = (now - recent_filters.last_updated).total_seconds() / 3600
+        hours_since_filter = (timezone.now() - parse_datetime(last_filtered_at)).total_seconds() / 3600
         
         if hours_since_filter < 1:
             # Filtered within last hour - massive boost
@@ -1556,10 +1674,10 @@ class PostViewSet(viewsets.ModelViewSet):
         time_threshold = timezone.now() - timedelta(hours=24)
         
         # Use values_list to only fetch the ids for better performance
-        old_happening_post_ids = queryset.filter(
+        old_happening_post_ids = list(queryset.filter(
             status=PostStatus.HAPPENING,
             created_at__lt=time_threshold
-        ).values_list('id', flat=True)
+        ).values_list('id', flat=True))
         
         # Only update if there are posts to update
         if not old_happening_post_ids:
@@ -1569,10 +1687,15 @@ class PostViewSet(viewsets.ModelViewSet):
             
         # Batch update all old posts to ended status using a more efficient query
         updated_count = Post.objects.filter(id__in=old_happening_post_ids).update(
-            status=PostStatus.ENDED
+            status=PostStatus.ENDED,
+            version=F('version') + 1,
+            changed_at=timezone.now()
         )
         
         if updated_count > 0:
+            # Bulk update skips the post_save signal, so log the change and drop the cached bodies here
+            PostChange.record(old_happening_post_ids, PostChangeKind.ENDED)
+            post_cache.invalidate_posts_on_commit(old_happening_post_ids)
             print(f"🕐 AUTO-END DEBUG - Automatically marked {updated_count} events as ended (24+ hours old)")
         
         # Mark that we've checked this request
@@ -0,0 +1,280 @@
+"""
+Bulk application of queued vote and status-vote operations.
+
+Offline clients replay their queue through ``posts/bulk_vote/`` instead of
+one ``vote``/``vote_status`` request per tap. Each operation carries an
+idempotency key and the client timestamp of the tap:
+
+    {"key": "3f2a...", "type": "vote", "post_id": 12, "vote": 1, "client_timestamp": "..."}
+    {"key": "9b1c...", "type": "status", "post_id": 12, "event_ended": true, "client_timestamp": "..."}
+
+``vote`` is the state the user ended up with (1 up, -1 down, 0 removed)
+rather than a toggle, so replaying an operation is harmless. For several
+operations on the same post and type, the one with the latest client
+timestamp wins and the others are reported as ``superseded``.
+
+The whole batch is applied in one transaction: the affected posts are
+locked once, votes and status votes are written with bulk upserts, and the
+vote counters of every post are written with a single grouped UPDATE.
+"""
+
+from collections import namedtuple
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import post_cache
+from .models import EventStatusVote, Post, PostChange, PostChangeKind, PostStatus, PostVote, VoteReceipt
+
+DEFAULT_BULK_VOTE_SETTINGS = {
+    'MAX_OPERATIONS': 500,          # Operations accepted per request
+    'RECEIPT_RETENTION_DAYS': 30,   # Idempotency keys are remembered this long
+}
+
+VoteOperation = namedtuple('VoteOperation', ['index', 'key', 'type', 'post_id', 'value', 'client_timestamp'])
+
+
+class BulkVoteError(ValueError):
+    """The request as a whole is malformed (not a list, too many operations)"""
+
+
+def get_bulk_vote_settings():
+    """Return the bulk vote settings merged over the defaults"""
+    return {**DEFAULT_BULK_VOTE_SETTINGS, **getattr(settings, 'BULK_VOTES', {})}
+
+
+def parse_operation(index, raw):
+    """Validate one raw operation; raises ValueError with a message for the client"""
+    if not isinstance(raw, dict):
+        raise ValueError("operation must be an object")
+
+    key = raw.get('key')
+    if not isinstance(key, str) or not key or len(key) > 64:
+        raise ValueError("key must be a non-empty string of at most 64 characters")
+
+    try:
+        post_id = int(raw.get('post_id'))
+    except (TypeError, ValueError):
+        raise ValueError("post_id must be an integer")
+
+    op_type = raw.get('type')
+    if op_type == 'vote':
+        value = raw.get('vote')
+        if value not in (1, -1, 0):
+            raise ValueError("vote must be 1, -1 or 0")
+    elif op_type == 'status':
+        value = raw.get('event_ended')
+        if not isinstance(value, bool):
+            raise ValueError("event_ended must be true or false")
+    else:
+        raise ValueError("type must be 'vote' or 'status'")
+
+    client_timestamp = raw.get('client_timestamp')
+    if client_timestamp is not None:
+        parsed = parse_datetime(str(client_timestamp))
+        if parsed is None:
+            raise ValueError("client_timestamp must be an ISO 8601 datetime")
+        client_timestamp = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+
+    return VoteOperation(index, key, op_type, post_id, value, client_timestamp)
+
+
+def apply_vote_operations(user, raw_operations):
+    """
+    Apply a batch of queued operations for ``user``.
+
+    Returns ``{'results': [...], 'posts': {...}}``: one result per operation
+    in request order (``applied``, ``superseded``, ``duplicate``, ``missing``
+    or ``invalid``) and the final state of every post the batch touched.
+    """
+    if not isinstance(raw_operations, list):
+        raise BulkVoteError("operations must be a list")
+    max_operations = get_bulk_vote_settings()['MAX_OPERATIONS']
+    if len(raw_operations) > max_operations:
+        raise BulkVoteError(f"At most {max_operations} operations can be submitted at once")
+
+    results = [None] * len(raw_operations)
+    operations = []
+    for index, raw in enumerate(raw_operations):
+        try:
+            operations.append(parse_operation(index, raw))
+        except ValueError as e:
+            key = raw.get('key') if isinstance(raw, dict) else None
+            results[index] = {'key': key, 'result': 'invalid', 'error': str(e)}
+
+    with transaction.atomic():
+        # Lock the posts in id order so concurrent batches can't deadlock. A concurrent
+        # replay of the same keys waits here and then finds the receipts of the first
+        locked = {
+            post.id: post
+            for post in Post.objects.select_for_update().filter(id__in={op.post_id for op in operations}).order_by('id')
+        }
+
+        # Skip keys that were applied by an earlier replay or repeat within this batch
+        seen_keys = set(
+            VoteReceipt.objects.filter(user=user, key__in={op.key for op in operations}).values_list('key', flat=True)
+        )
+        fresh = []
+        for op in operations:
+            if op.key in seen_keys:
+                results[op.index] = {'key': op.key, 'result': 'duplicate'}
+            else:
+                seen_keys.add(op.key)
+                fresh.append(op)
+
+        fresh_post_ids = {op.post_id for op in fresh}
+        posts = {post_id: post for post_id, post in locked.items() if post_id in fresh_post_ids}
+
+        # Latest client timestamp wins per (post, type); untimed operations count as happening now
+        latest = {}
+        for op in fresh:
+            if op.post_id not in posts:
+                results[op.index] = {'key': op.key, 'result': 'missing'}
+                continue
+            sort_key = (op.client_timestamp or timezone.now(), op.index)
+            current = latest.get((op.post_id, op.type))
+            if current is None or sort_key >= current[0]:
+                if current is not None:
+                    results[current[1].index] = {'key': current[1].key, 'result': 'superseded'}
+                latest[(op.post_id, op.type)] = (sort_key, op)
+            else:
+                results[op.index] = {'key': op.key, 'result': 'superseded'}
+
+        winners = [op for _, op in latest.values()]
+        for op in winners:
+            results[op.index] = {'key': op.key, 'result': 'applied'}
+
+        user_votes = _apply_votes(user, posts, [op for op in winners if op.type == 'vote'])
+        status_votes, vote_counts = _apply_status_votes(user, posts, [op for op in winners if op.type == 'status'])
+
+        VoteReceipt.objects.bulk_create([
+            VoteReceipt(user=user, key=op.key)
+            for op in fresh
+            if op.post_id in posts
+        ], ignore_conflicts=True)
+
+        changed_ids = {op.post_id for op in winners}
+        if changed_ids:
+            Post.bump_versions(changed_ids, kind=PostChangeKind.VOTED)
+            post_cache.invalidate_posts_on_commit(changed_ids)
+
+    return {
+        'results': results,
+        'posts': {
+            post_id: {
+                'upvotes': post.upvotes,
+                'downvotes': post.downvotes,
+                'honesty_score': post.honesty_score,
+                'status': post.status,
+                'ended_votes': vote_counts.get(post_id, {}).get('ended', 0),
+                'happening_votes': vote_counts.get(post_id, {}).get('happening', 0),
+                'user_vote': user_votes.get(post_id, 0),
+                'user_status_vote': status_votes.get(post_id),
+            }
+            for post_id, post in posts.items()
+        },
+    }
+
+
+def _apply_votes(user, posts, operations):
+    """Upsert/delete the user's votes and write all counters in one grouped UPDATE; returns final votes"""
+    votes = PostVote.objects.filter(user=user, post_id__in=posts).values_list('post_id', 'is_upvote')
+    existing = {post_id: (1 if is_upvote else -1) for post_id, is_upvote in votes}
+    final = dict(existing)
+
+    upserts, removed, changed_posts = [], [], []
+    for op in operations:
+        old, new = existing.get(op.post_id, 0), op.value
+        if old == new:
+            continue
+        post = posts[op.post_id]
+        if old == 1:
+            post.upvotes = max(0, post.upvotes - 1)
+        elif old == -1:
+            post.downvotes = max(0, post.downvotes - 1)
+        if new == 1:
+            post.upvotes += 1
+        elif new == -1:
+            post.downvotes += 1
+
+        total_votes = post.upvotes + post.downvotes
+        post.honesty_score = int((post.upvotes / total_votes) * 100) if total_votes > 0 else 50
+        changed_posts.append(post)
+
+        if new == 0:
+            removed.append(op.post_id)
+            final.pop(op.post_id, None)
+        else:
+            upserts.append(PostVote(user=user, post_id=op.post_id, is_upvote=(new == 1)))
+            final[op.post_id] = new
+
+    if upserts:
+        PostVote.objects.bulk_create(
+            upserts, update_conflicts=True, unique_fields=['user', 'post'], update_fields=['is_upvote']
+        )
+    if removed:
+        # Plain DELETE: the per-row delete signals would redo the version bumps done for the whole batch
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(PostVote._meta.db_table)} "
+                f"WHERE user_id = %s AND post_id = ANY(%s)",
+                [user.id, removed],
+            )
+    if changed_posts:
+        Post.objects.bulk_update(changed_posts, ['upvotes', 'downvotes', 'honesty_score'])
+
+    return final
+
+
+def _apply_status_votes(user, posts, operations):
+    """
+    Upsert the user's status votes and end the posts whose votes now say so.
+    Returns (final status vote per post, status vote counts per post).
+    """
+    if operations:
+        EventStatusVote.objects.bulk_create(
+            [EventStatusVote(user=user, post_id=op.post_id, voted_ended=op.value) for op in operations],
+            update_conflicts=True,
+            unique_fields=['user', 'post'],
+            update_fields=['voted_ended'],
+        )
+
+    final = {
+        post_id: ('ended' if voted_ended else 'happening')
+        for post_id, voted_ended in EventStatusVote.objects.filter(
+            user=user, post_id__in=posts
+        ).values_list('post_id', 'voted_ended')
+    }
+    vote_counts = {
+        row['post_id']: row
+        for row in EventStatusVote.objects.filter(post_id__in=posts).values('post_id').annotate(
+            ended=Count('id', filter=Q(voted_ended=True)),
+            happening=Count('id', filter=Q(voted_ended=False)),
+        )
+    }
+
+    ended_posts = []
+    for op in operations:
+        post = posts[op.post_id]
+        counts = vote_counts.get(post.id, {})
+        post._ended_votes_count = counts.get('ended', 0)
+        post._happening_votes_count = counts.get('happening', 0)
+        if post.status == PostStatus.HAPPENING and post.should_mark_as_ended():
+            post.status = PostStatus.ENDED
+            ended_posts.append(post)
+
+    if ended_posts:
+        Post.objects.bulk_update(ended_posts, ['status'])
+        PostChange.record([post.id for post in ended_posts], PostChangeKind.ENDED)
+
+    return final, vote_counts
+
+
+def prune_vote_receipts(days=None):
+    """Forget idempotency keys older than the retention window; returns rows deleted"""
+    days = days or get_bulk_vote_settings()['RECEIPT_RETENTION_DAYS']
+    return VoteReceipt.objects.filter(applied_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
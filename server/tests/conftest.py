@@ -0,0 +1,151 @@
+"""
+Fixtures for the query budget suite: a seeded world of users, posts, votes
+and notifications, API clients, and stubs for the outbound Firebase calls
+(Firestore user sync and FCM sends) so no test talks to Google.
+"""
+
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+# Enough rows that the small and large pages in the growth tests differ
+SEED_POSTS = 24
+
+
+@pytest.fixture(autouse=True)
+def offline_firebase(monkeypatch, settings):
+    """Keep Firestore/FCM calls out of the tests (uploads go to the temporary MEDIA_ROOT of ../conftest.py)"""
+    import accounts.models
+
+    monkeypatch.setattr(accounts.models, 'sync_user_to_firestore', lambda *args, **kwargs: None)
+    batch_response = SimpleNamespace(success_count=1, failure_count=0, responses=[SimpleNamespace(success=True, exception=None)])
+    for name, value in (
+        ('send', 'projects/test/messages/1'),
+        ('send_multicast', batch_response),
+        ('send_each_for_multicast', batch_response),
+    ):
+        monkeypatch.setattr(f'firebase_admin.messaging.{name}', mock.Mock(return_value=value), raising=False)
+
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']  # Seeding speed only
+    settings.INTERACTION_INGEST = {'FLUSH_INTERVAL': 0}  # Flush in-request so counts are deterministic
+    settings.REQUEST_METRICS = {'ENABLED': False}
+
+
+@pytest.fixture
+def world(db):
+    """
+    A viewer following one author, an admin, ``SEED_POSTS`` posts around Amman by
+    several authors with votes, status votes, saves and a related post, and
+    ``SEED_POSTS`` notifications of every kind for the viewer.
+    """
+    from accounts.models import Account
+    from media_api.models import MediaFile
+    from notifications.models import (
+        EventConfirmation, FCMToken, FriendRequest, NotificationHistory, NotificationQueue, NotificationSettings,
+    )
+    from posts.cache import post_cache
+    from posts.models import EventStatusVote, Post, PostCoordinates, PostVote
+
+    post_cache.clear()
+    viewer = Account.objects.create_user(
+        email='viewer@example.com', first_name='View', last_name='Er', password='Password123!', is_verified=True
+    )
+    admin = Account.objects.create_superuser('admin@example.com', 'Ad', 'Min', 'Password123!')
+    authors = [
+        Account.objects.create_user(
+            email=f'author{index}@example.com', first_name='Author', last_name=str(index), password='Password123!'
+        )
+        for index in range(4)
+    ]
+    authors[1].profile.followers.add(viewer.profile)  # The viewer follows author 1
+    viewer.profile.followers.add(authors[0].profile)  # Author 0 follows the viewer
+
+    posts = []
+    for index in range(SEED_POSTS):
+        location = PostCoordinates.objects.create(
+            latitude=31.95 + index * 0.001, longitude=35.93, address=f'Street {index}, Amman'
+        )
+        posts.append(Post.objects.create(
+            title=f'Event {index}', content='Something is happening', category='news',
+            location=location, author=authors[index % len(authors)],
+        ))
+    own_location = PostCoordinates.objects.create(latitude=31.96, longitude=35.92)
+    own_post = Post.objects.create(title='My report', content='Seen it', location=own_location, author=viewer)
+    related_location = PostCoordinates.objects.create(latitude=31.95, longitude=35.93)
+    related = Post.objects.create(
+        title='Follow-up', content='Still going', location=related_location, author=authors[1], related_post=posts[0]
+    )
+
+    for post in posts:
+        PostVote.objects.create(user=authors[0], post=post, is_upvote=True)
+        EventStatusVote.objects.create(user=authors[2], post=post, voted_ended=False)
+    for post in posts[::2]:
+        PostVote.objects.create(user=viewer, post=post, is_upvote=True)
+        viewer.profile.saved_posts.add(post)
+
+    notification_settings, _ = NotificationSettings.objects.get_or_create(user=viewer)
+    fcm_token = FCMToken.objects.create(user=viewer, token='viewer-device-token', device_platform='android')
+    FCMToken.objects.create(user=authors[0], token='author-device-token', device_platform='ios')
+    notifications = [
+        NotificationHistory.objects.create(
+            user=viewer, notification_type='new_post', title=f'New post {index}', body='Nearby', data={'post_id': index}
+        )
+        for index in range(SEED_POSTS)
+    ]
+    queued = [
+        NotificationQueue.objects.create(
+            user=viewer, notification_type='system', title=f'Queued {index}', body='Later',
+            scheduled_for=timezone.now() + timedelta(minutes=index),
+        )
+        for index in range(SEED_POSTS)
+    ]
+    friend_request = FriendRequest.objects.create(from_user=authors[2], to_user=viewer, message='Hi')
+    confirmation = EventConfirmation.objects.create(event_id=str(posts[0].id), user=viewer, is_still_there=True)
+    media = MediaFile.objects.create(
+        user=viewer, file=ContentFile(b'not really a jpeg', name='test.jpg'), content_type='image',
+        original_filename='test.jpg',
+    )
+
+    return SimpleNamespace(
+        viewer=viewer, admin=admin, authors=authors, posts=posts, own_post=own_post, related=related, notifications=notifications, queued=queued,
+        notification_settings=notification_settings, fcm_token=fcm_token, friend_request=friend_request,
+        confirmation=confirmation, media=media,
+        unique=lambda: uuid.uuid4().hex[:8],
+    )
+
+
+def _bearer_client(user):
+    """A client sending a real access token, so JWT user resolution is part of every count"""
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    api_client = APIClient()
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return api_client
+
+
+@pytest.fixture
+def client(world):
+    """API client authenticated as the world's viewer"""
+    return _bearer_client(world.viewer)
+
+
+@pytest.fixture
+def author_client(world):
+    """API client authenticated as an unverified author"""
+    return _bearer_client(world.authors[0])
+
+
+@pytest.fixture
+def admin_client(world):
+    return _bearer_client(world.admin)
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
@@ -0,0 +1,346 @@
+"""
+Query budgets for every route in posts/, accounts/, notifications/ and
+media_api/.
+
+Each route gets a maximum query count measured against the seeded world in
+conftest.py. List routes are also requested with a small and a large page
+and must run the same number of queries, so an N+1 shows up as soon as it is
+introduced rather than on a production-sized feed. Failures print the SQL.
+Every named URL under those apps must have a route here, so a new endpoint
+can't ship without a budget.
+
+Clients send real JWT access tokens, so the user lookup done by
+authentication is part of every count: each route is measured with a cold
+authentication cache (accounts/authentication.py). A warm one must take
+the user and profile lookups off the read routes entirely. Budgets are the counts measured
+when each was set: when an optimization lowers a count, lower the budget
+with it.
+
+    pytest tests/
+"""
+
+import re
+from collections import Counter, namedtuple
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+
+from posts.cache import post_cache
+
+Route = namedtuple('Route', ['name', 'method', 'path', 'budget', 'data', 'client', 'page_param', 'fmt', 'status'])
+
+
+def route(name, method, path, budget, data=None, client='viewer', page_param=None, fmt='json', status=None):
+    """
+    ``path`` and ``data`` may be callables taking the seeded world.
+    ``client`` is 'viewer', 'author' (unverified), 'admin' or 'anonymous'.
+    ``page_param`` names the query parameter that sizes the page of a list
+    route ('page_size' or 'limit'); those routes also get a growth test.
+    ``status`` is the expected status code when it isn't a 2xx (e.g. a
+    rejected verification code); the budget covers that path too.
+    """
+    return Route(name, method, path, budget, data, client, page_param, fmt, status)
+
+
+def post_id(index=0):
+    return lambda world: f'/api/posts/{world.posts[index].id}/'
+
+
+def own_post(world):
+    return f'/api/posts/{world.own_post.id}/'
+
+ROUTES = [
+    # posts/
+    route('post-list', 'get', '/api/posts/', 10, page_param='page_size'),
+    route('post-list (normalized)', 'get', '/api/posts/?shape=normalized', 11, page_param='page_size'),
+    route('post-list (pin preset)', 'get', '/api/posts/?fields=pin', 8, page_param='page_size'),
+    route('post-create', 'post', '/api/posts/', 13, data={
+        'title': 'Road closed', 'content': 'Police at the roundabout', 'category': 'traffic',
+        'location': {'latitude': 31.97, 'longitude': 35.91, 'address': 'Abdoun'},
+    }),
+    route('post-detail', 'get', post_id(), 10),
+    route('post-update', 'patch', own_post, 11, data={'content': 'Updated'}),
+    route('post-delete', 'delete', own_post, 12),
+    route('post-related', 'get', lambda world: f'/api/posts/{world.posts[0].id}/related/', 12),
+    route('post-vote', 'post', lambda world: f'/api/posts/{world.posts[1].id}/vote/', 18, data={'is_upvote': True}),
+    route('post-vote-status', 'post', lambda world: f'/api/posts/{world.posts[1].id}/vote_status/', 13,
+          data={'event_ended': True}),
+    route('post-toggle-save', 'post', lambda world: f'/api/posts/{world.posts[1].id}/toggle_save/', 9),
+    route('post-nearby', 'get', '/api/posts/nearby/?lat=31.95&lng=35.93&radius=50000', 10, page_param='page_size'),
+    route('post-recommended', 'get', '/api/posts/recommended/?latitude=31.95&longitude=35.93', 21,
+          page_param='limit'),
+    route('post-following', 'get', '/api/posts/following/', 9, page_param='page_size'),
+    route('post-following-posts', 'get', '/api/posts/following_posts/', 5),
+    route('post-user-posts', 'get', lambda world: f'/api/posts/user_posts/?user_id={world.authors[1].id}', 6,
+          page_param='page_size'),
+    route('post-saved', 'get', lambda world: f'/api/posts/saved/?user_id={world.viewer.id}', 12, page_param='page_size'),
+    route('post-upvoted', 'get', lambda world: f'/api/posts/upvoted/?user_id={world.viewer.id}', 11, page_param='page_size'),
+    route('post-search', 'get', '/api/posts/search/?query=Event', 10, page_param='page_size'),
+    route('post-category-analytics', 'get', '/api/posts/category_analytics/', 2),
+    route('post-changes', 'get', '/api/posts/changes/', 2),
+    route('post-batch', 'get', lambda world: '/api/posts/batch/?ids=' + ','.join(str(p.id) for p in world.posts[:10]), 8),
+    route('post-bulk-vote', 'post', '/api/posts/bulk_vote/', 13, data=lambda world: {'operations': [
+        {'key': f'op-{post.id}', 'type': 'vote', 'post_id': post.id, 'vote': 1} for post in world.posts[:10]
+    ]}),
+    route('post-cache-stats', 'get', '/api/posts/cache_stats/', 1, client='admin'),
+
+    # accounts/
+    route('token_obtain_pair', 'post', '/api/accounts/token/', 2, client='anonymous',
+          data={'email': 'viewer@example.com', 'password': 'Password123!'}),
+    route('token_refresh', 'post', '/api/accounts/token/refresh/', 6, client='anonymous',
+          data=lambda world: {'refresh': str(_refresh_token(world.viewer))}),
+    route('token_validate', 'post', '/api/accounts/token/validate/', 1),
+    route('register', 'post', '/api/accounts/register/', 14, client='anonymous', data={
+        'email': 'newcomer@example.com', 'password': 'Password123!', 'first_name': 'New', 'last_name': 'Comer',
+    }),
+    route('login', 'post', '/api/accounts/login/', 2, client='anonymous',
+          data={'email': 'viewer@example.com', 'password': 'Password123!'}),
+    route('google_login', 'post', '/api/accounts/google-login/', 14, client='anonymous', data={
+        'google_id': 'g-123', 'email': 'googler@example.com', 'first_name': 'Goo', 'last_name': 'Gler',
+    }),
+    route('logout', 'post', '/api/accounts/logout/', 9, data=lambda world: {'refresh': str(_refresh_token(world.viewer))}),
+    route('all_users_minimal', 'get', '/api/accounts/all-users/', 2),
+    route('user_directory', 'get', '/api/accounts/users/directory/', 3, page_param='limit'),
+    route('profile', 'get', '/api/accounts/profile/', 4),
+    route('profile_image', 'post', '/api/accounts/profile-image/', 8, fmt='multipart',
+          data=lambda world: {'profile_image': _png_upload()}),
+    route('verify_email', 'post', '/api/accounts/verify-email/', 2, data={'code': '000000'}, client='author',
+          status=400),
+    route('resend_verification', 'post', '/api/accounts/resend-verification-code/', 3, client='author'),
+    route('forgot_password', 'post', '/api/accounts/forgot-password/', 3, client='anonymous',
+          data={'email': 'viewer@example.com'}),
+    route('verify_reset_code', 'post', '/api/accounts/verify-reset-code/', 2, client='anonymous',
+          data={'email': 'viewer@example.com', 'code': '000000'}, status=400),
+    route('reset_password', 'post', '/api/accounts/reset-password/', 0, client='anonymous',
+          data={'reset_token': 'invalid', 'new_password': 'Password456!'}, status=400),
+    route('user_profile', 'get', '/api/accounts/users/profile/', 4),
+    route('user_profile_update', 'post', '/api/accounts/users/profile/update/', 6, data={'bio': 'Hello'}),
+    route('user_profile_detail', 'get', lambda world: f'/api/accounts/users/{world.authors[0].id}/profile/', 6),
+    route('user_follow', 'post', lambda world: f'/api/accounts/users/{world.authors[2].id}/follow/', 10),
+    route('user_unfollow', 'post', lambda world: f'/api/accounts/users/{world.authors[1].id}/unfollow/', 6),
+    route('user_followers', 'get', lambda world: f'/api/accounts/users/{world.viewer.id}/followers/', 5),
+    route('user_following', 'get', lambda world: f'/api/accounts/users/{world.viewer.id}/following/', 5),
+    route('user_search', 'get', '/api/accounts/users/search/?q=author', 3),
+    route('user_random', 'get', '/api/accounts/users/random/', 10),
+    route('verification_request (get)', 'get', '/api/accounts/verification-request/', 2),
+    route('verification_request (post)', 'post', '/api/accounts/verification-request/', 3,
+          data={'reason': 'I report from the field every day'}),
+    route('change_password', 'post', '/api/accounts/change-password/', 6,
+          data={'current_password': 'Password123!', 'new_password': 'Password456!'}),
+    route('change_email', 'post', '/api/accounts/change-email/', 9,
+          data={'new_email': 'viewer2@example.com', 'password': 'Password123!'}),
+    route('data_download_request', 'post', '/api/accounts/data-download-request/', 1),
+    route('deactivate_account', 'post', '/api/accounts/deactivate-account/', 2, data={'password': 'Password123!'}),
+    route('delete_account', 'post', '/api/accounts/delete-account/', 66, data={'password': 'Password123!'}),
+
+    # notifications/
+    route('notification-settings-list', 'get', '/api/notifications/settings/', 3),
+    route('notification-settings-my-settings', 'get', '/api/notifications/settings/my_settings/', 2),
+    route('notification-settings-detail', 'get',
+          lambda world: f'/api/notifications/settings/{world.notification_settings.id}/', 2),
+    route('notification-settings-my-settings (patch)', 'patch', '/api/notifications/settings/my_settings/', 3,
+          data={'nearby_events': False}),
+    route('fcm-tokens-list', 'get', '/api/notifications/fcm-tokens/', 3),
+    route('fcm-tokens-register-token', 'post', '/api/notifications/fcm-tokens/register_token/', 6,
+          data={'token': 'new-device-token', 'platform': 'android'}),
+    route('fcm-tokens-deactivate-token', 'post', '/api/notifications/fcm-tokens/deactivate_token/', 2,
+          data={'token': 'viewer-device-token'}),
+    route('fcm-tokens-detail', 'get', lambda world: f'/api/notifications/fcm-tokens/{world.fcm_token.id}/', 2),
+    route('notification-history-list', 'get', '/api/notifications/history/', 3, page_param='page_size'),
+    route('notification-history-detail', 'get',
+          lambda world: f'/api/notifications/history/{world.notifications[0].id}/', 2),
+    route('notification-history-unread-count', 'get', '/api/notifications/history/unread_count/', 1),
+    route('notification-history-mark-all-read', 'post', '/api/notifications/history/mark_all_read/', 2),
+    route('notification-history-mark-read', 'post',
+          lambda world: f'/api/notifications/history/{world.notifications[0].id}/mark_read/', 3),
+    route('notification-history-mark-unread', 'post',
+          lambda world: f'/api/notifications/history/{world.notifications[0].id}/mark_unread/', 3),
+    route('notification-history-delete-notification', 'delete',
+          lambda world: f'/api/notifications/history/{world.notifications[0].id}/delete_notification/', 3),
+    route('friend-requests-list', 'get', '/api/notifications/friend-requests/', 3, page_param='page_size'),
+    route('friend-requests-detail', 'get',
+          lambda world: f'/api/notifications/friend-requests/{world.friend_request.id}/', 2),
+    route('friend-requests-send-request', 'post', '/api/notifications/friend-requests/send_request/', 6,
+          data=lambda world: {'to_user_id': world.authors[3].id, 'message': 'Hi'}),
+    route('friend-requests-respond', 'post',
+          lambda world: f'/api/notifications/friend-requests/{world.friend_request.id}/respond/', 4,
+          data={'response': 'accepted'}),
+    route('event-confirmations-list', 'get', '/api/notifications/event-confirmations/', 3, page_param='page_size'),
+    route('event-confirmations-detail', 'get',
+          lambda world: f'/api/notifications/event-confirmations/{world.confirmation.id}/', 2),
+    route('event-confirmations-respond-to-confirmation', 'post',
+          '/api/notifications/event-confirmations/respond_to_confirmation/', 5,
+          data=lambda world: {'confirmation_id': str(world.confirmation.id), 'is_still_there': True}),
+    route('notification-queue-list', 'get', '/api/notifications/queue/', 3, page_param='page_size'),
+    route('notification-queue-stats', 'get', '/api/notifications/queue/stats/', 7),
+    route('notification-queue-detail', 'get', lambda world: f'/api/notifications/queue/{world.queued[0].id}/', 2),
+    route('send-still-there-confirmation', 'post', '/api/notifications/actions/send-still-there-confirmation/', 8,
+          data=lambda world: {'event_id': str(world.posts[0].id), 'user_ids': [a.id for a in world.authors[:2]]}),
+    route('test-notification', 'post', '/api/notifications/actions/test-notification/', 3),
+    route('send-direct', 'post', '/api/notifications/actions/send-direct/', 3,
+          data=lambda world: {'recipient_user_id': world.authors[0].id, 'title': 'Hi', 'body': 'There'}),
+
+    # media_api/
+    route('mediafile-list', 'get', '/media-api/files/', 3, page_param='page_size'),
+    route('mediafile-detail', 'get', lambda world: f'/media-api/files/{world.media.id}/', 2),
+    route('upload_media', 'post', '/media-api/upload/', 2, fmt='multipart', data=lambda world: {
+        'file': _png_upload(), 'content_type': 'image',
+    }),
+    route('get_media', 'get', lambda world: f'/media-api/get/{world.media.id}/', 3),
+    route('delete_media', 'delete', lambda world: f'/media-api/delete/{world.media.id}/', 5),
+    route('list_user_media', 'get', '/media-api/list/', 2),
+    route('get_thumbnail', 'get', '/media-api/thumbnail/missing.mp4/', 1, status=404),
+]
+
+
+# URL prefixes of the apps whose routes are budgeted
+BUDGETED_PREFIXES = ('api/accounts/', 'api/posts/', 'api/notifications/', 'media-api/')
+
+# Named URLs that aren't endpoints of their own: the DRF routers' browsable API roots
+UNBUDGETED_URL_NAMES = {'api-root'}
+
+
+def _url_names(patterns, prefix=''):
+    """(path, name) of every named URL pattern, with the route prefixes joined"""
+    for pattern in patterns:
+        path = prefix + str(pattern.pattern).lstrip('^')
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns, path)
+        elif pattern.name:
+            yield path, pattern.name
+
+
+def _refresh_token(user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+    return RefreshToken.for_user(user)
+
+
+def _png_upload():
+    import io
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile('pixel.png', buffer.getvalue(), content_type='image/png')
+
+
+def _resolve(value, world):
+    return value(world) if callable(value) else value
+
+
+def _request(route, world, clients, extra_params=None):
+    path = _resolve(route.path, world)
+    if extra_params:
+        separator = '&' if '?' in path else '?'
+        path += separator + '&'.join(f'{key}={value}' for key, value in extra_params.items())
+    api_client = clients[route.client]
+    data = _resolve(route.data, world)
+    if route.method == 'get':
+        return api_client.get(path)
+    return getattr(api_client, route.method)(path, data, format=route.fmt)
+
+
+@pytest.fixture
+def clients(client, author_client, admin_client, anonymous_client):
+    return {'viewer': client, 'author': author_client, 'admin': admin_client, 'anonymous': anonymous_client}
+
+
+def _normalize(sql):
+    """SQL with literals stripped, to group repeated statements"""
+    return re.sub(r"\b\d+\b|'[^']*'", '?', sql)
+
+
+def _format_queries(queries):
+    return '\n'.join(f"{index}. {query['sql']}" for index, query in enumerate(queries, start=1))
+
+
+def _measure(route, world, clients, extra_params=None):
+    post_cache.clear()
+    with CaptureQueriesContext(connection) as captured:
+        response = _request(route, world, clients, extra_params)
+    return response, captured.captured_queries
+
+
+@pytest.mark.parametrize('route', ROUTES, ids=lambda route: f'{route.method.upper()} {route.name}')
+def test_query_budget(route, world, clients):
+    response, queries = _measure(route, world, clients)
+
+    if route.status is not None:
+        assert response.status_code == route.status, f"{route.name} returned {response.status_code}"
+    else:
+        assert response.status_code < 400, f"{route.name} returned {response.status_code}: {response.content[:200]}"
+    if len(queries) > route.budget:
+        pytest.fail(
+            f"{route.method.upper()} {route.name} ran {len(queries)} queries, budget is {route.budget}:\n"
+            f"{_format_queries(queries)}",
+            pytrace=False,
+        )
+
+
+@pytest.mark.parametrize(
+    'route', [route for route in ROUTES if route.page_param],
+    ids=lambda route: f'{route.method.upper()} {route.name}',
+)
+def test_queries_do_not_grow_with_page_size(route, world, clients):
+    small_response, small = _measure(route, world, clients, {route.page_param: 2})
+    large_response, large = _measure(route, world, clients, {route.page_param: 20})
+
+    assert small_response.status_code == large_response.status_code == 200
+    if len(large) > len(small):
+        grown = Counter(_normalize(query['sql']) for query in large)
+        grown.subtract(Counter(_normalize(query['sql']) for query in small))
+        repeated = '\n'.join(f"+{count} x {sql}" for sql, count in grown.most_common() if count > 0)
+        pytest.fail(
+            f"{route.name} ran {len(small)} queries for 2 items and {len(large)} for 20; "
+            f"statements that grew with the page:\n{repeated}",
+            pytrace=False,
+        )
+
+
+# Read routes that also use request.user.profile, which comes with the cached user
+PROFILE_READING_ROUTES = {'post-list', 'post-detail', 'post-nearby', 'post-saved', 'profile', 'user_profile'}
+
+# Routes authenticated from the token claims alone, with no user lookup to save
+CLAIMS_ONLY_ROUTES = {'user_directory', 'notification-history-unread-count'}
+
+
+@pytest.mark.parametrize(
+    'route', [
+        route for route in ROUTES
+        if route.method == 'get' and route.client == 'viewer' and route.name not in CLAIMS_ONLY_ROUTES
+    ],
+    ids=lambda route: f'{route.method.upper()} {route.name}',
+)
+def test_warm_authentication_cache_saves_queries(route, world, clients, settings, tmp_path):
+    settings.AUTH_CACHE = {'ENABLED': False}
+    _, uncached = _measure(route, world, clients)
+    # The user is only cached in a cache shared between workers; a directory cache stands in for one
+    settings.CACHES = {
+        **settings.CACHES,
+        'auth': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)},
+    }
+    settings.AUTH_CACHE = {'ENABLED': True, 'CACHE': 'auth'}
+    _measure(route, world, clients)
+    _, warm = _measure(route, world, clients)
+
+    saved = 2 if route.name in PROFILE_READING_ROUTES else 1
+    if len(warm) > len(uncached) - saved:
+        pytest.fail(
+            f"{route.name} ran {len(warm)} queries with a warm authentication cache and {len(uncached)} "
+            f"without one; expected at least {saved} fewer:\n{_format_queries(warm)}",
+            pytrace=False,
+        )
+
+
+def test_every_url_has_a_budget(world):
+    url_names = {
+        name for path, name in _url_names(get_resolver().url_patterns)
+        if path.startswith(BUDGETED_PREFIXES) and name not in UNBUDGETED_URL_NAMES
+    }
+    budgeted = {resolve(_resolve(route.path, world).split('?')[0]).url_name for route in ROUTES}
+
+    assert url_names - budgeted == set(), 'named URLs without a query budget'